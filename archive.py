@@ -0,0 +1,790 @@
+"""
+EvLogPyAI - Archivio Compresso delle Estrazioni
+Gli eventi di ogni estrazione conservati compressi e senza duplicati, con limiti di
+spazio e di età; qualsiasi report passato può essere ricostruito su richiesta
+
+Il testo di ogni evento nel report (report.format_event) è un record identificato
+dall'impronta del contenuto: estrazioni ripetute dello stesso canale ritrovano quasi
+tutti i record già archiviati e aggiungono solo quelli nuovi. I record nuovi vengono
+raccolti in blocchi da ~256 KB compressi con zstd (pacchetto opzionale zstandard) o
+zlib, ognuno con la tabella delle posizioni dei suoi record; ogni estrazione conserva
+solo i riferimenti (blocco, posizione) dei suoi eventi nell'ordine del report.
+
+La ricostruzione segue i riferimenti senza consultare l'indice delle impronte: decomprime
+i blocchi (tenuti in una piccola cache) e scrive i testi già pronti, numerandoli. Il costo
+resta vicino a quello della lettura del report non compresso e il file ottenuto è
+identico a quello scritto sul Desktop.
+
+Spazio e età sono limitati da apply_retention: le estrazioni più vecchie vengono
+eliminate, i record non più usati rimossi e i blocchi rimasti quasi vuoti riscritti
+(compattazione); il file SQLite restituisce lo spazio con l'incremental vacuum.
+
+Uso da riga di comando:
+    python archive.py                       # elenco delle estrazioni archiviate
+    python archive.py --export 42           # ricostruisce il report 42 sul Desktop
+    python archive.py --stats
+    python archive.py --compact --max-mb 500 --max-days 90
+    python archive.py --bench               # compressione e ricostruzione su estrazioni sintetiche
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni da riga di comando
+import argparse
+
+# array: Elenco compatto delle impronte di un'estrazione
+import array
+
+# hashlib: Impronta del contenuto dei record
+import hashlib
+
+# os: Percorsi dei report ricostruiti
+import os
+
+# sqlite3: Blocchi, record ed estrazioni in un unico file
+import sqlite3
+
+# sys: Ordine dei byte delle impronte salvate
+import sys
+
+# tempfile: File temporanei del benchmark
+import tempfile
+
+# threading: Archiviazione dal thread di estrazione, compattazione da un altro
+import threading
+
+# time: Istante delle estrazioni e misure del benchmark
+import time
+
+# zlib: Compressione dei blocchi (sempre disponibile)
+import zlib
+
+# collections: Cache dei blocchi decompressi
+from collections import OrderedDict
+
+# datetime: Data delle estrazioni nei report ricostruiti
+from datetime import datetime
+
+# zstandard: Compressione più veloce e compatta dei blocchi (opzionale - senza viene usato zlib)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# paths: Cartella dati dell'applicazione
+from paths import app_data_path
+
+# report: Testo degli eventi e scrittura del report ricostruito
+from report import ReportWriter, format_events, report_path
+
+
+# === CONFIGURAZIONE ===
+
+# Testo non compresso per blocco: abbastanza per comprimere bene, poco da decomprimere per un record
+BLOCK_BYTES = 256 * 1024
+
+# Blocchi decompressi tenuti in memoria durante la ricostruzione
+BLOCK_CACHE = 32
+
+# Livelli di compressione (veloci: l'archiviazione avviene durante la lettura degli eventi)
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Blocchi con meno di questa frazione di contenuto ancora usato vengono riscritti dalla compattazione
+COMPACT_RATIO = 0.5
+
+# Limiti predefiniti dell'archivio
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_DAYS = 90
+
+# Parametri per query "IN (...)" (SQLite ne accetta al massimo 999 nelle versioni più vecchie)
+_IN_BATCH = 500
+
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+
+def default_codec() -> str:
+    """Compressione dei nuovi blocchi: zstd se disponibile"""
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Blocco compresso con zstd: installare il pacchetto zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+# Bit della posizione del record nel blocco all'interno di un riferimento (blocco << 20 | posizione)
+_SLOT_BITS = 20
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+
+
+def record_hash(data: bytes) -> int:
+    """Impronta di un record (64 bit con segno, chiave primaria SQLite)"""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def _to_little(values: array.array) -> array.array:
+    if sys.byteorder == "big":
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _pack_refs(refs: array.array) -> bytes:
+    """Riferimenti ai record di un'estrazione, nell'ordine del report, little-endian e compressi"""
+    return zlib.compress(_to_little(refs).tobytes(), 1)
+
+
+def _unpack_refs(data: bytes) -> array.array:
+    refs = array.array("q")
+    refs.frombytes(zlib.decompress(data))
+    return _to_little(refs)
+
+
+def _pack_block(texts: list) -> bytes:
+    """Testi dei record preceduti dalla tabella delle posizioni (numero di record e n + 1 offset)"""
+    offsets = array.array("I", [len(texts), 0])
+    position = 0
+    for text in texts:
+        position += len(text)
+        offsets.append(position)
+    return _to_little(offsets).tobytes() + b"".join(texts)
+
+
+def _unpack_block(data: bytes) -> tuple:
+    """(dati, offset dei record, inizio dei testi) di un blocco decompresso"""
+    count = int.from_bytes(data[:4], "little")
+    offsets = array.array("I")
+    offsets.frombytes(data[4:8 + 4 * count])
+    return data, _to_little(offsets), 8 + 4 * count
+
+
+def _batches(items: list, size: int = _IN_BATCH):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ArchiveRun:
+    """
+    Estrazione in corso di archiviazione: eventi aggiunti a lotti, poi close()
+
+    Uso come fase della pipeline di estrazione, accanto alla scrittura del report.
+    """
+
+    def __init__(self, archive, title: str, category: str, category_windows: str, description: str,
+                 num_rows: int, filename: str = None):
+        self.archive = archive
+        self.title = title
+        self.category = category
+        self.category_windows = category_windows
+        self.description = description
+        self.num_rows = num_rows
+        self.filename = filename
+        self.created = time.time()
+        self.raw_bytes = 0
+        self.refs = array.array("q")  # Riferimento di ogni evento (-1 finché il suo blocco non è salvato)
+
+        # Blocco in preparazione: testi nuovi, loro posizione e eventi che vi fanno riferimento
+        self._texts = []
+        self._size = 0
+        self._pending = {}
+        self._unresolved = []
+
+    def add_events(self, logs: list):
+        """
+        Archivia un lotto di eventi (solo i record mai visti occupano spazio)
+
+        Args:
+            logs (list): Eventi nel formato dell'applicazione
+        """
+        texts = [text.encode("utf-8") for text in format_events(logs, self.archive.messages)]
+        hashes = [record_hash(text) for text in texts]
+        self.raw_bytes += sum(len(text) for text in texts)
+
+        # Sotto il lock: la compattazione vede (e aggiorna) anche i riferimenti delle estrazioni in corso
+        with self.archive._lock:
+            known = self.archive._lookup(hashes)
+            refs = self.refs
+            for record, text in zip(hashes, texts):
+                ref = known.get(record)
+                if ref is not None:
+                    refs.append(ref)
+                    continue
+                slot = self._pending.get(record)
+                if slot is None:
+                    slot = self._pending[record] = len(self._texts)
+                    self._texts.append(text)
+                    self._size += len(text)
+                self._unresolved.append((len(refs), slot))
+                refs.append(-1)
+                if self._size >= BLOCK_BYTES:
+                    known.update(self._flush())
+
+    def _flush(self) -> dict:
+        """Salva il blocco in preparazione e completa i riferimenti che lo attendevano"""
+        if not self._texts:
+            return {}
+        saved = self.archive._write_block(self._texts, self._pending)
+        by_slot = {slot: saved[record] for record, slot in self._pending.items()}
+        for index, slot in self._unresolved:
+            self.refs[index] = by_slot[slot]
+        self._texts = []
+        self._size = 0
+        self._pending = {}
+        self._unresolved = []
+        return saved
+
+    def close(self) -> int:
+        """
+        Completa l'archiviazione
+
+        Returns:
+            int: Id dell'estrazione archiviata
+        """
+        with self.archive._lock:
+            self._flush()
+            return self.archive._finish_run(self)
+
+    def abort(self):
+        """Annulla l'estrazione (i record già scritti e non usati spariscono alla compattazione)"""
+        self._texts = []
+        self._pending = {}
+        self._unresolved = []
+        self.archive._forget(self)
+
+
+class EventArchive:
+    """
+    Archivio compresso e deduplicato degli eventi estratti, in un file SQLite
+    """
+
+    def __init__(self, path: str = None, codec: str = None, messages=None):
+        """
+        Args:
+            path (str): Percorso del file SQLite (default: %LOCALAPPDATA%\\EvLogPyAI\\archive.db)
+            codec (str): Compressione dei nuovi blocchi ("zstd" o "zlib", default: zstd se disponibile)
+            messages (MessageStore): Archivio dei messaggi completi degli eventi (come nel report)
+        """
+        self.path = path or app_data_path("archive.db")
+        self.codec = codec or default_codec()
+        self.messages = messages
+        self._lock = threading.RLock()
+        self._active = set()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # Deve precedere la creazione delle tabelle: lo spazio liberato torna al file system
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blocks (
+                id INTEGER PRIMARY KEY,
+                codec TEXT NOT NULL,
+                records INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                stored_bytes INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+            -- Indice dei contenuti: impronta -> riferimento (blocco << 20 | posizione nel blocco)
+            CREATE TABLE IF NOT EXISTS records (
+                hash INTEGER PRIMARY KEY,
+                ref INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_ref ON records (ref);
+            -- Ogni estrazione: metadati del report e riferimenti ai record nell'ordine del report
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created REAL NOT NULL,
+                title TEXT,
+                category TEXT,
+                category_windows TEXT,
+                description TEXT,
+                num_rows INTEGER,
+                filename TEXT,
+                events INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                manifest BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_created ON runs (created);
+            """
+        )
+        self._conn.commit()
+
+    # === ARCHIVIAZIONE ===
+
+    def begin_run(self, title: str, category: str, category_windows: str, description: str = "",
+                  num_rows: int = 0, filename: str = None) -> ArchiveRun:
+        """
+        Inizia l'archiviazione di un'estrazione, i cui eventi arrivano poi a lotti
+
+        Args:
+            title (str): Titolo del problema
+            category (str): Categoria di log selezionata
+            category_windows (str): Nome tecnico Windows della categoria
+            description (str): Descrizione del problema
+            num_rows (int): Numero di righe richieste
+            filename (str): Nome del report sul Desktop
+
+        Returns:
+            ArchiveRun: Estrazione in corso (add_events, poi close)
+        """
+        run = ArchiveRun(self, title, category, category_windows, description, num_rows, filename)
+        with self._lock:
+            self._active.add(run)
+        return run
+
+    def add_run(self, logs: list, title: str, category: str, category_windows: str, description: str = "",
+                num_rows: int = 0, filename: str = None) -> int:
+        """
+        Archivia un'estrazione completa in una volta
+
+        Returns:
+            int: Id dell'estrazione archiviata
+        """
+        run = self.begin_run(title, category, category_windows, description, num_rows, filename)
+        try:
+            run.add_events(logs)
+            return run.close()
+        except Exception:
+            run.abort()
+            raise
+
+    def _lookup(self, hashes: list) -> dict:
+        """Riferimenti dei record già archiviati tra quelli indicati (con il lock già preso)"""
+        cursor = self._conn.cursor()
+        cursor.row_factory = None
+        found = {}
+        for batch in _batches(list(set(hashes))):
+            found.update(cursor.execute(
+                f"SELECT hash, ref FROM records WHERE hash IN ({','.join('?' * len(batch))})", batch
+            ))
+        return found
+
+    def _write_block(self, texts: list, pending: dict) -> dict:
+        """
+        Comprime e salva un blocco (con il lock già preso)
+
+        Returns:
+            dict: Impronta -> riferimento di ogni record del blocco
+        """
+        # Un'altra estrazione in corso può aver appena archiviato gli stessi record: si usano i suoi
+        saved = self._lookup(list(pending))
+        data = _pack_block(texts)
+        compressed = _compress(data, self.codec)
+        block_id = self._conn.execute(
+            "INSERT INTO blocks (codec, records, raw_bytes, stored_bytes, data) VALUES (?, ?, ?, ?, ?)",
+            (self.codec, len(texts), sum(len(text) for text in texts), len(compressed), compressed)
+        ).lastrowid
+        rows = []
+        for record, slot in pending.items():
+            if record not in saved:
+                saved[record] = block_id << _SLOT_BITS | slot
+                rows.append((record, saved[record], len(texts[slot])))
+        self._conn.executemany("INSERT INTO records (hash, ref, length) VALUES (?, ?, ?)", rows)
+        self._conn.commit()
+        return saved
+
+    def _finish_run(self, run: ArchiveRun) -> int:
+        with self._lock:
+            run_id = self._conn.execute(
+                "INSERT INTO runs (created, title, category, category_windows, description, num_rows, filename, "
+                "events, raw_bytes, manifest) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run.created, run.title, run.category, run.category_windows, run.description, run.num_rows,
+                 run.filename, len(run.refs), run.raw_bytes, _pack_refs(run.refs))
+            ).lastrowid
+            self._conn.commit()
+            self._active.discard(run)
+        return run_id
+
+    def _forget(self, run: ArchiveRun):
+        with self._lock:
+            self._active.discard(run)
+
+    # === CONSULTAZIONE E RICOSTRUZIONE ===
+
+    def runs(self, limit: int = None) -> list:
+        """
+        Estrazioni archiviate, dalla più recente
+
+        Returns:
+            list: Righe (id, created, title, category, filename, events, raw_bytes)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, created, title, category, filename, events, raw_bytes FROM runs "
+                "ORDER BY created DESC LIMIT ?", (limit if limit else -1,)
+            ).fetchall()
+
+    def get_run(self, run_id: int):
+        """Riga dell'estrazione (None se non esiste o è stata eliminata)"""
+        with self._lock:
+            return self._conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+
+    def _load_block(self, block_id: int) -> tuple:
+        with self._lock:
+            row = self._conn.execute("SELECT codec, data FROM blocks WHERE id = ?", (block_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"Blocco {block_id} mancante nell'archivio")
+        return _unpack_block(_decompress(row["data"], row["codec"]))
+
+    def iter_texts(self, run_id: int):
+        """
+        Testi degli eventi di un'estrazione, nell'ordine del report
+
+        Raises:
+            KeyError: Estrazione inesistente
+            ValueError: Archivio danneggiato (blocco mancante)
+        """
+        run = self.get_run(run_id)
+        if run is None:
+            raise KeyError(f"Estrazione {run_id} non presente nell'archivio")
+
+        cache = OrderedDict()
+        current = None
+        for ref in _unpack_refs(run["manifest"]):
+            block_id = ref >> _SLOT_BITS
+            # Eventi consecutivi stanno quasi sempre nello stesso blocco: la cache serve ai salti
+            if block_id != current:
+                block = cache.get(block_id)
+                if block is None:
+                    block = cache[block_id] = self._load_block(block_id)
+                    if len(cache) > BLOCK_CACHE:
+                        cache.popitem(last=False)
+                else:
+                    cache.move_to_end(block_id)
+                data, offsets, base = block
+                current = block_id
+            slot = ref & _SLOT_MASK
+            yield data[base + offsets[slot]:base + offsets[slot + 1]].decode("utf-8")
+
+    def export(self, run_id: int, filepath: str = None) -> str:
+        """
+        Ricostruisce il report di un'estrazione
+
+        Args:
+            run_id (int): Id dell'estrazione
+            filepath (str): Percorso del report (default: Desktop, con il nome originale)
+
+        Returns:
+            str: Percorso del report scritto
+        """
+        run = self.get_run(run_id)
+        if run is None:
+            raise KeyError(f"Estrazione {run_id} non presente nell'archivio")
+        if filepath is None:
+            filename = run["filename"] or report_path(run["category"] or "Log", run["title"] or "Archivio")[0]
+            filepath = os.path.join(os.path.expanduser("~"), "Desktop", filename)
+        writer = ReportWriter(filepath, run["title"], run["category"], run["category_windows"],
+                              run["description"], run["num_rows"], created=datetime.fromtimestamp(run["created"]))
+        try:
+            writer.write_formatted(self.iter_texts(run_id))
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+        return filepath
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Estrazioni, eventi, record distinti, blocchi e dimensioni (originale e compressa)
+        """
+        with self._lock:
+            runs, events, raw = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(events), 0), COALESCE(SUM(raw_bytes), 0) FROM runs"
+            ).fetchone()
+            blocks, block_raw = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0) FROM blocks"
+            ).fetchone()
+            records = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            stored = self._stored_bytes()
+        return {
+            "runs": runs,
+            "events": events,
+            "unique_records": records,
+            "blocks": blocks,
+            "raw_bytes": raw,
+            "unique_bytes": block_raw,
+            "stored_bytes": stored,
+            "ratio": raw / stored if stored else 0.0,
+            "codec": self.codec,
+        }
+
+    # === LIMITI E COMPATTAZIONE ===
+
+    def _stored_bytes(self) -> int:
+        """Byte dei dati compressi: blocchi e riferimenti delle estrazioni"""
+        return self._conn.execute(
+            "SELECT (SELECT COALESCE(SUM(stored_bytes), 0) FROM blocks) + "
+            "(SELECT COALESCE(SUM(LENGTH(manifest)), 0) FROM runs)"
+        ).fetchone()[0]
+
+    def apply_retention(self, max_bytes: int = None, max_age_days: float = None, keep: int = 1) -> dict:
+        """
+        Elimina le estrazioni oltre i limiti, dalla più vecchia, e compatta l'archivio
+
+        Args:
+            max_bytes (int): Spazio massimo occupato dai dati compressi (None = nessun limite)
+            max_age_days (float): Età massima delle estrazioni in giorni (None = nessun limite)
+            keep (int): Estrazioni più recenti mai eliminate
+
+        Returns:
+            dict: Estrazioni eliminate e risultato della compattazione (vuoto se non serviva)
+        """
+        deleted = 0
+        with self._lock:
+            before = self._stored_bytes()
+            if max_age_days:
+                deleted += self._conn.execute(
+                    "DELETE FROM runs WHERE created < ? AND id NOT IN "
+                    "(SELECT id FROM runs ORDER BY created DESC LIMIT ?)",
+                    (time.time() - max_age_days * 86400, keep)
+                ).rowcount
+                self._conn.commit()
+                if deleted:
+                    self._collect(rewrite=False)
+            # Oltre lo spazio: via la più vecchia e i record solo suoi, finché si rientra nel limite
+            while max_bytes and self._stored_bytes() > max_bytes:
+                oldest = self._conn.execute(
+                    "SELECT id FROM runs WHERE id NOT IN (SELECT id FROM runs ORDER BY created DESC LIMIT ?) "
+                    "ORDER BY created LIMIT 1", (keep,)
+                ).fetchone()
+                if oldest is None:
+                    break
+                self._conn.execute("DELETE FROM runs WHERE id = ?", (oldest[0],))
+                self._conn.commit()
+                deleted += 1
+                self._collect(rewrite=False)
+            if not deleted:
+                return {}
+            result = self._collect(rewrite=True)
+        result.update(deleted_runs=deleted, bytes_before=before)
+        return result
+
+    def compact(self) -> dict:
+        """
+        Rimuove i record non più usati e riscrive i blocchi rimasti quasi vuoti
+
+        Returns:
+            dict: Record rimossi, blocchi eliminati e riscritti, byte prima e dopo
+        """
+        with self._lock:
+            return self._collect(rewrite=True)
+
+    def _collect(self, rewrite: bool) -> dict:
+        """Compattazione (con il lock già preso)"""
+        conn = self._conn
+        before = self._stored_bytes()
+
+        # Riferimenti ancora usati: estrazioni archiviate e in corso
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (ref INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM live")
+        for (manifest,) in conn.execute("SELECT manifest FROM runs").fetchall():
+            conn.executemany("INSERT OR IGNORE INTO live (ref) VALUES (?)",
+                             ((ref,) for ref in _unpack_refs(manifest)))
+        for run in self._active:
+            conn.executemany("INSERT OR IGNORE INTO live (ref) VALUES (?)", ((ref,) for ref in run.refs if ref >= 0))
+
+        removed = conn.execute("DELETE FROM records WHERE ref NOT IN (SELECT ref FROM live)").rowcount
+        conn.execute("DELETE FROM live")
+        dropped = conn.execute(
+            f"DELETE FROM blocks WHERE id NOT IN (SELECT DISTINCT ref >> {_SLOT_BITS} FROM records)"
+        ).rowcount
+
+        rewritten = 0
+        if rewrite:
+            sparse = [row[0] for row in conn.execute(
+                f"SELECT b.id FROM blocks b JOIN (SELECT ref >> {_SLOT_BITS} AS block, SUM(length) AS live "
+                "FROM records GROUP BY block) r ON r.block = b.id WHERE r.live < b.raw_bytes * ?", (COMPACT_RATIO,)
+            ).fetchall()]
+            # I record ancora usati dei blocchi quasi vuoti vengono riuniti in blocchi nuovi
+            moved = {}
+            texts, pending = [], {}
+            for block_id in sparse:
+                data, offsets, base = self._load_block(block_id)
+                for record, ref in conn.execute(
+                    "SELECT hash, ref FROM records WHERE ref BETWEEN ? AND ?",
+                    (block_id << _SLOT_BITS, block_id << _SLOT_BITS | _SLOT_MASK)
+                ).fetchall():
+                    slot = ref & _SLOT_MASK
+                    pending[record] = (ref, len(texts))
+                    texts.append(data[base + offsets[slot]:base + offsets[slot + 1]])
+                conn.execute("DELETE FROM blocks WHERE id = ?", (block_id,))
+                rewritten += 1
+                if sum(len(text) for text in texts) >= BLOCK_BYTES:
+                    moved.update(self._rewrite_block(texts, pending))
+                    texts, pending = [], {}
+            if texts:
+                moved.update(self._rewrite_block(texts, pending))
+
+            # Riferimenti delle estrazioni (archiviate e in corso) ai record spostati
+            if moved:
+                for run_id, manifest in conn.execute("SELECT id, manifest FROM runs").fetchall():
+                    refs = _unpack_refs(manifest)
+                    if not moved.keys().isdisjoint(refs):
+                        refs = array.array("q", (moved.get(ref, ref) for ref in refs))
+                        conn.execute("UPDATE runs SET manifest = ? WHERE id = ?", (_pack_refs(refs), run_id))
+                for run in self._active:
+                    for index, ref in enumerate(run.refs):
+                        if ref in moved:
+                            run.refs[index] = moved[ref]
+
+        conn.commit()
+        # Restituisce al file system le pagine liberate
+        conn.execute("PRAGMA incremental_vacuum")
+        return {"removed_records": removed, "dropped_blocks": dropped, "rewritten_blocks": rewritten,
+                "bytes_before": before, "bytes_after": self._stored_bytes()}
+
+    def _rewrite_block(self, texts: list, pending: dict) -> dict:
+        """
+        Nuovo blocco con i record di blocchi compattati (nella transazione della compattazione)
+
+        Returns:
+            dict: Vecchio riferimento -> nuovo riferimento
+        """
+        compressed = _compress(_pack_block(texts), self.codec)
+        block_id = self._conn.execute(
+            "INSERT INTO blocks (codec, records, raw_bytes, stored_bytes, data) VALUES (?, ?, ?, ?, ?)",
+            (self.codec, len(texts), sum(len(text) for text in texts), len(compressed), compressed)
+        ).lastrowid
+        moved = {old: block_id << _SLOT_BITS | slot for old, slot in pending.values()}
+        self._conn.executemany("UPDATE records SET ref = ? WHERE hash = ?",
+                               ((moved[old], record) for record, (old, slot) in pending.items()))
+        return moved
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# === BENCHMARK ===
+
+def benchmark(runs: int = 20, events: int = 20000, overlap: float = 0.9, codec: str = None) -> dict:
+    """
+    Estrazioni sintetiche sovrapposte (come letture ripetute dello stesso canale):
+    spazio occupato rispetto ai report non compressi e tempo di ricostruzione
+    rispetto alla lettura del report originale
+
+    Args:
+        runs (int): Estrazioni archiviate
+        events (int): Eventi per estrazione
+        overlap (float): Frazione di eventi in comune tra due estrazioni consecutive
+        codec (str): Compressione dei blocchi (default: zstd se disponibile)
+
+    Returns:
+        dict: Misure del benchmark
+    """
+    from wire import _synthetic_logs
+
+    step = max(1, int(events * (1 - overlap)))
+    log = _synthetic_logs(events + step * runs, seed=7)
+    with tempfile.TemporaryDirectory(prefix="evlogpyai-archive-") as workdir:
+        archive = EventArchive(os.path.join(workdir, "archive.db"), codec=codec)
+        report_bytes = 0
+        archive_seconds = 0.0
+        last_report = None
+        for i in range(runs):
+            # Estrazione i: gli eventi più recenti di quel momento (il log cresce di step eventi a volta)
+            logs = log[step * (runs - 1 - i):step * (runs - 1 - i) + events]
+            last_report = os.path.join(workdir, f"report_{i}.txt")
+            writer = ReportWriter(last_report, f"Estrazione {i}", "Sistema", "System", "Benchmark", events)
+            writer.write_events(logs)
+            report_bytes += writer.close()
+            started = time.perf_counter()
+            run_id = archive.add_run(logs, f"Estrazione {i}", "Sistema", "System", "Benchmark", events)
+            archive_seconds += time.perf_counter() - started
+
+        # Lettura del report originale (file non compresso, cache del sistema calda)
+        with open(last_report, "rb") as f:
+            f.read()
+        started = time.perf_counter()
+        with open(last_report, "rb") as f:
+            original = f.read().decode("utf-8")
+        read_seconds = time.perf_counter() - started
+
+        rebuilt_path = os.path.join(workdir, "rebuilt.txt")
+        started = time.perf_counter()
+        archive.export(run_id, rebuilt_path)
+        export_seconds = time.perf_counter() - started
+        with open(rebuilt_path, "rb") as f:
+            # Uguali a parte la riga "DATA ESTRAZIONE" (il benchmark archivia qualche istante dopo)
+            identical = f.read().decode("utf-8").split("\n", 7)[7] == original.split("\n", 7)[7]
+
+        stats = archive.stats()
+        archive.close()
+    return {
+        "codec": stats["codec"],
+        "runs": runs,
+        "events_per_run": events,
+        "report_mb": report_bytes / 1e6,
+        "archive_mb": stats["stored_bytes"] / 1e6,
+        "ratio": report_bytes / stats["stored_bytes"] if stats["stored_bytes"] else 0.0,
+        "unique_records": stats["unique_records"],
+        "archive_events_per_second": runs * events / archive_seconds if archive_seconds else 0.0,
+        "read_report_ms": read_seconds * 1000,
+        "export_report_ms": export_seconds * 1000,
+        "identical": identical,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Archivio compresso delle estrazioni")
+    parser.add_argument("--export", type=int, metavar="ID", help="Ricostruisce il report di un'estrazione")
+    parser.add_argument("-o", "--output", help="Percorso del report ricostruito (default: Desktop)")
+    parser.add_argument("--stats", action="store_true", help="Spazio occupato e rapporto di compressione")
+    parser.add_argument("--compact", action="store_true",
+                        help="Applica i limiti (--max-mb, --max-days) e compatta l'archivio")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help=f"Spazio massimo dell'archivio in MB (default: {DEFAULT_MAX_MB})")
+    parser.add_argument("--max-days", type=float, default=DEFAULT_MAX_DAYS,
+                        help=f"Età massima delle estrazioni in giorni (default: {DEFAULT_MAX_DAYS})")
+    parser.add_argument("--bench", action="store_true", help="Benchmark su estrazioni sintetiche sovrapposte")
+    parser.add_argument("--runs", type=int, default=20, help="Estrazioni del benchmark (default: 20)")
+    parser.add_argument("--events", type=int, default=20000, help="Eventi per estrazione del benchmark")
+    args = parser.parse_args()
+
+    if args.bench:
+        result = benchmark(args.runs, args.events)
+        print(f"📦 {result['runs']} estrazioni da {result['events_per_run']} eventi ({result['codec']}): "
+              f"report {result['report_mb']:.1f} MB → archivio {result['archive_mb']:.2f} MB "
+              f"(x{result['ratio']:.0f}, {result['unique_records']} record distinti)")
+        print(f"  Archiviazione: {result['archive_events_per_second']:,.0f} eventi/s")
+        print(f"  Ultimo report: lettura del file {result['read_report_ms']:.0f} ms, "
+              f"ricostruzione dall'archivio {result['export_report_ms']:.0f} ms "
+              f"({'identico' if result['identical'] else 'DIVERSO'})")
+        return
+
+    archive = EventArchive()
+    if args.export is not None:
+        print(f"📄 Report ricostruito: {archive.export(args.export, args.output)}")
+    elif args.compact:
+        result = archive.apply_retention(int(args.max_mb * 1024 * 1024), args.max_days) or archive.compact()
+        print(f"🗜️  {result.get('deleted_runs', 0)} estrazioni eliminate, {result['removed_records']} record "
+              f"rimossi, {result['rewritten_blocks']} blocchi riscritti: "
+              f"{result['bytes_before'] / 1e6:.1f} → {result['bytes_after'] / 1e6:.1f} MB")
+    elif args.stats:
+        stats = archive.stats()
+        print(f"📦 {stats['runs']} estrazioni, {stats['events']} eventi ({stats['unique_records']} distinti) in "
+              f"{stats['blocks']} blocchi {stats['codec']}: {stats['raw_bytes'] / 1e6:.1f} MB → "
+              f"{stats['stored_bytes'] / 1e6:.1f} MB (x{stats['ratio']:.1f})")
+    else:
+        for run in archive.runs():
+            created = datetime.fromtimestamp(run["created"]).strftime("%d/%m/%Y %H:%M:%S")
+            print(f"{run['id']:>6}  {created}  {run['category'] or '':<12} {run['events']:>8} eventi  "
+                  f"{run['raw_bytes'] / 1e6:7.1f} MB  {run['title']}")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
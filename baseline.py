@@ -0,0 +1,349 @@
+"""
+EvLogPyAI - Baseline e Analisi Differenziale
+Profilo "normale" di un log per host e canale, usato per inviare all'AI solo le anomalie
+
+Il profilo conta le firme degli eventi (sorgente, Event ID, tipo e template del
+messaggio, vedi wire.message_template) in un count-min sketch: memoria fissa
+(1 MiB con i valori predefiniti) qualunque sia la durata del periodo di riferimento.
+
+Un'estrazione viene confrontata con il profilo: passano solo gli eventi con firme
+mai viste o con frequenza molto superiore a quella normale. Lo sketch può solo
+sovrastimare i conteggi, quindi una firma "nuova" non viene mai scartata per errore
+a meno di collisioni su tutte le righe (probabilità trascurabile).
+
+Cattura del profilo (su una macchina in salute):
+    python trigger.py --capture-baseline Sistema --baseline-events 200000
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# array: Contatori dello sketch in un buffer compatto
+from array import array
+
+# datetime: Interpretazione dei timestamp degli eventi
+from datetime import datetime
+
+# hashlib: Hash delle firme
+import hashlib
+
+# json: Metadati del profilo su disco
+import json
+
+# os: Percorso e scrittura atomica del profilo
+import os
+
+# re: Nomi file sicuri per host e canale
+import re
+
+# socket: Nome dell'host del profilo
+import socket
+
+# struct: Intestazione binaria del file del profilo
+import struct
+
+# sys: Ordine dei byte della piattaforma
+import sys
+
+# time: Data di cattura del profilo
+import time
+
+# wire: Template dei messaggi senza parametri variabili
+from wire import message_template
+
+# paths: Cartella dati dell'applicazione
+from paths import app_data_path
+
+
+# === CONFIGURAZIONE ===
+
+# Dimensioni dello sketch: 4 righe da 65536 contatori a 32 bit
+SKETCH_WIDTH = 1 << 16
+SKETCH_DEPTH = 4
+
+# Una firma nota passa se la sua frequenza supera RATE_FACTOR volte quella normale
+# e compare almeno MIN_INCREASE volte nell'estrazione
+RATE_FACTOR = 3.0
+MIN_INCREASE = 3
+
+# Durata minima considerata per un periodo (evita frequenze enormi su pochi secondi)
+MIN_SPAN_SECONDS = 60
+
+# Intestazione del file: magic, versione, larghezza, profondità, lunghezza dei metadati
+_MAGIC = b"EVLB"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBIII")
+
+
+def event_signature(log: dict) -> bytes:
+    """
+    Firma di un evento: uguale per eventi che differiscono solo per numeri, GUID o orario
+
+    Returns:
+        bytes: Hash a 128 bit della firma
+    """
+    template, _ = message_template(log.get("message"))
+    key = "\x1f".join((str(log.get("source")), str(log.get("event_id")), str(log.get("type")), str(template)))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def event_epoch(text, cache: dict):
+    """
+    Timestamp "%c" di un evento in secondi epoch (None se non interpretabile)
+
+    Args:
+        text (str): Campo "timestamp" dell'evento
+        cache (dict): Conversioni già fatte (molti eventi condividono lo stesso secondo)
+    """
+    if text in cache:
+        return cache[text]
+    try:
+        epoch = datetime.strptime(text, "%c").timestamp()
+    except (TypeError, ValueError, OverflowError, OSError):
+        epoch = None
+    cache[text] = epoch
+    return epoch
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text).strip("_") or "_"
+
+
+def baseline_path(host: str, channel: str) -> str:
+    """
+    Percorso del profilo di un host e canale nella cartella dati
+    """
+    return app_data_path("baselines", f"{_safe_name(host)}_{_safe_name(channel)}.evlb")
+
+
+class CountMinSketch:
+    """
+    Conteggi approssimati (mai sottostimati) in memoria fissa
+    """
+
+    def __init__(self, width: int = SKETCH_WIDTH, depth: int = SKETCH_DEPTH, counts: array = None):
+        self.width = width
+        self.depth = depth
+        self.counts = counts if counts is not None else array("I", bytes(4 * width * depth))
+
+    def _cells(self, digest: bytes):
+        """Una cella per riga, con doppio hash ricavato dalle due metà della firma"""
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, digest: bytes, count: int = 1):
+        counts = self.counts
+        for cell in self._cells(digest):
+            counts[cell] = min(0xFFFFFFFF, counts[cell] + count)
+
+    def estimate(self, digest: bytes) -> int:
+        counts = self.counts
+        return min(counts[cell] for cell in self._cells(digest))
+
+
+class Baseline:
+    """
+    Profilo normale di un log: conteggi delle firme e periodo coperto
+    """
+
+    def __init__(self, host: str, channel: str, sketch: CountMinSketch = None, meta: dict = None):
+        """
+        Args:
+            host (str): Nome della macchina
+            channel (str): Nome tecnico del log (es. "System")
+            sketch (CountMinSketch): Conteggi delle firme (nuovo se None)
+            meta (dict): Metadati salvati (eventi, periodo, data di cattura)
+        """
+        self.host = host
+        self.channel = channel
+        self.sketch = sketch or CountMinSketch()
+        meta = meta or {}
+        self.events = meta.get("events", 0)
+        self.first_epoch = meta.get("first_epoch")
+        self.last_epoch = meta.get("last_epoch")
+        self.captured = meta.get("captured")
+        self._times = {}
+
+    # === CATTURA ===
+
+    def add(self, log: dict):
+        """Aggiunge un evento al profilo"""
+        self.sketch.add(event_signature(log))
+        self.events += 1
+        epoch = event_epoch(log.get("timestamp"), self._times)
+        if epoch is not None:
+            if self.first_epoch is None or epoch < self.first_epoch:
+                self.first_epoch = epoch
+            if self.last_epoch is None or epoch > self.last_epoch:
+                self.last_epoch = epoch
+        # La cache dei timestamp resta piccola anche su periodi lunghi
+        if len(self._times) > 100000:
+            self._times.clear()
+
+    @property
+    def span_seconds(self) -> float:
+        """Durata del periodo di riferimento"""
+        if self.first_epoch is None:
+            return MIN_SPAN_SECONDS
+        return max(MIN_SPAN_SECONDS, self.last_epoch - self.first_epoch)
+
+    # === CONFRONTO ===
+
+    def diff(self, logs: list) -> tuple:
+        """
+        Confronta un'estrazione con il profilo
+
+        Args:
+            logs (list): Eventi dell'estrazione
+
+        Returns:
+            tuple: (eventi con firme nuove o in aumento nell'ordine originale, riepilogo per il payload)
+        """
+        groups = {}
+        times = {}
+        first = last = None
+        for i, log in enumerate(logs):
+            digest = event_signature(log)
+            group = groups.get(digest)
+            if group is None:
+                group = groups[digest] = []
+            group.append(i)
+            epoch = event_epoch(log.get("timestamp"), times)
+            if epoch is not None:
+                first = epoch if first is None else min(first, epoch)
+                last = epoch if last is None else max(last, epoch)
+        span = MIN_SPAN_SECONDS if first is None else max(MIN_SPAN_SECONDS, last - first)
+        scale = span / self.span_seconds
+
+        # === FIRME NUOVE O IN AUMENTO ===
+        keep = []
+        signatures = []
+        for digest, indexes in groups.items():
+            count = len(indexes)
+            baseline_count = self.sketch.estimate(digest)
+            expected = baseline_count * scale
+            if baseline_count == 0:
+                status = "new"
+            elif count >= MIN_INCREASE and count > RATE_FACTOR * expected:
+                status = "increased"
+            else:
+                continue
+            keep.extend(indexes)
+            sample = logs[indexes[0]]
+            signatures.append({
+                "source": sample.get("source"),
+                "event_id": sample.get("event_id"),
+                "type": sample.get("type"),
+                "status": status,
+                "count": count,
+                "expected": round(expected, 2),
+            })
+        keep.sort()
+        signatures.sort(key=lambda s: (s["status"] != "new", -s["count"]))
+
+        summary = {
+            "profile": f"{self.host}/{self.channel}",
+            "baseline_events": self.events,
+            "baseline_hours": round(self.span_seconds / 3600, 2),
+            "total_events": len(logs),
+            "forwarded_events": len(keep),
+            "suppressed_events": len(logs) - len(keep),
+            "new_signatures": sum(1 for s in signatures if s["status"] == "new"),
+            "increased_signatures": sum(1 for s in signatures if s["status"] == "increased"),
+            "signatures": signatures,
+        }
+        return [logs[i] for i in keep], summary
+
+    # === PERSISTENZA ===
+
+    def save(self, path: str = None) -> str:
+        """
+        Salva il profilo (scrittura atomica)
+
+        Returns:
+            str: Percorso del file
+        """
+        path = path or baseline_path(self.host, self.channel)
+        meta = json.dumps({
+            "host": self.host,
+            "channel": self.channel,
+            "events": self.events,
+            "first_epoch": self.first_epoch,
+            "last_epoch": self.last_epoch,
+            "captured": self.captured or time.time(),
+        }).encode("utf-8")
+        counts = self.sketch.counts
+        if sys.byteorder != "little":
+            counts = array("I", counts)
+            counts.byteswap()
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.sketch.width, self.sketch.depth, len(meta)))
+            f.write(meta)
+            f.write(counts.tobytes())
+        os.replace(temp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Baseline":
+        """
+        Carica un profilo salvato
+
+        Raises:
+            ValueError: File non valido o di una versione non supportata
+        """
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"Profilo baseline non valido: {path}")
+            magic, version, width, depth, meta_size = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"Profilo baseline non valido o di versione non supportata: {path}")
+            meta = json.loads(f.read(meta_size).decode("utf-8"))
+            counts = array("I")
+            counts.frombytes(f.read(4 * width * depth))
+        if len(counts) != width * depth:
+            raise ValueError(f"Profilo baseline troncato: {path}")
+        if sys.byteorder != "little":
+            counts.byteswap()
+        return cls(meta["host"], meta["channel"], CountMinSketch(width, depth, counts), meta)
+
+
+def load_baseline(channel: str, host: str = None):
+    """
+    Profilo salvato di un canale su questo host
+
+    Returns:
+        Baseline: Profilo, o None se non è mai stato catturato
+    """
+    path = baseline_path(host or socket.gethostname(), channel)
+    if not os.path.exists(path):
+        return None
+    return Baseline.load(path)
+
+
+def capture_baseline(source: str, channel: str, num_records: int, host: str = None, on_progress=None) -> Baseline:
+    """
+    Cattura il profilo di un canale leggendo gli ultimi num_records eventi
+
+    Args:
+        source (str): Nome tecnico del log (o percorso di un file .evtx)
+        channel (str): Canale a cui associare il profilo
+        num_records (int): Eventi da leggere (il periodo coperto dipende dal log)
+        host (str): Host del profilo (default: questa macchina)
+        on_progress (callable): on_progress(eventi_letti) ogni 10000 eventi
+
+    Returns:
+        Baseline: Profilo catturato (da salvare con save)
+    """
+    from extractor import iter_events
+
+    baseline = Baseline(host or socket.gethostname(), channel)
+    # Profili di centinaia di migliaia di eventi: formattazione nel pool (uno per CPU)
+    for log in iter_events(source, num_records, format_workers=None):
+        baseline.add(log)
+        if on_progress and baseline.events % 10000 == 0:
+            on_progress(baseline.events)
+    baseline.captured = time.time()
+    return baseline
@@ -0,0 +1,219 @@
+"""
+EvLogPyAI - Archivio dei Messaggi Completi
+I messaggi degli eventi oltre MESSAGE_MAX_CHARS conservati interi, compressi e senza
+duplicati, fuori dal percorso degli eventi
+
+Gli eventi in memoria (pipe del processo di estrazione, fasi della pipeline, tabella,
+storico) portano solo l'anteprima di MESSAGE_MAX_CHARS caratteri e, per i messaggi più
+lunghi, "message_ref": l'id del testo completo in questo archivio. Stack trace ed
+eccezioni .NET non vanno persi, ma non occupano memoria né payload finché qualcuno
+non li chiede: il report sul Desktop, il dettaglio della tabella eventi e il payload
+per l'AI (entro AI_MESSAGE_MAX_CHARS) li leggono solo quando servono.
+
+L'id è l'impronta del testo: lo stesso messaggio ripetuto in migliaia di eventi (o in
+estrazioni diverse) è salvato una volta sola. I messaggi non più visti da
+DEFAULT_MAX_DAYS giorni vengono eliminati da prune.
+
+I lettori degli eventi (eventlog.raw_to_dict, evtx_reader) mettono il testo completo in
+"message_full"; detach_message lo sposta qui prima che l'evento esca dalla lettura.
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# hashlib: Impronta del testo (id del messaggio)
+import hashlib
+
+# sqlite3: Archivio locale dei messaggi
+import sqlite3
+
+# threading: Usato dal thread di estrazione, dalle fasi della pipeline e dalla GUI
+import threading
+
+# time: Ultimo utilizzo dei messaggi (pulizia dei più vecchi)
+import time
+
+# zlib: Compressione dei testi
+import zlib
+
+# paths: Cartella dati dell'applicazione
+from paths import app_data_path
+
+
+# === CONFIGURAZIONE ===
+
+# Caratteri del messaggio che restano nell'evento (stesso valore di eventlog.MESSAGE_MAX_CHARS)
+MESSAGE_MAX_CHARS = 500
+
+# Caratteri massimi di un messaggio nel payload per l'AI: oltre, il contesto del modello se ne va
+# tutto in un solo stack trace
+AI_MESSAGE_MAX_CHARS = 4000
+
+# Giorni dopo i quali un messaggio non più visto viene eliminato
+DEFAULT_MAX_DAYS = 90
+
+# Parametri per query "IN (...)" (SQLite ne accetta al massimo 999 nelle versioni più vecchie)
+_IN_BATCH = 500
+
+ZLIB_LEVEL = 6
+
+
+def message_id(text: str) -> int:
+    """Id di un messaggio: impronta del testo (64 bit con segno, mai 0)"""
+    value = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+    return value or 1
+
+
+class MessageStore:
+    """
+    Testi completi dei messaggi lunghi, in un file SQLite condiviso tra i processi
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str): Percorso del file SQLite (default: %LOCALAPPDATA%\\EvLogPyAI\\messages.db)
+        """
+        self.path = path or app_data_path("messages.db")
+        self._lock = threading.RLock()
+        # Il processo di estrazione scrive mentre la GUI legge: attesa invece di "database is locked"
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                seen REAL NOT NULL,
+                length INTEGER NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_seen ON messages (seen);
+            """
+        )
+        self._conn.commit()
+        # Id già scritti da questa istanza: i messaggi ripetuti non vengono né ricompressi né riscritti
+        self._known = set()
+        self._pending = 0
+
+    def put(self, text: str) -> int:
+        """
+        Salva un messaggio (visibile agli altri processi dopo flush)
+
+        Returns:
+            int: Id del messaggio
+        """
+        ref = message_id(text)
+        if ref in self._known:
+            return ref
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO messages (id, seen, length, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET seen = excluded.seen",
+                (ref, time.time(), len(text), zlib.compress(text.encode("utf-8"), ZLIB_LEVEL))
+            )
+            self._pending += 1
+            self._known.add(ref)
+        return ref
+
+    def flush(self):
+        """Rende visibili i messaggi salvati (da chiamare prima di consegnare gli eventi che li citano)"""
+        with self._lock:
+            if self._pending:
+                self._conn.commit()
+                self._pending = 0
+
+    def get(self, ref: int) -> str:
+        """Testo completo del messaggio (None se non presente)"""
+        return self.get_many([ref]).get(ref)
+
+    def get_many(self, refs) -> dict:
+        """
+        Testi completi di più messaggi
+
+        Returns:
+            dict: Id -> testo (gli id non presenti mancano)
+        """
+        refs = list(set(refs))
+        found = {}
+        with self._lock:
+            for start in range(0, len(refs), _IN_BATCH):
+                batch = refs[start:start + _IN_BATCH]
+                found.update(
+                    (ref, zlib.decompress(data).decode("utf-8")) for ref, data in self._conn.execute(
+                        f"SELECT id, data FROM messages WHERE id IN ({','.join('?' * len(batch))})", batch
+                    )
+                )
+        return found
+
+    def full_messages(self, logs: list, max_chars: int = None) -> list:
+        """
+        Messaggio di ogni evento: il testo completo se archiviato, altrimenti quello dell'evento
+
+        Args:
+            logs (list): Eventi nel formato dell'applicazione
+            max_chars (int): Caratteri massimi di ogni messaggio (None = nessun limite)
+
+        Returns:
+            list: Messaggi nell'ordine degli eventi
+        """
+        texts = self.get_many(log["message_ref"] for log in logs if log.get("message_ref"))
+        messages = [texts.get(log.get("message_ref"), log["message"]) for log in logs]
+        if max_chars:
+            messages = [message[:max_chars] for message in messages]
+        return messages
+
+    def expand(self, logs: list, max_chars: int = AI_MESSAGE_MAX_CHARS) -> list:
+        """
+        Eventi con il messaggio completo (entro max_chars) al posto dell'anteprima
+
+        Solo gli eventi con "message_ref" vengono copiati; gli altri restano gli stessi oggetti.
+
+        Returns:
+            list: Eventi senza "message_ref"
+        """
+        refs = [log for log in logs if log.get("message_ref")]
+        if not refs:
+            return logs
+        texts = self.get_many(log["message_ref"] for log in refs)
+        expanded = []
+        for log in logs:
+            ref = log.get("message_ref")
+            if ref:
+                log = {key: value for key, value in log.items() if key != "message_ref"}
+                log["message"] = texts.get(ref, log["message"])[:max_chars]
+            expanded.append(log)
+        return expanded
+
+    def prune(self, max_age_days: float = DEFAULT_MAX_DAYS) -> int:
+        """
+        Elimina i messaggi non più visti da max_age_days giorni
+
+        Returns:
+            int: Messaggi eliminati
+        """
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM messages WHERE seen < ?", (time.time() - max_age_days * 86400,)
+            ).rowcount
+            self._conn.commit()
+            self._known.clear()
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+def detach_message(log: dict, store: MessageStore = None) -> dict:
+    """
+    Sposta il testo completo dell'evento ("message_full") nell'archivio dei messaggi
+
+    Senza archivio il testo completo viene scartato (resta l'anteprima, come in origine).
+
+    Returns:
+        dict: Lo stesso evento, con "message_ref" se il messaggio è stato archiviato
+    """
+    full = log.pop("message_full", None)
+    if full is not None and store is not None:
+        log["message_ref"] = store.put(full)
+    return log
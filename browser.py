@@ -0,0 +1,460 @@
+"""
+EvLogPyAI - Visualizzatore eventi virtualizzato
+Tabella degli eventi estratti dentro l'applicazione, con ordinamento per colonna,
+filtro durante la digitazione e selezione degli eventi da inviare all'analisi AI
+
+Per gestire 100k+ eventi senza bloccare Tk:
+- Vengono disegnate solo le righe visibili: un piccolo insieme di elementi del Canvas
+  viene riutilizzato a ogni scorrimento (nessun widget per riga)
+- Gli ordinamenti per colonna vengono calcolati una volta e riusati
+- Il filtro usa indici per colonna (valore -> righe) per sorgente, ID e tipo; se il testo
+  viene solo allungato, la ricerca riparte dai risultati precedenti invece che da tutte le righe
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# customtkinter: Finestra e controlli con lo stesso tema dell'applicazione
+import customtkinter as ctk
+
+# tkinter: Canvas per il disegno delle righe visibili
+import tkinter as tk
+
+# itertools: Selezione veloce delle righe tramite maschera
+from itertools import compress
+
+
+# === COLONNE ===
+# (chiave del dizionario evento, intestazione, larghezza in pixel; 0 = spazio restante)
+COLUMNS = (
+    ("timestamp", "Timestamp", 180),
+    ("source", "Sorgente", 210),
+    ("event_id", "ID", 60),
+    ("type", "Tipo", 110),
+    ("message", "Messaggio", 0),
+)
+
+# Intestazioni per chiave di colonna
+HEADERS = {key: header for key, header, _ in COLUMNS}
+
+# Colonne con pochi valori distinti: filtrate tramite l'indice valore -> righe
+INDEXED_COLUMNS = ("source", "event_id", "type")
+
+# Etichette del menu filtro -> colonna (None = tutte le colonne)
+FILTER_COLUMNS = {
+    "Tutte le colonne": None,
+    "Sorgente": "source",
+    "Event ID": "event_id",
+    "Tipo": "type",
+    "Messaggio": "message",
+    "Timestamp": "timestamp",
+}
+
+ROW_HEIGHT = 22       # Altezza di una riga in pixel
+CHECK_WIDTH = 30      # Larghezza della colonna di selezione
+CHAR_WIDTH = 7        # Larghezza media di un carattere (per troncare il testo senza misurarlo)
+
+
+class EventTableModel:
+    """
+    Dati della tabella: ordinamento, filtro e selezione (nessuna dipendenza da Tk)
+    """
+
+    def __init__(self, logs: list):
+        """
+        Args:
+            logs (list): Eventi nel formato dell'applicazione, nell'ordine di lettura (dal più recente)
+        """
+        self.logs = logs
+        self.sort_column = None
+        self.sort_desc = False
+        self.selected = set(range(len(logs)))  # Per default vengono inviati tutti gli eventi
+        self.view = list(range(len(logs)))     # Righe visibili nell'ordine di visualizzazione
+
+        self._texts = {}        # colonna -> testo minuscolo di ogni riga (calcolato al primo uso)
+        self._value_index = {}  # colonna -> {valore minuscolo: [righe]}
+        self._orders = {}       # colonna -> permutazione crescente delle righe
+        self._filter = (None, "")
+        self._matches = None    # Righe che soddisfano il filtro (None = nessun filtro)
+
+    # === INDICI PER COLONNA ===
+
+    def _column_texts(self, column: str) -> list:
+        texts = self._texts.get(column)
+        if texts is None:
+            texts = self._texts[column] = [str(log.get(column, "")).lower() for log in self.logs]
+        return texts
+
+    def _column_values(self, column: str) -> dict:
+        index = self._value_index.get(column)
+        if index is None:
+            index = self._value_index[column] = {}
+            for row, text in enumerate(self._column_texts(column)):
+                index.setdefault(text, []).append(row)
+        return index
+
+    def _order(self, column: str) -> list:
+        order = self._orders.get(column)
+        if order is None:
+            rows = range(len(self.logs))
+            if column == "timestamp":
+                # Il testo "%c" non è ordinabile: l'ordine di lettura è già cronologico (dal più recente)
+                order = list(reversed(rows))
+            elif column in ("event_id", "category"):
+                order = sorted(rows, key=lambda r: (self.logs[r].get(column) is None, self.logs[r].get(column) or 0))
+            else:
+                texts = self._column_texts(column)
+                order = sorted(rows, key=texts.__getitem__)
+            self._orders[column] = order
+        return order
+
+    # === ORDINAMENTO E FILTRO ===
+
+    def sort_by(self, column: str):
+        """
+        Ordina per colonna; un secondo clic sulla stessa colonna inverte l'ordine
+        """
+        if self.sort_column == column:
+            self.sort_desc = not self.sort_desc
+        else:
+            self.sort_column, self.sort_desc = column, False
+        self._rebuild_view()
+
+    def set_filter(self, text: str, column: str = None):
+        """
+        Mostra solo le righe che contengono il testo (senza distinzione maiuscole)
+
+        Args:
+            text (str): Testo da cercare
+            column (str): Colonna in cui cercare (None = tutte)
+        """
+        text = text.strip().lower()
+        previous_column, previous_text = self._filter
+        if not text:
+            self._matches = None
+        else:
+            # Filtro incrementale: se il testo è stato solo allungato basta rifiltrare i risultati precedenti
+            narrowing = (self._matches is not None and column == previous_column
+                         and text.startswith(previous_text))
+            self._matches = self._match(text, column, self._matches if narrowing else None)
+        self._filter = (column, text)
+        self._rebuild_view()
+
+    def _match(self, text: str, column: str, candidates: list) -> list:
+        mask = bytearray(len(self.logs))
+        for col in ([column] if column else [c[0] for c in COLUMNS]):
+            if col in INDEXED_COLUMNS:
+                for value, rows in self._column_values(col).items():
+                    if text in value:
+                        for row in rows:
+                            mask[row] = 1
+            else:
+                texts = self._column_texts(col)
+                for row in (candidates if candidates is not None else range(len(texts))):
+                    if not mask[row] and text in texts[row]:
+                        mask[row] = 1
+        if candidates is not None:
+            return [row for row in candidates if mask[row]]
+        return list(compress(range(len(self.logs)), mask))
+
+    def _rebuild_view(self):
+        order = self._order(self.sort_column) if self.sort_column else range(len(self.logs))
+        if self.sort_desc:
+            order = reversed(order)
+        if self._matches is None:
+            self.view = list(order)
+        else:
+            mask = bytearray(len(self.logs))
+            for row in self._matches:
+                mask[row] = 1
+            self.view = [row for row in order if mask[row]]
+
+    # === SELEZIONE ===
+
+    def toggle(self, row: int):
+        if row in self.selected:
+            self.selected.discard(row)
+        else:
+            self.selected.add(row)
+
+    def select_visible(self, selected: bool = True):
+        """
+        Seleziona (o deseleziona) tutte le righe che soddisfano il filtro corrente
+        """
+        if selected:
+            self.selected.update(self.view)
+        else:
+            self.selected.difference_update(self.view)
+
+    def selected_logs(self) -> list:
+        """
+        Returns:
+            list: Eventi selezionati, nell'ordine di lettura originale
+        """
+        return [self.logs[row] for row in sorted(self.selected)]
+
+
+class EventBrowser(ctk.CTkToplevel):
+    """
+    Finestra con la tabella virtualizzata degli eventi estratti
+    """
+
+    def __init__(self, master, logs: list, colors: dict, title: str = "", on_send=None, messages=None):
+        """
+        Args:
+            master: Finestra principale dell'applicazione
+            logs (list): Eventi estratti
+            colors (dict): Palette colori dell'applicazione
+            title (str): Sottotitolo mostrato nell'intestazione (es. nome del report)
+            on_send (callable): on_send(logs) chiamata con gli eventi selezionati da analizzare
+            messages (MessageStore): Archivio dei messaggi completi, letto solo per l'evento evidenziato
+        """
+        super().__init__(master)
+        self.model = EventTableModel(logs)
+        self.colors = colors
+        self.on_send = on_send
+        self.messages = messages
+        self.top = 0              # Indice (nella vista) della prima riga visibile
+        self.current = None       # Riga evidenziata (dettagli in basso)
+        self._slots = []          # Elementi del Canvas riutilizzati: uno per riga visibile
+        self._header_columns = []
+        self._filter_job = None
+
+        self.title("EvLogPyAI - Eventi estratti")
+        self.geometry("1100x650")
+        self.configure(fg_color=colors["background"])
+
+        self._create_widgets(title)
+        self._refresh()
+
+    # === INTERFACCIA ===
+
+    def _create_widgets(self, title: str):
+        colors = self.colors
+
+        # === BARRA SUPERIORE: FILTRO ===
+        bar = ctk.CTkFrame(self, fg_color="transparent")
+        bar.pack(fill="x", padx=15, pady=(15, 5))
+
+        ctk.CTkLabel(bar, text=title, font=ctk.CTkFont(size=13, weight="bold"),
+                     text_color=colors["text"]).pack(side="left", padx=(0, 15))
+
+        self.filter_column = ctk.CTkComboBox(
+            bar, values=list(FILTER_COLUMNS), width=160, state="readonly",
+            fg_color=colors["input_bg"], border_color=colors["border"], text_color=colors["text"],
+            button_color=colors["primary"], command=lambda _: self._apply_filter()
+        )
+        self.filter_column.set("Tutte le colonne")
+        self.filter_column.pack(side="right")
+
+        self.filter_entry = ctk.CTkEntry(
+            bar, placeholder_text="Filtra...", width=280,
+            fg_color=colors["input_bg"], border_color=colors["border"], text_color=colors["text"]
+        )
+        self.filter_entry.pack(side="right", padx=10)
+        # Filtro durante la digitazione (con un breve ritardo per non rifiltrare a ogni tasto)
+        self.filter_entry.bind("<KeyRelease>", self._schedule_filter)
+
+        # === TABELLA ===
+        table = ctk.CTkFrame(self, fg_color=colors["card"])
+        table.pack(fill="both", expand=True, padx=15, pady=5)
+
+        self.header = tk.Canvas(table, height=ROW_HEIGHT + 4, bg=colors["border"], highlightthickness=0)
+        self.header.pack(fill="x", side="top")
+        self.header.bind("<Button-1>", self._on_header_click)
+
+        self.scrollbar = ctk.CTkScrollbar(table, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas = tk.Canvas(table, bg=colors["card"], highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True, side="left")
+        self.canvas.bind("<Configure>", lambda e: self._refresh())
+        self.canvas.bind("<Button-1>", self._on_click)
+        # Rotella del mouse (Windows/macOS e Linux)
+        self.canvas.bind("<MouseWheel>", lambda e: self._scroll(-3 if e.delta > 0 else 3))
+        self.canvas.bind("<Button-4>", lambda e: self._scroll(-3))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll(3))
+        self.bind("<Prior>", lambda e: self._scroll(-self._visible_rows()))
+        self.bind("<Next>", lambda e: self._scroll(self._visible_rows()))
+
+        # === DETTAGLIO EVENTO ===
+        self.details = ctk.CTkTextbox(self, height=110, fg_color=colors["card"], text_color=colors["text"],
+                                      wrap="word", state="disabled")
+        self.details.pack(fill="x", padx=15, pady=5)
+
+        # === PULSANTI ===
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(fill="x", padx=15, pady=(0, 15))
+
+        ctk.CTkButton(buttons, text="Seleziona visibili", width=140, fg_color=colors["secondary"],
+                      command=lambda: self._select_visible(True)).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(buttons, text="Deseleziona visibili", width=140, fg_color=colors["secondary"],
+                      command=lambda: self._select_visible(False)).pack(side="left")
+
+        self.send_btn = ctk.CTkButton(
+            buttons, text="🚀 Invia selezionati ad analisi", width=240, height=40,
+            fg_color=colors["success"], hover_color="#059669",
+            font=ctk.CTkFont(size=14, weight="bold"), command=self._on_send
+        )
+        self.send_btn.pack(side="right")
+
+        self.count_label = ctk.CTkLabel(buttons, text="", text_color=colors["text_secondary"])
+        self.count_label.pack(side="right", padx=15)
+
+    # === DISEGNO DELLE RIGHE VISIBILI ===
+
+    def _visible_rows(self) -> int:
+        return max(1, self.canvas.winfo_height() // ROW_HEIGHT)
+
+    def _layout(self, width: int) -> list:
+        """
+        Calcola le posizioni x delle colonne per la larghezza corrente
+        """
+        fixed = sum(w for _, _, w in COLUMNS)
+        x = CHECK_WIDTH
+        positions = []
+        for key, _, w in COLUMNS:
+            w = w or max(100, width - fixed - CHECK_WIDTH)
+            positions.append((key, x, w))
+            x += w
+        return positions
+
+    def _ensure_slots(self, count: int):
+        """
+        Crea (una sola volta) gli elementi del Canvas per count righe visibili
+        """
+        while len(self._slots) < count:
+            y = len(self._slots) * ROW_HEIGHT
+            slot = {
+                "bg": self.canvas.create_rectangle(0, y, 0, y + ROW_HEIGHT, width=0),
+                "check": self.canvas.create_text(CHECK_WIDTH // 2, y + ROW_HEIGHT // 2, anchor="center",
+                                                 fill=self.colors["text"]),
+                "cells": [self.canvas.create_text(0, y + ROW_HEIGHT // 2, anchor="w", fill=self.colors["text"],
+                                                  font=("Segoe UI", 9)) for _ in COLUMNS],
+            }
+            self._slots.append(slot)
+
+    def _refresh(self):
+        """
+        Aggiorna il contenuto degli elementi visibili (nessun elemento creato per le righe fuori schermo)
+        """
+        width = self.canvas.winfo_width()
+        visible = self._visible_rows() + 1
+        view = self.model.view
+        self.top = max(0, min(self.top, len(view) - visible + 1))
+        columns = self._layout(width)
+
+        self._ensure_slots(visible)
+        for i, slot in enumerate(self._slots):
+            index = self.top + i
+            if i >= visible or index >= len(view):
+                self.canvas.itemconfigure(slot["bg"], state="hidden")
+                self.canvas.itemconfigure(slot["check"], state="hidden")
+                for item in slot["cells"]:
+                    self.canvas.itemconfigure(item, state="hidden")
+                continue
+
+            row = view[index]
+            log = self.model.logs[row]
+            y = i * ROW_HEIGHT
+            if row == self.current:
+                fill = self.colors["primary"]
+            else:
+                fill = self.colors["card"] if index % 2 else self.colors["background"]
+            self.canvas.coords(slot["bg"], 0, y, width, y + ROW_HEIGHT)
+            self.canvas.itemconfigure(slot["bg"], fill=fill, state="normal")
+            self.canvas.itemconfigure(slot["check"], text="☑" if row in self.model.selected else "☐",
+                                      state="normal")
+            for item, (key, x, w) in zip(slot["cells"], columns):
+                text = " ".join(str(log.get(key, "")).split())
+                max_chars = max(1, (w - 8) // CHAR_WIDTH)
+                if len(text) > max_chars:
+                    text = text[:max_chars - 1] + "…"
+                self.canvas.coords(item, x + 4, y + ROW_HEIGHT // 2)
+                self.canvas.itemconfigure(item, text=text, state="normal")
+
+        self._draw_header(columns)
+
+        # Posizione della scrollbar come frazione delle righe
+        total = max(1, len(view))
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        self.count_label.configure(
+            text=f"{len(view)} di {len(self.model.logs)} eventi · {len(self.model.selected)} selezionati")
+
+    def _draw_header(self, columns: list):
+        self.header.delete("all")
+        for key, x, w in columns:
+            label = HEADERS[key]
+            if key == self.model.sort_column:
+                label += " ▼" if self.model.sort_desc else " ▲"
+            self.header.create_text(x + 4, (ROW_HEIGHT + 4) // 2, anchor="w", text=label,
+                                    fill=self.colors["text"], font=("Segoe UI", 9, "bold"))
+        self._header_columns = columns
+
+    # === EVENTI ===
+
+    def _scroll(self, rows: int):
+        self.top += rows
+        self._refresh()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.top = int(float(value) * len(self.model.view))
+        elif action == "scroll":
+            step = self._visible_rows() if unit == "pages" else 1
+            self.top += int(value) * step
+        self._refresh()
+
+    def _on_header_click(self, event):
+        for key, x, w in self._header_columns:
+            if x <= event.x < x + w:
+                self.model.sort_by(key)
+                self.top = 0
+                self._refresh()
+                return
+
+    def _on_click(self, event):
+        index = self.top + event.y // ROW_HEIGHT
+        if index >= len(self.model.view):
+            return
+        row = self.model.view[index]
+        if event.x < CHECK_WIDTH:
+            self.model.toggle(row)
+        else:
+            self.current = row
+            self._show_details(self.model.logs[row])
+        self._refresh()
+
+    def _show_details(self, log: dict):
+        # Tabella e filtro usano l'anteprima: il messaggio completo viene letto solo qui
+        message = log["message"]
+        if log.get("message_ref") and self.messages is not None:
+            message = self.messages.get(log["message_ref"]) or message
+        self.details.configure(state="normal")
+        self.details.delete("1.0", "end")
+        self.details.insert("1.0", f"{log['timestamp']}  ·  {log['source']}  ·  ID {log['event_id']}  ·  "
+                                   f"{log['type']}  ·  Categoria {log['category']}\n\n{message}")
+        if log.get("tags"):
+            self.details.insert("2.0", f"Regole: {', '.join(log['tags'])}\n")
+        self.details.configure(state="disabled")
+
+    def _schedule_filter(self, event=None):
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(150, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        self.model.set_filter(self.filter_entry.get(), FILTER_COLUMNS.get(self.filter_column.get()))
+        self.top = 0
+        self._refresh()
+
+    def _select_visible(self, selected: bool):
+        self.model.select_visible(selected)
+        self._refresh()
+
+    def _on_send(self):
+        logs = self.model.selected_logs()
+        if not logs or not self.on_send:
+            return
+        self.send_btn.configure(state="disabled", text=f"✅ Inviati {len(logs)} eventi")
+        self.on_send(logs)
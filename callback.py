@@ -0,0 +1,477 @@
+"""
+EvLogPyAI - Server Callback e Abbinamento delle Risposte
+Server HTTP locale che riceve le risposte dell'AI da N8N e le abbina alle richieste inviate
+
+Ogni invio porta nel payload un "request_id" che il workflow restituisce nella callback
+(nodo HTTP Request). Con più analisi in corso contemporaneamente la risposta viene così
+attribuita alla richiesta giusta (titolo, categoria, tempo di attesa) invece che all'ultima
+inviata. I job uniti dalla coalescenza dell'outbox portano gli id separati da virgola.
+
+Il corpo delle callback viene letto a blocchi dal socket, con Content-Length o con
+Transfer-Encoding: chunked, fino a un massimo configurabile (oltre: 413 senza leggere il
+resto). Con il pacchetto opzionale ijson il JSON viene analizzato mentre arriva e il corpo
+grezzo non resta mai intero in memoria; senza, i blocchi vengono raccolti in un unico buffer
+analizzato una volta sola. Le connessioni restano aperte (HTTP/1.1 keep-alive) e ognuna è
+servita da un thread: più callback dal workflow non riaprono una connessione ciascuna.
+
+Con un archivio dei report (reportstore.py) il server serve anche lo storico delle analisi
+su /reports/, solo ai client locali.
+
+Usato dalla GUI (trigger.py) e dal test di carico (loadtest.py), che esercita lo stesso
+percorso di invio e callback senza Windows né interfaccia grafica.
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Corpo delle callback e delle metriche
+import json
+
+# threading: Server in un thread separato e accesso concorrente alle richieste in attesa
+import threading
+
+# time: Istanti di invio e consegna delle richieste
+import time
+
+# uuid: Identificativi delle richieste
+import uuid
+
+# collections: Richieste in attesa nell'ordine di invio
+from collections import OrderedDict
+
+# http.server: Server HTTP della callback
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# urllib.parse: Parametri dell'endpoint /metrics
+from urllib.parse import parse_qs
+
+# ijson: Analisi incrementale del JSON delle callback (opzionale - senza il corpo viene letto in un buffer)
+try:
+    import ijson
+    _JSON_ERRORS = (ValueError, RecursionError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    _JSON_ERRORS = (ValueError, RecursionError)
+
+
+# Richieste in attesa oltre le quali le più vecchie vengono dimenticate (risposte mai arrivate)
+MAX_PENDING = 1000
+
+# Dimensione massima del corpo di una callback (risposte dell'AI molto lunghe comprese)
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Byte letti dal socket per volta
+READ_SIZE = 64 * 1024
+
+# Annidamento massimo del JSON di una callback (le risposte di N8N sono oggetti piatti)
+MAX_JSON_DEPTH = 64
+
+# Secondi dopo i quali una connessione keep-alive inattiva viene chiusa
+KEEPALIVE_TIMEOUT = 30
+
+
+def new_request_id() -> str:
+    """Identificativo di una richiesta inviata a N8N"""
+    return uuid.uuid4().hex[:16]
+
+
+def split_request_ids(value) -> list:
+    """Id contenuti nel campo "request_id" (più id separati da virgola per i job uniti)"""
+    return [part for part in str(value or "").split(",") if part]
+
+
+class BodyTooLarge(ValueError):
+    """Corpo della richiesta oltre la dimensione massima"""
+
+
+class RequestBody:
+    """
+    Corpo di una richiesta HTTP letto a blocchi dal socket (Content-Length o chunked)
+
+    Si comporta come un file in sola lettura: read(n) restituisce al più n byte del corpo
+    già decodificato dal chunked encoding, senza mai leggere oltre la fine della richiesta
+    (la connessione resta utilizzabile per la successiva).
+    """
+
+    def __init__(self, rfile, headers, max_bytes: int = MAX_BODY_BYTES):
+        """
+        Args:
+            rfile: Stream della connessione
+            headers: Intestazioni della richiesta
+            max_bytes (int): Dimensione massima del corpo
+
+        Raises:
+            BodyTooLarge: Content-Length oltre max_bytes
+            ValueError: Content-Length non valido
+        """
+        self.rfile = rfile
+        self.max_bytes = max_bytes
+        self.chunked = "chunked" in headers.get("Transfer-Encoding", "").lower()
+        self.total = 0           # Byte del corpo letti finora
+        self._done = False
+        if self.chunked:
+            self._remaining = 0  # Byte ancora da leggere nel chunk corrente
+        else:
+            # HTTP/1.1: senza Content-Length né chunked la richiesta non ha corpo
+            self._remaining = int(headers.get("Content-Length") or 0)
+            if self._remaining < 0:
+                raise ValueError(f"Content-Length non valido: {self._remaining}")
+            if self._remaining > max_bytes:
+                raise BodyTooLarge(f"{self._remaining} byte (massimo {max_bytes})")
+            self._done = self._remaining == 0
+
+    def _next_chunk(self):
+        """
+        Legge l'intestazione del chunk successivo (e i trailer dopo l'ultimo)
+
+        Raises:
+            ValueError: Dimensione del chunk non esadecimale o negativa
+            BodyTooLarge: Corpo oltre max_bytes
+        """
+        if self.total:
+            # CRLF che chiude il chunk precedente
+            self.rfile.readline(64)
+        line = self.rfile.readline(1024)
+        if not line:
+            raise ConnectionError("Connessione chiusa durante il corpo")
+        # Solo cifre esadecimali: int(..., 16) accetterebbe anche "-1" o "+5", e una
+        # dimensione negativa diventerebbe rfile.read(-1) (lettura fino alla chiusura)
+        digits = line.split(b";", 1)[0].strip()
+        if not digits or digits.strip(b"0123456789abcdefABCDEF"):
+            raise ValueError(f"Dimensione del chunk non valida: {digits[:20]!r}")
+        size = int(digits, 16)
+        if size == 0:
+            while self.rfile.readline(1024) not in (b"\r\n", b"\n", b""):
+                pass
+            self._done = True
+        elif self.total + size > self.max_bytes:
+            raise BodyTooLarge(f"oltre {self.max_bytes} byte")
+        self._remaining = size
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Args:
+            size (int): Byte massimi da restituire (-1 = tutto il corpo rimanente)
+
+        Returns:
+            bytes: Parte successiva del corpo (vuota alla fine)
+        """
+        if size is None or size < 0:
+            buffer = bytearray()
+            while True:
+                data = self.read(READ_SIZE)
+                if not data:
+                    return bytes(buffer)
+                buffer += data
+        if self._done or size == 0:
+            return b""
+        if self._remaining == 0:
+            self._next_chunk()
+            if self._done:
+                return b""
+        if self._remaining < 0:
+            raise ValueError("Dimensione del corpo negativa")
+        data = self.rfile.read(min(size, self._remaining))
+        if not data:
+            raise ConnectionError("Connessione chiusa durante il corpo")
+        self._remaining -= len(data)
+        self.total += len(data)
+        if not self.chunked and self._remaining == 0:
+            self._done = True
+        return data
+
+    def drain(self):
+        """Scarta la parte non letta (la connessione torna pronta per la richiesta successiva)"""
+        while self.read(READ_SIZE):
+            pass
+
+
+def parse_json_body(body: RequestBody):
+    """
+    Oggetto JSON contenuto nel corpo, analizzato mentre viene letto se ijson è disponibile
+
+    Raises:
+        ValueError: JSON non valido o assente
+        BodyTooLarge: Corpo oltre la dimensione massima
+    """
+    if ijson is None:
+        return json.loads(body.read())
+    # Eventi di basso livello (senza prefissi) e profondità limitata: un corpo ostile
+    # come "[[[[..." non può far crescere la memoria oltre il corpo stesso
+    builder = ijson.ObjectBuilder()
+    depth = 0
+    for event, value in ijson.basic_parse(body, use_float=True):
+        if event in ("start_map", "start_array"):
+            depth += 1
+            if depth > MAX_JSON_DEPTH:
+                raise ValueError(f"JSON annidato oltre {MAX_JSON_DEPTH} livelli")
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        builder.event(event, value)
+        if depth == 0:
+            return builder.value
+    raise ValueError("Corpo vuoto")
+
+
+class PendingRequests:
+    """
+    Richieste consegnate o da consegnare a N8N in attesa della risposta dell'AI
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._requests = OrderedDict()
+
+        # Esito dell'abbinamento delle callback
+        self.matched = 0          # Callback abbinate a una richiesta in attesa
+        self.missing_id = 0       # Callback senza request_id (workflow non aggiornato): abbinate alla più vecchia
+        self.unknown_id = 0       # Callback con id non in attesa (duplicate, tardive o di un'altra istanza)
+        self.expired = 0          # Richieste dimenticate senza risposta (oltre max_pending)
+
+    def add(self, request_id: str, data: dict):
+        """
+        Registra una richiesta (prima dell'invio: la risposta può arrivare prima di on_sent)
+
+        Args:
+            request_id (str): Id inserito nel payload
+            data (dict): Dati della richiesta (titolo, categoria...); vengono aggiunti
+                         "request_id", "submitted" e, alla consegna, "delivered"
+        """
+        data = dict(data, request_id=request_id, submitted=time.perf_counter())
+        with self._lock:
+            self._requests[request_id] = data
+            while len(self._requests) > self.max_pending:
+                self._requests.popitem(last=False)
+                self.expired += 1
+
+    def delivered(self, request_ids):
+        """Segna le richieste consegnate a N8N (inizio dell'attesa della risposta)"""
+        now = time.perf_counter()
+        with self._lock:
+            for request_id in split_request_ids(request_ids):
+                data = self._requests.get(request_id)
+                if data is not None:
+                    data["delivered"] = now
+
+    def match(self, response: dict) -> list:
+        """
+        Richieste a cui risponde una callback (rimosse dall'attesa)
+
+        Args:
+            response (dict): Corpo della callback di N8N
+
+        Returns:
+            list: Dati delle richieste abbinate (vuota se nessuna)
+        """
+        request_ids = split_request_ids(response.get("request_id"))
+        with self._lock:
+            if not request_ids:
+                # Workflow senza request_id: le risposte arrivano di solito nell'ordine di invio
+                self.missing_id += 1
+                return [self._requests.popitem(last=False)[1]] if self._requests else []
+            matched = []
+            for request_id in request_ids:
+                data = self._requests.pop(request_id, None)
+                if data is None:
+                    self.unknown_id += 1
+                else:
+                    self.matched += 1
+                    matched.append(data)
+            return matched
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Richieste in attesa ed esito dell'abbinamento delle callback (gauge di /metrics)
+        """
+        return {
+            "pending_requests": len(self._requests),
+            "callbacks_matched": self.matched,
+            "callbacks_missing_id": self.missing_id,
+            "callbacks_unknown_id": self.unknown_id,
+            "requests_expired": self.expired,
+        }
+
+
+class CallbackServer:
+    """
+    Server HTTP che riceve le risposte di N8N (POST) ed espone /metrics (GET)
+    """
+
+    def __init__(self, port: int, on_response, metrics=None, host: str = "",
+                 max_body_bytes: int = MAX_BODY_BYTES, reports=None, verbose: bool = True):
+        """
+        Args:
+            port (int): Porta di ascolto (0 = scelta dal sistema, vedi port dopo start)
+            on_response (callable): on_response(dati) chiamata nel thread del server per ogni callback
+            metrics (Metrics): Registro esposto su /metrics (facoltativo)
+            host (str): Interfaccia di ascolto ("" = tutte, IPv4 e IPv6)
+            max_body_bytes (int): Dimensione massima del corpo di una callback (oltre: 413)
+            reports (ReportStore): Archivio dei report servito su /reports/ (facoltativo)
+            verbose (bool): Stampa le richieste ricevute sulla console
+        """
+        self.port = port
+        self.host = host
+        self.on_response = on_response
+        self.metrics = metrics
+        self.max_body_bytes = max_body_bytes
+        self.reports = reports
+        self.verbose = verbose
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """
+        Avvia il server in un thread daemon (un thread per connessione)
+
+        Raises:
+            OSError: Porta già in uso o non disponibile
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        # Nessun timeout: il server rimane in ascolto indefinitamente per le risposte lunghe dell'AI
+        self.server.timeout = None
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Ferma il server se è in esecuzione"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
+
+    @property
+    def running(self) -> bool:
+        return self.server is not None
+
+    def _handler_class(self):
+        # Riferimento al server callback per accederlo dall'handler
+        owner = self
+
+        class CallbackHandler(BaseHTTPRequestHandler):
+            """
+            Handler HTTP per gestire le richieste in arrivo da N8N
+            """
+
+            # Keep-alive: la connessione resta aperta per le richieste successive
+            protocol_version = "HTTP/1.1"
+            # Timeout del socket: chiude le connessioni inattive (e i client che si bloccano a metà corpo)
+            timeout = KEEPALIVE_TIMEOUT
+            # Intestazioni e corpo partono con due scritture: senza TCP_NODELAY il ritardo dell'ACK
+            # del client aggiunge ~40 ms a ogni risposta sulle connessioni keep-alive
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                """Sovrascrive il log per evitare output su console"""
+                # Le interrogazioni periodiche di /metrics e le pagine dei report non vengono stampate
+                if owner.verbose and not str(args[0]).startswith(("GET /metrics", "GET /reports")):
+                    print(f"📨 Server callback: {args[0]}")
+
+            def do_POST(self):
+                """
+                Gestisce le richieste POST (risposta da N8N)
+                """
+                started = time.perf_counter()
+                try:
+                    # Legge il corpo a blocchi (Content-Length o chunked) e lo decodifica
+                    body = RequestBody(self.rfile, self.headers, owner.max_body_bytes)
+                    response_data = parse_json_body(body)
+                    # Eventuali byte dopo il JSON: la connessione deve restare allineata
+                    body.drain()
+                except BodyTooLarge as e:
+                    # Il resto del corpo non viene letto: la connessione va chiusa
+                    print(f"❌ Risposta troppo grande: {str(e)}")
+                    self._reply(413, {"status": "error", "error": "body too large"})
+                    self.close_connection = True
+                    return
+                except OSError as e:
+                    print(f"❌ Connessione interrotta durante la risposta: {str(e)}")
+                    self.close_connection = True
+                    return
+                except _JSON_ERRORS as e:
+                    print(f"❌ Risposta non valida: {' '.join(str(e).split())}")
+                    self._reply(400, {"status": "error", "error": "invalid JSON"})
+                    self.close_connection = True
+                    return
+
+                if owner.metrics is not None:
+                    owner.metrics.observe("receive_callback", time.perf_counter() - started, nbytes=body.total)
+
+                if owner.verbose:
+                    print("\n" + "="*80)
+                    print("📥 RISPOSTA RICEVUTA DA N8N")
+                    print("="*80)
+                    print(f"📦 Dati ricevuti ({body.total} byte): {str(response_data)[:500]}")
+                    print("="*80 + "\n")
+
+                # Invia risposta OK a N8N
+                self._reply(200, {"status": "received"})
+
+                try:
+                    owner.on_response(response_data if isinstance(response_data, dict) else {})
+                except Exception as e:
+                    print(f"❌ Errore elaborazione risposta: {str(e)}")
+
+            def _reply(self, status: int, data: dict):
+                """Risposta JSON con Content-Length (necessario per il keep-alive)"""
+                self._send(status, {"Content-type": "application/json"}, json.dumps(data).encode())
+
+            def _send(self, status: int, headers: dict, body: bytes):
+                """Risposta con le intestazioni indicate e Content-Length"""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                """
+                Gestisce le richieste GET
+                - /metrics: metriche in formato Prometheus (JSON con ?format=json o Accept: application/json)
+                - /metrics.json: metriche in formato JSON
+                - /reports/...: storico e report HTML (solo dal computer locale)
+                - altri percorsi: health check
+                """
+                path, _, query = self.path.partition("?")
+
+                if (path == "/reports" or path.startswith("/reports/")) and owner.reports is not None:
+                    # I report contengono dettagli dei sistemi analizzati: non vengono serviti alla rete
+                    if self.client_address[0] not in ("127.0.0.1", "::1", "::ffff:127.0.0.1"):
+                        self._send(403, {"Content-Type": "text/plain"}, b"Forbidden")
+                        return
+                    self._send(*owner.reports.handle_get(path, query, self.headers))
+                    return
+
+                if path in ("/metrics", "/metrics.json") and owner.metrics is not None:
+                    wants_json = (
+                        path == "/metrics.json"
+                        or "json" in parse_qs(query).get("format", [])
+                        or "application/json" in self.headers.get("Accept", "")
+                    )
+                    if wants_json:
+                        body = json.dumps(owner.metrics.to_json(), indent=2).encode("utf-8")
+                        content_type = "application/json"
+                    else:
+                        body = owner.metrics.to_prometheus().encode("utf-8")
+                        content_type = "text/plain; version=0.0.4; charset=utf-8"
+                    self.send_response(200)
+                    self.send_header('Content-type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                body = b"EvLogPyAI Callback Server Running"
+                self.send_response(200)
+                self.send_header('Content-type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return CallbackHandler
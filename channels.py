@@ -0,0 +1,292 @@
+"""
+EvLogPyAI - Catalogo dei Canali
+Tutti i canali del Visualizzatore Eventi, compresi "Registri applicazioni e servizi"
+(es. Microsoft-Windows-TaskScheduler/Operational, Microsoft-Windows-PowerShell/Operational),
+con i metadati salvati in una cache SQLite
+
+La GUI riempie il menu delle categorie dalla cache, subito all'avvio, e mostra per il
+canale scelto quanti eventi contiene, quanto pesa la selezione e da quando risale.
+L'enumerazione (EvtOpenChannelEnum) e la lettura dei metadati avvengono in un thread in
+background: ogni aggiornamento rilegge solo numero di record, dimensione e ultima scrittura
+(EvtGetLogInfo), mentre il primo e l'ultimo evento vengono interrogati solo per i canali
+scritti dall'aggiornamento precedente.
+
+Uso da riga di comando:
+    python channels.py              # aggiorna e mostra i canali con eventi
+    python channels.py --all        # anche i canali vuoti o disattivati
+    python channels.py --cached     # solo la cache, senza aggiornare
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni da riga di comando
+import argparse
+
+# sqlite3: Cache dei metadati dei canali
+import sqlite3
+
+# threading: Aggiornamento in background e accesso da GUI e thread di aggiornamento
+import threading
+
+# time: Orario degli aggiornamenti
+import time
+
+# datetime: Date del primo e dell'ultimo evento
+from datetime import datetime
+
+# paths: Cartella dati dell'applicazione
+from paths import app_data_path
+
+
+# === CONFIGURAZIONE ===
+
+# Secondi tra due aggiornamenti in background del catalogo
+CATALOG_REFRESH_SECONDS = 300
+
+# Canali aggiornati per transazione (la GUI legge la cache mentre l'aggiornamento prosegue)
+_COMMIT_EVERY = 50
+
+# Epoca dei FILETIME di Windows in secondi prima del 1970-01-01
+_FILETIME_EPOCH_OFFSET = 11644473600
+
+
+def _to_epoch(value) -> float:
+    """Orario restituito da EvtGetLogInfo (datetime o FILETIME) in secondi epoch (None se assente)"""
+    if value is None:
+        return None
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    return int(value) / 10_000_000 - _FILETIME_EPOCH_OFFSET if value else None
+
+
+def format_size(nbytes: float) -> str:
+    """Dimensione leggibile (KB, MB, GB)"""
+    for unit in ("B", "KB", "MB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} GB"
+
+
+def format_estimate(info: dict, num_rows: int = None) -> str:
+    """
+    Riepilogo di una selezione: eventi presenti (o richiesti), dimensione stimata, periodo
+
+    Args:
+        info (dict): Riga del catalogo (vedi ChannelCatalog.get)
+        num_rows (int): Eventi richiesti (None = tutto il canale)
+
+    Returns:
+        str: es. "5000 di 12345 eventi · ~2.1 MB · dal 01/02/2026 al 19/10/2026"
+    """
+    records = info["records"] or 0
+    if not records:
+        return "canale vuoto" if info["enabled"] else "canale disattivato"
+    events = min(num_rows, records) if num_rows else records
+    parts = [f"{events} di {records} eventi" if num_rows else f"{records} eventi"]
+    # Dimensione del file del canale ripartita sugli eventi: stima di quanto pesa la selezione
+    if info["file_size"]:
+        parts.append(f"~{format_size(info['file_size'] * events / records)}")
+    if info["oldest"] and info["newest"]:
+        parts.append(f"dal {datetime.fromtimestamp(info['oldest']).strftime('%d/%m/%Y')} "
+                     f"al {datetime.fromtimestamp(info['newest']).strftime('%d/%m/%Y')}")
+    return " · ".join(parts)
+
+
+class ChannelCatalog:
+    """
+    Cache dei canali del Visualizzatore Eventi e dei loro metadati, in un file SQLite
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str): Percorso del file SQLite (default: %LOCALAPPDATA%\\EvLogPyAI\\channels.db)
+        """
+        self.path = path or app_data_path("channels.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS channels (
+                name TEXT PRIMARY KEY,
+                enabled INTEGER NOT NULL,
+                records INTEGER,
+                file_size INTEGER,
+                oldest REAL,
+                newest REAL,
+                last_write REAL,
+                refreshed REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_refresh = None
+
+    # === CONSULTAZIONE (SOLO CACHE) ===
+
+    def channels(self, active_only: bool = True) -> list:
+        """
+        Canali in cache, in ordine alfabetico
+
+        Args:
+            active_only (bool): Solo i canali attivi con almeno un evento
+
+        Returns:
+            list: Righe (name, enabled, records, file_size, oldest, newest, last_write, refreshed)
+        """
+        where = "WHERE enabled AND records > 0" if active_only else ""
+        with self._lock:
+            return self._conn.execute(f"SELECT * FROM channels {where} ORDER BY name COLLATE NOCASE").fetchall()
+
+    def get(self, name: str):
+        """Metadati di un canale (None se non ancora in cache)"""
+        with self._lock:
+            return self._conn.execute("SELECT * FROM channels WHERE name = ?", (name,)).fetchone()
+
+    # === AGGIORNAMENTO ===
+
+    def refresh(self) -> int:
+        """
+        Enumera i canali e aggiorna la cache; primo e ultimo evento solo per i canali cambiati
+
+        Returns:
+            int: Canali nuovi o cambiati dall'aggiornamento precedente
+        """
+        # Importati qui: il catalogo in cache resta consultabile anche senza pywin32
+        import win32evtlog
+        import eventlog
+
+        with self._lock:
+            cached = {row["name"]: row for row in self._conn.execute("SELECT * FROM channels")}
+
+        names = []
+        enum = win32evtlog.EvtOpenChannelEnum()
+        while True:
+            name = win32evtlog.EvtNextChannelPath(enum)
+            if name is None:
+                break
+            names.append(name)
+
+        changed = 0
+        now = time.time()
+        for name in names:
+            if self._stop.is_set():
+                break
+            try:
+                info = self._read_info(win32evtlog, name)
+            except Exception:
+                # Canale non accessibile (es. Security senza privilegi di amministratore): resta com'era
+                continue
+            previous = cached.get(name)
+            if previous is not None and previous["last_write"] == info["last_write"] \
+                    and previous["enabled"] == info["enabled"] and previous["records"] == info["records"]:
+                continue
+            oldest = newest = None
+            if info["records"]:
+                oldest = self._event_time(win32evtlog, eventlog, name, win32evtlog.EvtQueryForwardDirection)
+                newest = self._event_time(win32evtlog, eventlog, name, win32evtlog.EvtQueryReverseDirection)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO channels (name, enabled, records, file_size, oldest, newest, last_write, "
+                    "refreshed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, info["enabled"], info["records"], info["file_size"], oldest, newest, info["last_write"], now)
+                )
+                changed += 1
+                if changed % _COMMIT_EVERY == 0:
+                    self._conn.commit()
+
+        with self._lock:
+            # Canali disinstallati insieme al loro provider
+            if names and not self._stop.is_set():
+                removed = set(cached) - set(names)
+                self._conn.executemany("DELETE FROM channels WHERE name = ?", ((name,) for name in removed))
+                changed += len(removed)
+            self._conn.commit()
+        self.last_refresh = now
+        return changed
+
+    @staticmethod
+    def _read_info(win32evtlog, name: str) -> dict:
+        """Stato, numero di record, dimensione e ultima scrittura di un canale"""
+        config = win32evtlog.EvtOpenChannelConfig(name)
+        enabled = bool(win32evtlog.EvtGetChannelConfigProperty(config, win32evtlog.EvtChannelConfigEnabled)[0])
+        log = win32evtlog.EvtOpenLog(name, win32evtlog.EvtOpenChannelPath)
+        return {
+            "enabled": enabled,
+            "records": win32evtlog.EvtGetLogInfo(log, win32evtlog.EvtLogNumberOfLogRecords)[0] or 0,
+            "file_size": win32evtlog.EvtGetLogInfo(log, win32evtlog.EvtLogFileSize)[0] or 0,
+            "last_write": _to_epoch(win32evtlog.EvtGetLogInfo(log, win32evtlog.EvtLogLastWriteTime)[0]),
+        }
+
+    @staticmethod
+    def _event_time(win32evtlog, eventlog, name: str, direction: int) -> float:
+        """Orario (epoch) del primo evento del canale nella direzione indicata (None se non leggibile)"""
+        try:
+            query = win32evtlog.EvtQuery(name, win32evtlog.EvtQueryChannelPath | direction)
+            events = win32evtlog.EvtNext(query, 1)
+            if not events:
+                return None
+            xml = win32evtlog.EvtRender(events[0], win32evtlog.EvtRenderEventXml)
+        except Exception:
+            return None
+        start = xml.find('SystemTime="')
+        created = eventlog.parse_system_time(xml[start + 12:start + 31]) if start >= 0 else None
+        return created.timestamp() if created else None
+
+    def start(self, on_update=None, interval: float = CATALOG_REFRESH_SECONDS):
+        """
+        Avvia l'aggiornamento periodico in un thread daemon (il primo subito)
+
+        Args:
+            on_update (callable): on_update() dopo ogni aggiornamento che ha cambiato la cache
+                                  (chiamata dal thread del catalogo)
+            interval (float): Secondi tra due aggiornamenti
+        """
+        def run():
+            while not self._stop.is_set():
+                try:
+                    if self.refresh() and on_update:
+                        on_update()
+                except Exception as e:
+                    print(f"⚠️  Aggiornamento del catalogo dei canali non riuscito: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name="evlogpyai-channels", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Catalogo dei canali del Visualizzatore Eventi")
+    parser.add_argument("--all", action="store_true", help="Mostra anche i canali vuoti o disattivati")
+    parser.add_argument("--cached", action="store_true", help="Non aggiornare: mostra solo la cache")
+    args = parser.parse_args()
+
+    catalog = ChannelCatalog()
+    try:
+        if not args.cached:
+            started = time.perf_counter()
+            changed = catalog.refresh()
+            print(f"🔄 Catalogo aggiornato in {time.perf_counter() - started:.1f} s ({changed} canali cambiati)")
+        rows = catalog.channels(active_only=not args.all)
+        for row in rows:
+            print(f"{row['name']:<70} {format_estimate(row)}")
+        print(f"\n📚 {len(rows)} canali (cache: {catalog.path})")
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+"""
+EvLogPyAI - Correlazione degli Incidenti
+Raggruppa gli eventi di più canali in incidenti: catene di eventi vicini nel tempo
+o legati da una relazione causa-effetto nota
+
+Un incidente è spesso una catena: un avviso del disco nel log Sistema, poi il crash
+di un'applicazione nel log Applicazione, poi il riavvio del servizio. Invece di una
+lista piatta di migliaia di righe, all'AI arrivano poche decine di incidenti con
+catena causale, canali coinvolti ed eventi rappresentativi.
+
+Algoritmo (sort and sweep, O(n log n)):
+- gli eventi di tutti i canali vengono ordinati per orario
+- una sola scansione in ordine di tempo unisce (union-find) ogni evento significativo
+  al precedente se distano al massimo gap secondi (e l'incidente non supera max_span),
+  e all'ultima occorrenza di una causa nota entro la finestra della regola (CAUSAL_RULES)
+- gli eventi informativi che non compaiono in nessuna regola non formano incidenti
+
+Regole aggiuntive in %LOCALAPPDATA%\\EvLogPyAI\\correlation_rules.json, una lista di
+oggetti con gli stessi campi di CAUSAL_RULES:
+    [{"cause": {"source": "disk", "event_ids": [153]},
+      "effect": {"source": "MyService", "event_ids": [100]},
+      "window": 600, "label": "Errore I/O seguito dall'errore del servizio"}]
+
+Uso da riga di comando (anteprima su file .evtx):
+    python correlation.py System.evtx Application.evtx -n 50000
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Regole personalizzate dell'utente
+import json
+
+# os: Presenza del file delle regole personalizzate
+import os
+
+# baseline: Conversione dei timestamp degli eventi
+from baseline import event_epoch
+
+# knowledge: Confronto delle sorgenti ("Microsoft-Windows-Kernel-Power" = "Kernel-Power")
+from knowledge import normalize_source
+
+# wire: Template dei messaggi (firme degli eventi dell'incidente)
+from wire import message_template
+
+
+# === CONFIGURAZIONE ===
+
+# Due eventi significativi a meno di GAP_SECONDS appartengono allo stesso incidente...
+GAP_SECONDS = 60
+# ...purché l'incidente non duri più di MAX_SPAN_SECONDS (i legami causali non hanno limite)
+MAX_SPAN_SECONDS = 1800
+
+# Tipi di evento che formano incidenti anche senza una regola causale
+SIGNIFICANT_TYPES = ("Errore", "Avviso", "Audit Failure")
+
+# Incidenti inviati all'AI (i più gravi) ed eventi rappresentativi per incidente
+MAX_INCIDENTS = 30
+MAX_REPRESENTATIVES = 5
+
+# Firme elencate per incidente
+MAX_SIGNATURES = 8
+
+# Relazioni causa-effetto note: l'effetto viene legato all'ultima causa vista entro window secondi
+CAUSAL_RULES = [
+    # --- Disco e file system ---
+    {
+        "cause": {"source": "disk", "event_ids": [7, 11, 51, 153]},
+        "effect": {"source": "Ntfs", "event_ids": [55, 98]},
+        "window": 600, "label": "Errore del disco seguito da corruzione del file system",
+    },
+    {
+        "cause": {"source": "disk", "event_ids": [7, 11, 51, 153]},
+        "effect": {"source": "Application Error", "event_ids": [1000]},
+        "window": 600, "label": "Errore di I/O del disco seguito dal crash di un'applicazione",
+    },
+    {
+        "cause": {"source": "Ntfs", "event_ids": [55, 98]},
+        "effect": {"source": "Application Error", "event_ids": [1000]},
+        "window": 600, "label": "Corruzione del file system seguita dal crash di un'applicazione",
+    },
+    {
+        "cause": {"source": "volmgr", "event_ids": [46]},
+        "effect": {"source": "Kernel-Power", "event_ids": [41]},
+        "window": 3600, "label": "Dump di arresto non configurato dopo un riavvio imprevisto",
+    },
+    # --- Applicazioni e servizi ---
+    {
+        "cause": {"source": ".NET Runtime", "event_ids": [1026]},
+        "effect": {"source": "Application Error", "event_ids": [1000]},
+        "window": 60, "label": "Eccezione .NET non gestita che termina il processo",
+    },
+    {
+        "cause": {"source": "Application Error", "event_ids": [1000]},
+        "effect": {"source": "Windows Error Reporting", "event_ids": [1001]},
+        "window": 300, "label": "Crash segnalato da Windows Error Reporting",
+    },
+    {
+        "cause": {"source": "Application Error", "event_ids": [1000]},
+        "effect": {"source": "Service Control Manager", "event_ids": [7031, 7034]},
+        "window": 120, "label": "Crash dell'eseguibile di un servizio",
+    },
+    {
+        "cause": {"source": "Application Hang", "event_ids": [1002]},
+        "effect": {"source": "Service Control Manager", "event_ids": [7031, 7034]},
+        "window": 120, "label": "Blocco dell'eseguibile di un servizio",
+    },
+    {
+        "cause": {"source": "Service Control Manager", "event_ids": [7009, 7011]},
+        "effect": {"source": "Service Control Manager", "event_ids": [7000]},
+        "window": 60, "label": "Timeout del servizio che ne impedisce l'avvio",
+    },
+    {
+        "cause": {"source": "Service Control Manager", "event_ids": [7000, 7023]},
+        "effect": {"source": "Service Control Manager", "event_ids": [7001]},
+        "window": 120, "label": "Servizio non avviato che blocca i servizi dipendenti",
+    },
+    # --- Hardware e arresti ---
+    {
+        "cause": {"source": "WHEA-Logger", "event_ids": [17, 18, 19]},
+        "effect": {"source": "Kernel-Power", "event_ids": [41]},
+        "window": 3600, "label": "Errore hardware seguito da un riavvio imprevisto",
+    },
+    {
+        "cause": {"source": "Kernel-Power", "event_ids": [41]},
+        "effect": {"source": "EventLog", "event_ids": [6008]},
+        "window": 300, "label": "Riavvio imprevisto registrato all'avvio successivo",
+    },
+    # --- Rete e orario ---
+    {
+        "cause": {"source": "Tcpip", "event_ids": [4199]},
+        "effect": {"source": "DNS-Client", "event_ids": [1014]},
+        "window": 600, "label": "Conflitto di indirizzo IP seguito da errori di risoluzione DNS",
+    },
+    {
+        "cause": {"source": "Time-Service", "event_ids": [129]},
+        "effect": {"source": "Time-Service", "event_ids": [134]},
+        "window": 900, "label": "Origine orario non raggiungibile e sincronizzazione non riuscita",
+    },
+]
+
+
+def _event_key(log: dict):
+    """(sorgente normalizzata, Event ID) di un evento, o None se l'ID non è numerico"""
+    try:
+        return normalize_source(log.get("source")), int(log.get("event_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _DisjointSet:
+    """Union-find con compressione dei cammini; ogni radice ricorda l'inizio del suo incidente"""
+
+    __slots__ = ("parent", "start")
+
+    def __init__(self):
+        self.parent = []
+        self.start = []
+
+    def add(self, epoch: float) -> int:
+        self.parent.append(len(self.parent))
+        self.start.append(epoch)
+        return len(self.parent) - 1
+
+    def find(self, node: int) -> int:
+        parent = self.parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            # La radice è il nodo più vecchio: l'inizio dell'incidente resta il suo
+            if b < a:
+                a, b = b, a
+            self.parent[b] = a
+            self.start[a] = min(self.start[a], self.start[b])
+        return a
+
+
+class Correlator:
+    """
+    Motore di correlazione: regole causali indicizzate per effetto
+    """
+
+    def __init__(self, rules: list = None, custom_path: str = None, gap: float = GAP_SECONDS,
+                 max_span: float = MAX_SPAN_SECONDS):
+        """
+        Args:
+            rules (list): Regole causali (default CAUSAL_RULES)
+            custom_path (str): File JSON con regole aggiuntive (facoltativo)
+            gap (float): Distanza massima in secondi tra eventi vicini dello stesso incidente
+            max_span (float): Durata massima di un incidente formato per vicinanza
+        """
+        self.gap = gap
+        self.max_span = max_span
+        # (sorgente, Event ID) dell'effetto -> [(chiavi delle cause, finestra, etichetta)]
+        self._by_effect = {}
+        self._rule_keys = set()
+        for rule in rules if rules is not None else CAUSAL_RULES:
+            self._add(rule)
+        if custom_path and os.path.exists(custom_path):
+            try:
+                with open(custom_path, encoding="utf-8") as f:
+                    for rule in json.load(f):
+                        self._add(rule)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                print(f"⚠️  Regole di correlazione personalizzate non valide ({custom_path}): {e}")
+
+    def _add(self, rule: dict):
+        cause_source = normalize_source(rule["cause"]["source"])
+        causes = tuple((cause_source, int(i)) for i in rule["cause"]["event_ids"])
+        effect_source = normalize_source(rule["effect"]["source"])
+        for event_id in rule["effect"]["event_ids"]:
+            key = (effect_source, int(event_id))
+            self._by_effect.setdefault(key, []).append((causes, float(rule["window"]), rule["label"]))
+            self._rule_keys.add(key)
+        self._rule_keys.update(causes)
+
+    def correlate(self, streams: dict, focus: str = None, max_incidents: int = MAX_INCIDENTS) -> tuple:
+        """
+        Raggruppa gli eventi di più canali in incidenti
+
+        Args:
+            streams (dict): Nome del canale -> eventi estratti (in qualsiasi ordine)
+            focus (str): Se indicato restano solo gli incidenti con eventi di questo canale
+            max_incidents (int): Incidenti restituiti (i più gravi)
+
+        Returns:
+            tuple: (eventi rappresentativi in ordine di tempo, riepilogo per il payload)
+        """
+        # === ORDINAMENTO PER ORARIO ===
+        times = {}
+        timeline = []
+        total = 0
+        for channel, logs in streams.items():
+            total += len(logs)
+            for log in logs:
+                epoch = event_epoch(log.get("timestamp"), times)
+                if epoch is not None:
+                    timeline.append((epoch, channel, log))
+        timeline.sort(key=lambda item: item[0])
+
+        # === SWEEP ===
+        sets = _DisjointSet()
+        nodes = []          # Nodo -> (orario, canale, evento, chiave)
+        last_seen = {}      # (sorgente, Event ID) -> ultimo nodo con quella chiave
+        links = []          # (nodo causa, nodo effetto, etichetta)
+        previous = None
+        for epoch, channel, log in timeline:
+            key = _event_key(log)
+            if log.get("type") not in SIGNIFICANT_TYPES and key not in self._rule_keys:
+                continue
+            node = sets.add(epoch)
+            nodes.append((epoch, channel, log, key))
+
+            # Vicinanza: legato al precedente se vicino e l'incidente resta entro max_span
+            if previous is not None and epoch - nodes[previous][0] <= self.gap:
+                if epoch - sets.start[sets.find(previous)] <= self.max_span:
+                    sets.union(previous, node)
+
+            # Causalità: legato all'ultima occorrenza di ogni causa entro la finestra della regola
+            for causes, window, label in self._by_effect.get(key, ()):
+                best = None
+                for cause in causes:
+                    candidate = last_seen.get(cause)
+                    if candidate is not None and epoch - nodes[candidate][0] <= window:
+                        if best is None or nodes[candidate][0] > nodes[best][0]:
+                            best = candidate
+                if best is not None:
+                    sets.union(best, node)
+                    links.append((best, node, label))
+
+            if key is not None:
+                last_seen[key] = node
+            previous = node
+
+        # === INCIDENTI ===
+        groups = {}
+        for node in range(len(nodes)):
+            groups.setdefault(sets.find(node), []).append(node)
+        links_by_root = {}
+        for cause, effect, label in links:
+            links_by_root.setdefault(sets.find(cause), []).append((cause, effect, label))
+
+        incidents = []
+        for root, members in groups.items():
+            if focus is not None and not any(nodes[n][1] == focus for n in members):
+                continue
+            incidents.append(self._build_incident(nodes, members, links_by_root.get(root, [])))
+        clustered = sum(incident["events"] for incident in incidents)
+        incidents.sort(key=lambda incident: incident["score"], reverse=True)
+        kept = incidents[:max_incidents]
+
+        # === EVENTI RAPPRESENTATIVI ===
+        # Prima le cause, poi il primo evento di ogni firma, in ordine di tempo
+        representatives = []
+        for number, incident in enumerate(kept, 1):
+            incident["id"] = number
+            representatives.extend(incident.pop("_representatives"))
+        for incident in incidents[max_incidents:]:
+            incident.pop("_representatives")
+        representatives.sort(key=lambda item: item[0])
+
+        summary = {
+            "method": "sort_sweep",
+            "channels": {channel: len(logs) for channel, logs in streams.items()},
+            "total_events": total,
+            "significant_events": len(nodes),
+            "clustered_events": clustered,
+            "incidents_total": len(incidents),
+            "incidents_dropped": len(incidents) - len(kept),
+            "gap_seconds": self.gap,
+            "incidents": kept,
+        }
+        return [log for _, log in representatives], summary
+
+    def _build_incident(self, nodes: list, members: list, links: list) -> dict:
+        """Riepilogo di un incidente: durata, canali, tipi, catena causale e firme"""
+        channels = {}
+        levels = {}
+        signatures = {}
+        for node in members:
+            epoch, channel, log, key = nodes[node]
+            channels[channel] = channels.get(channel, 0) + 1
+            levels[log.get("type")] = levels.get(log.get("type"), 0) + 1
+            template, _ = message_template(log.get("message"))
+            signature = (channel, log.get("source"), log.get("event_id"), log.get("type"), template)
+            entry = signatures.get(signature)
+            if entry is None:
+                entry = signatures[signature] = {
+                    "channel": channel, "source": log.get("source"), "event_id": log.get("event_id"),
+                    "type": log.get("type"), "count": 0, "first": log.get("timestamp"),
+                    "message": log.get("message"), "_node": node,
+                }
+            entry["count"] += 1
+
+        # === CATENA CAUSALE ===
+        # Legami uguali (stessa coppia sorgente/Event ID) contati una volta sola
+        chain = {}
+        effects = set()
+        for cause, effect, label in links:
+            cause_log, effect_log = nodes[cause][2], nodes[effect][2]
+            pair = (nodes[cause][3], nodes[effect][3])
+            gap = nodes[effect][0] - nodes[cause][0]
+            item = chain.get(pair)
+            if item is None:
+                item = chain[pair] = {
+                    "cause": f"{cause_log.get('source')} {cause_log.get('event_id')}",
+                    "effect": f"{effect_log.get('source')} {effect_log.get('event_id')}",
+                    "label": label, "count": 0, "min_gap_seconds": gap, "_node": cause,
+                }
+            item["count"] += 1
+            item["min_gap_seconds"] = min(item["min_gap_seconds"], gap)
+            effects.add(nodes[effect][3])
+
+        # Causa principale: la prima causa che non è a sua volta effetto di un'altra,
+        # altrimenti il primo errore (o il primo evento) dell'incidente
+        roots = [item["_node"] for item in chain.values() if nodes[item["_node"]][3] not in effects]
+        errors = [node for node in members if nodes[node][2].get("type") == "Errore"]
+        root_node = min(roots) if roots else (errors[0] if errors else members[0])
+        root_log = nodes[root_node][2]
+
+        first, last = nodes[members[0]][0], nodes[members[-1]][0]
+        ordered = sorted(signatures.values(), key=lambda s: (s["_node"] != root_node, -s["count"]))
+        representative_nodes = sorted({root_node} | {s["_node"] for s in ordered[:MAX_REPRESENTATIVES - 1]})
+        for entry in ordered:
+            del entry["_node"]
+        links_out = sorted(chain.values(), key=lambda item: item["_node"])
+        for item in links_out:
+            del item["_node"]
+            item["min_gap_seconds"] = round(item["min_gap_seconds"], 1)
+
+        # Gravità: errori e legami causali pesano più degli avvisi, più canali più dell'unico
+        score = (3 * levels.get("Errore", 0) + 2 * levels.get("Audit Failure", 0) + levels.get("Avviso", 0)
+                 + 10 * len(chain) + 5 * (len(channels) - 1))
+        return {
+            "start": nodes[members[0]][2].get("timestamp"),
+            "end": nodes[members[-1]][2].get("timestamp"),
+            "duration_seconds": round(last - first, 1),
+            "events": len(members),
+            "channels": channels,
+            "levels": levels,
+            "root_cause": {
+                "channel": nodes[root_node][1], "source": root_log.get("source"),
+                "event_id": root_log.get("event_id"), "timestamp": root_log.get("timestamp"),
+            },
+            "chain": links_out,
+            "signatures": ordered[:MAX_SIGNATURES],
+            "score": score,
+            "_representatives": [(nodes[node][0], nodes[node][2]) for node in representative_nodes],
+        }
+
+
+def merge_incidents(summaries: list, max_incidents: int = MAX_INCIDENTS) -> dict:
+    """
+    Unisce i riepiloghi di correlazione di più payload (vedi outbox.coalesce_payloads)
+
+    Returns:
+        dict: Riepilogo con i conteggi sommati e gli incidenti più gravi di tutti i payload
+    """
+    incidents = sorted((incident for s in summaries for incident in s["incidents"]),
+                       key=lambda incident: incident["score"], reverse=True)
+    kept = [dict(incident, id=number) for number, incident in enumerate(incidents[:max_incidents], 1)]
+    channels = {}
+    for summary in summaries:
+        for channel, count in summary["channels"].items():
+            channels[channel] = channels.get(channel, 0) + count
+    total_incidents = sum(s["incidents_total"] for s in summaries)
+    return {
+        "method": "sort_sweep",
+        "channels": channels,
+        "total_events": sum(s["total_events"] for s in summaries),
+        "significant_events": sum(s["significant_events"] for s in summaries),
+        "clustered_events": sum(s["clustered_events"] for s in summaries),
+        "incidents_total": total_incidents,
+        "incidents_dropped": total_incidents - len(kept),
+        "gap_seconds": summaries[-1]["gap_seconds"],
+        "incidents": kept,
+    }
+
+
+def format_incidents(summary: dict) -> str:
+    """
+    Testo leggibile degli incidenti (console e anteprima da riga di comando)
+    """
+    lines = [f"{summary['total_events']} eventi da {len(summary['channels'])} canali -> "
+             f"{summary['incidents_total']} incidenti ({summary['significant_events']} eventi significativi)"]
+    for incident in summary["incidents"]:
+        root = incident["root_cause"]
+        channels = ", ".join(f"{c} {n}" for c, n in incident["channels"].items())
+        lines.append(f"\n#{incident['id']} {incident['start']} → {incident['end']} · {incident['events']} eventi "
+                     f"({channels}) · gravità {incident['score']}")
+        lines.append(f"   Causa principale: {root['source']} {root['event_id']} ({root['channel']})")
+        for link in incident["chain"]:
+            lines.append(f"   ⛓  {link['cause']} → {link['effect']}: {link['label']} "
+                         f"(x{link['count']}, dopo {link['min_gap_seconds']:.0f} s)")
+        for signature in incident["signatures"]:
+            lines.append(f"   - [{signature['channel']}] {signature['type']} {signature['source']} "
+                         f"{signature['event_id']} x{signature['count']}")
+    if summary["incidents_dropped"]:
+        lines.append(f"\n... altri {summary['incidents_dropped']} incidenti meno gravi")
+    return "\n".join(lines)
+
+
+# === ANTEPRIMA DA RIGA DI COMANDO ===
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from evtx_reader import read_evtx_logs
+
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Anteprima della correlazione degli incidenti")
+    parser.add_argument("evtx", nargs="+", help="File .evtx da correlare (uno per canale)")
+    parser.add_argument("-n", type=int, default=50000, help="Eventi da leggere per file (default: 50000)")
+    parser.add_argument("--gap", type=float, default=GAP_SECONDS,
+                        help=f"Secondi tra eventi vicini dello stesso incidente (default: {GAP_SECONDS})")
+    args = parser.parse_args()
+
+    streams = {os.path.splitext(os.path.basename(path))[0]: read_evtx_logs(path, args.n) for path in args.evtx}
+    started = time.perf_counter()
+    representatives, info = Correlator(gap=args.gap).correlate(streams)
+    elapsed = time.perf_counter() - started
+    print(format_incidents(info))
+    print(f"\n{len(representatives)} eventi rappresentativi in {elapsed * 1000:.0f} ms")
@@ -0,0 +1,362 @@
+"""
+EvLogPyAI - Accesso al Visualizzatore Eventi di Windows
+Funzioni condivise per leggere i record dei log eventi e convertirli in dizionari
+
+Usato sia dalla GUI (estrazione una tantum) sia dalla modalità watch (lettura incrementale)
+
+I log classici (Application, System, ...) si leggono con ReadEventLog; i canali di
+"Registri applicazioni e servizi" (es. Microsoft-Windows-TaskScheduler/Operational)
+esistono solo per le API Evt*: iter_channel_events li legge nello stesso formato.
+"""
+
+# collections: Record grezzo trasferibile ai processi di formattazione
+from collections import namedtuple
+
+# functools: Cache della verifica dei log classici (una lettura del registro per canale)
+import functools
+
+# datetime: Timestamp degli eventi dei canali (SystemTime in UTC)
+from datetime import datetime, timezone
+
+# math: Fine dell'intervallo di tempo arrotondata al secondo
+import math
+
+# xml.etree: Campi degli eventi dei canali resi in XML da EvtRender
+from xml.etree import ElementTree
+
+# win32evtlog: Libreria per accedere ai log eventi di Windows (richiede pywin32)
+import win32evtlog
+
+# win32evtlogutil: Utilities per formattare i messaggi dei log eventi di Windows
+import win32evtlogutil
+
+# win32con: Costanti di Windows (come EVENTLOG_ERROR_TYPE, EVENTLOG_WARNING_TYPE, ecc.)
+import win32con
+
+# security: Campi strutturati degli eventi di audit letti dalle insertion strings
+from security import extract_fields, format_fields
+
+# evtx_reader: Etichette dei livelli e bit di audit (stessa conversione dei file .evtx)
+from evtx_reader import LEVEL_LABELS, KEYWORD_AUDIT_FAILURE, KEYWORD_AUDIT_SUCCESS
+
+
+# === ETICHETTE TIPO EVENTO ===
+# Converte il codice numerico del tipo evento in una stringa leggibile
+EVENT_TYPE_LABELS = {
+    win32con.EVENTLOG_ERROR_TYPE: "Errore",               # 1: Evento di errore critico
+    win32con.EVENTLOG_WARNING_TYPE: "Avviso",             # 2: Evento di avviso
+    win32con.EVENTLOG_INFORMATION_TYPE: "Informazione",   # 4: Evento informativo
+    win32con.EVENTLOG_AUDIT_SUCCESS: "Audit Success",     # 8: Audit riuscito (eventi di sicurezza)
+    win32con.EVENTLOG_AUDIT_FAILURE: "Audit Failure",     # 16: Audit fallito (eventi di sicurezza)
+}
+
+# Lunghezza massima del messaggio salvato per ogni evento (anteprima: il testo completo va in blobstore.py)
+MESSAGE_MAX_CHARS = 500
+
+
+# === RECORD GREZZI ===
+# Campi di un PyEventLogRecord necessari alla conversione, con gli stessi nomi degli attributi
+# di pywin32 (SafeFormatMessage usa solo SourceName, EventID e StringInserts). A differenza del
+# record originale è serializzabile: la formattazione può avvenire in altri processi (vedi formatpool.py)
+RawEvent = namedtuple("RawEvent", "TimeGenerated SourceName EventID EventType EventCategory StringInserts")
+
+
+def raw_event(event) -> RawEvent:
+    """
+    Copia di un record di ReadEventLog con il solo lavoro di lettura (nessuna formattazione)
+
+    Args:
+        event: Oggetto evento di pywin32 (PyEventLogRecord)
+
+    Returns:
+        RawEvent: Record con timestamp già in testo e insertion strings
+    """
+    return RawEvent(event.TimeGenerated.Format(), event.SourceName, event.EventID, event.EventType,
+                    event.EventCategory, event.StringInserts)
+
+
+def event_to_dict(event, log_type: str, with_fields: bool = False) -> dict:
+    """
+    Converte un record restituito da ReadEventLog nel dizionario usato dall'applicazione
+
+    Args:
+        event: Oggetto evento di pywin32 (PyEventLogRecord)
+        log_type (str): Nome tecnico del log di Windows (es. "System")
+        with_fields (bool): Aggiunge "fields" con i campi strutturati degli eventi di sicurezza
+                            registrati (usati dagli aggregati di extractor.py)
+
+    Returns:
+        dict: Dizionario con timestamp, source, event_id, type, category e message
+    """
+    return raw_to_dict(raw_event(event), log_type, with_fields)
+
+
+def raw_to_dict(event: RawEvent, log_type: str, with_fields: bool = False) -> dict:
+    """
+    Come event_to_dict, per un record grezzo (eseguita anche nei processi di formattazione)
+
+    Returns:
+        dict: Dizionario con timestamp, source, event_id, type, category e message
+              (più "message_full" se il messaggio supera MESSAGE_MAX_CHARS, vedi blobstore.detach_message)
+    """
+    # "Info" è il valore predefinito per tipi non riconosciuti
+    event_type = EVENT_TYPE_LABELS.get(event.EventType, "Info")
+    event_id = event.EventID & 0xFFFF
+
+    # === EVENTI DI SICUREZZA ===
+    # Per gli Event ID registrati in security.py il messaggio viene composto dai campi
+    # delle insertion strings, senza passare da SafeFormatMessage
+    fields = extract_fields(event_id, event.StringInserts) if log_type == "Security" else None
+
+    # === RECUPERO MESSAGGIO EVENTO ===
+    # Tenta di formattare il messaggio dell'evento in modo leggibile
+    if fields is not None:
+        msg = format_fields(event_id, fields)
+    else:
+        try:
+            # SafeFormatMessage converte il messaggio raw in testo formattato
+            msg = win32evtlogutil.SafeFormatMessage(event, log_type)
+        except Exception:
+            # Se la formattazione fallisce, usa un messaggio predefinito
+            msg = "Messaggio non disponibile"
+
+    log = {
+        "timestamp": event.TimeGenerated,           # Data/ora dell'evento già formattata da raw_event
+        "source": event.SourceName,                 # Nome dell'applicazione/servizio che ha generato l'evento
+        "event_id": event_id,                       # ID univoco dell'evento (& 0xFFFF estrae i 16 bit bassi)
+        "type": event_type,                         # Tipo evento (Errore, Avviso, ecc.)
+        "category": event.EventCategory,            # Categoria numerica dell'evento
+        "message": msg[:MESSAGE_MAX_CHARS] if msg else "N/A"  # Anteprima del messaggio (limitata)
+    }
+    # Il testo completo esce dalla lettura solo fino all'archivio dei messaggi
+    if msg and len(msg) > MESSAGE_MAX_CHARS:
+        log["message_full"] = msg
+    if with_fields and fields is not None:
+        log["fields"] = fields
+    return log
+
+
+def get_record_range(hand) -> tuple:
+    """
+    Restituisce l'intervallo dei numeri di record presenti nel log
+
+    Args:
+        hand: Handle restituito da OpenEventLog
+
+    Returns:
+        tuple: (record più vecchio, record più recente); (0, -1) se il log è vuoto
+    """
+    oldest = win32evtlog.GetOldestEventLogRecord(hand)
+    count = win32evtlog.GetNumberOfEventLogRecords(hand)
+    return oldest, oldest + count - 1
+
+
+def read_records_after(hand, last_record: int) -> list:
+    """
+    Legge in avanti tutti i record successivi a last_record (lettura incrementale)
+
+    Usa EVENTLOG_SEEK_READ per posizionarsi direttamente sul primo record nuovo,
+    senza rileggere quelli già elaborati.
+
+    Args:
+        hand: Handle restituito da OpenEventLog
+        last_record (int): Numero dell'ultimo record già elaborato
+
+    Returns:
+        list: Record grezzi di pywin32 in ordine cronologico
+    """
+    oldest, newest = get_record_range(hand)
+
+    # Log vuoto
+    if newest < oldest:
+        return []
+
+    if newest < last_record:
+        # Log svuotato: la numerazione riparte da 1, si rilegge tutto dal più vecchio
+        # (compreso l'evento 104/1102 che registra lo svuotamento)
+        start = oldest
+    elif newest == last_record:
+        # Nessun record nuovo
+        return []
+    else:
+        # Se il log ha sovrascritto i record non ancora letti, riparte dal più vecchio
+        start = max(last_record + 1, oldest)
+
+    records = []
+    flags = win32evtlog.EVENTLOG_SEEK_READ | win32evtlog.EVENTLOG_FORWARDS_READ
+    while True:
+        batch = win32evtlog.ReadEventLog(hand, flags, start)
+        if not batch:
+            break
+        records.extend(batch)
+        # Dopo il primo seek prosegue in modo sequenziale
+        flags = win32evtlog.EVENTLOG_SEQUENTIAL_READ | win32evtlog.EVENTLOG_FORWARDS_READ
+    return records
+
+
+# === CANALI DI REGISTRI APPLICAZIONI E SERVIZI ===
+
+# Namespace dell'XML restituito da EvtRender
+_EVENT_NS = {"e": "http://schemas.microsoft.com/win/2004/08/events/event"}
+
+# Eventi chiesti a ogni EvtNext
+_EVT_BATCH = 100
+
+
+# Chiave del registro con un sottochiave per ogni log classico
+_CLASSIC_LOGS_KEY = r"SYSTEM\CurrentControlSet\Services\EventLog"
+
+
+@functools.lru_cache(maxsize=None)
+def is_classic_log(channel: str) -> bool:
+    """
+    True per i log leggibili con OpenEventLog/ReadEventLog
+
+    Il nome non basta: canali come "Setup" o "ForwardedEvents" non hanno "/" ma esistono solo
+    per le API Evt*, e OpenEventLog con un nome sconosciuto apre in silenzio il log Application.
+    Sono classici solo i log registrati sotto HKLM\\SYSTEM\\CurrentControlSet\\Services\\EventLog.
+    """
+    if "/" in channel:
+        # "Registri applicazioni e servizi" (Provider/Tipo): mai classici
+        return False
+    # Importato qui: eventlog resta importabile dove il registro non c'è
+    import winreg
+    try:
+        winreg.CloseKey(winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, f"{_CLASSIC_LOGS_KEY}\\{channel}"))
+    except OSError:
+        return False
+    return True
+
+
+def parse_system_time(value: str):
+    """
+    Converte un SystemTime dell'XML degli eventi (es. 2026-10-19T08:15:02.1234567Z) in datetime UTC
+
+    Returns:
+        datetime: Orario con fuso UTC (None se non interpretabile)
+    """
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_channel_message(event, provider: str, publishers: dict):
+    """Messaggio formattato con i metadati del provider (None se non disponibili)"""
+    if provider not in publishers:
+        try:
+            publishers[provider] = win32evtlog.EvtOpenPublisherMetadata(provider)
+        except Exception:
+            publishers[provider] = None
+    metadata = publishers[provider]
+    if metadata is None:
+        return None
+    try:
+        return win32evtlog.EvtFormatMessage(metadata, event, win32evtlog.EvtFormatMessageEvent)
+    except Exception:
+        return None
+
+
+def channel_event_to_dict(event, publishers: dict) -> dict:
+    """
+    Converte un evento restituito da EvtNext nel dizionario usato dall'applicazione
+
+    Args:
+        event: Handle dell'evento (EvtNext)
+        publishers (dict): Cache provider -> metadati per EvtFormatMessage (condivisa tra gli eventi)
+
+    Returns:
+        dict: Stesse chiavi di event_to_dict ("message_full" se il messaggio supera MESSAGE_MAX_CHARS)
+    """
+    root = ElementTree.fromstring(win32evtlog.EvtRender(event, win32evtlog.EvtRenderEventXml))
+    system = root.find("e:System", _EVENT_NS)
+    provider = system.find("e:Provider", _EVENT_NS)
+    source = (provider.get("EventSourceName") or provider.get("Name") or "") if provider is not None else ""
+
+    # === TIPO EVENTO ===
+    keywords = int(system.findtext("e:Keywords", "0", _EVENT_NS) or "0", 16)
+    if keywords & KEYWORD_AUDIT_FAILURE:
+        event_type = "Audit Failure"
+    elif keywords & KEYWORD_AUDIT_SUCCESS:
+        event_type = "Audit Success"
+    else:
+        event_type = LEVEL_LABELS.get(int(system.findtext("e:Level", "4", _EVENT_NS) or 4), "Informazione")
+
+    # Come TimeGenerated.Format() dei log classici: ora locale formattata con "%c"
+    created = system.find("e:TimeCreated", _EVENT_NS)
+    timestamp = parse_system_time(created.get("SystemTime") if created is not None else None)
+    timestamp = timestamp.astimezone().replace(tzinfo=None).strftime("%c") if timestamp else "N/A"
+
+    # === MESSAGGIO ===
+    # Senza metadati del provider restano i valori di EventData/UserData, come per i file .evtx
+    msg = _format_channel_message(event, provider.get("Name") if provider is not None else source, publishers)
+    if not msg:
+        data = root.find("e:EventData", _EVENT_NS)
+        if data is None:
+            data = root.find("e:UserData", _EVENT_NS)
+        values = []
+        for item in (data.iter() if data is not None else ()):
+            if item is not data and item.text and item.text.strip():
+                name = item.get("Name")
+                values.append(f"{name}: {item.text.strip()}" if name else item.text.strip())
+        msg = "\n".join(values)
+
+    log = {
+        "timestamp": timestamp,
+        "source": source,
+        "event_id": int(system.findtext("e:EventID", "0", _EVENT_NS) or 0) & 0xFFFF,
+        "type": event_type,
+        "category": int(system.findtext("e:Task", "0", _EVENT_NS) or 0),
+        "message": msg[:MESSAGE_MAX_CHARS] if msg else "N/A"
+    }
+    if msg and len(msg) > MESSAGE_MAX_CHARS:
+        log["message_full"] = msg
+    return log
+
+
+def time_range_query(since: float = None, until: float = None) -> str:
+    """
+    Query XPath di EvtQuery per gli eventi creati tra since e until (secondi epoch)
+
+    Returns:
+        str: Query (None se l'intervallo è illimitato)
+    """
+    conditions = []
+    if since is not None:
+        conditions.append(f"@SystemTime>='{_system_time(since)}'")
+    if until is not None:
+        # Fine esclusiva al secondo successivo, come per i log classici (vedi timeseek.end_of_range):
+        # SystemTime ha una risoluzione di 100 ns, "<= ...:59.000Z" perderebbe l'ultimo secondo
+        conditions.append(f"@SystemTime<'{_system_time(math.floor(until) + 1)}'")
+    return f"*[System[TimeCreated[{' and '.join(conditions)}]]]" if conditions else None
+
+
+def _system_time(epoch: float) -> str:
+    moment = datetime.fromtimestamp(epoch, timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def iter_channel_events(channel: str, num_records: int, since: float = None, until: float = None):
+    """
+    Legge gli ultimi num_records eventi di un canale con le API Evt*, dal più recente
+
+    Args:
+        channel (str): Percorso del canale (es. "Microsoft-Windows-TaskScheduler/Operational")
+        num_records (int): Numero massimo di eventi
+        since (float): Solo eventi creati da questo orario (secondi epoch, None = nessun limite)
+        until (float): Solo eventi creati fino a questo orario, incluso (il filtro è applicato dal servizio)
+
+    Yields:
+        dict: Eventi nel formato dell'applicazione
+    """
+    query = win32evtlog.EvtQuery(channel, win32evtlog.EvtQueryChannelPath | win32evtlog.EvtQueryReverseDirection,
+                                 time_range_query(since, until))
+    publishers = {}
+    read = 0
+    while read < num_records:
+        events = win32evtlog.EvtNext(query, min(_EVT_BATCH, num_records - read))
+        if not events:
+            break
+        read += len(events)
+        for event in events:
+            yield channel_event_to_dict(event, publishers)
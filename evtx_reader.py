@@ -0,0 +1,716 @@
+"""
+EvLogPyAI - Lettore di file .evtx (formato binario nativo)
+Legge offline i file .evtx copiati dai server, senza pywin32 e anche su Linux
+
+Caratteristiche:
+- Il file viene mappato in memoria (mmap): nessuna copia dei chunk da 64 KiB,
+  che vengono letti tramite slice memoryview
+- I template BinXML vengono interpretati una sola volta per chunk e riusati
+  da tutti i record che li referenziano
+- I chunk sono indipendenti: vengono decodificati in parallelo su un pool di processi
+- Ogni record viene convertito nello stesso dizionario prodotto dal backend live
+  (timestamp, source, event_id, type, category, message)
+
+Uso da riga di comando:
+    python evtx_reader.py Security.evtx -n 50          # ultimi 50 eventi in JSON
+    python evtx_reader.py Security.evtx --bench        # throughput MB/s per numero di worker
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni da riga di comando (lettura e benchmark)
+import argparse
+
+# json: Output dei record da riga di comando
+import json
+
+# mmap: Mappatura del file in memoria
+import mmap
+
+# os: Dimensione del file e numero di CPU
+import os
+
+# struct: Decodifica dei campi binari little-endian
+import struct
+
+# time: Misura del throughput nel benchmark
+import time
+
+# uuid: Formattazione dei GUID
+import uuid
+
+# concurrent.futures: Pool di processi per la decodifica parallela dei chunk
+from concurrent.futures import ProcessPoolExecutor
+
+# collections: Coda dei task in volo (ordine dei risultati preservato)
+from collections import deque
+
+# datetime: Conversione dei FILETIME di Windows
+from datetime import datetime, timedelta, timezone
+
+# security: Campi strutturati degli eventi di audit (modulo senza dipendenze da pywin32)
+from security import extract_fields, format_fields, is_security_source
+
+
+# === COSTANTI DEL FORMATO ===
+FILE_MAGIC = b"ElfFile\x00"
+CHUNK_MAGIC = b"ElfChnk\x00"
+RECORD_MAGIC = b"\x2a\x2a\x00\x00"
+FILE_HEADER_SIZE = 4096
+CHUNK_SIZE = 65536
+CHUNK_HEADER_SIZE = 512
+
+# Epoca dei FILETIME di Windows (intervalli da 100 ns dal 1601-01-01 UTC)
+FILETIME_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+
+# Stessi valori di eventlog.MESSAGE_MAX_CHARS e delle etichette di eventlog.EVENT_TYPE_LABELS
+# (duplicati qui perché questo modulo non deve dipendere da pywin32)
+MESSAGE_MAX_CHARS = 500
+LEVEL_LABELS = {1: "Errore", 2: "Errore", 3: "Avviso", 4: "Informazione", 5: "Informazione"}
+KEYWORD_AUDIT_SUCCESS = 0x0020000000000000
+KEYWORD_AUDIT_FAILURE = 0x0010000000000000
+
+# Entità XML predefinite (token EntityRef)
+XML_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+
+# Formati struct dei tipi numerici a dimensione fissa
+_NUMERIC_FORMATS = {
+    0x03: "<b", 0x04: "<B", 0x05: "<h", 0x06: "<H", 0x07: "<i", 0x08: "<I",
+    0x09: "<q", 0x0A: "<Q", 0x0B: "<f", 0x0C: "<d",
+}
+
+
+class EvtxFormatError(Exception):
+    """
+    Sollevata quando il file non è un .evtx valido
+    """
+
+
+# === NODI DEL DOCUMENTO BINXML ===
+
+class _Element:
+    """
+    Elemento XML (nel template può contenere sostituzioni non ancora risolte)
+    """
+
+    __slots__ = ("name", "attrs", "children")
+
+    def __init__(self, name, attrs, children):
+        self.name = name
+        self.attrs = attrs          # Lista di (nome, lista di nodi valore)
+        self.children = children    # Lista di _Element, stringhe e _Substitution
+
+    def child(self, name):
+        for node in self.children:
+            if isinstance(node, _Element) and node.name == name:
+                return node
+        return None
+
+    def text(self):
+        return "".join(_to_text(node) for node in self.children if not isinstance(node, _Element))
+
+    def attr(self, name):
+        for attr_name, value in self.attrs:
+            if attr_name == name:
+                return value
+        return None
+
+
+class _Substitution:
+    """
+    Segnaposto del template sostituito con il valore corrispondente del record
+    """
+
+    __slots__ = ("index", "optional")
+
+    def __init__(self, index, optional):
+        self.index = index
+        self.optional = optional
+
+
+# === PARSER DI UN CHUNK ===
+
+class _ChunkParser:
+    """
+    Decodifica i record di un singolo chunk da 64 KiB
+
+    Tutti gli offset (nomi, template) sono relativi all'inizio del chunk,
+    per cui ogni chunk può essere elaborato in modo indipendente.
+    """
+
+    def __init__(self, buf: memoryview):
+        """
+        Args:
+            buf (memoryview): Slice del file corrispondente al chunk (nessuna copia)
+        """
+        self.buf = buf
+        self.names = {}       # offset -> nome (stringhe comuni del chunk)
+        self.templates = {}   # offset della definizione -> radice del template
+
+    # --- Primitive di lettura ---
+
+    def _u8(self, off):
+        return self.buf[off]
+
+    def _u16(self, off):
+        return struct.unpack_from("<H", self.buf, off)[0]
+
+    def _u32(self, off):
+        return struct.unpack_from("<I", self.buf, off)[0]
+
+    def _utf16(self, off, chars):
+        return bytes(self.buf[off:off + chars * 2]).decode("utf-16-le", "replace")
+
+    def _name(self, name_off, off):
+        """
+        Legge un nome (elemento/attributo); se è definito inline restituisce anche l'offset successivo
+
+        Returns:
+            tuple: (nome, offset dopo il campo o dopo il nome inline)
+        """
+        name = self.names.get(name_off)
+        if name is None:
+            length = self._u16(name_off + 6)
+            name = self._utf16(name_off + 8, length)
+            self.names[name_off] = name
+        if name_off == off:
+            # Struttura inline: next(4) + hash(2) + lunghezza(2) + caratteri + terminatore(2)
+            off += 8 + self._u16(name_off + 6) * 2 + 2
+        return name, off
+
+    # --- Record ---
+
+    def records(self):
+        """
+        Itera sui record del chunk
+
+        Yields:
+            tuple: (numero record, FILETIME di scrittura, radice _Element risolta)
+        """
+        free_space = self._u32(48)
+        off = CHUNK_HEADER_SIZE
+        while off + 24 <= min(free_space, CHUNK_SIZE):
+            if bytes(self.buf[off:off + 4]) != RECORD_MAGIC:
+                break
+            size = self._u32(off + 4)
+            if size < 28 or off + size > CHUNK_SIZE:
+                break
+            record_id = struct.unpack_from("<Q", self.buf, off + 8)[0]
+            written = struct.unpack_from("<Q", self.buf, off + 16)[0]
+            try:
+                root, _ = self._parse_fragment(off + 24, None)
+            except (struct.error, IndexError, ValueError, KeyError):
+                # Record danneggiato: viene saltato senza interrompere il chunk
+                root = None
+            if root is not None:
+                yield record_id, written, root
+            off += size
+
+    # --- BinXML ---
+
+    def _parse_fragment(self, off, values):
+        """
+        Interpreta un frammento BinXML (intestazione + istanza di template o elemento)
+
+        Args:
+            off (int): Offset del frammento nel chunk
+            values (list | None): Valori di sostituzione del contesto corrente
+
+        Returns:
+            tuple: (_Element risolto, offset finale)
+        """
+        while True:
+            token = self._u8(off)
+            if token == 0x0F:                       # StartOfStream: major, minor, flags
+                off += 4
+            elif token == 0x0C:                     # TemplateInstance
+                return self._parse_template_instance(off)
+            elif token & 0x0F == 0x01:              # Elemento diretto (senza template)
+                element, off = self._parse_element(off)
+                return _resolve(element, values or [], self), off
+            else:
+                return None, off + 1
+
+    def _parse_template_instance(self, off):
+        """
+        Legge un'istanza di template: definizione (inline la prima volta) + array di sostituzione
+        """
+        def_off = self._u32(off + 6)
+        off += 10
+
+        template = self.templates.get(def_off)
+        if template is None:
+            # La definizione inizia con next(4) + GUID(16) + dimensione(4), poi il frammento
+            template, _ = self._parse_template_body(def_off + 24)
+            self.templates[def_off] = template
+        if def_off == off:
+            off = def_off + 24 + self._u32(def_off + 20)
+
+        count = self._u32(off)
+        off += 4
+        descriptors = []
+        for _ in range(count):
+            descriptors.append((self._u16(off), self._u8(off + 2)))
+            off += 4
+
+        values = []
+        for size, value_type in descriptors:
+            values.append(self._decode_value(value_type, off, size))
+            off += size
+
+        return _resolve(template, values, self), off
+
+    def _parse_template_body(self, off):
+        """
+        Interpreta il frammento di una definizione di template (senza risolverlo)
+        """
+        while self._u8(off) == 0x0F:
+            off += 4
+        return self._parse_element(off)
+
+    def _parse_element(self, off):
+        """
+        Interpreta un elemento: nome, attributi e figli fino a EndElement
+        """
+        has_attrs = self._u8(off) & 0x40
+        # token(1) + dependency id(2) + dimensione(4) + offset del nome(4)
+        name_off = self._u32(off + 7)
+        name, off = self._name(name_off, off + 11)
+
+        attrs = []
+        if has_attrs:
+            off += 4                                # Dimensione della lista di attributi
+            while True:
+                token = self._u8(off)
+                if token & 0x0F != 0x06:
+                    break
+                attr_name, off = self._name(self._u32(off + 1), off + 5)
+                value, off = self._parse_content(off, single=True)
+                attrs.append((attr_name, value))
+                if not token & 0x40:
+                    break
+
+        token = self._u8(off)
+        off += 1
+        if token == 0x03:                           # CloseEmptyElement
+            return _Element(name, attrs, []), off
+        if token != 0x02:                           # CloseStartElement
+            raise ValueError(f"Token inatteso 0x{token:02x} nell'elemento {name}")
+
+        children, off = self._parse_content(off, single=False)
+        return _Element(name, attrs, children), off + 1   # +1: EndElement
+
+    def _parse_content(self, off, single):
+        """
+        Interpreta il contenuto di un elemento (o il valore di un attributo)
+
+        Args:
+            off (int): Offset del primo token
+            single (bool): True per il valore di un attributo (un solo nodo)
+
+        Returns:
+            tuple: (lista di nodi, offset finale)
+        """
+        nodes = []
+        while True:
+            token = self._u8(off)
+            base = token & 0x0F
+            if base in (0x00, 0x04) or (single and nodes):
+                return nodes, off
+            if base == 0x01:                        # Elemento figlio
+                element, off = self._parse_element(off)
+                nodes.append(element)
+            elif base == 0x05:                      # Valore testuale (sempre stringa UTF-16)
+                length = self._u16(off + 2)
+                nodes.append(self._utf16(off + 4, length))
+                off += 4 + length * 2
+            elif base == 0x07:                      # CDATA
+                length = self._u16(off + 1)
+                nodes.append(self._utf16(off + 3, length))
+                off += 3 + length * 2
+            elif base == 0x08:                      # CharRef
+                nodes.append(chr(self._u16(off + 1)))
+                off += 3
+            elif base == 0x09:                      # EntityRef
+                entity, off = self._name(self._u32(off + 1), off + 5)
+                nodes.append(XML_ENTITIES.get(entity, f"&{entity};"))
+            elif base == 0x0A:                      # Processing instruction: target
+                _, off = self._name(self._u32(off + 1), off + 5)
+            elif base == 0x0B:                      # Processing instruction: dati
+                off += 3 + self._u16(off + 1) * 2
+            elif base in (0x0D, 0x0E):              # Sostituzione normale / condizionale
+                nodes.append(_Substitution(self._u16(off + 1), base == 0x0E))
+                off += 4
+            elif base == 0x0F:                      # StartOfStream annidato
+                off += 4
+            else:
+                raise ValueError(f"Token BinXML sconosciuto 0x{token:02x}")
+
+    # --- Valori tipizzati ---
+
+    def _decode_value(self, value_type, off, size):
+        """
+        Decodifica un valore dell'array di sostituzione
+
+        Returns:
+            Valore Python (str, int, datetime, _Element per BinXML annidato) o None
+        """
+        if size == 0 or value_type == 0x00:
+            return None
+        if value_type == 0x01:                      # Stringa UTF-16
+            return self._utf16(off, size // 2).rstrip("\x00")
+        if value_type == 0x02:                      # Stringa ANSI
+            return bytes(self.buf[off:off + size]).decode("latin-1").rstrip("\x00")
+        if value_type in _NUMERIC_FORMATS:
+            return struct.unpack_from(_NUMERIC_FORMATS[value_type], self.buf, off)[0]
+        if value_type == 0x0D:                      # Booleano (32 bit)
+            return self._u32(off) != 0
+        if value_type == 0x0E:                      # Binario
+            return bytes(self.buf[off:off + size]).hex().upper()
+        if value_type == 0x0F:                      # GUID
+            return "{" + str(uuid.UUID(bytes_le=bytes(self.buf[off:off + 16]))).upper() + "}"
+        if value_type == 0x10:                      # size_t
+            return "0x%x" % struct.unpack_from("<Q" if size == 8 else "<I", self.buf, off)[0]
+        if value_type == 0x11:                      # FILETIME
+            return _filetime(struct.unpack_from("<Q", self.buf, off)[0])
+        if value_type == 0x12:                      # SYSTEMTIME
+            y, mo, _, d, h, mi, s, ms = struct.unpack_from("<8H", self.buf, off)
+            return datetime(y, mo, d, h, mi, s, ms * 1000, tzinfo=timezone.utc)
+        if value_type == 0x13:                      # SID
+            revision, count = self._u8(off), self._u8(off + 1)
+            authority = int.from_bytes(bytes(self.buf[off + 2:off + 8]), "big")
+            subs = struct.unpack_from(f"<{count}I", self.buf, off + 8)
+            return f"S-{revision}-{authority}" + "".join(f"-{s}" for s in subs)
+        if value_type == 0x14:                      # HexInt32
+            return "0x%08x" % self._u32(off)
+        if value_type == 0x15:                      # HexInt64
+            return "0x%016x" % struct.unpack_from("<Q", self.buf, off)[0]
+        if value_type == 0x21:                      # BinXML annidato
+            element, _ = self._parse_fragment(off, None)
+            return element
+        if value_type == 0x81:                      # Array di stringhe UTF-16
+            return [s for s in self._utf16(off, size // 2).split("\x00") if s]
+        # Altri array o tipi sconosciuti: rappresentazione esadecimale
+        return bytes(self.buf[off:off + size]).hex().upper()
+
+
+def _resolve(node, values, parser):
+    """
+    Applica l'array di sostituzione a un template, producendo un nuovo albero
+
+    Le sostituzioni condizionali con valore nullo vengono rimosse;
+    i valori BinXML annidati diventano elementi figli.
+    """
+    def resolve_nodes(nodes):
+        out = []
+        for item in nodes:
+            if isinstance(item, _Substitution):
+                value = values[item.index] if item.index < len(values) else None
+                if value is None:
+                    continue
+                out.append(value)
+            elif isinstance(item, _Element):
+                out.append(resolve_element(item))
+            else:
+                out.append(item)
+        return out
+
+    def resolve_element(element):
+        attrs = []
+        for name, value in element.attrs:
+            resolved = resolve_nodes(value)
+            if resolved:
+                attrs.append((name, resolved[0] if len(resolved) == 1 else "".join(map(_to_text, resolved))))
+        return _Element(element.name, attrs, resolve_nodes(element.children))
+
+    return resolve_element(node)
+
+
+def _filetime(value: int):
+    """
+    Converte un FILETIME (100 ns dal 1601) in datetime UTC
+    """
+    return FILETIME_EPOCH + timedelta(microseconds=value // 10)
+
+
+def _to_text(value) -> str:
+    """
+    Rappresentazione testuale di un valore risolto
+    """
+    if isinstance(value, _Element):
+        return value.text()
+    if isinstance(value, list):
+        return ", ".join(map(str, value))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _to_int(value, default=0) -> int:
+    """
+    Converte in intero un valore che può essere numerico o testuale (anche esadecimale)
+    """
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+# === CONVERSIONE NEL FORMATO DELL'APPLICAZIONE ===
+
+def record_to_dict(root: _Element, written: int, with_fields: bool = False) -> dict:
+    """
+    Converte un record decodificato nel dizionario usato dall'applicazione
+    (stesse chiavi di eventlog.event_to_dict)
+
+    Il messaggio non può essere formattato senza le DLL dei provider:
+    vengono riportate le insertion strings di EventData/UserData. Per gli eventi
+    di sicurezza registrati in security.py diventa la riga compatta dei campi.
+
+    Args:
+        root (_Element): Elemento <Event> risolto
+        written (int): FILETIME di scrittura del record (usato se manca TimeCreated)
+        with_fields (bool): Aggiunge "fields" con i campi degli eventi di sicurezza (vedi eventlog.event_to_dict)
+
+    Returns:
+        dict: timestamp, source, event_id, type, category, message (e "message_full" se troncato)
+    """
+    system = root.child("System") or _Element("System", [], [])
+
+    provider = system.child("Provider")
+    source = ""
+    if provider is not None:
+        source = _to_text(provider.attr("EventSourceName") or provider.attr("Name") or "")
+
+    event_id = system.child("EventID")
+    level = system.child("Level")
+    task = system.child("Task")
+    keywords = system.child("Keywords")
+    created = system.child("TimeCreated")
+
+    # === TIPO EVENTO ===
+    keyword_bits = _to_int(keywords.children[0], 0) if keywords is not None and keywords.children else 0
+    if keyword_bits & KEYWORD_AUDIT_FAILURE:
+        event_type = "Audit Failure"
+    elif keyword_bits & KEYWORD_AUDIT_SUCCESS:
+        event_type = "Audit Success"
+    else:
+        level_value = _to_int(level.children[0], 4) if level is not None and level.children else 4
+        event_type = LEVEL_LABELS.get(level_value, "Informazione")
+
+    # === TIMESTAMP ===
+    # Come TimeGenerated.Format() di pywin32: ora locale formattata con "%c"
+    timestamp = created.attr("SystemTime") if created is not None else None
+    if not isinstance(timestamp, datetime):
+        timestamp = _filetime(written)
+    timestamp = timestamp.astimezone().replace(tzinfo=None).strftime("%c")
+
+    event_id = _to_int(event_id.children[0]) & 0xFFFF if event_id is not None and event_id.children else 0
+
+    # === MESSAGGIO (INSERTION STRINGS) ===
+    lines = []
+    inserts = []
+    data = root.child("EventData") or root.child("UserData")
+    if data is not None:
+        items = data.children
+        # UserData contiene un unico elemento specifico del provider
+        if data.name == "UserData" and len(items) == 1 and isinstance(items[0], _Element):
+            items = items[0].children
+        for item in items:
+            if isinstance(item, _Element):
+                name = item.attr("Name") or item.name
+                inserts.append(item.text())
+                lines.append(f"{_to_text(name)}: {item.text()}" if name != "Data" else item.text())
+            elif _to_text(item).strip():
+                lines.append(_to_text(item))
+    fields = extract_fields(event_id, inserts) if is_security_source(source) else None
+    message = format_fields(event_id, fields) if fields is not None else "\n".join(lines)
+
+    log = {
+        "timestamp": timestamp,
+        "source": source,
+        "event_id": event_id,
+        "type": event_type,
+        "category": _to_int(task.children[0]) if task is not None and task.children else 0,
+        "message": message[:MESSAGE_MAX_CHARS] if message else "N/A"
+    }
+    if message and len(message) > MESSAGE_MAX_CHARS:
+        log["message_full"] = message
+    if with_fields and fields is not None:
+        log["fields"] = fields
+    return log
+
+
+# === LETTURA DEL FILE ===
+
+def _chunk_offsets(mm) -> list:
+    """
+    Restituisce gli offset dei chunk validi del file, con l'ultimo numero di record di ognuno
+
+    Returns:
+        list: Tuple (offset, primo record, ultimo record) in ordine di numero di record
+    """
+    if mm[:8] != FILE_MAGIC:
+        raise EvtxFormatError("Intestazione ElfFile non trovata: il file non è un .evtx")
+
+    chunks = []
+    for offset in range(FILE_HEADER_SIZE, len(mm) - CHUNK_SIZE + 1, CHUNK_SIZE):
+        if mm[offset:offset + 8] != CHUNK_MAGIC:
+            continue
+        first, last = struct.unpack_from("<QQ", mm, offset + 8)
+        chunks.append((offset, first, last))
+    # Il file è circolare: ordina per numero di record, non per posizione
+    chunks.sort(key=lambda c: c[1])
+    return chunks
+
+
+def _decode_chunks(path: str, offsets: list, with_fields: bool = False) -> list:
+    """
+    Decodifica un gruppo di chunk (eseguita anche nei processi del pool)
+
+    Ogni processo mappa il file per conto proprio: tra i processi viaggiano
+    solo gli offset e i dizionari risultanti, mai i dati grezzi.
+
+    Returns:
+        list: Liste di (numero record, dizionario evento), una per chunk
+    """
+    results = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            for offset in offsets:
+                chunk = view[offset:offset + CHUNK_SIZE]
+                try:
+                    results.append([
+                        (record_id, record_to_dict(root, written, with_fields))
+                        for record_id, written, root in _ChunkParser(chunk).records()
+                    ])
+                finally:
+                    # Il file mappato può essere chiuso solo dopo aver rilasciato ogni slice
+                    chunk.release()
+        finally:
+            view.release()
+    return results
+
+
+def iter_evtx_records(path: str, workers: int = None, newest_first: bool = False, with_fields: bool = False):
+    """
+    Itera sui record di un file .evtx, decodificando i chunk in parallelo
+
+    Args:
+        path (str): Percorso del file .evtx
+        workers (int): Processi del pool (None = numero di CPU, 1 = nessun pool)
+        newest_first (bool): Se True restituisce i record dal più recente (come il backend live)
+        with_fields (bool): Campi strutturati degli eventi di sicurezza in "fields" (vedi record_to_dict)
+
+    Yields:
+        tuple: (numero record, dizionario evento)
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks = _chunk_offsets(mm)
+    offsets = [c[0] for c in chunks]
+    if newest_first:
+        offsets.reverse()
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(offsets) <= 1:
+        for offset in offsets:
+            yield from _ordered(_decode_chunks(path, [offset], with_fields)[0], newest_first)
+        return
+
+    # Un chunk per task, al massimo 2 task in volo per worker: se il chiamante
+    # si ferma presto (es. ultimi N eventi) il resto del file non viene decodificato
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    remaining = iter(offsets)
+    try:
+        for offset in remaining:
+            pending.append(pool.submit(_decode_chunks, path, [offset], with_fields))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            chunk_records = pending.popleft().result()[0]
+            offset = next(remaining, None)
+            if offset is not None:
+                pending.append(pool.submit(_decode_chunks, path, [offset], with_fields))
+            yield from _ordered(chunk_records, newest_first)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _ordered(records: list, newest_first: bool) -> list:
+    return sorted(records, key=lambda r: r[0], reverse=newest_first)
+
+
+def read_evtx_logs(path: str, num_records: int, workers: int = None) -> list:
+    """
+    Legge gli ultimi num_records eventi di un file .evtx, dal più recente
+    (stesso ordine e formato di EvLogPyAI._get_windows_logs)
+
+    Args:
+        path (str): Percorso del file .evtx
+        num_records (int): Numero di eventi da restituire
+        workers (int): Processi del pool (None = numero di CPU)
+
+    Returns:
+        list: Dizionari degli eventi
+    """
+    logs = []
+    for _, event in iter_evtx_records(path, workers=workers, newest_first=True):
+        # Solo l'anteprima del messaggio, come gli eventi estratti senza archivio dei messaggi
+        event.pop("message_full", None)
+        logs.append(event)
+        if len(logs) >= num_records:
+            break
+    return logs
+
+
+# === BENCHMARK ===
+
+def benchmark(path: str, worker_counts=(1, 2, 4, 8)) -> list:
+    """
+    Misura il throughput di decodifica (MB/s) al variare del numero di worker
+
+    Args:
+        path (str): File .evtx da decodificare per intero
+        worker_counts (tuple): Numeri di worker da provare
+
+    Returns:
+        list: Tuple (worker, secondi, record, MB/s)
+    """
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    results = []
+    print(f"📊 Benchmark {os.path.basename(path)} ({size_mb:.1f} MB)")
+    for workers in worker_counts:
+        started = time.perf_counter()
+        count = sum(1 for _ in iter_evtx_records(path, workers=workers))
+        elapsed = time.perf_counter() - started
+        results.append((workers, elapsed, count, size_mb / elapsed if elapsed else 0.0))
+        print(f"  {workers:>2} worker: {elapsed:7.2f}s  {count:>9} record  {size_mb / elapsed:8.2f} MB/s")
+    return results
+
+
+def main():
+    """
+    Entry point da riga di comando
+    """
+    parser = argparse.ArgumentParser(description="Lettore di file .evtx di EvLogPyAI")
+    parser.add_argument("path", help="File .evtx da leggere")
+    parser.add_argument("-n", "--num", type=int, default=50, help="Numero di eventi da mostrare (default: 50)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Processi del pool (default: CPU)")
+    parser.add_argument("--bench", action="store_true", help="Misura il throughput MB/s per numero di worker")
+    args = parser.parse_args()
+
+    if args.bench:
+        counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        benchmark(args.path, counts)
+    else:
+        print(json.dumps(read_evtx_logs(args.path, args.num, workers=args.workers), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+EvLogPyAI - Pool di Formattazione dei Messaggi
+Formattazione degli eventi (SafeFormatMessage) in più processi, separata dalla lettura dei record
+
+Nel ciclo di lettura resta solo ReadEventLog e la copia dei campi grezzi (eventlog.raw_event);
+i record vengono raggruppati in blocchi e formattati da un pool di processi. I risultati
+tornano nell'ordine di lettura e i blocchi in volo sono al massimo due per processo:
+se il consumatore rallenta (pipe verso la GUI, scrittura del report) la lettura si ferma
+e la memoria resta limitata.
+
+Sotto POOL_MIN_EVENTS eventi o con un solo processo la formattazione avviene nel ciclo
+di lettura come in origine: avviare il pool costerebbe più del lavoro da dividere.
+
+Scalabilità con un formattatore finto di costo regolabile (stesso su ogni macchina):
+    python formatpool.py --bench 200000 --cost-us 100
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni del benchmark da riga di comando
+import argparse
+
+# collections: Coda ordinata dei blocchi in volo
+from collections import deque
+
+# concurrent.futures: Pool di processi di formattazione
+from concurrent.futures import ProcessPoolExecutor
+
+# itertools: Blocchi di record letti dall'iteratore
+from itertools import islice
+
+# multiprocessing: Processi avviati con "spawn" come su Windows
+import multiprocessing
+
+# os: Numero di CPU (dimensione predefinita del pool)
+import os
+
+# time: Tempo di formattazione misurato nei processi
+import time
+
+
+# === CONFIGURAZIONE ===
+
+# Record per blocco inviato al pool: abbastanza da ammortizzare il trasferimento tra processi
+CHUNK_RECORDS = 250
+
+# Blocchi in volo per processo (limite della memoria occupata dai record letti in anticipo)
+INFLIGHT_PER_WORKER = 2
+
+# Sotto questo numero di eventi la formattazione resta nel ciclo di lettura
+POOL_MIN_EVENTS = 5000
+
+
+def default_workers() -> int:
+    """Processi del pool se non indicati (--format-workers): uno per CPU"""
+    return os.cpu_count() or 1
+
+
+def _format_chunk(formatter, records: list, args: tuple) -> tuple:
+    """
+    Formatta un blocco di record (eseguita nei processi del pool)
+
+    Returns:
+        tuple: (risultati nell'ordine dei record, secondi di formattazione)
+    """
+    started = time.perf_counter()
+    results = [formatter(record, *args) for record in records]
+    return results, time.perf_counter() - started
+
+
+def iter_formatted(records, formatter, args: tuple = (), workers: int = None, summary: dict = None,
+                   chunk_size: int = CHUNK_RECORDS):
+    """
+    Applica formatter a ogni record, in parallelo, restituendo i risultati nell'ordine dei record
+
+    Args:
+        records: Iteratore di record grezzi (letto solo quando c'è posto per un nuovo blocco)
+        formatter (callable): formatter(record, *args), funzione di modulo (deve essere serializzabile)
+        args (tuple): Argomenti aggiuntivi di formatter (es. nome del log)
+        workers (int): Processi del pool (None = numero di CPU, 1 = nessun pool)
+        summary (dict): Riepilogo in cui accumulare "format_seconds" (tempo di CPU dei processi)
+        chunk_size (int): Record per blocco
+
+    Yields:
+        Risultati di formatter
+    """
+    summary = summary if summary is not None else {}
+    summary.setdefault("format_seconds", 0.0)
+    workers = workers or default_workers()
+    summary["format_workers"] = workers
+
+    if workers <= 1:
+        for record in records:
+            started = time.perf_counter()
+            result = formatter(record, *args)
+            summary["format_seconds"] += time.perf_counter() - started
+            yield result
+        return
+
+    iterator = iter(records)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    pending = deque()
+
+    def submit() -> bool:
+        chunk = list(islice(iterator, chunk_size))
+        if chunk:
+            pending.append(pool.submit(_format_chunk, formatter, chunk, args))
+        return bool(chunk)
+
+    try:
+        while len(pending) < workers * INFLIGHT_PER_WORKER and submit():
+            pass
+        while pending:
+            results, seconds = pending.popleft().result()
+            summary["format_seconds"] += seconds
+            # Un blocco consegnato libera un posto: si legge il successivo prima di restituire
+            # i risultati, così i processi lavorano mentre il consumatore li elabora
+            submit()
+            yield from results
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# === BENCHMARK ===
+
+def fake_format(record: tuple, cost_us: float) -> dict:
+    """
+    Formattatore finto: occupa la CPU per cost_us microsecondi (come SafeFormatMessage su
+    una sorgente con DLL dei messaggi non in cache) e restituisce un evento plausibile
+    """
+    deadline = time.perf_counter() + cost_us / 1e6
+    while time.perf_counter() < deadline:
+        pass
+    index, source, event_id = record
+    return {"timestamp": index, "source": source, "event_id": event_id, "type": "Errore", "category": 0,
+            "message": f"Evento {event_id} di {source} numero {index}"}
+
+
+def benchmark(count: int = 200000, cost_us: float = 100.0, worker_counts: tuple = None) -> list:
+    """
+    Eventi al secondo al variare dei processi del pool, con fake_format di costo cost_us
+
+    Returns:
+        list: Tuple (processi, secondi, eventi al secondo)
+    """
+    cpus = default_workers()
+    worker_counts = worker_counts or tuple(sorted({1, 2, 4, cpus} | ({8} if cpus >= 8 else set())))
+    records = [(i, f"Source{i % 40}", i % 9000) for i in range(count)]
+    print(f"📊 {count} eventi, formattazione finta da {cost_us:g} µs, {cpus} CPU")
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        started = time.perf_counter()
+        formatted = 0
+        for i, log in enumerate(iter_formatted(iter(records), fake_format, (cost_us,), workers=workers)):
+            # L'ordine di lettura deve essere conservato
+            assert log["timestamp"] == i
+            formatted += 1
+        elapsed = time.perf_counter() - started
+        rate = formatted / elapsed
+        baseline = baseline or rate
+        results.append((workers, elapsed, rate))
+        print(f"  {workers:>2} processi: {elapsed:7.2f}s  {rate:>10,.0f} eventi/s  x{rate / baseline:.2f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Benchmark del pool di formattazione")
+    parser.add_argument("--bench", type=int, default=200000, metavar="EVENTI",
+                        help="Eventi formattati per ogni misura (default: 200000)")
+    parser.add_argument("--cost-us", type=float, default=100.0,
+                        help="Costo di formattazione di un evento in microsecondi (default: 100)")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", help="Numeri di processi da provare")
+    args = parser.parse_args()
+    benchmark(args.bench, args.cost_us, tuple(args.workers) if args.workers else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+EvLogPyAI - Stato dei Servizi e Preriscaldamento
+Controlla in background che N8N e Ollama siano pronti e carica il modello in memoria
+prima della prima analisi
+
+Dopo l'avvio dei container la prima analisi è molto più lenta delle successive:
+Ollama deve caricare il modello in RAM e N8N attivare il workflow. All'avvio
+dell'applicazione HealthMonitor:
+- verifica N8N (/healthz) e invia al webhook una richiesta {"warmup": true},
+  scartata dal nodo Decode Payload senza interpellare l'AI
+- verifica che Ollama risponda e che il modello sia installato, poi lo carica
+  in memoria con una richiesta vuota (keep_alive: resta residente)
+- ripete i controlli periodicamente, misurando la latenza di ogni servizio
+
+Server di prova locale (N8N e Ollama simulati, per i test senza Docker):
+    python health.py --stub --port 8099 --load-delay 5
+    python trigger.py --n8n-url http://127.0.0.1:8099/webhook/evlogpyai --ollama-url http://127.0.0.1:8099
+Controllo singolo da riga di comando:
+    python health.py --check
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Corpo delle richieste del server di prova
+import json
+
+# threading: Controlli in un thread in background
+import threading
+
+# time: Latenze e intervallo tra i controlli
+import time
+
+# urllib.parse: Indirizzo base di N8N dall'URL del webhook
+from urllib.parse import urlsplit
+
+# requests: Richieste HTTP verso N8N e Ollama
+import requests
+
+
+# === CONFIGURAZIONE ===
+
+# Ollama esposto da docker-compose.yml e modello usato dal workflow N8N
+OLLAMA_URL = "http://localhost:11434"
+OLLAMA_MODEL = "llama2"
+
+# Il modello resta in memoria per questo tempo dopo l'ultima richiesta
+KEEP_ALIVE = "60m"
+
+# Secondi tra due controlli
+CHECK_INTERVAL = 60.0
+
+# Timeout (connessione, lettura) dei controlli e del caricamento del modello
+PROBE_TIMEOUT = (3, 10)
+WARMUP_TIMEOUT = (3, 600)
+
+# Stati di un servizio
+STATUS_UNKNOWN = "unknown"    # Non ancora controllato
+STATUS_OK = "ok"              # Pronto
+STATUS_WARMING = "warming"    # Raggiungibile, preriscaldamento in corso
+STATUS_DEGRADED = "degraded"  # Raggiungibile ma non pronto (workflow non attivo, modello mancante)
+STATUS_DOWN = "down"          # Non raggiungibile
+
+
+def _get(url: str, timeout=PROBE_TIMEOUT):
+    """GET con misura della latenza; restituisce (risposta o None, millisecondi, errore)"""
+    started = time.perf_counter()
+    try:
+        response = requests.get(url, timeout=timeout)
+        return response, (time.perf_counter() - started) * 1000, None
+    except requests.exceptions.RequestException as e:
+        return None, (time.perf_counter() - started) * 1000, e
+
+
+def _post(url: str, payload: dict, timeout=PROBE_TIMEOUT):
+    """POST JSON con misura della latenza; restituisce (risposta o None, millisecondi, errore)"""
+    started = time.perf_counter()
+    try:
+        response = requests.post(url, json=payload, timeout=timeout)
+        return response, (time.perf_counter() - started) * 1000, None
+    except requests.exceptions.RequestException as e:
+        return None, (time.perf_counter() - started) * 1000, e
+
+
+def probe_n8n(webhook_url: str, warmup: bool = True) -> dict:
+    """
+    Controlla N8N e, se richiesto, preriscalda il webhook
+
+    Args:
+        webhook_url (str): URL del webhook del workflow
+        warmup (bool): Invia la richiesta {"warmup": true} al webhook
+
+    Returns:
+        dict: Stato del servizio (status, latency_ms, detail)
+    """
+    parts = urlsplit(webhook_url)
+    response, latency, error = _get(f"{parts.scheme}://{parts.netloc}/healthz")
+    if response is None:
+        return {"status": STATUS_DOWN, "latency_ms": None, "detail": f"non raggiungibile ({type(error).__name__})"}
+    if response.status_code != 200:
+        return {"status": STATUS_DEGRADED, "latency_ms": latency, "detail": f"/healthz: HTTP {response.status_code}"}
+    if not warmup:
+        return {"status": STATUS_OK, "latency_ms": latency, "detail": "pronto"}
+
+    # Un webhook non registrato (workflow non attivo) risponde 404
+    response, latency, error = _post(webhook_url, {"warmup": True})
+    if response is None:
+        return {"status": STATUS_DEGRADED, "latency_ms": latency, "detail": f"webhook: {type(error).__name__}"}
+    if response.status_code == 404:
+        return {"status": STATUS_DEGRADED, "latency_ms": latency, "detail": "workflow non attivo"}
+    if response.status_code != 200:
+        return {"status": STATUS_DEGRADED, "latency_ms": latency, "detail": f"webhook: HTTP {response.status_code}"}
+    return {"status": STATUS_OK, "latency_ms": latency, "detail": "workflow attivo"}
+
+
+def probe_ollama(base_url: str, model: str) -> dict:
+    """
+    Controlla che Ollama risponda, che il modello sia installato e se è già in memoria
+
+    Returns:
+        dict: Stato del servizio (status, latency_ms, detail, loaded)
+    """
+    response, latency, error = _get(f"{base_url}/api/tags")
+    if response is None:
+        return {"status": STATUS_DOWN, "latency_ms": None, "detail": f"non raggiungibile ({type(error).__name__})",
+                "loaded": False}
+    try:
+        names = {m.get("name", "") for m in response.json().get("models", [])}
+    except ValueError:
+        names = set()
+    if response.status_code != 200 or not any(n == model or n.split(":")[0] == model for n in names):
+        return {"status": STATUS_DEGRADED, "latency_ms": latency,
+                "detail": f"modello {model} non installato (ollama pull {model})", "loaded": False}
+
+    # /api/ps elenca i modelli residenti in memoria
+    response, _, _ = _get(f"{base_url}/api/ps")
+    loaded = False
+    if response is not None and response.status_code == 200:
+        try:
+            loaded = any(m.get("name", "").split(":")[0] == model.split(":")[0]
+                         for m in response.json().get("models", []))
+        except ValueError:
+            loaded = False
+    return {"status": STATUS_OK if loaded else STATUS_WARMING, "latency_ms": latency,
+            "detail": f"{model} in memoria" if loaded else f"{model} non in memoria", "loaded": loaded}
+
+
+def warm_ollama(base_url: str, model: str) -> dict:
+    """
+    Carica il modello in memoria (una richiesta senza prompt non genera testo)
+
+    Returns:
+        dict: Stato del servizio dopo il caricamento (load_ms: durata del caricamento)
+    """
+    response, elapsed, error = _post(f"{base_url}/api/generate",
+                                     {"model": model, "prompt": "", "keep_alive": KEEP_ALIVE, "stream": False},
+                                     timeout=WARMUP_TIMEOUT)
+    if response is None or response.status_code != 200:
+        detail = type(error).__name__ if response is None else f"HTTP {response.status_code}"
+        return {"status": STATUS_DEGRADED, "latency_ms": None, "detail": f"caricamento non riuscito ({detail})",
+                "loaded": False}
+    return {"status": STATUS_OK, "latency_ms": None, "detail": f"{model} in memoria", "loaded": True,
+            "load_ms": elapsed}
+
+
+class HealthMonitor:
+    """
+    Controlli periodici di N8N e Ollama in un thread in background
+    """
+
+    def __init__(self, n8n_webhook_url: str, ollama_url: str = OLLAMA_URL, model: str = OLLAMA_MODEL,
+                 on_update=None, interval: float = CHECK_INTERVAL, warmup: bool = True):
+        """
+        Args:
+            n8n_webhook_url (str): URL del webhook del workflow
+            ollama_url (str): Indirizzo di Ollama
+            model (str): Modello da tenere in memoria
+            on_update (callable): on_update(stato) dopo ogni controllo (chiamata dal thread di controllo)
+            interval (float): Secondi tra due controlli
+            warmup (bool): Preriscalda webhook e modello (False = solo controlli)
+        """
+        self.n8n_webhook_url = n8n_webhook_url
+        self.ollama_url = ollama_url.rstrip("/")
+        self.model = model
+        self.on_update = on_update
+        self.interval = interval
+        self.warmup = warmup
+        self.state = {
+            "n8n": {"status": STATUS_UNKNOWN, "latency_ms": None, "detail": "controllo in corso"},
+            "ollama": {"status": STATUS_UNKNOWN, "latency_ms": None, "detail": "controllo in corso", "loaded": False},
+        }
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._n8n_warmed = False
+
+    def start(self):
+        """Avvia i controlli in background"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="evlogpyai-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def check_now(self):
+        """Anticipa il prossimo controllo"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def check(self) -> dict:
+        """
+        Esegue un giro di controlli (e il preriscaldamento se serve)
+
+        Returns:
+            dict: Stato di N8N e Ollama
+        """
+        # Il webhook viene preriscaldato una volta; poi basta /healthz
+        n8n = probe_n8n(self.n8n_webhook_url, warmup=self.warmup and not self._n8n_warmed)
+        if n8n["status"] == STATUS_OK and "workflow" in n8n["detail"]:
+            self._n8n_warmed = True
+        elif n8n["status"] == STATUS_OK and self._n8n_warmed:
+            n8n["detail"] = "workflow attivo"
+        self._update("n8n", n8n)
+
+        ollama = probe_ollama(self.ollama_url, self.model)
+        self._update("ollama", ollama)
+        if ollama["status"] == STATUS_WARMING and self.warmup:
+            # Caricamento del modello: può richiedere minuti su CPU, lo stato resta "warming"
+            ollama["detail"] = f"caricamento di {self.model}..."
+            self._update("ollama", ollama)
+            warmed = warm_ollama(self.ollama_url, self.model)
+            warmed["latency_ms"] = ollama["latency_ms"]
+            self._update("ollama", warmed)
+        return self.state
+
+    def _update(self, service: str, state: dict):
+        state = dict(state, checked=time.time())
+        # La durata dell'ultimo caricamento resta visibile nei controlli successivi
+        if "load_ms" not in state and self.state[service].get("load_ms") is not None:
+            state["load_ms"] = self.state[service]["load_ms"]
+        self.state[service] = state
+        if self.on_update:
+            self.on_update(self.state)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Gauge per l'endpoint /metrics
+        """
+        n8n, ollama = self.state["n8n"], self.state["ollama"]
+        return {
+            "health_n8n_up": 1 if n8n["status"] == STATUS_OK else 0,
+            "health_n8n_latency_ms": round(n8n["latency_ms"] or 0, 1),
+            "health_ollama_up": 1 if ollama["status"] in (STATUS_OK, STATUS_WARMING) else 0,
+            "health_ollama_latency_ms": round(ollama["latency_ms"] or 0, 1),
+            "health_model_loaded": 1 if ollama.get("loaded") else 0,
+            "health_model_load_ms": round(ollama.get("load_ms") or 0, 1),
+        }
+
+
+_ICONS = {
+    STATUS_OK: "🟢", STATUS_WARMING: "🟡", STATUS_DEGRADED: "🟠", STATUS_DOWN: "🔴", STATUS_UNKNOWN: "⚪",
+}
+
+
+def format_state(state: dict) -> str:
+    """
+    Riga di stato per la GUI (es. "🟢 N8N 12 ms · 🟢 Ollama 8 ms, llama2 in memoria")
+    """
+    parts = []
+    for service, label in (("n8n", "N8N"), ("ollama", "Ollama")):
+        info = state[service]
+        text = f"{_ICONS.get(info['status'], '⚪')} {label}"
+        if info.get("latency_ms") is not None:
+            text += f" {info['latency_ms']:.0f} ms"
+        text += f", {info['detail']}"
+        if info.get("load_ms"):
+            text += f" (caricato in {info['load_ms'] / 1000:.1f} s)"
+        parts.append(text)
+    return " · ".join(parts)
+
+
+# === SERVER DI PROVA ===
+
+def run_stub_server(port: int = 8099, load_delay: float = 5.0, latency: float = 0.0, workflow_active: bool = True):
+    """
+    Server HTTP che simula N8N e Ollama per i test senza Docker
+
+    Args:
+        port (int): Porta di ascolto (127.0.0.1)
+        load_delay (float): Secondi per "caricare" il modello alla prima richiesta
+        latency (float): Ritardo aggiunto a ogni risposta
+        workflow_active (bool): False = il webhook risponde 404 come un workflow non attivo
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {"loaded": False, "lock": threading.Lock(), "received": 0}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            print(f"🧪 Stub: {args[0]}")
+
+        def _reply(self, code: int, data: dict):
+            time.sleep(latency)
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/healthz":
+                self._reply(200, {"status": "ok"})
+            elif self.path == "/api/tags":
+                self._reply(200, {"models": [{"name": f"{OLLAMA_MODEL}:latest"}]})
+            elif self.path == "/api/ps":
+                models = [{"name": f"{OLLAMA_MODEL}:latest"}] if state["loaded"] else []
+                self._reply(200, {"models": models})
+            else:
+                self._reply(404, {"message": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            if self.path == "/api/generate":
+                with state["lock"]:
+                    if not state["loaded"]:
+                        time.sleep(load_delay)
+                        state["loaded"] = True
+                self._reply(200, {"model": OLLAMA_MODEL, "response": "", "done": True})
+            elif self.path.startswith("/webhook/") and workflow_active:
+                state["received"] += 1
+                self._reply(200, {"message": "Workflow was started"})
+            else:
+                self._reply(404, {"message": "The requested webhook is not registered."})
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    print(f"🧪 Server di prova su http://127.0.0.1:{port} (N8N: /webhook/evlogpyai, Ollama: /api/...)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Stato di N8N e Ollama")
+    parser.add_argument("--check", action="store_true", help="Esegue un controllo (con preriscaldamento) e termina")
+    parser.add_argument("--stub", action="store_true", help="Avvia il server di prova che simula N8N e Ollama")
+    parser.add_argument("--port", type=int, default=8099, help="Porta del server di prova (default: 8099)")
+    parser.add_argument("--load-delay", type=float, default=5.0,
+                        help="Secondi di caricamento simulato del modello (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Ritardo simulato di ogni risposta in secondi")
+    parser.add_argument("--inactive", action="store_true", help="Il server di prova simula un workflow non attivo")
+    parser.add_argument("--n8n-url", default="http://localhost:5678/webhook/evlogpyai", help="URL del webhook N8N")
+    parser.add_argument("--ollama-url", default=OLLAMA_URL, help="Indirizzo di Ollama")
+    parser.add_argument("--model", default=OLLAMA_MODEL, help="Modello Ollama")
+    args = parser.parse_args()
+
+    if args.stub:
+        run_stub_server(args.port, args.load_delay, args.latency, workflow_active=not args.inactive)
+    else:
+        monitor = HealthMonitor(args.n8n_url, args.ollama_url, args.model,
+                                on_update=lambda state: print(format_state(state)))
+        monitor.check()
+
+
+if __name__ == "__main__":
+    main()
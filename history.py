@@ -0,0 +1,407 @@
+"""
+EvLogPyAI - Storico delle estrazioni con ricerca full-text
+Ogni evento estratto viene indicizzato in un database SQLite locale (FTS5),
+così si può cercare "quando è comparso l'ultima volta l'evento 7031 di questo
+servizio" senza aprire a mano i report sul Desktop
+
+Sintassi delle ricerche:
+    disco errore                  tutte le parole (messaggio o sorgente)
+    "arrestato in modo imprevisto"  frase esatta
+    kerne*                        prefisso
+    source:Ntfs  id:7031  level:errore  filtri per campo (combinabili con il testo)
+
+Caratteristiche:
+- Aggiornamento incrementale a ogni estrazione (GUI e modalità watch)
+- Eventi già presenti in estrazioni precedenti non vengono duplicati
+- Il rowid degli eventi è derivato dal timestamp: i risultati escono già dal più
+  recente senza ordinare tutte le corrispondenze, anche su milioni di eventi
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# glob: Ricerca dei report già presenti sul Desktop
+import glob
+
+# hashlib: Impronta degli eventi per evitare duplicati
+import hashlib
+
+# os: Percorsi dei report
+import os
+
+# re: Interpretazione delle query e dei report testuali
+import re
+
+# sqlite3: Database locale con indice FTS5
+import sqlite3
+
+# threading: Il database è usato dal thread di estrazione, dalla GUI e dalla modalità watch
+import threading
+
+# time: Misura della durata delle ricerche
+import time
+
+# datetime: Conversione dei timestamp in epoch e orario delle estrazioni
+from datetime import datetime
+
+
+# Bit riservati al progressivo degli eventi con lo stesso secondo (rowid = epoch << 20 | progressivo)
+_SLOT_BITS = 20
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+
+# Campi ammessi nelle query (alias italiani compresi)
+_FIELD_ALIASES = {
+    "source": "source", "sorgente": "source",
+    "id": "event_id", "eventid": "event_id",
+    "level": "type", "tipo": "type", "type": "type",
+}
+
+# Termini della query: campo:"frase", campo:valore, "frase", parola
+_QUERY_TOKEN = re.compile(r'(\w+):"([^"]*)"|(\w+):(\S+)|"([^"]*)"|(\S+)')
+
+
+class EventIndex:
+    """
+    Indice full-text degli eventi estratti, salvato in un file SQLite
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Percorso del file SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created REAL NOT NULL,
+                category TEXT,
+                title TEXT,
+                filepath TEXT,
+                total_logs INTEGER NOT NULL,
+                new_events INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                fingerprint INTEGER NOT NULL UNIQUE,
+                extraction_id INTEGER NOT NULL,
+                timestamp TEXT,
+                source TEXT,
+                event_id INTEGER,
+                type TEXT,
+                category INTEGER,
+                message TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_event_id ON events (event_id);
+            CREATE INDEX IF NOT EXISTS idx_events_type ON events (type);
+
+            -- Indice full-text "external content": il testo è memorizzato una sola volta in events
+            CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5 (
+                source, message,
+                content='events', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+                INSERT INTO events_fts (rowid, source, message) VALUES (new.id, new.source, new.message);
+            END;
+            CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+                INSERT INTO events_fts (events_fts, rowid, source, message)
+                VALUES ('delete', old.id, old.source, old.message);
+            END;
+            """
+        )
+        self._conn.commit()
+
+    # === AGGIORNAMENTO ===
+
+    def add_extraction(self, logs: list, category: str = None, title: str = None, filepath: str = None) -> int:
+        """
+        Indicizza gli eventi di un'estrazione (quelli già presenti vengono saltati)
+
+        Args:
+            logs (list): Eventi nel formato dell'applicazione
+            category (str): Categoria di log dell'estrazione
+            title (str): Titolo del problema
+            filepath (str): Report salvato sul Desktop
+
+        Returns:
+            int: Numero di eventi nuovi aggiunti all'indice
+        """
+        extraction_id = self.begin_extraction(category, title, filepath)
+        return self.add_events(extraction_id, logs)
+
+    def begin_extraction(self, category: str = None, title: str = None, filepath: str = None) -> int:
+        """
+        Registra una nuova estrazione, i cui eventi arrivano poi a lotti con add_events
+
+        Returns:
+            int: ID dell'estrazione
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO extractions (created, category, title, filepath, total_logs, new_events) "
+                "VALUES (?, ?, ?, ?, 0, 0)",
+                (time.time(), category, title, filepath)
+            ).lastrowid
+
+    def add_events(self, extraction_id: int, logs: list) -> int:
+        """
+        Indicizza un lotto di eventi di un'estrazione registrata con begin_extraction
+
+        Args:
+            extraction_id (int): ID dell'estrazione
+            logs (list): Eventi nel formato dell'applicazione
+
+        Returns:
+            int: Numero di eventi nuovi aggiunti all'indice
+        """
+        parsed_times = {}
+        next_slot = {}
+        added = 0
+        with self._lock, self._conn:
+            fallback_epoch = int(time.time())
+
+            for log in logs:
+                # === ROWID DAL TIMESTAMP ===
+                text = log.get("timestamp")
+                epoch = parsed_times.get(text)
+                if epoch is None:
+                    epoch = parsed_times[text] = _timestamp_to_epoch(text, fallback_epoch)
+
+                slot = next_slot.get(epoch)
+                if slot is None:
+                    base = epoch << _SLOT_BITS
+                    last = self._conn.execute(
+                        "SELECT MAX(id) FROM events WHERE id BETWEEN ? AND ?", (base, base | _SLOT_MASK)
+                    ).fetchone()[0]
+                    slot = base if last is None else last + 1
+
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO events "
+                    "(id, fingerprint, extraction_id, timestamp, source, event_id, type, category, message) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (slot, _fingerprint(log), extraction_id, text, log.get("source"), log.get("event_id"),
+                     log.get("type"), log.get("category"), log.get("message"))
+                )
+                if cursor.rowcount:
+                    added += 1
+                    slot += 1
+                next_slot[epoch] = slot
+
+            self._conn.execute(
+                "UPDATE extractions SET total_logs = total_logs + ?, new_events = new_events + ? WHERE id = ?",
+                (len(logs), added, extraction_id)
+            )
+        return added
+
+    def import_reports(self, folder: str) -> tuple:
+        """
+        Indicizza i report EvLog_*.txt già salvati in una cartella (es. il Desktop)
+
+        I report già importati (stesso percorso) vengono saltati.
+
+        Args:
+            folder (str): Cartella in cui cercare i report
+
+        Returns:
+            tuple: (report importati, eventi nuovi)
+        """
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT filepath FROM extractions")}
+        reports = events = 0
+        for path in sorted(glob.glob(os.path.join(folder, "EvLog_*.txt"))):
+            if path in known:
+                continue
+            try:
+                title, category, logs = parse_report(path)
+            except (OSError, UnicodeDecodeError):
+                continue
+            events += self.add_extraction(logs, category=category, title=title, filepath=path)
+            reports += 1
+        return reports, events
+
+    # === RICERCA ===
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """
+        Cerca negli eventi indicizzati, dal più recente
+
+        Args:
+            query (str): Testo della ricerca (vedi sintassi nel docstring del modulo)
+            limit (int): Numero massimo di risultati
+
+        Returns:
+            list: Eventi trovati con titolo e percorso dell'estrazione di origine
+        """
+        match, where, params = _parse_query(query)
+        columns = ("e.timestamp, e.source, e.event_id, e.type, e.category, e.message, "
+                   "x.title AS extraction_title, x.filepath AS extraction_file")
+
+        if match:
+            sql = (f"SELECT {columns} FROM events_fts JOIN events e ON e.id = events_fts.rowid "
+                   f"JOIN extractions x ON x.id = e.extraction_id "
+                   f"WHERE events_fts MATCH ? {''.join(' AND ' + w for w in where)} "
+                   f"ORDER BY events_fts.rowid DESC LIMIT ?")
+            params = [match] + params
+        else:
+            sql = (f"SELECT {columns} FROM events e JOIN extractions x ON x.id = e.extraction_id "
+                   f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+                   f"ORDER BY e.id DESC LIMIT ?")
+        params.append(limit)
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                # Query FTS5 non valida (es. solo segni di punteggiatura)
+                raise ValueError(f"Ricerca non valida: {e}") from e
+        return [dict(row) for row in rows]
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Numero di eventi ed estrazioni indicizzati
+        """
+        with self._lock:
+            events = self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            extractions = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        return {"history_events": events, "history_extractions": extractions}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _parse_query(query: str) -> tuple:
+    """
+    Converte la query dell'utente in (espressione FTS5, condizioni SQL, parametri)
+    """
+    terms, where, params = [], [], []
+    for m in _QUERY_TOKEN.finditer(query):
+        field = m.group(1) or m.group(3)
+        value = m.group(2) if m.group(1) else m.group(4)
+        column = _FIELD_ALIASES.get(field.lower()) if field else None
+
+        if field and column is None:
+            # "campo:" sconosciuto: trattato come testo normale
+            terms.append(_fts_term(m.group(0)))
+        elif column == "source":
+            terms.append(f"source : {_fts_term(value)}")
+        elif column == "event_id":
+            ids = [int(v) for v in value.split(",") if v.strip().isdigit()]
+            if not ids:
+                raise ValueError(f"Event ID non valido: {value}")
+            where.append(f"e.event_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        elif column == "type":
+            # Prefisso senza distinzione maiuscole: level:err trova "Errore"
+            where.append("e.type LIKE ?")
+            params.append(value + "%")
+        elif m.group(5) is not None:
+            terms.append(_fts_term(m.group(5), phrase=True))
+        else:
+            terms.append(_fts_term(m.group(6)))
+    return " AND ".join(terms), where, params
+
+
+def _fts_term(text: str, phrase: bool = False) -> str:
+    """
+    Racchiude un termine tra virgolette (niente sintassi FTS5 accidentale); "abc*" resta un prefisso
+    """
+    prefix = not phrase and text.endswith("*") and len(text) > 1
+    if prefix:
+        text = text[:-1]
+    return '"' + text.replace('"', '""') + '"' + ("*" if prefix else "")
+
+
+def _timestamp_to_epoch(text: str, fallback: int) -> int:
+    """
+    Converte il timestamp "%c" degli eventi in secondi epoch (fallback se non interpretabile)
+    """
+    try:
+        return max(0, int(datetime.strptime(text, "%c").timestamp()))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return fallback
+
+
+def _fingerprint(log: dict) -> int:
+    """
+    Impronta a 64 bit di un evento (stesso evento in più estrazioni = stessa impronta)
+    """
+    key = "\x1f".join(str(log.get(k)) for k in ("timestamp", "source", "event_id", "type", "category", "message"))
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+# === IMPORTAZIONE REPORT TESTUALI ===
+
+_REPORT_FIELDS = {
+    "Timestamp:": "timestamp",
+    "Sorgente:": "source",
+    "Event ID:": "event_id",
+    "Tipo:": "type",
+    "Categoria:": "category",
+}
+
+
+def parse_report(path: str) -> tuple:
+    """
+    Legge un report EvLog_*.txt scritto da trigger.py
+
+    Args:
+        path (str): Percorso del report
+
+    Returns:
+        tuple: (titolo, categoria, lista di eventi)
+    """
+    title = category = None
+    logs = []
+    current = None
+    in_message = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("📋 TITOLO: ") and title is None:
+                title = line[len("📋 TITOLO: "):]
+            elif line.startswith("📁 CATEGORIA: ") and category is None:
+                category = line[len("📁 CATEGORIA: "):].split(" (")[0]
+            elif line.startswith("--- Evento #"):
+                current = {"message": []}
+                logs.append(current)
+                in_message = False
+            elif current is None:
+                continue
+            elif in_message and line.startswith("    "):
+                current["message"].append(line[4:])
+            elif line.strip() == "Messaggio:":
+                in_message = True
+            else:
+                in_message = False
+                stripped = line.strip()
+                for label, key in _REPORT_FIELDS.items():
+                    if stripped.startswith(label):
+                        current[key] = stripped[len(label):].strip()
+                        break
+
+    for log in logs:
+        log["message"] = "\n".join(log["message"])
+        for key in ("event_id", "category"):
+            value = log.get(key)
+            if value is not None and value.lstrip("-").isdigit():
+                log[key] = int(value)
+    return title, category, logs
+
+
+def format_result(result: dict) -> str:
+    """
+    Riga leggibile di un risultato (usata dalla GUI e dalla ricerca da riga di comando)
+    """
+    message = " ".join((result.get("message") or "").split())
+    if len(message) > 160:
+        message = message[:157] + "..."
+    return (f"{result['timestamp']}  [{result['type']}]  {result['source']}  (ID {result['event_id']})\n"
+            f"    {message}\n"
+            f"    ↳ {result.get('extraction_title') or '-'}")
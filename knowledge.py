@@ -0,0 +1,507 @@
+"""
+EvLogPyAI - Knowledge Base Locale
+Spiegazioni e soluzioni per gli eventi più comuni, senza passare dall'AI
+
+Gli eventi "da manuale" (servizio terminato 7031/7034, disco 153, Kernel-Power 41...)
+ricevono una risposta immediata dalla knowledge base; solo gli eventi sconosciuti o
+ambigui (voci con "escalate") vengono inviati al workflow N8N.
+
+Le voci sono indicizzate per (sorgente normalizzata, Event ID): ricerca O(1) per evento.
+Voci aggiuntive o correzioni si possono mettere in %LOCALAPPDATA%\\EvLogPyAI\\known_issues.json,
+una lista di oggetti con gli stessi campi di KNOWN_ISSUES:
+    [{"source": "disk", "event_id": 153, "title": "...", "explanation": "...",
+      "remediation": ["...", "..."], "escalate": false}]
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Voci personalizzate dell'utente
+import json
+
+# os: Presenza del file delle voci personalizzate
+import os
+
+
+# === VOCI PREDEFINITE ===
+# escalate=True: la spiegazione viene mostrata subito ma l'evento va comunque all'AI,
+# perché la causa dipende dal contenuto del messaggio (modulo, account, applicazione)
+KNOWN_ISSUES = [
+    # --- Service Control Manager ---
+    {
+        "source": "Service Control Manager", "event_id": 7031,
+        "title": "Servizio terminato in modo imprevisto (con azione di ripristino)",
+        "explanation": "Il servizio indicato nel messaggio si è arrestato senza una richiesta di stop; "
+                       "Windows ha applicato l'azione di ripristino configurata (di solito il riavvio).",
+        "remediation": [
+            "Identificare il servizio nel messaggio e controllare i log dell'applicazione nello stesso minuto",
+            "Verificare la scheda Ripristino in services.msc (riavvio, contatore errori)",
+            "Aggiornare o reinstallare il software del servizio se l'arresto si ripete",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7034,
+        "title": "Servizio terminato in modo imprevisto",
+        "explanation": "Il servizio si è arrestato inaspettatamente e non è configurata alcuna azione di "
+                       "ripristino: resta fermo finché non viene riavviato.",
+        "remediation": [
+            "Riavviare il servizio da services.msc o con 'sc start <nome>'",
+            "Cercare errori 1000/1026 dell'eseguibile del servizio nel log Applicazione",
+            "Configurare il riavvio automatico nella scheda Ripristino",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7000,
+        "title": "Avvio del servizio non riuscito",
+        "explanation": "Il servizio non è partito: eseguibile mancante, account di accesso errato o "
+                       "dipendenza non disponibile (il codice d'errore è nel messaggio).",
+        "remediation": [
+            "Controllare percorso dell'eseguibile e account di accesso in services.msc",
+            "Verificare che le dipendenze del servizio siano avviate",
+            "Se l'account ha una password scaduta aggiornarla nelle proprietà del servizio",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7001,
+        "title": "Servizio non avviato per una dipendenza",
+        "explanation": "Il servizio dipende da un altro servizio che non è partito: la causa vera è "
+                       "nell'evento 7000/7023 del servizio dipendente.",
+        "remediation": [
+            "Cercare l'errore di avvio del servizio dipendente nello stesso avvio",
+            "Verificare le dipendenze con 'sc qc <nome>'",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7009,
+        "title": "Timeout nella connessione al servizio",
+        "explanation": "Il servizio non ha risposto entro il timeout (30000 ms predefiniti), tipico su "
+                       "avvii lenti o dischi sotto carico.",
+        "remediation": [
+            "Verificare il carico del disco e della CPU all'avvio",
+            "Impostare il servizio su 'Automatico (avvio ritardato)'",
+            "Se necessario aumentare ServicesPipeTimeout in HKLM\\SYSTEM\\CurrentControlSet\\Control",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7011,
+        "title": "Timeout in attesa della risposta di un servizio",
+        "explanation": "Un servizio non ha risposto a un comando di controllo entro 30 secondi.",
+        "remediation": [
+            "Identificare il servizio e verificarne il carico o eventuali blocchi",
+            "Aggiornare driver di storage e rete se l'evento è frequente",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7023,
+        "title": "Servizio terminato con un errore",
+        "explanation": "Il servizio si è fermato restituendo il codice d'errore riportato nel messaggio.",
+        "remediation": [
+            "Cercare il codice d'errore del messaggio (es. con 'net helpmsg <codice>')",
+            "Controllare configurazione e log specifici del servizio",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7026,
+        "title": "Driver di avvio non caricati",
+        "explanation": "Uno o più driver di avvio o di sistema non sono stati caricati: spesso driver di "
+                       "dispositivi rimossi o software disinstallato male.",
+        "remediation": [
+            "Verificare i driver elencati nel messaggio con 'sc query <driver>'",
+            "Disabilitare o rimuovere i driver di hardware non più presente",
+        ],
+    },
+    {
+        "source": "Service Control Manager", "event_id": 7043,
+        "title": "Servizio non arrestato correttamente",
+        "explanation": "Durante lo spegnimento il servizio non si è fermato nel tempo previsto.",
+        "remediation": [
+            "Verificare aggiornamenti del software del servizio",
+            "Controllare se lo spegnimento è rallentato da operazioni di I/O in corso",
+        ],
+    },
+    # --- Disco e file system ---
+    {
+        "source": "disk", "event_id": 153,
+        "title": "Operazione di I/O ripetuta sul disco",
+        "explanation": "Una richiesta di I/O è stata ritentata: il disco o il controller ha risposto "
+                       "in ritardo. Occasionale è innocuo, frequente indica un disco in degrado o "
+                       "problemi di cavo/controller/storage di rete.",
+        "remediation": [
+            "Controllare lo stato SMART del disco (es. 'wmic diskdrive get status' o strumenti del produttore)",
+            "Aggiornare firmware del disco e driver del controller di storage",
+            "Su macchine virtuali verificare la latenza dello storage dell'host",
+        ],
+    },
+    {
+        "source": "disk", "event_id": 7,
+        "title": "Blocco danneggiato sul disco",
+        "explanation": "Il dispositivo ha un settore illeggibile: rischio di perdita dati.",
+        "remediation": [
+            "Eseguire subito un backup dei dati",
+            "Eseguire 'chkdsk /r' sul volume",
+            "Pianificare la sostituzione del disco",
+        ],
+    },
+    {
+        "source": "disk", "event_id": 11,
+        "title": "Errore del controller del disco",
+        "explanation": "Il driver ha rilevato un errore del controller: cavi, alimentazione o controller.",
+        "remediation": [
+            "Verificare cavi e alimentazione del disco",
+            "Aggiornare driver e firmware del controller di storage",
+        ],
+    },
+    {
+        "source": "disk", "event_id": 51,
+        "title": "Errore durante un'operazione di paging",
+        "explanation": "Errore di I/O durante la lettura o scrittura di pagine di memoria su disco.",
+        "remediation": [
+            "Controllare lo stato SMART del disco",
+            "Verificare cavi e controller; se il disco è USB/esterno ignorare se scollegato a caldo",
+        ],
+    },
+    {
+        "source": "Ntfs", "event_id": 55,
+        "title": "Struttura del file system danneggiata",
+        "explanation": "NTFS ha rilevato un danneggiamento della struttura del volume.",
+        "remediation": [
+            "Eseguire 'chkdsk <unità>: /f' (al riavvio se è il volume di sistema)",
+            "Controllare lo stato del disco se l'evento si ripete",
+        ],
+    },
+    {
+        "source": "Ntfs", "event_id": 98,
+        "title": "Controllo del volume completato",
+        "explanation": "Evento informativo: il volume è stato verificato ed è integro o è stato riparato.",
+        "remediation": [
+            "Nessuna azione se il messaggio indica che non sono stati trovati problemi",
+        ],
+    },
+    {
+        "source": "volmgr", "event_id": 46,
+        "title": "Inizializzazione del dump di arresto non riuscita",
+        "explanation": "Il sistema non potrà scrivere il dump in caso di crash: file di paging assente "
+                       "o troppo piccolo sul volume di sistema.",
+        "remediation": [
+            "Verificare le impostazioni del file di paging (sysdm.cpl > Avanzate > Prestazioni)",
+            "Impostare il tipo di dump in Avvio e ripristino",
+        ],
+    },
+    # --- Alimentazione e avvio ---
+    {
+        "source": "Microsoft-Windows-Kernel-Power", "event_id": 41,
+        "title": "Riavvio senza arresto corretto",
+        "explanation": "Il sistema si è riavviato senza un arresto pulito: blocco, crash (BugcheckCode "
+                       "diverso da 0 nel messaggio), mancanza di corrente o pulsante di accensione.",
+        "remediation": [
+            "Se BugcheckCode è diverso da 0 analizzare il dump in C:\\Windows\\Minidump",
+            "Se è 0 verificare alimentazione, UPS, temperature e pressione del pulsante",
+            "Aggiornare BIOS/UEFI e driver di chipset e scheda video",
+        ],
+    },
+    {
+        "source": "EventLog", "event_id": 6008,
+        "title": "Arresto del sistema imprevisto",
+        "explanation": "Il precedente arresto del sistema non è stato pulito (accompagna spesso Kernel-Power 41).",
+        "remediation": [
+            "Controllare gli eventi subito precedenti all'orario indicato nel messaggio",
+            "Verificare alimentazione e presenza di dump di crash",
+        ],
+    },
+    {
+        "source": "EventLog", "event_id": 6005,
+        "title": "Avvio del servizio Registro eventi",
+        "explanation": "Evento informativo registrato a ogni avvio del sistema.",
+        "remediation": ["Nessuna azione necessaria"],
+    },
+    {
+        "source": "EventLog", "event_id": 6006,
+        "title": "Arresto del servizio Registro eventi",
+        "explanation": "Evento informativo registrato a ogni arresto pulito del sistema.",
+        "remediation": ["Nessuna azione necessaria"],
+    },
+    {
+        "source": "Microsoft-Windows-Kernel-General", "event_id": 12,
+        "title": "Avvio del sistema operativo",
+        "explanation": "Evento informativo con l'orario di avvio del sistema.",
+        "remediation": ["Nessuna azione necessaria"],
+    },
+    {
+        "source": "Microsoft-Windows-Kernel-General", "event_id": 13,
+        "title": "Arresto del sistema operativo",
+        "explanation": "Evento informativo con l'orario di arresto del sistema.",
+        "remediation": ["Nessuna azione necessaria"],
+    },
+    # --- Hardware ---
+    {
+        "source": "Microsoft-Windows-WHEA-Logger", "event_id": 17,
+        "title": "Errore hardware corretto (PCI Express)",
+        "explanation": "Errore hardware corretto automaticamente, di solito su un collegamento PCIe.",
+        "remediation": [
+            "Aggiornare BIOS/UEFI e driver di chipset",
+            "Se molto frequente disattivare ASPM/risparmio energetico PCIe o verificare la scheda indicata",
+        ],
+    },
+    {
+        "source": "Microsoft-Windows-WHEA-Logger", "event_id": 18,
+        "title": "Errore hardware irreversibile",
+        "explanation": "Errore hardware fatale (CPU, memoria o bus) che ha probabilmente causato un crash.",
+        "remediation": [
+            "Verificare temperature, alimentazione e overclock",
+            "Eseguire la diagnostica della memoria e del processore del produttore",
+        ],
+        "escalate": True,
+    },
+    {
+        "source": "Microsoft-Windows-WHEA-Logger", "event_id": 19,
+        "title": "Errore hardware corretto (processore/memoria)",
+        "explanation": "Errore corretto dalla CPU o dalla memoria ECC: isolato è innocuo, ripetuto "
+                       "anticipa un guasto.",
+        "remediation": [
+            "Controllare la frequenza degli eventi nel tempo",
+            "Aggiornare BIOS/microcode e verificare i moduli di memoria",
+        ],
+    },
+    # --- Rete e servizi di sistema ---
+    {
+        "source": "Microsoft-Windows-DistributedCOM", "event_id": 10016,
+        "title": "Autorizzazioni DCOM mancanti",
+        "explanation": "Un componente di sistema ha chiesto un'attivazione DCOM senza autorizzazione. "
+                       "Microsoft lo documenta come evento atteso e innocuo.",
+        "remediation": ["Nessuna azione necessaria se non ci sono malfunzionamenti collegati"],
+    },
+    {
+        "source": "Microsoft-Windows-Time-Service", "event_id": 129,
+        "title": "Server di riferimento orario non raggiungibile",
+        "explanation": "Il servizio Ora di Windows non riesce a contattare la sorgente NTP/dominio.",
+        "remediation": [
+            "Verificare la connettività verso il server NTP o il domain controller",
+            "Controllare la configurazione con 'w32tm /query /status'",
+        ],
+    },
+    {
+        "source": "Microsoft-Windows-Time-Service", "event_id": 134,
+        "title": "Risoluzione del nome del server orario non riuscita",
+        "explanation": "Il nome del server NTP configurato non è risolvibile via DNS.",
+        "remediation": [
+            "Verificare DNS e nome del server in 'w32tm /query /configuration'",
+        ],
+    },
+    {
+        "source": "Tcpip", "event_id": 4199,
+        "title": "Conflitto di indirizzo IP",
+        "explanation": "Un altro dispositivo in rete usa lo stesso indirizzo IP (indicato con il MAC nel messaggio).",
+        "remediation": [
+            "Individuare il dispositivo dal MAC indicato",
+            "Correggere le assegnazioni statiche o le prenotazioni DHCP",
+        ],
+    },
+    {
+        "source": "Microsoft-Windows-DNS-Client", "event_id": 1014,
+        "title": "Timeout nella risoluzione DNS",
+        "explanation": "Nessun server DNS ha risposto per il nome indicato.",
+        "remediation": [
+            "Verificare i server DNS configurati e la loro raggiungibilità",
+            "Se isolato e su rete mobile/VPN può essere ignorato",
+        ],
+    },
+    {
+        "source": "Schannel", "event_id": 36887,
+        "title": "Avviso TLS fatale ricevuto dal server remoto",
+        "explanation": "Una connessione TLS è stata rifiutata dall'altro capo (codice di avviso nel messaggio).",
+        "remediation": [
+            "Verificare versioni TLS e suite di cifratura supportate dalle due parti",
+            "Se non ci sono malfunzionamenti visibili l'evento può essere ignorato",
+        ],
+    },
+    {
+        "source": "Microsoft-Windows-WindowsUpdateClient", "event_id": 20,
+        "title": "Installazione di un aggiornamento non riuscita",
+        "explanation": "Un aggiornamento non è stato installato (codice d'errore nel messaggio).",
+        "remediation": [
+            "Riprovare da Impostazioni > Windows Update",
+            "Eseguire 'DISM /Online /Cleanup-Image /RestoreHealth' e 'sfc /scannow'",
+        ],
+    },
+    # --- Applicazioni (dipendono dal modulo: vanno comunque all'AI) ---
+    {
+        "source": "Application Error", "event_id": 1000,
+        "title": "Arresto anomalo di un'applicazione",
+        "explanation": "Un processo si è chiuso per un'eccezione: il modulo con errore e il codice di "
+                       "eccezione nel messaggio indicano la causa.",
+        "remediation": [
+            "Aggiornare o reinstallare l'applicazione indicata",
+            "Se il modulo con errore è una DLL di terze parti aggiornare il relativo software",
+        ],
+        "escalate": True,
+    },
+    {
+        "source": "Application Hang", "event_id": 1002,
+        "title": "Applicazione bloccata",
+        "explanation": "Un'applicazione ha smesso di rispondere ed è stata chiusa.",
+        "remediation": [
+            "Verificare risorse del sistema (memoria, disco) al momento del blocco",
+            "Aggiornare l'applicazione indicata",
+        ],
+        "escalate": True,
+    },
+    {
+        "source": ".NET Runtime", "event_id": 1026,
+        "title": "Eccezione .NET non gestita",
+        "explanation": "Un'applicazione .NET è terminata per un'eccezione non gestita (stack nel messaggio).",
+        "remediation": [
+            "Consultare lo stack dell'eccezione nel messaggio",
+            "Aggiornare l'applicazione e il .NET Framework/Runtime",
+        ],
+        "escalate": True,
+    },
+    {
+        "source": "Microsoft-Windows-Security-Auditing", "event_id": 4625,
+        "title": "Accesso non riuscito",
+        "explanation": "Tentativo di accesso fallito: password errata, account disabilitato o bloccato "
+                       "(Status/SubStatus nel messaggio). Molti tentativi ravvicinati possono indicare un attacco.",
+        "remediation": [
+            "Verificare account, workstation e indirizzo di origine nel messaggio",
+            "Se i tentativi sono numerosi bloccare l'origine e controllare le credenziali salvate",
+        ],
+        "escalate": True,
+    },
+]
+
+
+def normalize_source(source) -> str:
+    """
+    Sorgente in forma confrontabile: il log live e i file .evtx possono riportare
+    "Microsoft-Windows-Kernel-Power" o "Kernel-Power" per lo stesso provider
+    """
+    text = str(source or "").strip().lower()
+    if text.startswith("microsoft-windows-"):
+        text = text[len("microsoft-windows-"):]
+    return text
+
+
+class KnowledgeBase:
+    """
+    Indice (sorgente, Event ID) -> voce della knowledge base
+    """
+
+    def __init__(self, entries: list = None, custom_path: str = None):
+        """
+        Args:
+            entries (list): Voci predefinite (default KNOWN_ISSUES)
+            custom_path (str): File JSON con voci aggiuntive o sostitutive (facoltativo)
+        """
+        self._index = {}
+        for entry in entries if entries is not None else KNOWN_ISSUES:
+            self._add(entry)
+        if custom_path and os.path.exists(custom_path):
+            try:
+                with open(custom_path, encoding="utf-8") as f:
+                    for entry in json.load(f):
+                        self._add(entry)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                print(f"⚠️  Knowledge base personalizzata non valida ({custom_path}): {e}")
+
+    def _add(self, entry: dict):
+        self._index[(normalize_source(entry["source"]), int(entry["event_id"]))] = entry
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, log: dict):
+        """
+        Returns:
+            dict: Voce della knowledge base per l'evento, o None
+        """
+        try:
+            return self._index.get((normalize_source(log.get("source")), int(log.get("event_id"))))
+        except (TypeError, ValueError):
+            return None
+
+    def split(self, logs: list) -> tuple:
+        """
+        Divide un'estrazione in problemi noti e eventi da inviare all'AI
+
+        Args:
+            logs (list): Eventi dell'estrazione
+
+        Returns:
+            tuple: (problemi noti raggruppati per voce, eventi da inviare all'AI nell'ordine originale)
+                   Ogni problema noto: {"entry", "count", "first", "last", "example"}
+                   Gli eventi delle voci con "escalate" compaiono in entrambi
+        """
+        matches = {}
+        escalated = []
+        for log in logs:
+            entry = self.lookup(log)
+            if entry is None or entry.get("escalate"):
+                escalated.append(log)
+            if entry is None:
+                continue
+            match = matches.get(id(entry))
+            if match is None:
+                # Gli eventi arrivano dal più recente: il primo visto è l'ultimo in ordine di tempo
+                match = matches[id(entry)] = {"entry": entry, "count": 0, "last": log.get("timestamp"),
+                                              "example": log}
+            match["count"] += 1
+            match["first"] = log.get("timestamp")
+        ordered = sorted(matches.values(), key=lambda m: (bool(m["entry"].get("escalate")), -m["count"]))
+        return ordered, escalated
+
+
+def summarize_matches(matches: list) -> dict:
+    """
+    Riepilogo dei problemi noti per il payload inviato all'AI
+
+    Returns:
+        dict: Eventi riconosciuti e voci trovate
+    """
+    return {
+        "matched_events": sum(m["count"] for m in matches),
+        "issues": [
+            {"source": m["entry"]["source"], "event_id": m["entry"]["event_id"], "title": m["entry"]["title"],
+             "count": m["count"], "escalated": bool(m["entry"].get("escalate"))}
+            for m in matches
+        ],
+    }
+
+
+def format_matches(matches: list, total: int, escalated: int) -> str:
+    """
+    Testo del report immediato per i problemi noti
+
+    Args:
+        matches (list): Problemi noti restituiti da KnowledgeBase.split
+        total (int): Eventi analizzati
+        escalated (int): Eventi inviati all'AI
+
+    Returns:
+        str: Report in testo semplice (reso in HTML come le risposte dell'AI)
+    """
+    matched = sum(m["count"] for m in matches)
+    lines = [
+        "⚡ RISPOSTA IMMEDIATA DALLA KNOWLEDGE BASE LOCALE",
+        "",
+        f"{matched} eventi su {total} riconosciuti come problemi noti.",
+        f"{escalated} eventi inviati all'AI per l'analisi: la risposta arriverà in una nuova pagina."
+        if escalated else "Nessun evento richiede l'analisi dell'AI.",
+    ]
+    for match in matches:
+        entry = match["entry"]
+        example = str(match["example"].get("message") or "").strip()
+        if len(example) > 300:
+            example = example[:300] + "…"
+        lines += [
+            "",
+            "━" * 60,
+            f"■ {entry['source']} {entry['event_id']} — {entry['title']}",
+            f"Eventi: {match['count']} (dal {match['first']} al {match['last']})",
+            "",
+            f"Spiegazione: {entry['explanation']}",
+            "Soluzione:",
+        ]
+        lines += [f"  {i}. {step}" for i, step in enumerate(entry.get("remediation", []), 1)]
+        if entry.get("escalate"):
+            lines.append("ℹ️ La causa dipende dal contenuto del messaggio: l'evento è stato inviato anche all'AI.")
+        if example:
+            lines += ["", "Esempio:", example]
+    return "\n".join(lines)
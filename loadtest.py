@@ -0,0 +1,495 @@
+"""
+EvLogPyAI - Test di Carico End-to-End
+Simula più tecnici che avviano analisi contemporaneamente, con N8N e Ollama simulati in locale
+
+Vengono avviati due server finti:
+- N8N: il webhook conferma subito (200) e in background interroga Ollama, poi invia
+  la risposta al callback_url del payload come il nodo HTTP Request del workflow
+  (output + request_id);
+- Ollama: /api/chat e /api/generate con latenza iniziale, velocità di lettura del prompt
+  e di generazione dei token configurabili, e un numero limitato di richieste in parallelo
+  (come OLLAMA_NUM_PARALLEL: le altre aspettano in coda).
+
+Ogni job percorre lo stesso codice dell'applicazione: estrazione (eventi sintetici o un
+file .evtx con extractor.py), report (report.py), accodamento nell'outbox SQLite e invio
+con OutboxSender (outbox.py, formato scelto con --wire-format), ricezione della risposta
+con CallbackServer e abbinamento alla richiesta con PendingRequests (callback.py).
+Non servono Windows, Docker né rete: tutto gira su 127.0.0.1.
+
+Esempi:
+    python loadtest.py --jobs 50 --concurrency 10
+    python loadtest.py --jobs 20 --concurrency 10 --token-rate 15 --ollama-parallel 2
+    python loadtest.py --jobs 20 --concurrency 10 --no-request-id   # workflow senza request_id
+    python loadtest.py --evtx System.evtx --events 5000 --wire-format compact
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni da riga di comando
+import argparse
+
+# json: Corpo delle richieste dei server finti e risultato in JSON
+import json
+
+# os: Cartella temporanea di outbox e report
+import os
+
+# tempfile: Outbox e report del test fuori dalla cartella dati dell'applicazione
+import tempfile
+
+# threading: Job concorrenti, risposte in background del finto N8N
+import threading
+
+# time: Latenze simulate e misure
+import time
+
+# concurrent.futures: Job eseguiti in parallelo
+from concurrent.futures import ThreadPoolExecutor
+
+# datetime: Timestamp del payload
+from datetime import datetime
+
+# http.server: Server finti di N8N e Ollama
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# requests: Chiamate del finto N8N verso Ollama e verso la callback
+import requests
+
+# callback: Server callback e abbinamento delle risposte (stesso codice della GUI)
+from callback import CallbackServer, PendingRequests, new_request_id
+
+# metrics: Registro delle fasi e percentili
+from metrics import Metrics
+
+# outbox: Coda durevole e thread di invio (stesso codice della GUI)
+from outbox import Outbox, OutboxSender
+
+# report: Report testuale scritto da ogni job
+from report import ReportWriter
+
+# wire: Formati di trasmissione, decodifica dello schema colonnare, eventi sintetici
+from wire import WIRE_FORMATS, WIRE_JSON, from_columnar, msgpack, _synthetic_logs
+
+
+# === CONFIGURAZIONE PREDEFINITA ===
+DEFAULT_JOBS = 20
+DEFAULT_CONCURRENCY = 10
+DEFAULT_EVENTS = 2000
+
+# Ollama simulato: un modello 7B su CPU genera qualche decina di token al secondo
+DEFAULT_TOKENS = 300
+DEFAULT_TOKEN_RATE = 40.0
+DEFAULT_PROMPT_RATE = 2000.0
+DEFAULT_NUM_CTX = 2048           # Contesto predefinito di Ollama: il prompt oltre viene troncato
+DEFAULT_OLLAMA_LATENCY = 0.2
+DEFAULT_OLLAMA_PARALLEL = 1
+
+
+# === OLLAMA SIMULATO ===
+
+class FakeOllama:
+    """
+    Server che risponde come Ollama, con costo proporzionale a prompt e risposta
+    """
+
+    def __init__(self, tokens: int = DEFAULT_TOKENS, token_rate: float = DEFAULT_TOKEN_RATE,
+                 prompt_rate: float = DEFAULT_PROMPT_RATE, latency: float = DEFAULT_OLLAMA_LATENCY,
+                 parallel: int = DEFAULT_OLLAMA_PARALLEL, num_ctx: int = DEFAULT_NUM_CTX):
+        """
+        Args:
+            tokens (int): Token generati per risposta
+            token_rate (float): Token generati al secondo
+            prompt_rate (float): Token del prompt letti al secondo (~4 caratteri per token)
+            latency (float): Secondi fissi prima della generazione
+            parallel (int): Richieste elaborate contemporaneamente (le altre attendono)
+            num_ctx (int): Token di contesto (la parte del prompt oltre il limite non costa)
+        """
+        self.tokens = tokens
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.latency = latency
+        self.num_ctx = num_ctx
+        self._slots = threading.Semaphore(max(1, parallel))
+        self.requests = 0
+        self.server = None
+
+    def generation_seconds(self, prompt_chars: int) -> float:
+        """Durata simulata di una risposta"""
+        prompt_tokens = min(prompt_chars / 4, self.num_ctx)
+        return self.latency + prompt_tokens / self.prompt_rate + self.tokens / self.token_rate
+
+    def start(self) -> str:
+        """
+        Returns:
+            str: Indirizzo base (es. http://127.0.0.1:PORTA)
+        """
+        owner = self
+
+        class OllamaHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, data: dict):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._reply({"models": [{"name": "llama2:latest"}]})
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                prompt = request.get("prompt") or "".join(m.get("content", "") for m in request.get("messages", []))
+                with owner._slots:
+                    owner.requests += 1
+                    time.sleep(owner.generation_seconds(len(prompt)))
+                text = " ".join(["analisi"] * owner.tokens)
+                if self.path == "/api/chat":
+                    self._reply({"model": request.get("model"), "message": {"role": "assistant", "content": text},
+                                 "done": True, "eval_count": owner.tokens})
+                else:
+                    self._reply({"model": request.get("model"), "response": text, "done": True,
+                                 "eval_count": owner.tokens})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), OllamaHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+# === N8N SIMULATO ===
+
+def decode_webhook_body(body: bytes, content_type: str) -> dict:
+    """
+    Payload originale da un corpo in qualsiasi formato di trasmissione (come il nodo Decode Payload)
+    """
+    if "msgpack" in content_type:
+        payload = msgpack.unpackb(body, raw=False)
+    else:
+        payload = json.loads(body.decode("utf-8"))
+    if "logs_columnar" in payload:
+        payload["logs"] = from_columnar(payload.pop("logs_columnar"))
+    return payload
+
+
+class FakeN8N:
+    """
+    Webhook che conferma subito e risponde più tardi al callback_url, come il workflow
+    """
+
+    def __init__(self, ollama_url: str, latency: float = 0.0, echo_request_id: bool = True):
+        """
+        Args:
+            ollama_url (str): Indirizzo del finto Ollama
+            latency (float): Secondi di elaborazione del workflow prima della chiamata all'AI
+            echo_request_id (bool): False = callback senza request_id (workflow non aggiornato)
+        """
+        self.ollama_url = ollama_url
+        self.latency = latency
+        self.echo_request_id = echo_request_id
+        self.received = 0
+        self.callback_errors = 0
+        self.server = None
+        self._threads = []
+
+    def start(self) -> str:
+        """
+        Returns:
+            str: URL del webhook
+        """
+        owner = self
+
+        class WebhookHandler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                payload = decode_webhook_body(body, self.headers.get("Content-Type", ""))
+                reply = json.dumps({"message": "Workflow was started"}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+                if payload.get("warmup"):
+                    return
+                owner.received += 1
+                thread = threading.Thread(target=owner._run_workflow, args=(payload,), daemon=True)
+                owner._threads.append(thread)
+                thread.start()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_address[1]}/webhook/evlogpyai"
+
+    def _run_workflow(self, payload: dict):
+        """
+        Esecuzione del workflow: prompt, chiamata a Ollama, risposta al callback_url
+        """
+        time.sleep(self.latency)
+        prompt = (f"TITOLO: {payload.get('title')}\n\nDESCRIZIONE: {payload.get('description')}\n\n"
+                  + "".join(f"{log.get('timestamp')} {log.get('source')} {log.get('event_id')} {log.get('type')} "
+                            f"{log.get('message')}\n" for log in payload.get("logs") or []))
+        try:
+            response = requests.post(f"{self.ollama_url}/api/chat", json={
+                "model": "llama2", "messages": [{"role": "user", "content": prompt}], "stream": False
+            }, timeout=600)
+            text = response.json()["message"]["content"]
+            # Il titolo in testa alla risposta permette al test di verificare l'abbinamento
+            data = {"output": f"[{payload.get('title')}] {text}"}
+            if self.echo_request_id:
+                data["request_id"] = payload.get("request_id")
+            requests.post(payload["callback_url"], json=data, timeout=30).raise_for_status()
+        except (requests.exceptions.RequestException, KeyError, ValueError):
+            self.callback_errors += 1
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+# === TEST DI CARICO ===
+
+class LoadTest:
+    """
+    Job concorrenti di estrazione e analisi attraverso outbox, webhook e callback
+    """
+
+    def __init__(self, webhook_url: str, workdir: str, events: int = DEFAULT_EVENTS, evtx: str = None,
+                 wire_format: str = WIRE_JSON, coalesce: bool = False, timeout: float = 600.0):
+        """
+        Args:
+            webhook_url (str): URL del webhook (finto o reale)
+            workdir (str): Cartella di outbox e report
+            events (int): Eventi estratti da ogni job
+            evtx (str): File .evtx da cui estrarre (None = eventi sintetici)
+            wire_format (str): Formato di trasmissione del payload
+            coalesce (bool): Tutti i job con la stessa chiave di coalescenza (come la modalità watch)
+            timeout (float): Secondi massimi di attesa della risposta per job
+        """
+        self.workdir = workdir
+        self.events = events
+        self.evtx = evtx
+        self.coalesce = coalesce
+        self.timeout = timeout
+        self.metrics = Metrics(window=100000)
+        self.pending = PendingRequests()
+        self.outbox = Outbox(os.path.join(workdir, "outbox.db"))
+        self.sender = OutboxSender(self.outbox, webhook_url, on_sent=self._on_sent, metrics=self.metrics,
+                                   wire_format=wire_format, base_delay=0.5)
+        self.callback = CallbackServer(0, on_response=self._on_response, metrics=self.metrics,
+                                       host="127.0.0.1", verbose=False)
+        self._lock = threading.Lock()
+        self.mismatched = 0       # Risposte abbinate alla richiesta sbagliata
+        self.unmatched = 0        # Risposte che non trovano nessuna richiesta
+        self.timeouts = 0         # Job senza risposta entro il timeout
+
+    def _on_sent(self, payload: dict):
+        self.pending.delivered(payload.get("request_id"))
+
+    def _on_response(self, response: dict):
+        """Callback ricevuta: abbinamento alla richiesta e fine del job"""
+        received = time.perf_counter()
+        matched = self.pending.match(response)
+        output = str(response.get("output") or "")
+        with self._lock:
+            if not matched:
+                self.unmatched += 1
+            for request in matched:
+                if not output.startswith(f"[{request['title']}]") and len(matched) == 1:
+                    self.mismatched += 1
+                if "delivered" in request:
+                    self.metrics.observe("wait_ai", received - request["delivered"])
+                    self.metrics.observe("outbox_wait", request["delivered"] - request["submitted"])
+                self.metrics.observe("end_to_end", received - request["started"])
+                request["done"].set()
+
+    def _extract(self, job: int) -> list:
+        if self.evtx:
+            from extractor import extract_in_thread
+            logs, _ = extract_in_thread(self.evtx, self.events, format_workers=1)
+            return logs
+        return _synthetic_logs(self.events, seed=job)
+
+    def run_job(self, job: int) -> bool:
+        """
+        Un'analisi completa: estrazione, report, invio e attesa della risposta
+
+        Returns:
+            bool: True se la risposta è arrivata entro il timeout
+        """
+        started = time.perf_counter()
+        title = f"Job {job}"
+        with self.metrics.stage("extract") as stage:
+            logs = self._extract(job)
+            stage.add_items(len(logs))
+
+        with self.metrics.stage("write_report") as stage:
+            writer = ReportWriter(os.path.join(self.workdir, f"report_{job}.txt"), title, "Sistema", "System",
+                                  "Test di carico", self.events)
+            writer.write_events(logs)
+            stage.add_bytes(writer.close())
+
+        request_id = new_request_id()
+        done = threading.Event()
+        self.pending.add(request_id, {"title": title, "category": "Sistema", "total_logs": len(logs),
+                                      "started": started, "done": done})
+        payload = {
+            "title": title,
+            "category": "Sistema",
+            "category_windows": "System",
+            "description": f"Test di carico, job {job}",
+            "timestamp": datetime.now().isoformat(),
+            "filename": f"report_{job}.txt",
+            "filepath": os.path.join(self.workdir, f"report_{job}.txt"),
+            "total_logs": len(logs),
+            "logs": logs,
+            "callback_url": f"http://127.0.0.1:{self.callback.port}/callback",
+            "request_id": request_id,
+        }
+        with self.metrics.stage("enqueue") as stage:
+            self.outbox.enqueue(payload, coalesce_key="loadtest" if self.coalesce else None)
+            stage.add_items(len(logs))
+        self.sender.notify()
+
+        if done.wait(self.timeout):
+            return True
+        with self._lock:
+            self.timeouts += 1
+        return False
+
+    def run(self, jobs: int, concurrency: int) -> dict:
+        """
+        Esegue jobs analisi, concurrency alla volta
+
+        Returns:
+            dict: Latenze, errori di abbinamento e throughput
+        """
+        self.callback.start()
+        self.sender.start()
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                completed = sum(pool.map(self.run_job, range(1, jobs + 1)))
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sender.stop()
+            self.callback.stop()
+
+        stages = self.metrics.to_json()["stages"]
+        e2e = stages.get("end_to_end", {})
+        return {
+            "jobs": jobs,
+            "concurrency": concurrency,
+            "events_per_job": self.events,
+            "completed": completed,
+            "timeouts": self.timeouts,
+            "elapsed_seconds": elapsed,
+            "jobs_per_second": completed / elapsed if elapsed else 0.0,
+            "events_per_second": completed * self.events / elapsed if elapsed else 0.0,
+            "e2e_p50_seconds": e2e.get("p50_seconds", 0.0),
+            "e2e_p95_seconds": e2e.get("p95_seconds", 0.0),
+            "e2e_p99_seconds": e2e.get("p99_seconds", 0.0),
+            "e2e_mean_seconds": e2e.get("avg_seconds", 0.0),
+            "callback_mismatched": self.mismatched,
+            "callback_unmatched": self.unmatched,
+            "matching": self.pending.stats(),
+            "outbox": self.sender.stats(),
+            "stages": {name: {"p50_seconds": s["p50_seconds"], "p95_seconds": s["p95_seconds"],
+                              "p99_seconds": s["p99_seconds"], "count": s["count"]}
+                       for name, s in stages.items()},
+        }
+
+
+def format_result(result: dict, ollama: FakeOllama = None, n8n: FakeN8N = None) -> str:
+    """
+    Riepilogo leggibile del test di carico
+    """
+    lines = [
+        f"📊 {result['completed']}/{result['jobs']} job completati con {result['concurrency']} in parallelo "
+        f"({result['events_per_job']} eventi ciascuno) in {result['elapsed_seconds']:.1f}s",
+        f"  Latenza end-to-end: p50 {result['e2e_p50_seconds']:.2f}s  p95 {result['e2e_p95_seconds']:.2f}s  "
+        f"p99 {result['e2e_p99_seconds']:.2f}s  media {result['e2e_mean_seconds']:.2f}s",
+        f"  Throughput: {result['jobs_per_second']:.2f} job/s, {result['events_per_second']:,.0f} eventi/s",
+        f"  Abbinamento callback: {result['matching']['callbacks_matched']} abbinate, "
+        f"{result['callback_mismatched']} alla richiesta sbagliata, {result['callback_unmatched']} senza richiesta, "
+        f"{result['matching']['callbacks_missing_id']} senza request_id, {result['timeouts']} job senza risposta",
+        f"  Outbox: {result['outbox']['sent_jobs']} job inviati, {result['outbox']['failed_attempts']} tentativi "
+        f"falliti, {result['outbox']['sent_bytes'] / 1e6:.1f} MB",
+    ]
+    if n8n is not None:
+        lines.append(f"  N8N simulato: {n8n.received} esecuzioni, {n8n.callback_errors} callback non riuscite")
+    if ollama is not None:
+        lines.append(f"  Ollama simulato: {ollama.requests} risposte "
+                     f"(~{ollama.generation_seconds(0):.1f}s ciascuna senza prompt)")
+    lines.append("  Fasi (p50 / p95 / p99):")
+    for name, stage in result["stages"].items():
+        lines.append(f"    {name:<18} {stage['p50_seconds']:7.3f}s {stage['p95_seconds']:7.3f}s "
+                     f"{stage['p99_seconds']:7.3f}s  ({stage['count']})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Test di carico con N8N e Ollama simulati")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help=f"Analisi totali (default: {DEFAULT_JOBS})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Analisi contemporanee (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENTS,
+                        help=f"Eventi estratti per analisi (default: {DEFAULT_EVENTS})")
+    parser.add_argument("--evtx", help="File .evtx da cui estrarre (default: eventi sintetici)")
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS, default=WIRE_JSON,
+                        help="Formato del payload (default: json)")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Stessa chiave di coalescenza per tutti i job (invii uniti dall'outbox)")
+    parser.add_argument("--tokens", type=int, default=DEFAULT_TOKENS,
+                        help=f"Token per risposta (default: {DEFAULT_TOKENS})")
+    parser.add_argument("--token-rate", type=float, default=DEFAULT_TOKEN_RATE,
+                        help=f"Token generati al secondo (default: {DEFAULT_TOKEN_RATE:g})")
+    parser.add_argument("--prompt-rate", type=float, default=DEFAULT_PROMPT_RATE,
+                        help=f"Token del prompt letti al secondo (default: {DEFAULT_PROMPT_RATE:g})")
+    parser.add_argument("--num-ctx", type=int, default=DEFAULT_NUM_CTX,
+                        help=f"Token di contesto del modello (default: {DEFAULT_NUM_CTX})")
+    parser.add_argument("--ollama-latency", type=float, default=DEFAULT_OLLAMA_LATENCY,
+                        help=f"Secondi fissi per risposta (default: {DEFAULT_OLLAMA_LATENCY:g})")
+    parser.add_argument("--ollama-parallel", type=int, default=DEFAULT_OLLAMA_PARALLEL,
+                        help=f"Risposte generate in parallelo (default: {DEFAULT_OLLAMA_PARALLEL})")
+    parser.add_argument("--n8n-latency", type=float, default=0.05,
+                        help="Secondi di elaborazione del workflow prima dell'AI (default: 0.05)")
+    parser.add_argument("--no-request-id", action="store_true",
+                        help="Il finto N8N non restituisce il request_id (workflow non aggiornato)")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="Secondi massimi di attesa della risposta per job (default: 600)")
+    parser.add_argument("--json", action="store_true", help="Stampa il risultato in JSON")
+    args = parser.parse_args()
+
+    ollama = FakeOllama(args.tokens, args.token_rate, args.prompt_rate, args.ollama_latency, args.ollama_parallel,
+                        args.num_ctx)
+    n8n = FakeN8N(ollama.start(), latency=args.n8n_latency, echo_request_id=not args.no_request_id)
+    webhook_url = n8n.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="evlogpyai-loadtest-") as workdir:
+            test = LoadTest(webhook_url, workdir, events=args.events, evtx=args.evtx, wire_format=args.wire_format,
+                            coalesce=args.coalesce, timeout=args.timeout)
+            result = test.run(args.jobs, args.concurrency)
+            test.outbox._conn.close()
+    finally:
+        n8n.stop()
+        ollama.stop()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_result(result, ollama, n8n))
+
+
+if __name__ == "__main__":
+    main()
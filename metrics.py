@@ -0,0 +1,306 @@
+"""
+EvLogPyAI - Metriche per fase
+Misura durata, numero di elementi e byte di ogni fase dell'elaborazione
+(apertura log, lettura, formattazione, report, serializzazione, invio, attesa AI, HTML)
+
+Le metriche sono esposte in formato Prometheus e JSON dall'endpoint /metrics
+del server callback; ogni esecuzione scrive inoltre un file di trace JSON-lines.
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Serializzazione delle metriche e del file di trace
+import json
+
+# os: Creazione della cartella dei trace
+import os
+
+# threading: Le fasi vengono registrate da thread diversi (worker, outbox, server)
+import threading
+
+# time: Misura delle durate e timestamp delle esecuzioni
+import time
+
+# uuid: Identificativo univoco di ogni esecuzione
+import uuid
+
+# bisect: Ricerca del bucket dell'istogramma
+from bisect import bisect_left
+
+# collections: Finestra scorrevole delle ultime misure
+from collections import deque
+
+# contextlib: Context manager per cronometrare una fase
+from contextlib import contextmanager
+
+# datetime: Nome dei file di trace
+from datetime import datetime
+
+
+# === BUCKET ISTOGRAMMA (secondi) ===
+# Coprono sia le fasi rapide (formattazione di pochi eventi) sia l'attesa dell'AI (minuti)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _StageStats:
+    """
+    Statistiche accumulate per una singola fase
+    """
+
+    def __init__(self, window: int):
+        self.count = 0                                  # Numero di esecuzioni della fase
+        self.total_seconds = 0.0                        # Somma delle durate
+        self.total_bytes = 0                            # Byte elaborati
+        self.total_items = 0                            # Elementi elaborati (es. eventi)
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)  # Istogramma (ultimo = +Inf)
+        self.recent = deque(maxlen=window)              # Ultime durate per i percentili
+
+
+class StageTimer:
+    """
+    Oggetto restituito da Metrics.stage(): permette di aggiungere byte ed elementi alla fase
+    """
+
+    def __init__(self):
+        self.nbytes = 0
+        self.items = 0
+
+    def add_bytes(self, nbytes: int):
+        self.nbytes += nbytes
+
+    def add_items(self, items: int):
+        self.items += items
+
+
+class Metrics:
+    """
+    Registro thread-safe delle metriche per fase
+    """
+
+    def __init__(self, trace_dir: str = None, window: int = 500):
+        """
+        Args:
+            trace_dir (str): Cartella dei file di trace JSON-lines (None = nessun trace)
+            window (int): Numero di misure recenti usate per i percentili
+        """
+        self.trace_dir = trace_dir
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._gauges = []
+        self.run_id = None
+        self._trace_file = None
+
+    def add_gauges(self, provider):
+        """
+        Registra una funzione che restituisce valori istantanei da esporre (es. profondità outbox)
+
+        Args:
+            provider (callable): Funzione senza argomenti che restituisce un dict nome -> numero
+        """
+        self._gauges.append(provider)
+
+    def start_run(self, **info) -> str:
+        """
+        Inizia una nuova esecuzione: le fasi successive vengono scritte in un nuovo file di trace
+
+        Args:
+            **info: Dati descrittivi dell'esecuzione (es. categoria, righe richieste)
+
+        Returns:
+            str: Identificativo dell'esecuzione
+        """
+        with self._lock:
+            if self._trace_file:
+                self._trace_file.close()
+                self._trace_file = None
+            self.run_id = uuid.uuid4().hex[:12]
+            if self.trace_dir:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                name = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.run_id}.jsonl"
+                self._trace_file = open(os.path.join(self.trace_dir, name), "a", encoding="utf-8")
+                self._write_trace({"event": "run_start", "run_id": self.run_id, "ts": time.time(), **info})
+            return self.run_id
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Cronometra una fase
+
+        Esempio:
+            with metrics.stage("write_report") as t:
+                t.add_bytes(size)
+
+        Args:
+            name (str): Nome della fase
+        """
+        timer = StageTimer()
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            self.observe(name, time.perf_counter() - start, nbytes=timer.nbytes, items=timer.items)
+
+    def observe(self, name: str, seconds: float, nbytes: int = 0, items: int = 0):
+        """
+        Registra una misura già calcolata
+
+        Args:
+            name (str): Nome della fase
+            seconds (float): Durata
+            nbytes (int): Byte elaborati
+            items (int): Elementi elaborati
+        """
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats(self.window)
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.total_bytes += nbytes
+            stats.total_items += items
+            stats.buckets[bisect_left(DURATION_BUCKETS, seconds)] += 1
+            stats.recent.append(seconds)
+            self._write_trace({
+                "event": "stage", "run_id": self.run_id, "stage": name, "ts": time.time(),
+                "duration_s": round(seconds, 6), "bytes": nbytes, "items": items
+            })
+
+    def _write_trace(self, record: dict):
+        """
+        Scrive una riga nel file di trace (chiamata con il lock acquisito)
+        """
+        if self._trace_file:
+            self._trace_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._trace_file.flush()
+
+    def _gauge_values(self) -> dict:
+        values = {}
+        for provider in self._gauges:
+            try:
+                values.update(provider())
+            except Exception:
+                pass
+        return values
+
+    def to_json(self) -> dict:
+        """
+        Returns:
+            dict: Metriche per fase con percentili sulla finestra recente
+        """
+        with self._lock:
+            stages = {}
+            for name, s in self._stages.items():
+                recent = sorted(s.recent)
+                stages[name] = {
+                    "count": s.count,
+                    "total_seconds": s.total_seconds,
+                    "avg_seconds": s.total_seconds / s.count if s.count else 0.0,
+                    "bytes": s.total_bytes,
+                    "items": s.total_items,
+                    "p50_seconds": _percentile(recent, 0.50),
+                    "p95_seconds": _percentile(recent, 0.95),
+                    "p99_seconds": _percentile(recent, 0.99),
+                }
+            run_id = self.run_id
+        return {"run_id": run_id, "stages": stages, "gauges": self._gauge_values()}
+
+    def to_prometheus(self) -> str:
+        """
+        Returns:
+            str: Metriche in formato testo Prometheus (exposition format 0.0.4)
+        """
+        lines = [
+            "# HELP evlogpyai_stage_duration_seconds Durata delle fasi di elaborazione",
+            "# TYPE evlogpyai_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for name, s in stages:
+                cumulative = 0
+                for bound, n in zip(DURATION_BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(f'evlogpyai_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'evlogpyai_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'evlogpyai_stage_duration_seconds_sum{{stage="{name}"}} {s.total_seconds}')
+                lines.append(f'evlogpyai_stage_duration_seconds_count{{stage="{name}"}} {s.count}')
+
+            lines.append("# HELP evlogpyai_stage_bytes_total Byte elaborati per fase")
+            lines.append("# TYPE evlogpyai_stage_bytes_total counter")
+            for name, s in stages:
+                lines.append(f'evlogpyai_stage_bytes_total{{stage="{name}"}} {s.total_bytes}')
+
+            lines.append("# HELP evlogpyai_stage_items_total Elementi elaborati per fase")
+            lines.append("# TYPE evlogpyai_stage_items_total counter")
+            for name, s in stages:
+                lines.append(f'evlogpyai_stage_items_total{{stage="{name}"}} {s.total_items}')
+
+        for key, value in sorted(self._gauge_values().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"# TYPE evlogpyai_{key} gauge")
+                lines.append(f"evlogpyai_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopLagProbe:
+    """
+    Misura la reattività della GUI: un callback pianificato ogni interval_ms sul
+    mainloop registra di quanto arriva in ritardo rispetto all'orario previsto
+
+    Le misure non passano da Metrics.observe (sarebbero decine di righe di trace
+    al secondo): vengono esposte come gauge tramite stats().
+    """
+
+    def __init__(self, after, interval_ms: int = 50, window: int = 1200):
+        """
+        Args:
+            after (callable): Pianificatore del mainloop, es. widget.after(ms, callback)
+            interval_ms (int): Intervallo tra due campioni
+            window (int): Numero di campioni recenti usati per i percentili
+        """
+        self.after = after
+        self.interval_ms = interval_ms
+        self._lags = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._expected = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._schedule()
+
+    def stop(self):
+        self._running = False
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        lag = max(0.0, time.perf_counter() - self._expected)
+        self._lags.append(lag)
+        self._max_lag = max(self._max_lag, lag)
+        if self._running:
+            self._schedule()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Ritardo del mainloop in millisecondi (p50, p99 sulla finestra recente, massimo)
+        """
+        lags = sorted(self._lags)
+        return {
+            "gui_loop_lag_p50_ms": _percentile(lags, 0.50) * 1000,
+            "gui_loop_lag_p99_ms": _percentile(lags, 0.99) * 1000,
+            "gui_loop_lag_max_ms": self._max_lag * 1000,
+        }
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    """
+    Percentile per rango su una lista già ordinata (0.0 se vuota)
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
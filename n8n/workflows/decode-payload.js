@@ -0,0 +1,168 @@
+// EvLogPyAI - Decode Payload
+// Codice del nodo Code "Decode Payload" (modalità "Run Once for All Items"),
+// inserito tra il Webhook e "Edit Fields" in evlogpyai-workflow.json.
+//
+// Riporta ogni payload al formato originale con la lista "logs", qualunque sia
+// il formato di trasmissione scelto in trigger.py (--wire-format):
+// - json:    payload già nel formato originale, passato così com'è
+// - compact: schema colonnare in "logs_columnar" (JSON)
+// - msgpack: stesso schema serializzato con MessagePack (corpo binario, opzione
+//            "Raw Body" del Webhook attiva)
+//
+// Non servono moduli esterni: il decoder MessagePack è incluso qui sotto.
+//
+// Le richieste di preriscaldamento di trigger.py ({"warmup": true}, vedi health.py)
+// non producono item: il workflow si ferma qui senza interpellare l'AI.
+
+const COLUMNAR_VERSION = 2;
+const PARAM_MARK = '\u0000';
+
+// === TIMESTAMP ===
+// "ts" è l'orario locale del computer Windows in secondi (senza fuso orario): viene
+// riformattato con "ts_format" (la forma di "%c" di trigger.py) nello stesso testo
+// del report, senza passare dal fuso orario del container di N8N
+const DAYS = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
+const MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+
+function formatLocalTime(seconds, format) {
+  const d = new Date(seconds * 1000);
+  const pad = (n, fill = '0') => String(n).padStart(2, fill);
+  return format.replace(/%([a-zA-Z%])/g, (match, code) => {
+    switch (code) {
+      case 'a': return DAYS[d.getUTCDay()];
+      case 'b': return MONTHS[d.getUTCMonth()];
+      case 'd': return pad(d.getUTCDate());
+      case 'e': return pad(d.getUTCDate(), ' ');
+      case 'm': return pad(d.getUTCMonth() + 1);
+      case 'Y': return String(d.getUTCFullYear());
+      case 'y': return pad(d.getUTCFullYear() % 100);
+      case 'H': return pad(d.getUTCHours());
+      case 'M': return pad(d.getUTCMinutes());
+      case 'S': return pad(d.getUTCSeconds());
+      case '%': return '%';
+      default: return match;
+    }
+  });
+}
+
+// === DECODER MESSAGEPACK (sottoinsieme usato da Python msgpack.packb) ===
+function unpack(buf) {
+  let pos = 0;
+  const str = (n) => { const s = buf.toString('utf8', pos, pos + n); pos += n; return s; };
+  const bin = (n) => { const b = buf.subarray(pos, pos + n); pos += n; return b; };
+  const arr = (n) => { const a = new Array(n); for (let i = 0; i < n; i++) a[i] = read(); return a; };
+  const map = (n) => { const m = {}; for (let i = 0; i < n; i++) { const k = read(); m[k] = read(); } return m; };
+  const u = (size) => {
+    let v;
+    if (size === 1) v = buf.readUInt8(pos);
+    else if (size === 2) v = buf.readUInt16BE(pos);
+    else if (size === 4) v = buf.readUInt32BE(pos);
+    else v = Number(buf.readBigUInt64BE(pos));
+    pos += size;
+    return v;
+  };
+  const s = (size) => {
+    let v;
+    if (size === 1) v = buf.readInt8(pos);
+    else if (size === 2) v = buf.readInt16BE(pos);
+    else if (size === 4) v = buf.readInt32BE(pos);
+    else v = Number(buf.readBigInt64BE(pos));
+    pos += size;
+    return v;
+  };
+  function read() {
+    const b = buf[pos++];
+    if (b <= 0x7f) return b;
+    if (b >= 0xe0) return b - 0x100;
+    if ((b & 0xf0) === 0x80) return map(b & 0x0f);
+    if ((b & 0xf0) === 0x90) return arr(b & 0x0f);
+    if ((b & 0xe0) === 0xa0) return str(b & 0x1f);
+    switch (b) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(u(1));
+      case 0xc5: return bin(u(2));
+      case 0xc6: return bin(u(4));
+      case 0xca: { const v = buf.readFloatBE(pos); pos += 4; return v; }
+      case 0xcb: { const v = buf.readDoubleBE(pos); pos += 8; return v; }
+      case 0xcc: return u(1);
+      case 0xcd: return u(2);
+      case 0xce: return u(4);
+      case 0xcf: return u(8);
+      case 0xd0: return s(1);
+      case 0xd1: return s(2);
+      case 0xd2: return s(4);
+      case 0xd3: return s(8);
+      case 0xd9: return str(u(1));
+      case 0xda: return str(u(2));
+      case 0xdb: return str(u(4));
+      case 0xdc: return arr(u(2));
+      case 0xdd: return arr(u(4));
+      case 0xde: return map(u(2));
+      case 0xdf: return map(u(4));
+      default: throw new Error('MessagePack: tipo non supportato 0x' + b.toString(16));
+    }
+  }
+  return read();
+}
+
+// === SCHEMA COLONNARE -> LISTA "logs" ===
+function fromColumnar(data) {
+  if (data.version !== COLUMNAR_VERSION) {
+    throw new Error('Versione dello schema colonnare non supportata: ' + data.version);
+  }
+  const logs = new Array(data.count);
+  const tagNames = data.tag_names || [];
+  const tags = data.tags || {};
+  for (let i = 0; i < data.count; i++) {
+    const seconds = data.ts[i];
+    const template = data.templates[data.template[i]];
+    const params = data.params[i];
+    let message = template;
+    if (params && params.length) {
+      const parts = template.split(PARAM_MARK);
+      message = parts[0];
+      for (let p = 0; p < params.length; p++) message += params[p] + parts[p + 1];
+    }
+    logs[i] = {
+      timestamp: seconds === null ? data.ts_text[String(i)] : formatLocalTime(seconds, data.ts_format),
+      source: data.sources[data.source[i]],
+      event_id: data.event_id[i],
+      type: data.levels[String(data.level[i])] || 'Info',
+      category: data.category[i],
+      message,
+    };
+    // Etichette delle regole (rules.py): presenti solo per gli eventi etichettati
+    const eventTags = tags[String(i)];
+    if (eventTags) logs[i].tags = eventTags.map((index) => tagNames[index]);
+  }
+  return logs;
+}
+
+// === ELABORAZIONE DEGLI ITEM DEL WEBHOOK ===
+const items = $input.all();
+const results = [];
+for (let i = 0; i < items.length; i++) {
+  const item = items[i];
+  const headers = item.json.headers || {};
+  const contentType = String(headers['content-type'] || '');
+
+  // Il Webhook mette il corpo in "body"; le versioni precedenti lo fondevano nel json dell'item
+  let payload = item.json.body && typeof item.json.body === 'object' ? item.json.body : item.json;
+
+  if (contentType.includes('msgpack')) {
+    const raw = await this.helpers.getBinaryDataBuffer(i, 'data');
+    payload = unpack(raw);
+  }
+
+  if (payload.warmup) continue;
+
+  if (payload.logs_columnar) {
+    const { logs_columnar: columnar, ...rest } = payload;
+    payload = { ...rest, logs: fromColumnar(columnar) };
+  }
+
+  results.push({ json: payload });
+}
+return results;
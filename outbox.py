@@ -0,0 +1,494 @@
+"""
+EvLogPyAI - Outbox persistente per gli invii a N8N
+Ogni invio viene prima scritto in una tabella SQLite locale e poi consegnato
+da un thread in background, così un'interruzione di N8N non fa perdere dati
+e non blocca l'interfaccia grafica
+
+Caratteristiche:
+- Coda durevole (SQLite in modalità WAL): sopravvive a crash e riavvii
+- Retry con backoff esponenziale e jitter
+- Circuit breaker: dopo troppi errori consecutivi sospende i tentativi
+- Coalescenza: job piccoli con la stessa chiave vengono uniti in un solo invio
+- Statistiche: profondità della coda e throughput di svuotamento
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Serializzazione dei payload
+import json
+
+# random: Jitter sul backoff per evitare tentativi sincronizzati
+import random
+
+# sqlite3: Database locale usato come coda durevole
+import sqlite3
+
+# threading: Thread di invio e sincronizzazione
+import threading
+
+# time: Orari dei tentativi e misura del throughput
+import time
+
+# collections: Finestra scorrevole degli invii riusciti
+from collections import deque
+
+# requests: Richieste HTTP verso il webhook N8N
+import requests
+
+# wire: Serializzazione del payload nel formato di trasmissione scelto
+from wire import encode_payload, WIRE_JSON
+
+# sampling: Unione dei riepiloghi di campionamento dei job coalescenti
+from sampling import merge_summaries, sample_logs
+
+# correlation: Unione degli incidenti dei job coalescenti
+from correlation import merge_incidents
+
+
+# === STATI DEL CIRCUIT BREAKER ===
+BREAKER_CLOSED = "closed"        # Invii normali
+BREAKER_OPEN = "open"            # N8N considerato irraggiungibile: nessun tentativo
+BREAKER_HALF_OPEN = "half_open"  # Un solo tentativo di prova dopo la pausa
+
+
+class Outbox:
+    """
+    Coda durevole dei payload da inviare, salvata in un file SQLite
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Percorso del file SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   created REAL NOT NULL,
+                   coalesce_key TEXT,
+                   payload TEXT NOT NULL,
+                   size INTEGER NOT NULL,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   next_attempt REAL NOT NULL,
+                   status TEXT NOT NULL DEFAULT 'pending',
+                   last_error TEXT
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt)")
+        self._conn.commit()
+
+    def enqueue(self, payload: dict, coalesce_key: str = None, logs_json: str = None) -> int:
+        """
+        Aggiunge un payload alla coda
+
+        Args:
+            payload (dict): Dati da inviare al webhook
+            coalesce_key (str): Job con la stessa chiave possono essere uniti (None = mai)
+            logs_json (str): Lista "logs" già serializzata (preparata durante l'estrazione):
+                             sostituisce payload["logs"] senza serializzarla di nuovo
+
+        Returns:
+            int: ID del job
+        """
+        if logs_json is None:
+            body = json.dumps(payload, ensure_ascii=False)
+        else:
+            head = json.dumps({key: value for key, value in payload.items() if key != "logs"}, ensure_ascii=False)
+            body = f'{head[:-1]}, "logs": {logs_json}}}' if len(head) > 2 else f'{{"logs": {logs_json}}}'
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (created, coalesce_key, payload, size, next_attempt) VALUES (?, ?, ?, ?, ?)",
+                (now, coalesce_key, body, len(body.encode("utf-8")), now)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def due_jobs(self, now: float, limit: int = 50) -> list:
+        """
+        Restituisce i job pronti per l'invio, dal più vecchio
+
+        Returns:
+            list: Tuple (id, coalesce_key, payload, size, attempts)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, coalesce_key, payload, size, attempts FROM jobs "
+                "WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+    def next_due_time(self):
+        """
+        Returns:
+            float | None: Istante del prossimo tentativo in coda, None se la coda è vuota
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt) FROM jobs WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def mark_sent(self, job_ids: list):
+        """
+        Rimuove dalla coda i job consegnati
+        """
+        with self._lock:
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in job_ids])
+            self._conn.commit()
+
+    def mark_failed(self, job_ids: list, error: str, next_attempt: float, dead: bool = False):
+        """
+        Registra un tentativo fallito e pianifica il successivo
+
+        Args:
+            job_ids (list): Job coinvolti nel tentativo
+            error (str): Descrizione dell'errore
+            next_attempt (float): Istante del prossimo tentativo
+            dead (bool): Se True il job non verrà più ritentato (resta in tabella per ispezione)
+        """
+        status = "dead" if dead else "pending"
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET attempts = attempts + 1, next_attempt = ?, status = ?, last_error = ? WHERE id = ?",
+                [(next_attempt, status, error[:500], i) for i in job_ids]
+            )
+            self._conn.commit()
+
+    def depth(self) -> int:
+        """
+        Returns:
+            int: Numero di job in attesa di invio
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+
+    def pending_bytes(self) -> int:
+        """
+        Returns:
+            int: Dimensione totale (byte) dei payload in attesa
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM jobs WHERE status = 'pending'"
+            ).fetchone()[0]
+
+
+def coalesce_payloads(payloads: list) -> dict:
+    """
+    Unisce più payload della stessa chiave in un unico invio
+
+    I log vengono concatenati senza duplicati; titolo e callback sono quelli
+    del payload più recente, le descrizioni vengono accodate.
+
+    Args:
+        payloads (list): Payload in ordine di inserimento
+
+    Returns:
+        dict: Payload unificato
+    """
+    merged = dict(payloads[-1])
+    seen = set()
+    logs = []
+    for payload in payloads:
+        for log in payload.get("logs", []):
+            key = json.dumps(log, sort_keys=True, ensure_ascii=False)
+            if key not in seen:
+                seen.add(key)
+                logs.append(log)
+
+    descriptions = list(dict.fromkeys(p.get("description", "") for p in payloads))
+    merged["description"] = "\n\n".join(d for d in descriptions if d)
+    merged["logs"] = logs
+    merged["total_logs"] = len(logs)
+    merged["coalesced_jobs"] = len(payloads)
+
+    # La risposta dell'AI riporta tutti gli id: ogni richiesta unita viene considerata servita
+    request_ids = [p["request_id"] for p in payloads if p.get("request_id")]
+    if request_ids:
+        merged["request_id"] = ",".join(dict.fromkeys(request_ids))
+
+    # Riepiloghi di campionamento sommati per strato (vedi sampling.py);
+    # i payload non campionati contano come campioni completi
+    if any(p.get("sampling") for p in payloads):
+        merged["sampling"] = merge_summaries([
+            p.get("sampling") or sample_logs(p.get("logs", []), len(p.get("logs", [])))[1] for p in payloads
+        ])
+
+    # Incidenti correlati: restano i più gravi di tutti i payload (vedi correlation.py)
+    if any(p.get("incidents") for p in payloads):
+        merged["incidents"] = merge_incidents([p["incidents"] for p in payloads if p.get("incidents")])
+    return merged
+
+
+class OutboxSender:
+    """
+    Thread in background che svuota l'outbox verso il webhook N8N
+    """
+
+    def __init__(self, outbox: Outbox, url: str, on_sent=None, on_failed=None,
+                 base_delay: float = 2.0, max_delay: float = 300.0, max_attempts: int = 50,
+                 breaker_threshold: int = 5, breaker_reset: float = 60.0,
+                 coalesce_max_bytes: int = 256 * 1024, timeout=(5, 60), metrics=None,
+                 wire_format: str = WIRE_JSON):
+        """
+        Args:
+            outbox (Outbox): Coda da svuotare
+            url (str): URL del webhook N8N
+            on_sent (callable): on_sent(payload) chiamata dopo ogni invio riuscito
+            on_failed (callable): on_failed(payload, error, dead) chiamata dopo ogni tentativo fallito
+                                  (payload None se il job non è leggibile)
+            base_delay (float): Attesa (secondi) dopo il primo errore, raddoppiata a ogni tentativo
+            max_delay (float): Attesa massima tra due tentativi
+            max_attempts (int): Tentativi dopo i quali il job viene abbandonato
+            breaker_threshold (int): Errori consecutivi che aprono il circuit breaker
+            breaker_reset (float): Secondi di pausa prima del tentativo di prova
+            coalesce_max_bytes (int): Dimensione massima di un invio ottenuto unendo più job
+            timeout (tuple): Timeout (connessione, lettura) della richiesta HTTP
+            metrics (Metrics): Registro in cui misurare le fasi "serialize_payload" e "post"
+            wire_format (str): Formato di trasmissione del payload (json, compact, msgpack)
+        """
+        self.outbox = outbox
+        self.url = url
+        self.on_sent = on_sent
+        self.on_failed = on_failed
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.coalesce_max_bytes = coalesce_max_bytes
+        self.timeout = timeout
+        self.metrics = metrics
+        self.wire_format = wire_format
+
+        # Stato del circuit breaker
+        self.breaker_state = BREAKER_CLOSED
+        self._consecutive_failures = 0
+        self._breaker_opened_at = 0.0
+
+        # Statistiche
+        self.sent_jobs = 0
+        self.sent_bytes = 0
+        self.failed_attempts = 0
+        self._recent_sends = deque(maxlen=100)  # (istante, job, byte)
+
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """
+        Avvia il thread di invio (daemon)
+        """
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Ferma il thread di invio; i job non inviati restano nell'outbox
+        """
+        self._stopping = True
+        self._wakeup.set()
+
+    def notify(self):
+        """
+        Sveglia il thread di invio (chiamata dopo enqueue)
+        """
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Profondità della coda, contatori e throughput di svuotamento recente
+        """
+        throughput_jobs = throughput_bytes = 0.0
+        if len(self._recent_sends) >= 2:
+            span = self._recent_sends[-1][0] - self._recent_sends[0][0]
+            if span > 0:
+                throughput_jobs = sum(s[1] for s in self._recent_sends) / span
+                throughput_bytes = sum(s[2] for s in self._recent_sends) / span
+        return {
+            "queue_depth": self.outbox.depth(),
+            "queue_bytes": self.outbox.pending_bytes(),
+            "sent_jobs": self.sent_jobs,
+            "sent_bytes": self.sent_bytes,
+            "failed_attempts": self.failed_attempts,
+            "breaker_state": self.breaker_state,
+            "drain_jobs_per_sec": throughput_jobs,
+            "drain_bytes_per_sec": throughput_bytes,
+        }
+
+    def _run(self):
+        """
+        Ciclo del thread: invia i job pronti e dorme fino al prossimo tentativo
+        """
+        while not self._stopping:
+            self._wakeup.clear()
+            now = time.time()
+
+            if self.breaker_state == BREAKER_OPEN:
+                if now - self._breaker_opened_at >= self.breaker_reset:
+                    self.breaker_state = BREAKER_HALF_OPEN
+                    print("🔌 Circuit breaker N8N: tentativo di prova")
+                else:
+                    self._wakeup.wait(self._breaker_opened_at + self.breaker_reset - now)
+                    continue
+
+            try:
+                jobs = self.outbox.due_jobs(now)
+                if jobs:
+                    for group in self._group_jobs(jobs):
+                        self._send_group(group)
+                        if self._stopping or self.breaker_state == BREAKER_OPEN:
+                            break
+                    continue
+            except sqlite3.Error as e:
+                # Outbox momentaneamente non accessibile (es. disco pieno): il thread non deve morire
+                print(f"⚠️ Outbox: errore del database, nuovo tentativo tra {self.base_delay:.0f}s: {e}")
+                self._wakeup.wait(self.base_delay)
+                continue
+
+            # Nessun job pronto: attende il prossimo tentativo pianificato o un nuovo enqueue
+            next_due = self.outbox.next_due_time()
+            self._wakeup.wait(None if next_due is None else max(0.0, next_due - now))
+
+    def _group_jobs(self, jobs: list) -> list:
+        """
+        Raggruppa i job pronti: quelli con la stessa chiave vengono uniti finché restano piccoli
+
+        Returns:
+            list: Liste di job da inviare insieme, in ordine di inserimento
+        """
+        groups = []
+        open_groups = {}
+        for job in jobs:
+            key, size = job[1], job[3]
+            group = open_groups.get(key) if key is not None else None
+            if group is not None and group["size"] + size <= self.coalesce_max_bytes:
+                group["jobs"].append(job)
+                group["size"] += size
+                continue
+            group = {"jobs": [job], "size": size}
+            groups.append(group)
+            if key is not None:
+                open_groups[key] = group
+        return [g["jobs"] for g in groups]
+
+    def _send_group(self, group: list):
+        """
+        Invia un gruppo di job come singola richiesta HTTP e aggiorna coda e circuit breaker
+        """
+        job_ids = [job[0] for job in group]
+        started = time.perf_counter()
+        try:
+            payloads = [json.loads(job[2]) for job in group]
+            payload = payloads[0] if len(payloads) == 1 else coalesce_payloads(payloads)
+            body, content_type = encode_payload(payload, self.wire_format)
+        except Exception as e:
+            self._reject_group(group, e)
+            return
+        self._observe("serialize_payload", started, len(body), payload.get("total_logs", 0))
+
+        try:
+            started = time.perf_counter()
+            try:
+                response = requests.post(
+                    self.url,
+                    data=body,
+                    headers={"Content-Type": content_type},
+                    timeout=self.timeout
+                )
+            finally:
+                self._observe("post", started, len(body), len(group))
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(f"N8N ha risposto con codice {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            self._record_failure(group, payload, e)
+            return
+
+        # === INVIO RIUSCITO ===
+        try:
+            self.outbox.mark_sent(job_ids)
+        except sqlite3.Error as e:
+            # N8N ha già ricevuto i dati: al più il job verrà reinviato
+            print(f"⚠️ Outbox: invio riuscito ma non registrato: {e}")
+        self._consecutive_failures = 0
+        if self.breaker_state != BREAKER_CLOSED:
+            print("🔌 Circuit breaker N8N: chiuso")
+        self.breaker_state = BREAKER_CLOSED
+        self.sent_jobs += len(group)
+        self.sent_bytes += len(body)
+        self._recent_sends.append((time.time(), len(group), len(body)))
+        print(f"✅ Outbox: inviati {len(group)} job ({len(body)} byte) a N8N")
+        self._notify(self.on_sent, payload)
+
+    def _reject_group(self, group: list, error: Exception):
+        """
+        Job il cui payload non si può leggere o codificare: nessun nuovo tentativo lo cambierebbe
+
+        Un gruppo di più job viene riprovato job per job, così un solo job illeggibile non
+        trascina con sé gli altri; il job illeggibile viene abbandonato subito (dead-letter),
+        senza contare come errore di N8N per il circuit breaker.
+        """
+        if len(group) > 1:
+            for job in group:
+                self._send_group([job])
+            return
+        self.failed_attempts += 1
+        error = f"payload non valido: {error}"
+        try:
+            self.outbox.mark_failed([group[0][0]], error, time.time(), dead=True)
+        except sqlite3.Error as e:
+            print(f"⚠️ Outbox: job {group[0][0]} non registrato come abbandonato: {e}")
+        print(f"❌ Outbox: job {group[0][0]} abbandonato, {error}")
+        self._notify(self.on_failed, None, error, True)
+
+    @staticmethod
+    def _notify(callback, *args):
+        """Chiama on_sent / on_failed: un errore dell'applicazione non deve fermare il thread di invio"""
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"⚠️ Outbox: errore nella notifica dell'invio: {e}")
+
+    def _observe(self, stage: str, started: float, nbytes: int, items: int):
+        """
+        Registra la durata di una fase nel registro metriche (se presente)
+        """
+        if self.metrics:
+            self.metrics.observe(stage, time.perf_counter() - started, nbytes=nbytes, items=items)
+
+    def _record_failure(self, group: list, payload: dict, error: Exception):
+        """
+        Pianifica il prossimo tentativo con backoff esponenziale e aggiorna il circuit breaker
+        """
+        self.failed_attempts += 1
+        self._consecutive_failures += 1
+
+        attempts = max(job[4] for job in group) + 1
+        dead = attempts >= self.max_attempts
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        try:
+            self.outbox.mark_failed([job[0] for job in group], str(error), time.time() + delay, dead=dead)
+        except sqlite3.Error as e:
+            print(f"⚠️ Outbox: tentativo fallito non registrato: {e}")
+
+        print(f"⚠️ Outbox: invio fallito (tentativo {attempts}): {error}")
+        if dead:
+            print(f"❌ Outbox: job {[job[0] for job in group]} abbandonati dopo {attempts} tentativi")
+
+        if self.breaker_state == BREAKER_HALF_OPEN or self._consecutive_failures >= self.breaker_threshold:
+            if self.breaker_state != BREAKER_OPEN:
+                print(f"🔌 Circuit breaker N8N: aperto per {self.breaker_reset:.0f}s")
+            self.breaker_state = BREAKER_OPEN
+            self._breaker_opened_at = time.time()
+
+        self._notify(self.on_failed, payload, str(error), dead)
@@ -0,0 +1,31 @@
+"""
+EvLogPyAI - Percorsi dei dati locali
+Cartella in cui l'applicazione conserva i propri dati persistenti (code, indici, archivi)
+"""
+
+# os: Libreria per operazioni sul sistema operativo (percorsi, cartelle)
+import os
+
+
+# === CARTELLA DATI APPLICAZIONE ===
+# Su Windows: %LOCALAPPDATA%\EvLogPyAI (es. C:\Users\NomeUtente\AppData\Local\EvLogPyAI)
+# In assenza di LOCALAPPDATA usa una cartella nascosta nella home dell'utente
+APP_DATA_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA", os.path.join(os.path.expanduser("~"), ".evlogpyai")),
+    "EvLogPyAI"
+)
+
+
+def app_data_path(*parts: str) -> str:
+    """
+    Restituisce un percorso dentro la cartella dati, creando le cartelle intermedie
+
+    Args:
+        *parts (str): Componenti del percorso relativi ad APP_DATA_DIR (es. "outbox.db")
+
+    Returns:
+        str: Percorso completo
+    """
+    path = os.path.join(APP_DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,143 @@
+"""
+EvLogPyAI - Pipeline a Fasi
+Elaborazione a lotti con fasi sovrapposte: mentre l'estrazione legge gli eventi,
+il report viene scritto e il corpo dell'invio preparato in thread separati
+
+Ogni fase ha una coda limitata: se una fase è più lenta delle altre la lettura
+rallenta (backpressure) invece di accumulare tutti gli eventi in memoria. Il tempo
+totale tende a quello della fase più lenta invece che alla somma delle fasi.
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# queue: Code limitate tra la lettura e le fasi
+import queue
+
+# threading: Un thread per fase
+import threading
+
+# time: Misura del tempo di lavoro di ogni fase
+import time
+
+
+# Lotti in attesa per fase prima che la lettura si fermi
+QUEUE_BATCHES = 8
+
+# Marcatore di fine flusso
+_END = object()
+
+
+class Stage:
+    """
+    Fase della pipeline: un thread che elabora i lotti ricevuti dalla sua coda
+    """
+
+    def __init__(self, name: str, handler, size=None, maxsize: int = QUEUE_BATCHES):
+        """
+        Args:
+            name (str): Nome della fase nelle metriche
+            handler (callable): handler(lotto) chiamata per ogni lotto, nell'ordine di arrivo
+            size (callable): size() restituisce i byte prodotti dalla fase (per le metriche)
+            maxsize (int): Lotti in coda prima che put() si blocchi
+        """
+        self.name = name
+        self.handler = handler
+        self.size = size
+        self.queue = queue.Queue(maxsize)
+        self.busy_seconds = 0.0
+        self.items = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name=f"evlogpyai-{name}", daemon=True)
+
+    def _run(self):
+        """Loop della fase: termina al marcatore di fine flusso"""
+        while True:
+            batch = self.queue.get()
+            if batch is _END:
+                return
+            # Dopo un errore i lotti successivi vengono solo scartati, senza bloccare la lettura
+            if self.error is not None:
+                continue
+            started = time.perf_counter()
+            try:
+                self.handler(batch)
+            except Exception as e:
+                self.error = e
+            self.busy_seconds += time.perf_counter() - started
+            self.items += len(batch)
+
+
+class Pipeline:
+    """
+    Distribuisce ogni lotto a tutte le fasi, che lavorano in parallelo tra loro
+
+    Uso:
+        with Pipeline([Stage("write_report", writer.write_events), ...]) as pipeline:
+            extract(..., on_batch=pipeline.put)
+    All'uscita dal blocco attende lo svuotamento delle code e rilancia il primo errore di una fase.
+    """
+
+    def __init__(self, stages: list, metrics=None):
+        """
+        Args:
+            stages (list): Fasi che ricevono ogni lotto
+            metrics (Metrics): Registro in cui annotare il tempo di lavoro di ogni fase
+        """
+        self.stages = stages
+        self.metrics = metrics
+        self.wait_seconds = 0.0
+
+    def start(self):
+        """Avvia i thread delle fasi"""
+        for stage in self.stages:
+            stage._thread.start()
+
+    def put(self, batch: list):
+        """
+        Consegna un lotto a tutte le fasi; si blocca se la coda di una fase è piena
+
+        Args:
+            batch (list): Lotto di eventi (le fasi non devono modificarlo)
+        """
+        started = time.perf_counter()
+        for stage in self.stages:
+            stage.queue.put(batch)
+        self.wait_seconds += time.perf_counter() - started
+
+    def close(self):
+        """
+        Chiude il flusso e attende la fine di tutte le fasi
+
+        Raises:
+            Exception: Il primo errore sollevato da una fase
+        """
+        for stage in self.stages:
+            stage.queue.put(_END)
+        for stage in self.stages:
+            stage._thread.join()
+
+        if self.metrics:
+            for stage in self.stages:
+                nbytes = stage.size() if stage.size and stage.error is None else 0
+                self.metrics.observe(stage.name, stage.busy_seconds, nbytes=nbytes, items=stage.items)
+            # Tempo in cui la lettura è rimasta ferma perché una coda era piena
+            self.metrics.observe("pipeline_backpressure", self.wait_seconds)
+
+        for stage in self.stages:
+            if stage.error is not None:
+                raise stage.error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # L'errore della lettura ha la precedenza: le fasi vengono solo fermate
+            try:
+                self.close()
+            except Exception:
+                pass
+        return False
@@ -0,0 +1,261 @@
+"""
+EvLogPyAI - Modalità profiling
+Registra dove vengono spesi CPU e memoria durante un'esecuzione e scrive un
+bundle da analizzare offline ("ci ha messo un'eternità" sulla macchina dell'utente)
+
+Contenuto del bundle:
+- cpu.pstats: statistiche cProfile di tutti i thread (apribili con pstats/snakeviz)
+- cpu_top.txt: le funzioni più costose in formato testo
+- stacks.collapsed: stack campionati in formato "collapsed" (flamegraph.pl, speedscope)
+- memory_top.txt: principali allocatori tracemalloc a ogni confine di fase
+- summary.json: durata, metriche per fase e informazioni sull'ambiente
+
+Con il profiling disattivato nessuna di queste classi viene istanziata:
+l'overhead è nullo.
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# cProfile / pstats: Profilazione deterministica della CPU
+import cProfile
+import pstats
+
+# io: Buffer per il report testuale di pstats
+import io
+
+# json: Scrittura del riepilogo
+import json
+
+# os / sys / platform: Percorsi, frame dei thread e informazioni sull'ambiente
+import os
+import platform
+import sys
+
+# threading: Hook di profiling per i nuovi thread e thread di campionamento
+import threading
+
+# time: Intervallo di campionamento e durata dell'esecuzione
+import time
+
+# tracemalloc: Snapshot delle allocazioni di memoria
+import tracemalloc
+
+# collections: Conteggio degli stack campionati
+from collections import Counter
+
+# datetime: Nome della cartella del bundle
+from datetime import datetime
+
+
+# Da Python 3.12 cProfile usa sys.monitoring: un solo profiler attivo per processo,
+# che registra già le chiamate di tutti i thread (un secondo enable() solleva ValueError)
+_PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """
+    Profila un'intera esecuzione (GUI o headless) e scrive il bundle alla fine
+    """
+
+    def __init__(self, output_dir: str, sample_interval: float = 0.01, memory_frames: int = 25,
+                 top_n: int = 30):
+        """
+        Args:
+            output_dir (str): Cartella in cui creare il bundle
+            sample_interval (float): Intervallo (secondi) del campionamento degli stack
+            memory_frames (int): Profondità degli stack registrati da tracemalloc
+            top_n (int): Righe mostrate nei report testuali
+        """
+        self.bundle_dir = os.path.join(output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self.sample_interval = sample_interval
+        self.memory_frames = memory_frames
+        self.top_n = top_n
+
+        self._profiles = []
+        self._profiles_lock = threading.Lock()
+        self._stacks = Counter()
+        self._memory_reports = []
+        self._previous_snapshot = None
+        self._sampling = False
+        self._sampler = None
+        self._started = None
+        self._metrics = None
+
+    # === AVVIO E ARRESTO ===
+
+    def start(self):
+        """
+        Avvia cProfile (thread corrente e thread futuri), tracemalloc e il campionatore di stack
+        """
+        self._started = time.perf_counter()
+        tracemalloc.start(self.memory_frames)
+
+        # Il campionatore parte per primo, così non viene profilato da cProfile
+        self._sampling = True
+        self._sampler = threading.Thread(target=self._sample_stacks, name="evlogpyai-sampler", daemon=True)
+        self._sampler.start()
+
+        # Fino a Python 3.11 cProfile lavora per thread: ogni nuovo thread crea il proprio
+        # profiler al primo evento
+        if not _PROCESS_WIDE_PROFILER:
+            threading.setprofile(self._enable_in_thread)
+        self._new_profile().enable()
+
+    def attach(self, metrics):
+        """
+        Collega il profiler al registro metriche: a ogni fase completata
+        viene scattato uno snapshot tracemalloc
+
+        Args:
+            metrics (Metrics): Registro delle metriche dell'applicazione
+        """
+        self._metrics = metrics
+        original_observe = metrics.observe
+
+        def observe(name, seconds, nbytes=0, items=0):
+            original_observe(name, seconds, nbytes=nbytes, items=items)
+            self.snapshot(name)
+
+        # Sostituisce il metodo solo su questa istanza: senza profiling resta l'originale
+        metrics.observe = observe
+
+    def snapshot(self, label: str):
+        """
+        Registra i principali allocatori di memoria (e la differenza dal precedente snapshot)
+
+        Args:
+            label (str): Nome del confine di fase
+        """
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        lines = [f"=== {label} @ {time.perf_counter() - self._started:.3f}s "
+                 f"(corrente {current / 1024:.1f} KiB, picco {peak / 1024:.1f} KiB) ==="]
+        lines.append("-- Principali allocatori --")
+        for stat in snapshot.statistics("lineno")[:self.top_n]:
+            lines.append(f"  {stat}")
+        if self._previous_snapshot is not None:
+            lines.append("-- Differenza dallo snapshot precedente --")
+            for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[:self.top_n]:
+                lines.append(f"  {stat}")
+        self._memory_reports.append("\n".join(lines))
+        self._previous_snapshot = snapshot
+
+    def stop(self) -> str:
+        """
+        Ferma la profilazione e scrive il bundle
+
+        Returns:
+            str: Cartella del bundle
+        """
+        self._sampling = False
+        if not _PROCESS_WIDE_PROFILER:
+            threading.setprofile(None)
+        for profile in self._profiles:
+            profile.disable()
+        if self._sampler:
+            self._sampler.join(timeout=1)
+        self.snapshot("fine esecuzione")
+        tracemalloc.stop()
+
+        os.makedirs(self.bundle_dir, exist_ok=True)
+        self._write_cpu()
+        self._write_stacks()
+        self._write_text("memory_top.txt", "\n\n".join(self._memory_reports) + "\n")
+        self._write_summary()
+
+        print(f"🔬 Bundle di profiling salvato in: {self.bundle_dir}")
+        return self.bundle_dir
+
+    # === PROFILAZIONE CPU ===
+
+    def _new_profile(self) -> cProfile.Profile:
+        profile = cProfile.Profile()
+        with self._profiles_lock:
+            self._profiles.append(profile)
+        return profile
+
+    def _enable_in_thread(self, frame, event, arg):
+        """
+        Hook chiamato al primo evento di ogni nuovo thread: sostituisce sé stesso con cProfile
+
+        Se cProfile non può partire (altro strumento di profiling attivo) il thread resta coperto
+        solo dal campionatore di stack: il profiling non deve mai impedire a un thread di lavorare.
+        """
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return
+        with self._profiles_lock:
+            self._profiles.append(profile)
+
+    def _write_cpu(self):
+        stats = None
+        for profile in self._profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # Profiler di un thread che non ha registrato nessuna chiamata
+                continue
+        if stats is None:
+            return
+
+        stats.dump_stats(os.path.join(self.bundle_dir, "cpu.pstats"))
+
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        stats.sort_stats("tottime").print_stats(self.top_n)
+        self._write_text("cpu_top.txt", buffer.getvalue())
+
+    # === CAMPIONAMENTO STACK ===
+
+    def _sample_stacks(self):
+        """
+        Campiona periodicamente lo stack di tutti i thread (formato collapsed per i flame graph)
+        """
+        own_id = threading.get_ident()
+        names = {}
+        while self._sampling:
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            time.sleep(self.sample_interval)
+
+    def _write_stacks(self):
+        lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+        self._write_text("stacks.collapsed", "\n".join(lines) + "\n")
+
+    # === RIEPILOGO ===
+
+    def _write_summary(self):
+        summary = {
+            "duration_seconds": time.perf_counter() - self._started,
+            "python": sys.version,
+            "platform": platform.platform(),
+            "threads_profiled": len(self._profiles),
+            "stack_samples": sum(self._stacks.values()),
+            "sample_interval_seconds": self.sample_interval,
+            "metrics": self._metrics.to_json() if self._metrics else None,
+        }
+        self._write_text("summary.json", json.dumps(summary, indent=2, ensure_ascii=False, default=str))
+
+    def _write_text(self, name: str, content: str):
+        with open(os.path.join(self.bundle_dir, name), "w", encoding="utf-8") as f:
+            f.write(content)
@@ -0,0 +1,261 @@
+"""
+EvLogPyAI - Report Testuale
+Scrittura del report sul Desktop a lotti: il file viene scritto mentre gli eventi
+vengono ancora letti (vedi pipeline.py), senza attendere la lista completa
+
+Il formato del file è quello di sempre (letto anche da history.parse_report):
+l'unico dato noto solo alla fine, il numero di righe estratte, viene scritto in un
+campo a larghezza fissa e aggiornato alla chiusura.
+
+Il testo di ogni evento (format_event) è lo stesso che archive.py conserva compresso:
+un report archiviato viene ricostruito identico scrivendo i testi già pronti.
+
+Gli eventi con "message_ref" portano solo l'anteprima del messaggio: nel report va il
+testo completo, letto a lotti dall'archivio dei messaggi (blobstore.py).
+"""
+
+import os
+from datetime import datetime
+
+
+# Larghezza del campo "RIGHE ESTRATTE": il valore viene riscritto alla chiusura
+_COUNT_WIDTH = 10
+
+
+def report_path(category: str, title: str) -> tuple:
+    """
+    Determina nome e percorso del report sul Desktop
+
+    Args:
+        category (str): Categoria di log selezionata
+        title (str): Titolo del problema
+
+    Returns:
+        tuple: (nome file, percorso completo)
+    """
+    # === DETERMINAZIONE PERCORSO DESKTOP ===
+    # os.path.expanduser("~") ottiene la cartella home dell'utente corrente
+    # es. "C:\Users\NomeUtente" su Windows
+    # os.path.join() combina il percorso con "Desktop"
+    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
+
+    # === GENERAZIONE NOME FILE ===
+    # Crea un timestamp nel formato AAAAMMGG_HHMMSS (es. 20260202_153045)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Sanitizza il titolo rimuovendo caratteri non validi per i nomi file
+    # Mantiene solo lettere, numeri, spazi, trattini e underscore
+    # [:50] limita la lunghezza a 50 caratteri per evitare nomi troppo lunghi
+    safe_title = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in title)[:50]
+    # Anche la categoria: i canali di "Registri applicazioni e servizi" contengono "/"
+    safe_category = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in category)
+
+    # Compone il nome del file finale
+    # Formato: EvLog_[Categoria]_[Titolo]_[Timestamp].txt
+    filename = f"EvLog_{safe_category}_{safe_title}_{timestamp}.txt"
+
+    # Crea il percorso completo del file combinando desktop + nome file
+    return filename, os.path.join(desktop, filename)
+
+
+def format_event(log: dict, message: str = None) -> str:
+    """
+    Testo di un evento nel report, senza la riga "--- Evento #N ---" (che dipende dalla posizione)
+
+    Args:
+        log (dict): Evento nel formato dell'applicazione
+        message (str): Messaggio completo (default: quello dell'evento)
+
+    Returns:
+        str: Righe dell'evento, compresa la riga vuota finale
+    """
+    # Scrive tutti i dettagli dell'evento in modo strutturato
+    parts = [
+        f"  Timestamp: {log['timestamp']}\n",    # Data/ora evento
+        f"  Sorgente:  {log['source']}\n",       # Applicazione/servizio che ha generato l'evento
+        f"  Event ID:  {log['event_id']}\n",     # ID univoco dell'evento
+        f"  Tipo:      {log['type']}\n",         # Tipo (Errore, Avviso, Info, ecc.)
+        f"  Categoria: {log['category']}\n",     # Categoria numerica
+    ]
+    if log.get('tags'):
+        parts.append(f"  Regole:    {', '.join(log['tags'])}\n")  # Regole di rilevazione (vedi rules.py)
+    parts.append("  Messaggio:\n")
+
+    # === FORMATTAZIONE MESSAGGIO ===
+    # Il messaggio può contenere più righe, quindi le splitta
+    # Indenta ogni riga con 4 spazi per migliore leggibilità
+    for line in (log['message'] if message is None else message).split('\n'):
+        parts.append(f"    {line}\n")
+
+    # Riga vuota tra un evento e l'altro per separazione visiva
+    parts.append("\n")
+    return "".join(parts)
+
+
+def format_events(logs: list, messages=None) -> list:
+    """
+    Testi di un lotto di eventi (format_event), con i messaggi completi se archiviati
+
+    Args:
+        logs (list): Eventi nel formato dell'applicazione
+        messages (MessageStore): Archivio dei messaggi completi (None = anteprima degli eventi)
+
+    Returns:
+        list: Testi nell'ordine degli eventi
+    """
+    if messages is None or not any(log.get("message_ref") for log in logs):
+        return [format_event(log) for log in logs]
+    return [format_event(log, message) for log, message in zip(logs, messages.full_messages(logs))]
+
+
+class ReportWriter:
+    """
+    Report testuale scritto in modo incrementale
+
+    Uso: write_events() per ogni lotto, poi close(). Il file viene creato al primo
+    lotto: un'estrazione senza eventi non lascia file vuoti sul Desktop.
+    """
+
+    def __init__(self, filepath: str, title: str, category: str, category_windows: str,
+                 description: str, num_rows: int, created: datetime = None, messages=None):
+        """
+        Args:
+            filepath (str): Percorso del report
+            title (str): Titolo del problema
+            category (str): Categoria di log selezionata
+            category_windows (str): Nome tecnico Windows della categoria
+            description (str): Descrizione dettagliata del problema
+            num_rows (int): Numero di righe richieste dall'utente
+            created (datetime): Data dell'estrazione (default: adesso; per i report ricostruiti dall'archivio)
+            messages (MessageStore): Archivio dei messaggi completi (None = anteprima degli eventi)
+        """
+        self.filepath = filepath
+        self.title = title
+        self.category = category
+        self.category_windows = category_windows
+        self.description = description
+        self.num_rows = num_rows
+        self.created = created
+        self.messages = messages
+        self.count = 0
+        self._file = None
+        self._count_offset = None
+
+    def _open(self):
+        """Crea il file e scrive l'intestazione"""
+        # Encoding UTF-8 (supporta caratteri speciali ed emoji)
+        f = self._file = open(self.filepath, "w", encoding="utf-8")
+
+        # === INTESTAZIONE FILE ===
+        # Scrive una riga di separazione (80 caratteri "=")
+        f.write("=" * 80 + "\n")
+        # Titolo del report centrato
+        f.write("  EvLogPyAI - Report Log Eventi Windows\n")
+        f.write("=" * 80 + "\n\n")
+
+        # === INFORMAZIONI ESTRAZIONE ===
+        # Scrive i metadati dell'estrazione con emoji per migliore leggibilità
+        f.write(f"📋 TITOLO: {self.title}\n")
+        # Mostra sia il nome italiano che quello tecnico Windows della categoria
+        f.write(f"📁 CATEGORIA: {self.category} ({self.category_windows})\n")
+        # Data e ora dell'estrazione nel formato GG/MM/AAAA HH:MM:SS
+        f.write(f"📅 DATA ESTRAZIONE: {(self.created or datetime.now()).strftime('%d/%m/%Y %H:%M:%S')}\n")
+        # Numero di righe richieste dall'utente
+        f.write(f"📊 RIGHE RICHIESTE: {self.num_rows}\n")
+        # Numero effettivo di righe estratte (potrebbe essere minore se non ci sono abbastanza log):
+        # noto solo alla fine, intanto viene riservato un campo a larghezza fissa
+        f.write("📊 RIGHE ESTRATTE: ")
+        self._count_offset = f.tell()
+        f.write(" " * _COUNT_WIDTH + "\n\n")
+
+        # === SEZIONE DESCRIZIONE ISSUE ===
+        # Riga di separazione (80 trattini)
+        f.write("-" * 80 + "\n")
+        f.write("  DESCRIZIONE ISSUE\n")
+        f.write("-" * 80 + "\n")
+        # Scrive la descrizione completa del problema
+        f.write(f"{self.description}\n\n")
+
+        # === SEZIONE LOG EVENTI ===
+        f.write("=" * 80 + "\n")
+        f.write("  LOG EVENTI\n")
+        f.write("=" * 80 + "\n\n")
+
+    def write_events(self, logs: list):
+        """
+        Aggiunge un lotto di eventi al report
+
+        Args:
+            logs (list): Lista di dizionari contenenti gli eventi log
+        """
+        if self._file is None:
+            self._open()
+        f = self._file
+
+        # === CICLO DI SCRITTURA EVENTI ===
+        # La numerazione prosegue da un lotto all'altro
+        for i, text in enumerate(format_events(logs, self.messages), self.count + 1):
+            # Intestazione dell'evento con numero progressivo, poi i dettagli (vedi format_event)
+            f.write(f"--- Evento #{i} ---\n")
+            f.write(text)
+        self.count += len(logs)
+
+    def write_formatted(self, texts):
+        """
+        Aggiunge eventi già formattati con format_event (ricostruzione dall'archivio)
+
+        Args:
+            texts: Iterabile dei testi degli eventi, nell'ordine del report
+        """
+        if self._file is None:
+            self._open()
+        # Scritture raggruppate: migliaia di testi brevi costano meno in un'unica write
+        parts = []
+        for text in texts:
+            self.count += 1
+            parts.append(f"--- Evento #{self.count} ---\n")
+            parts.append(text)
+            if len(parts) >= 4096:
+                self._file.write("".join(parts))
+                parts.clear()
+        self._file.write("".join(parts))
+
+    def tell(self) -> int:
+        """Byte scritti finora nel report"""
+        return self._file.tell() if self._file is not None else 0
+
+    def close(self) -> int:
+        """
+        Scrive la chiusura del report e il numero di righe estratte
+
+        Returns:
+            int: Dimensione del file in byte (0 se non è stato scritto nessun evento)
+        """
+        f = self._file
+        if f is None:
+            return 0
+        try:
+            # === CHIUSURA FILE ===
+            # Riga finale di separazione
+            f.write("=" * 80 + "\n")
+            f.write("  Fine Report\n")
+            f.write("=" * 80 + "\n")
+            size = f.tell()
+
+            # Riscrive il campo riservato nell'intestazione
+            f.seek(self._count_offset)
+            f.write(str(self.count).ljust(_COUNT_WIDTH))
+            return size
+        finally:
+            f.close()
+            self._file = None
+
+    def abort(self):
+        """Chiude ed elimina il report incompleto (errore o estrazione interrotta)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self.filepath)
+            except OSError:
+                pass
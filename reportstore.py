@@ -0,0 +1,623 @@
+"""
+EvLogPyAI - Archivio dei Report HTML
+Le risposte dell'AI (e della knowledge base) salvate in una cartella dei report e servite
+dal server locale invece che da file temporanei sparsi
+
+Ogni report è un file <id>.html in %LOCALAPPDATA%\\EvLogPyAI\\reports, registrato in un
+indice SQLite (data, titolo, categoria, tipo, dimensione). Il foglio di stile è uno solo,
+in static/ con l'impronta del contenuto nel nome: il browser lo scarica una volta e lo
+tiene in cache per un anno; le pagine contengono solo la risposta.
+
+Il server callback (callback.py) serve su /reports/:
+- /reports/                   storico paginato, dal più recente (?page=N)
+- /reports/<id>.html          un report
+- /reports/static/<file>      foglio di stile condiviso (Cache-Control immutable)
+con compressione gzip se il browser la accetta, ETag e risposte 304 alle richieste
+condizionali. La pagina dello storico legge solo le righe della pagina richiesta
+dall'indice, quindi resta immediata anche con migliaia di report.
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# gzip: Compressione delle pagine servite
+import gzip
+
+# hashlib: Impronta del foglio di stile nel nome del file
+import hashlib
+
+# html: Escape dei testi inseriti nelle pagine
+import html
+
+# os: Percorsi dei report
+import os
+
+# re: Validazione degli id dei report nei percorsi richiesti
+import re
+
+# sqlite3: Indice dei report
+import sqlite3
+
+# threading: Il server serve le pagine da più thread mentre la GUI salva nuovi report
+import threading
+
+# time: Istante di creazione dei report
+import time
+
+# uuid: Parte casuale dell'id dei report
+import uuid
+
+# collections: Cache delle pagine compresse
+from collections import OrderedDict
+
+# datetime: Data dei report
+from datetime import datetime
+
+# urllib.parse: Parametri della pagina dello storico
+from urllib.parse import parse_qs
+
+# paths: Cartella dati dell'applicazione
+from paths import app_data_path
+
+
+# === CONFIGURAZIONE ===
+
+# Report per pagina dello storico
+PAGE_SIZE = 50
+
+# Sotto questa dimensione la compressione non conviene
+GZIP_MIN_BYTES = 1024
+
+# Pagine compresse tenute in memoria (i report non cambiano dopo il salvataggio)
+GZIP_CACHE_ENTRIES = 64
+
+# Cache del foglio di stile: un anno (il nome cambia se cambia il contenuto)
+STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Report e storico: sempre riconvalidati con l'ETag (304 se non sono cambiati)
+PAGE_CACHE_CONTROL = "no-cache"
+
+# Formato degli id dei report (data, ora e parte casuale)
+_REPORT_ID = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{6}$")
+
+
+# === FOGLIO DI STILE CONDIVISO ===
+
+REPORT_CSS = """* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    background: linear-gradient(135deg, #1F2937 0%, #111827 100%);
+    min-height: 100vh;
+    padding: 40px 20px;
+    color: #F9FAFB;
+}
+
+.container {
+    max-width: 900px;
+    margin: 0 auto;
+}
+
+.header {
+    background: linear-gradient(135deg, #10B981 0%, #059669 100%);
+    padding: 30px;
+    border-radius: 15px 15px 0 0;
+    text-align: center;
+    box-shadow: 0 4px 20px rgba(16, 185, 129, 0.3);
+}
+
+.header h1 {
+    color: #1F2937;
+    font-size: 28px;
+    margin-bottom: 10px;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    gap: 10px;
+}
+
+.header .subtitle {
+    color: #1F2937;
+    opacity: 0.8;
+    font-size: 14px;
+}
+
+.meta-info {
+    background: #374151;
+    padding: 20px 30px;
+    display: flex;
+    justify-content: space-between;
+    flex-wrap: wrap;
+    gap: 15px;
+    border-bottom: 1px solid #4B5563;
+}
+
+.meta-item {
+    display: flex;
+    align-items: center;
+    gap: 8px;
+}
+
+.meta-item .icon {
+    font-size: 18px;
+}
+
+.meta-item .label {
+    color: #9CA3AF;
+    font-size: 12px;
+    text-transform: uppercase;
+}
+
+.meta-item .value {
+    color: #F9FAFB;
+    font-weight: 600;
+}
+
+.content {
+    background: #374151;
+    padding: 30px;
+    border-radius: 0 0 15px 15px;
+    box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
+}
+
+.section-title {
+    color: #10B981;
+    font-size: 18px;
+    margin-bottom: 20px;
+    padding-bottom: 10px;
+    border-bottom: 2px solid #10B981;
+    display: flex;
+    align-items: center;
+    gap: 10px;
+}
+
+.ai-response {
+    background: #1F2937;
+    padding: 25px;
+    border-radius: 10px;
+    border-left: 4px solid #10B981;
+    line-height: 1.8;
+    font-size: 15px;
+    white-space: pre-wrap;
+    word-wrap: break-word;
+}
+
+.ai-response p {
+    margin-bottom: 15px;
+}
+
+.footer {
+    text-align: center;
+    margin-top: 30px;
+    color: #6B7280;
+    font-size: 13px;
+}
+
+.footer a {
+    color: #10B981;
+    text-decoration: none;
+}
+
+.footer a:hover {
+    text-decoration: underline;
+}
+
+@media (max-width: 600px) {
+    .header h1 {
+        font-size: 22px;
+    }
+
+    .meta-info {
+        flex-direction: column;
+    }
+
+    .content {
+        padding: 20px;
+    }
+}
+
+/* Storico dei report */
+.nav {
+    margin-bottom: 15px;
+    font-size: 14px;
+}
+
+.nav a {
+    color: #10B981;
+    text-decoration: none;
+}
+
+.history {
+    width: 100%;
+    border-collapse: collapse;
+    font-size: 14px;
+}
+
+.history th {
+    color: #9CA3AF;
+    font-size: 12px;
+    text-transform: uppercase;
+    text-align: left;
+    padding: 10px;
+    border-bottom: 2px solid #10B981;
+}
+
+.history td {
+    padding: 10px;
+    border-bottom: 1px solid #4B5563;
+}
+
+.history a {
+    color: #F9FAFB;
+    text-decoration: none;
+}
+
+.history a:hover {
+    color: #10B981;
+}
+
+.pages {
+    display: flex;
+    justify-content: space-between;
+    margin-top: 20px;
+    color: #9CA3AF;
+}
+
+.pages a {
+    color: #10B981;
+    text-decoration: none;
+}
+"""
+
+# Nome del file con l'impronta del contenuto: un nuovo stile non viene mai confuso con quello in cache
+CSS_HASH = hashlib.sha1(REPORT_CSS.encode("utf-8")).hexdigest()[:10]
+CSS_NAME = f"report.{CSS_HASH}.css"
+
+
+def _page(page_title: str, heading: str, subtitle: str, body: str, nav: str = "") -> str:
+    """Pagina completa con intestazione, foglio di stile condiviso e piè di pagina"""
+    return f'''<!DOCTYPE html>
+<html lang="it">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html.escape(page_title)}</title>
+    <link rel="stylesheet" href="static/{CSS_NAME}">
+</head>
+<body>
+    <div class="container">
+        {nav}
+        <div class="header">
+            <h1>{html.escape(heading)}</h1>
+            <div class="subtitle">{subtitle}</div>
+        </div>
+{body}
+        <div class="footer">
+            <p>Generato da <strong>EvLogPyAI</strong> con tecnologia <a href="#">Ollama AI</a></p>
+            <p>© 2026 - Tutti i diritti riservati</p>
+        </div>
+    </div>
+</body>
+</html>'''
+
+
+def render_report(ai_output: str, title: str = "Analisi Log", category: str = "N/D",
+                  heading: str = "🤖 EvLogPyAI - Analisi AI", timestamp: str = None) -> str:
+    """
+    Pagina HTML di una risposta dell'AI
+
+    Args:
+        ai_output (str): Testo della risposta
+        title (str): Titolo del problema
+        category (str): Categoria di log
+        heading (str): Intestazione della pagina (es. per la risposta della knowledge base)
+        timestamp (str): Data dell'analisi (default: adesso)
+
+    Returns:
+        str: Pagina HTML completa (il foglio di stile è in static/)
+    """
+    timestamp = timestamp or datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+    # Escape HTML per sicurezza, newline convertiti in <br>
+    ai_output_html = html.escape(ai_output, quote=False).replace("\n", "<br>\n")
+
+    body = f'''        <div class="meta-info">
+            <div class="meta-item">
+                <span class="icon">📋</span>
+                <div>
+                    <div class="label">Titolo</div>
+                    <div class="value">{html.escape(title)}</div>
+                </div>
+            </div>
+            <div class="meta-item">
+                <span class="icon">📁</span>
+                <div>
+                    <div class="label">Categoria</div>
+                    <div class="value">{html.escape(category)}</div>
+                </div>
+            </div>
+            <div class="meta-item">
+                <span class="icon">🕐</span>
+                <div>
+                    <div class="label">Data Analisi</div>
+                    <div class="value">{timestamp}</div>
+                </div>
+            </div>
+        </div>
+
+        <div class="content">
+            <div class="section-title">
+                <span>🔍</span>
+                <span>Diagnosi e Analisi</span>
+            </div>
+            <div class="ai-response">
+{ai_output_html}
+            </div>
+        </div>
+'''
+    return _page(heading.split(" ", 1)[-1], heading,
+                 "Report generato automaticamente dall'analisi dei log di Windows", body,
+                 nav='<div class="nav"><a href="./">← Storico report</a></div>')
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    True se l'ETag è tra quelli dell'intestazione If-None-Match
+
+    Gli ETag sono deboli (W/"..."): la versione compressa e quella non compressa di una
+    pagina sono equivalenti e condividono lo stesso ETag.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+class ReportStore:
+    """
+    Cartella dei report HTML con indice SQLite, servita dal server locale
+    """
+
+    def __init__(self, directory: str = None, page_size: int = PAGE_SIZE):
+        """
+        Args:
+            directory (str): Cartella dei report (default: %LOCALAPPDATA%\\EvLogPyAI\\reports)
+            page_size (int): Report per pagina dello storico
+        """
+        self.directory = directory or os.path.dirname(app_data_path("reports", "reports.db"))
+        self.page_size = page_size
+        os.makedirs(os.path.join(self.directory, "static"), exist_ok=True)
+
+        # Foglio di stile condiviso (scritto una volta per versione)
+        css_path = os.path.join(self.directory, "static", CSS_NAME)
+        if not os.path.exists(css_path):
+            with open(css_path, "w", encoding="utf-8") as f:
+                f.write(REPORT_CSS)
+
+        self._lock = threading.Lock()
+        self._gzip_cache = OrderedDict()
+        self._conn = sqlite3.connect(os.path.join(self.directory, "reports.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                id TEXT PRIMARY KEY,
+                created REAL NOT NULL,
+                title TEXT,
+                category TEXT,
+                heading TEXT,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created);
+            """
+        )
+        self._conn.commit()
+
+    # === SALVATAGGIO ===
+
+    def save(self, html_content: str, title: str = None, category: str = None, heading: str = None) -> str:
+        """
+        Salva un report e lo registra nell'indice
+
+        Args:
+            html_content (str): Pagina generata con render_report
+            title (str): Titolo del problema
+            category (str): Categoria di log
+            heading (str): Tipo di report (es. "🤖 EvLogPyAI - Analisi AI")
+
+        Returns:
+            str: Id del report (vedi path e url)
+        """
+        created = time.time()
+        report_id = datetime.fromtimestamp(created).strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        data = html_content.encode("utf-8")
+
+        # Scrittura atomica: il server non vede mai un report scritto a metà
+        path = self.path(report_id)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO reports (id, created, title, category, heading, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (report_id, created, title, category, heading, len(data))
+            )
+            self._conn.commit()
+        return report_id
+
+    def path(self, report_id: str) -> str:
+        """Percorso del file di un report"""
+        return os.path.join(self.directory, f"{report_id}.html")
+
+    @staticmethod
+    def url(base_url: str, report_id: str = None) -> str:
+        """
+        Indirizzo di un report (o dello storico) sul server locale
+
+        Args:
+            base_url (str): Indirizzo del server (es. http://127.0.0.1:5050)
+            report_id (str): Id del report (None = storico)
+        """
+        return f"{base_url}/reports/{report_id}.html" if report_id else f"{base_url}/reports/"
+
+    # === STORICO ===
+
+    def count(self) -> int:
+        """Numero di report salvati"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+
+    def page(self, number: int = 1) -> list:
+        """
+        Report di una pagina dello storico, dal più recente
+
+        Args:
+            number (int): Pagina (da 1)
+
+        Returns:
+            list: Righe dell'indice (id, created, title, category, heading, size)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, created, title, category, heading, size FROM reports "
+                "ORDER BY created DESC LIMIT ? OFFSET ?",
+                (self.page_size, (max(1, number) - 1) * self.page_size)
+            ).fetchall()
+
+    def _index_version(self) -> tuple:
+        """(numero di report, ultimo rowid): cambia a ogni report salvato"""
+        with self._lock:
+            return tuple(self._conn.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM reports").fetchone())
+
+    def render_index(self, number: int = 1, total: int = None) -> str:
+        """
+        Pagina dello storico dei report
+
+        Args:
+            number (int): Pagina (da 1)
+            total (int): Report salvati (se già noto)
+
+        Returns:
+            str: Pagina HTML
+        """
+        total = self.count() if total is None else total
+        pages = max(1, -(-total // self.page_size))
+        number = min(max(1, number), pages)
+
+        rows = []
+        for row in self.page(number):
+            created = datetime.fromtimestamp(row["created"]).strftime("%d/%m/%Y %H:%M:%S")
+            rows.append(
+                f'                <tr><td>{created}</td>'
+                f'<td><a href="{row["id"]}.html">{html.escape(row["title"] or "Analisi Log")}</a></td>'
+                f'<td>{html.escape(row["category"] or "N/D")}</td>'
+                f'<td>{html.escape((row["heading"] or "").split(" - ")[-1])}</td>'
+                f'<td>{row["size"] / 1024:.1f} KB</td></tr>'
+            )
+        previous = f'<a href="?page={number - 1}">← Più recenti</a>' if number > 1 else "<span></span>"
+        following = f'<a href="?page={number + 1}">Meno recenti →</a>' if number < pages else "<span></span>"
+
+        body = f'''        <div class="content">
+            <table class="history">
+                <tr><th>Data</th><th>Titolo</th><th>Categoria</th><th>Tipo</th><th>Dimensione</th></tr>
+{chr(10).join(rows)}
+            </table>
+            <div class="pages">{previous}<span>Pagina {number} di {pages}</span>{following}</div>
+        </div>
+'''
+        return _page("Storico Report", "📚 EvLogPyAI - Storico Report", f"{total} report salvati", body)
+
+    # === SERVIZIO HTTP ===
+
+    def handle_get(self, path: str, query: str = "", headers=None) -> tuple:
+        """
+        Risposta a una GET sotto /reports/
+
+        Args:
+            path (str): Percorso richiesto (senza query)
+            query (str): Query string (es. "page=2")
+            headers: Intestazioni della richiesta (Accept-Encoding, If-None-Match)
+
+        Returns:
+            tuple: (stato HTTP, intestazioni, corpo)
+        """
+        headers = headers or {}
+        name = path[len("/reports"):].lstrip("/")
+
+        if path == "/reports":
+            return 301, {"Location": "/reports/"}, b""
+
+        if name == "":
+            # Storico: l'ETag dipende solo da numero e ultimo report, la pagina si genera solo se cambia
+            try:
+                number = int(parse_qs(query).get("page", ["1"])[0])
+            except ValueError:
+                number = 1
+            total, last = self._index_version()
+            etag = f'W/"i{total:x}-{last:x}-{number}-{CSS_HASH}"'
+            if _etag_matches(headers.get("If-None-Match"), etag):
+                return self._not_modified(etag, PAGE_CACHE_CONTROL)
+            body = self.render_index(number, total).encode("utf-8")
+            return self._ok(body, "text/html; charset=utf-8", etag, PAGE_CACHE_CONTROL, headers)
+
+        if name == f"static/{CSS_NAME}":
+            etag = f'W/"{CSS_HASH}"'
+            if _etag_matches(headers.get("If-None-Match"), etag):
+                return self._not_modified(etag, STATIC_CACHE_CONTROL)
+            return self._ok(REPORT_CSS.encode("utf-8"), "text/css; charset=utf-8", etag, STATIC_CACHE_CONTROL,
+                            headers, cache_key=CSS_NAME)
+
+        report_id = name[:-5] if name.endswith(".html") else None
+        if report_id and _REPORT_ID.match(report_id):
+            try:
+                stat = os.stat(self.path(report_id))
+            except OSError:
+                return self._not_found()
+            etag = f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+            if _etag_matches(headers.get("If-None-Match"), etag):
+                return self._not_modified(etag, PAGE_CACHE_CONTROL)
+            with open(self.path(report_id), "rb") as f:
+                body = f.read()
+            return self._ok(body, "text/html; charset=utf-8", etag, PAGE_CACHE_CONTROL, headers,
+                            cache_key=(report_id, etag))
+
+        return self._not_found()
+
+    def _ok(self, body: bytes, content_type: str, etag: str, cache_control: str, request_headers,
+            cache_key=None) -> tuple:
+        """Risposta 200, compressa con gzip se il browser la accetta"""
+        response_headers = {"Content-Type": content_type, "ETag": etag, "Cache-Control": cache_control,
+                            "Vary": "Accept-Encoding"}
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in request_headers.get("Accept-Encoding", ""):
+            body = self._gzip(body, cache_key)
+            response_headers["Content-Encoding"] = "gzip"
+        return 200, response_headers, body
+
+    def _gzip(self, body: bytes, cache_key=None) -> bytes:
+        """Corpo compresso, dalla cache se già compresso (report e stile non cambiano)"""
+        if cache_key is None:
+            return gzip.compress(body, compresslevel=6, mtime=0)
+        with self._lock:
+            compressed = self._gzip_cache.get(cache_key)
+            if compressed is not None:
+                self._gzip_cache.move_to_end(cache_key)
+                return compressed
+        compressed = gzip.compress(body, compresslevel=6, mtime=0)
+        with self._lock:
+            self._gzip_cache[cache_key] = compressed
+            while len(self._gzip_cache) > GZIP_CACHE_ENTRIES:
+                self._gzip_cache.popitem(last=False)
+        return compressed
+
+    @staticmethod
+    def _not_modified(etag: str, cache_control: str) -> tuple:
+        return 304, {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}, b""
+
+    @staticmethod
+    def _not_found() -> tuple:
+        return 404, {"Content-Type": "text/plain; charset=utf-8"}, "Report non trovato".encode("utf-8")
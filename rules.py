@@ -0,0 +1,585 @@
+"""
+EvLogPyAI - Regole di Rilevazione
+Etichette sugli eventi che corrispondono a regole note (parole chiave, percorsi,
+combinazioni sorgente/Event ID), calcolate in una sola passata per evento
+
+Le regole vengono compilate in due strutture:
+- un automa di Aho-Corasick con tutte le parole chiave e i frammenti di percorso:
+  il messaggio viene letto una volta sola, qualunque sia il numero di regole;
+- una tabella (sorgente normalizzata, Event ID) -> regole per le regole senza parole chiave.
+Il costo per evento resta quindi praticamente costante passando da 10 a 1000 regole
+(vedi python rules.py --bench).
+
+Con il pacchetto pyahocorasick installato l'automa è quello in C della libreria;
+altrimenti viene usata un'implementazione in Python con lo stesso risultato.
+
+Regole aggiuntive o correzioni si possono mettere in %LOCALAPPDATA%\\EvLogPyAI\\rules.json,
+una lista di oggetti con gli stessi campi di DEFAULT_RULES; una regola con lo stesso "id"
+di una predefinita la sostituisce, {"id": "...", "disabled": true} la disattiva.
+Il file viene ricaricato automaticamente quando cambia, senza riavviare l'applicazione:
+    [{"id": "backup-failed", "title": "Backup non riuscito", "severity": "alta",
+      "keywords": ["backup failed"], "source": "Backup", "event_ids": [517]}]
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# json: Regole personalizzate dell'utente
+import json
+
+# os: Data di modifica del file delle regole (ricaricamento automatico)
+import os
+
+# threading: Ricaricamento delle regole mentre altri thread le usano
+import threading
+
+# time: Intervallo minimo tra due controlli del file
+import time
+
+# knowledge: Sorgenti in forma confrontabile (con o senza "Microsoft-Windows-")
+from knowledge import normalize_source
+
+# ahocorasick: Automa in C (opzionale, altrimenti implementazione in Python)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# === CONFIGURAZIONE ===
+
+# Gravità in ordine decrescente (ordinamento del riepilogo)
+SEVERITIES = ("critica", "alta", "media", "bassa")
+
+# Secondi minimi tra due controlli della data di modifica del file delle regole
+RELOAD_INTERVAL = 2.0
+
+# Messaggi di esempio per regola nel riepilogo inviato all'AI
+EXAMPLES_PER_RULE = 2
+
+# Messaggi già analizzati tenuti in memoria (molti eventi ripetono lo stesso testo)
+_CACHE_SIZE = 4096
+
+
+# === REGOLE PREDEFINITE ===
+# keywords: testi cercati nel messaggio (maiuscole/minuscole e "/" o "\\" indifferenti, basta uno)
+# paths: frammenti di percorso, cercati come keywords
+# source, event_ids, types: condizioni aggiuntive (tutte quelle indicate devono valere)
+# Una regola senza keywords/paths corrisponde a tutti gli eventi della sua sorgente/Event ID
+DEFAULT_RULES = [
+    # --- Manomissione dei log e dell'audit ---
+    {"id": "log-cleared", "title": "Log eventi cancellato", "severity": "critica",
+     "source": "Eventlog", "event_ids": [104, 1102]},
+    {"id": "audit-policy-changed", "title": "Criteri di controllo modificati", "severity": "alta",
+     "source": "Security-Auditing", "event_ids": [4719]},
+
+    # --- Persistenza ---
+    {"id": "service-installed", "title": "Nuovo servizio installato", "severity": "media",
+     "source": "Service Control Manager", "event_ids": [7045]},
+    {"id": "scheduled-task-created", "title": "Attività pianificata creata", "severity": "media",
+     "source": "Security-Auditing", "event_ids": [4698]},
+    {"id": "admin-group-member", "title": "Membro aggiunto a un gruppo di amministratori", "severity": "alta",
+     "event_ids": [4728, 4732, 4756], "keywords": ["admin", "amministratori"]},
+
+    # --- Esecuzione sospetta ---
+    {"id": "powershell-encoded", "title": "PowerShell con comando codificato o scaricato", "severity": "alta",
+     "keywords": ["-encodedcommand", " -enc ", "frombase64string", "invoke-expression", "iex(",
+                  "downloadstring(", "net.webclient", "-windowstyle hidden"]},
+    {"id": "attack-tools", "title": "Strumenti di attacco noti", "severity": "critica",
+     "keywords": ["mimikatz", "sekurlsa", "lsadump", "procdump", "psexesvc", "cobaltstrike", "rubeus",
+                  "bloodhound", "sharphound", "lazagne"]},
+    {"id": "lolbin-download", "title": "Download tramite eseguibili di sistema", "severity": "alta",
+     "keywords": ["certutil -urlcache", "certutil.exe -urlcache", "bitsadmin /transfer", "mshta http",
+                  "regsvr32 /i:http", "rundll32 javascript:"]},
+    {"id": "suspicious-path", "title": "Eseguibile in una cartella temporanea o pubblica", "severity": "media",
+     "paths": ["\\appdata\\local\\temp\\", "\\windows\\temp\\", "\\users\\public\\", "\\$recycle.bin\\",
+               "\\programdata\\temp\\", "\\perflogs\\"]},
+
+    # --- Ransomware ---
+    {"id": "shadow-copy-delete", "title": "Eliminazione delle copie shadow o del ripristino", "severity": "critica",
+     "keywords": ["vssadmin delete shadows", "vssadmin.exe delete shadows", "wmic shadowcopy delete",
+                  "bcdedit /set {default} recoveryenabled no", "wbadmin delete catalog", "resize shadowstorage"]},
+
+    # --- Antivirus ---
+    {"id": "defender-detection", "title": "Minaccia rilevata da Microsoft Defender", "severity": "critica",
+     "source": "Windows Defender", "event_ids": [1006, 1116, 1117]},
+    {"id": "defender-disabled", "title": "Protezione di Microsoft Defender disattivata", "severity": "alta",
+     "source": "Windows Defender", "event_ids": [5001, 5010, 5012, 5101]},
+
+    # --- Stabilità ---
+    {"id": "bugcheck", "title": "Arresto anomalo del sistema (schermata blu)", "severity": "alta",
+     "event_ids": [1001], "keywords": ["bugcheck", "bug check", "controllo errori"]},
+    {"id": "unexpected-shutdown", "title": "Arresto imprevisto", "severity": "alta",
+     "source": "EventLog", "event_ids": [6008]},
+    {"id": "whea-error", "title": "Errore hardware segnalato da WHEA", "severity": "alta",
+     "source": "WHEA-Logger"},
+    {"id": "low-memory", "title": "Memoria virtuale insufficiente", "severity": "media",
+     "source": "Resource-Exhaustion-Detector", "event_ids": [2004]},
+
+    # --- Dischi e file system ---
+    {"id": "disk-bad-block", "title": "Blocchi danneggiati o errori del controller", "severity": "alta",
+     "keywords": ["bad block", "blocco danneggiato", "controller error", "errore del controller",
+                  "was not able to read", "paging operation"]},
+    {"id": "disk-full", "title": "Spazio su disco esaurito", "severity": "media",
+     "keywords": ["disk is full", "disk is at or near capacity", "not enough space on the disk",
+                  "spazio su disco insufficiente", "disco pieno"]},
+    {"id": "ntfs-corruption", "title": "File system danneggiato", "severity": "alta",
+     "keywords": ["file system structure on the disk is corrupt", "struttura del file system",
+                  "run the chkdsk", "eseguire chkdsk"]},
+
+    # --- Rete e certificati ---
+    {"id": "certificate-expired", "title": "Certificato scaduto o non valido", "severity": "media",
+     "keywords": ["certificate has expired", "certificato è scaduto", "certificate is not valid",
+                  "untrusted root", "certificate chain"]},
+    {"id": "dns-timeout", "title": "Risoluzione DNS non riuscita", "severity": "bassa",
+     "source": "DNS Client Events", "event_ids": [1014]},
+    {"id": "time-sync", "title": "Sincronizzazione dell'ora non riuscita", "severity": "bassa",
+     "source": "Time-Service", "event_ids": [36, 129, 134]},
+]
+
+
+def _fold(text) -> str:
+    """Testo nella forma confrontata dall'automa: minuscolo, con "\\" al posto di "/" """
+    return str(text).lower().replace("/", "\\")
+
+
+def _normalize_rule(rule: dict) -> dict:
+    """
+    Regola in forma compilabile: testi in minuscolo, condizioni come insiemi
+
+    Raises:
+        ValueError: Regola senza id o senza alcuna condizione
+    """
+    rule_id = str(rule.get("id") or "").strip()
+    if not rule_id:
+        raise ValueError(f"regola senza id: {rule}")
+    keywords = [_fold(k) for k in rule.get("keywords") or () if str(k)]
+    keywords += [_fold(p) for p in rule.get("paths") or () if str(p)]
+    source = normalize_source(rule["source"]) if rule.get("source") else None
+    event_ids = frozenset(int(e) for e in rule["event_ids"]) if rule.get("event_ids") else None
+    types = frozenset(rule["types"]) if rule.get("types") else None
+    if not keywords and source is None and event_ids is None:
+        raise ValueError(f"regola {rule_id} senza keywords, paths, source o event_ids")
+    severity = rule.get("severity") if rule.get("severity") in SEVERITIES else "media"
+    return {"id": rule_id, "title": rule.get("title") or rule_id, "severity": severity,
+            "keywords": keywords, "source": source, "event_ids": event_ids, "types": types}
+
+
+# === AUTOMA DI AHO-CORASICK ===
+
+class _PythonAutomaton:
+    """
+    Automa di Aho-Corasick in Python (usato se pyahocorasick non è installato)
+
+    Le transizioni sono già risolte seguendo i fail link (automa deterministico):
+    ogni carattere del testo costa una sola ricerca in un dizionario.
+    """
+
+    def __init__(self, patterns: dict):
+        """
+        Args:
+            patterns (dict): Testo cercato -> valore restituito quando viene trovato
+        """
+        goto = [{}]
+        outputs = [[]]
+        for pattern, value in patterns.items():
+            state = 0
+            for ch in pattern:
+                following = goto[state].get(ch)
+                if following is None:
+                    following = goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = following
+            outputs[state].append(value)
+
+        # Visita in ampiezza: il fail link di uno stato è sempre meno profondo dello stato,
+        # quindi le sue transizioni e le sue uscite sono già complete quando serve
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            # Transizioni ereditate dal fail link, sovrascritte da quelle proprie
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            for ch, following in goto[state].items():
+                fail[following] = delta[fail[state]].get(ch, 0)
+                queue.append(following)
+        self._delta = delta
+        self._outputs = {state: tuple(values) for state, values in enumerate(outputs) if values}
+
+    def find(self, text: str) -> set:
+        """Valori di tutti i testi presenti in text"""
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if state in outputs:
+                found.update(outputs[state])
+        return found
+
+
+class _CAutomaton:
+    """
+    Automa di Aho-Corasick della libreria pyahocorasick (stessa interfaccia di _PythonAutomaton)
+    """
+
+    def __init__(self, patterns: dict):
+        self._automaton = ahocorasick.Automaton()
+        for pattern, value in patterns.items():
+            self._automaton.add_word(pattern, value)
+        self._automaton.make_automaton()
+
+    def find(self, text: str) -> set:
+        return {value for _, value in self._automaton.iter(text)}
+
+
+def build_automaton(patterns: dict, backend: str = None):
+    """
+    Automa per i testi indicati
+
+    Args:
+        patterns (dict): Testo cercato -> valore restituito quando viene trovato
+        backend (str): "c", "python" o None (il più veloce disponibile)
+    """
+    if backend == "c" or (backend is None and ahocorasick is not None):
+        return _CAutomaton(patterns)
+    return _PythonAutomaton(patterns)
+
+
+# === INSIEME DI REGOLE COMPILATO ===
+
+class RuleSet:
+    """
+    Regole compilate: automa delle parole chiave e tabella (sorgente, Event ID)
+    """
+
+    def __init__(self, rules: list, backend: str = None):
+        """
+        Args:
+            rules (list): Regole nel formato di DEFAULT_RULES
+            backend (str): Automa da usare (vedi build_automaton)
+        """
+        self.rules = [_normalize_rule(rule) for rule in rules]
+        self.by_id = {rule["id"]: rule for rule in self.rules}
+
+        # Parola chiave -> indici delle regole che la contengono
+        keywords = {}
+        # (sorgente, Event ID) -> indici delle regole senza parole chiave (None = qualsiasi)
+        self._dispatch = {}
+        for index, rule in enumerate(self.rules):
+            if rule["keywords"]:
+                for keyword in rule["keywords"]:
+                    keywords.setdefault(keyword, []).append(index)
+                continue
+            for event_id in rule["event_ids"] or (None,):
+                self._dispatch.setdefault((rule["source"], event_id), []).append(index)
+        self._automaton = build_automaton({k: tuple(v) for k, v in keywords.items()}, backend) if keywords else None
+        self._cache = {}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _keyword_hits(self, message: str) -> set:
+        """Indici delle regole con almeno una parola chiave nel messaggio"""
+        hits = self._cache.get(message)
+        if hits is None:
+            hits = set()
+            # Pattern e messaggio nella stessa forma: C:/Users/Public trova \\users\\public\\
+            for indexes in self._automaton.find(_fold(message)):
+                hits.update(indexes)
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.clear()
+            self._cache[message] = hits
+        return hits
+
+    def match(self, log: dict) -> list:
+        """
+        Returns:
+            list: Id delle regole che corrispondono all'evento, nell'ordine di definizione
+        """
+        source = normalize_source(log.get("source"))
+        try:
+            event_id = int(log.get("event_id"))
+        except (TypeError, ValueError):
+            event_id = None
+        event_type = log.get("type")
+        rules = self.rules
+
+        candidates = set()
+        if self._dispatch:
+            for key in ((source, event_id), (source, None), (None, event_id)):
+                candidates.update(self._dispatch.get(key, ()))
+        if self._automaton is not None:
+            candidates.update(self._keyword_hits(str(log.get("message") or "")))
+        if not candidates:
+            return []
+
+        matched = []
+        for index in sorted(candidates):
+            rule = rules[index]
+            if rule["source"] is not None and rule["source"] != source:
+                continue
+            if rule["event_ids"] is not None and event_id not in rule["event_ids"]:
+                continue
+            if rule["types"] is not None and event_type not in rule["types"]:
+                continue
+            matched.append(rule["id"])
+        return matched
+
+
+# === MOTORE CON RICARICAMENTO AUTOMATICO ===
+
+class RuleEngine:
+    """
+    Regole predefinite più quelle del file personalizzato, ricaricato quando cambia
+    """
+
+    def __init__(self, rules: list = None, custom_path: str = None, backend: str = None):
+        """
+        Args:
+            rules (list): Regole predefinite (default DEFAULT_RULES)
+            custom_path (str): File JSON con regole aggiuntive o sostitutive (facoltativo)
+            backend (str): Automa da usare (vedi build_automaton)
+        """
+        self.base_rules = list(rules if rules is not None else DEFAULT_RULES)
+        self.custom_path = custom_path
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked = 0.0
+        self.ruleset = RuleSet(self.base_rules, backend)
+        self.reload(force=True)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Ricompila le regole se il file personalizzato è cambiato
+
+        Una regola non valida nel file viene segnalata e il file ignorato:
+        restano attive le regole compilate in precedenza.
+
+        Returns:
+            bool: True se le regole sono state ricompilate
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < RELOAD_INTERVAL:
+            return False
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.custom_path).st_mtime if self.custom_path else None
+            except OSError:
+                mtime = None
+            if not force and mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            rules = {rule["id"]: rule for rule in self.base_rules}
+            if mtime is not None:
+                try:
+                    with open(self.custom_path, encoding="utf-8") as f:
+                        custom = json.load(f)
+                    for rule in custom:
+                        if rule.get("disabled"):
+                            rules.pop(rule.get("id"), None)
+                        else:
+                            rules[rule["id"]] = rule
+                    ruleset = RuleSet(list(rules.values()), self.backend)
+                except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+                    print(f"⚠️  Regole personalizzate non valide ({self.custom_path}): {e}")
+                    return False
+            else:
+                ruleset = RuleSet(list(rules.values()), self.backend)
+            self.ruleset = ruleset
+            return True
+
+    def tag(self, log: dict) -> list:
+        """
+        Aggiunge all'evento il campo "tags" con gli id delle regole corrispondenti
+
+        Returns:
+            list: Id delle regole (lista vuota se nessuna: il campo non viene aggiunto)
+        """
+        tags = self.ruleset.match(log)
+        if tags:
+            log["tags"] = tags
+        return tags
+
+    def tag_events(self, logs: list) -> int:
+        """
+        Etichetta un lotto di eventi (controllando prima se le regole sono cambiate)
+
+        Returns:
+            int: Eventi con almeno una regola
+        """
+        self.reload()
+        match = self.ruleset.match
+        tagged = 0
+        for log in logs:
+            tags = match(log)
+            if tags:
+                log["tags"] = tags
+                tagged += 1
+        return tagged
+
+    def summarize(self, logs: list) -> dict:
+        """
+        Riepilogo delle regole scattate per il payload inviato all'AI
+
+        Returns:
+            dict: Regole con conteggio, periodo ed esempi (None se nessun evento è etichettato)
+        """
+        by_id = self.ruleset.by_id
+        matches = {}
+        tagged = 0
+        for log in logs:
+            tags = log.get("tags")
+            if not tags:
+                continue
+            tagged += 1
+            for tag in tags:
+                match = matches.get(tag)
+                if match is None:
+                    rule = by_id.get(tag, {})
+                    # Gli eventi arrivano dal più recente: il primo visto è l'ultimo in ordine di tempo
+                    match = matches[tag] = {"id": tag, "title": rule.get("title", tag),
+                                            "severity": rule.get("severity", "media"), "count": 0,
+                                            "first": None, "last": log.get("timestamp"), "examples": []}
+                match["count"] += 1
+                match["first"] = log.get("timestamp")
+                if len(match["examples"]) < EXAMPLES_PER_RULE:
+                    match["examples"].append(f"{log.get('source')} {log.get('event_id')}: "
+                                             f"{str(log.get('message') or '').strip()[:200]}")
+        if not matches:
+            return None
+        ordered = sorted(matches.values(), key=lambda m: (SEVERITIES.index(m["severity"]), -m["count"]))
+        return {"rules": len(self.ruleset), "tagged_events": tagged, "total_events": len(logs),
+                "matches": ordered}
+
+
+def format_summary(summary: dict) -> str:
+    """
+    Riepilogo leggibile delle regole scattate (console e --rules-file)
+    """
+    lines = [f"🏷️  Regole: {summary['tagged_events']} eventi su {summary['total_events']} "
+             f"etichettati ({summary['rules']} regole attive)"]
+    for match in summary["matches"]:
+        lines.append(f"  [{match['severity']}] {match['title']} ({match['id']}): {match['count']} eventi")
+    return "\n".join(lines)
+
+
+# === BENCHMARK ===
+
+def _synthetic_rules(count: int, seed: int = 1) -> list:
+    """Regole con parole chiave inventate, metà delle quali con condizione su sorgente/Event ID"""
+    import random
+
+    rnd = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    rules = []
+    for i in range(count):
+        rule = {"id": f"r{i}", "title": f"Regola {i}", "severity": SEVERITIES[i % 4],
+                "keywords": ["".join(rnd.choice(letters) for _ in range(rnd.randint(6, 14))) for _ in range(2)]}
+        if i % 2:
+            rule["event_ids"] = [rnd.randint(1, 9000)]
+        rules.append(rule)
+    return rules
+
+
+def _synthetic_logs(count: int, rules: list, seed: int = 2) -> list:
+    """Eventi con messaggi di ~300 caratteri; circa uno su cinquanta contiene una parola chiave"""
+    import random
+
+    rnd = random.Random(seed)
+    words = ["service", "driver", "error", "the", "operation", "completed", "failed", "timeout", "network",
+             "disk", "volume", "user", "process", "started", "stopped", "registry", "value", "path"]
+    messages = []
+    for i in range(200):
+        text = " ".join(rnd.choice(words) for _ in range(45)) + f" C:\\Program Files\\App{i}\\app.exe"
+        if i % 50 == 0 and rules:
+            text += " " + rnd.choice(rnd.choice(rules)["keywords"])
+        messages.append(text)
+    return [{"source": "Service Control Manager", "event_id": rnd.randint(1, 9000), "type": "Errore",
+             # Numeri diversi in ogni messaggio: la cache dei messaggi non falsa la misura
+             "message": f"{rnd.choice(messages)} pid {i}"} for i in range(count)]
+
+
+def benchmark(count: int = 20000, sizes: tuple = (10, 100, 1000), backend: str = None) -> list:
+    """
+    Eventi al secondo con 10, 100 e 1000 regole: automa contro ricerca regola per regola
+
+    Returns:
+        list: Per ogni numero di regole {"rules", "automaton_eps", "naive_eps"}
+    """
+    results = []
+    print(f"📊 {count} eventi sintetici, automa "
+          f"{'pyahocorasick' if backend != 'python' and ahocorasick is not None else 'Python'}")
+    print(f"  {'regole':>6}  {'automa (eventi/s)':>18}  {'regola per regola (eventi/s)':>28}")
+    for size in sizes:
+        rules = _synthetic_rules(size)
+        logs = _synthetic_logs(count, rules)
+        ruleset = RuleSet(rules, backend)
+
+        started = time.perf_counter()
+        for log in logs:
+            ruleset.match(log)
+        automaton_seconds = time.perf_counter() - started
+
+        # Confronto: ogni regola cerca le sue parole chiave nel messaggio
+        compiled = ruleset.rules
+        started = time.perf_counter()
+        for log in logs:
+            text = _fold(log["message"])
+            [rule["id"] for rule in compiled if any(k in text for k in rule["keywords"])]
+        naive_seconds = time.perf_counter() - started
+
+        result = {"rules": size, "automaton_eps": count / automaton_seconds, "naive_eps": count / naive_seconds}
+        results.append(result)
+        print(f"  {size:>6}  {result['automaton_eps']:>18,.0f}  {result['naive_eps']:>28,.0f}")
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Regole di rilevazione")
+    parser.add_argument("evtx", nargs="?", help="File .evtx o nome tecnico del log da etichettare")
+    parser.add_argument("-n", type=int, default=10000, help="Eventi da leggere (default: 10000)")
+    parser.add_argument("--rules-file", help="File JSON di regole aggiuntive")
+    parser.add_argument("--json", action="store_true", help="Stampa il riepilogo in JSON")
+    parser.add_argument("--bench", type=int, nargs="?", const=20000, metavar="EVENTI",
+                        help="Benchmark con 10, 100 e 1000 regole sintetiche (default: 20000 eventi)")
+    parser.add_argument("--python", action="store_true", help="Usa l'automa in Python anche se c'è pyahocorasick")
+    args = parser.parse_args()
+
+    backend = "python" if args.python else None
+    if args.bench:
+        benchmark(args.bench, backend=backend)
+        return
+    if not args.evtx:
+        parser.error("indicare un file .evtx oppure --bench")
+
+    from extractor import extract_in_thread
+
+    engine = RuleEngine(custom_path=args.rules_file, backend=backend)
+    logs, _ = extract_in_thread(args.evtx, args.n)
+    started = time.perf_counter()
+    engine.tag_events(logs)
+    elapsed = time.perf_counter() - started
+    summary = engine.summarize(logs)
+    if summary is None:
+        print(f"Nessuna regola scattata su {len(logs)} eventi")
+    elif args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(format_summary(summary))
+    print(f"\n{len(logs)} eventi etichettati in {elapsed:.3f}s ({len(engine.ruleset)} regole)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+EvLogPyAI - Campionamento Stratificato
+Riduce le estrazioni molto grandi a un campione rappresentativo da inviare all'AI
+
+Invece di tenere solo gli eventi più recenti, il campione copre tutta la finestra
+estratta: gli eventi sono divisi in strati (tipo, sorgente, Event ID) e ogni strato
+è rappresentato da almeno un evento, anche se raro. Il resto dei posti va agli
+eventi con priorità casuale più alta, pesata per tipo (gli errori pesano di più).
+
+Un solo passaggio e memoria fissa: vengono conservati solo gli eventi del campione
+(capacità + un evento per strato), qualunque sia il numero di eventi letti.
+Il riepilogo restituito (eventi visti e campionati per strato) viene aggiunto al
+payload, così l'analisi sa quanti eventi rappresenta ogni evento del campione.
+
+Uso da riga di comando (anteprima su un file .evtx):
+    python sampling.py System.evtx -n 200000 --size 500
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# heapq: Heap dei candidati all'esclusione e delle riserve di ogni strato
+import heapq
+
+# math: Priorità pesate in scala logaritmica
+import math
+
+# random: Priorità casuali del campionamento
+import random
+
+
+# === CONFIGURAZIONE ===
+
+# Peso per tipo di evento: un errore ha 8 volte la probabilità di entrare nel campione
+# di un evento informativo con la stessa sorgente ed Event ID
+LEVEL_WEIGHTS = {
+    "Errore": 8.0,
+    "Audit Failure": 4.0,
+    "Avviso": 3.0,
+}
+DEFAULT_WEIGHT = 1.0
+
+# Eventi garantiti per ogni strato
+MIN_PER_STRATUM = 1
+
+
+def stratum_key(log: dict) -> tuple:
+    """
+    Strato di un evento: (tipo, sorgente, Event ID)
+    """
+    return log.get("type"), log.get("source"), log.get("event_id")
+
+
+class _Stratum:
+    """Riserva di uno strato: min-heap di (priorità, numero d'ordine, evento)"""
+
+    __slots__ = ("seen", "heap")
+
+    def __init__(self):
+        self.seen = 0
+        self.heap = []
+
+
+class StratifiedSampler:
+    """
+    Campionamento a riserva stratificato e pesato, in un solo passaggio
+
+    Ogni evento riceve la priorità log(u) / peso (u casuale in (0, 1]): il campione
+    contiene gli eventi con priorità più alta, con il vincolo che ogni strato
+    conservi almeno min_per_stratum eventi. Quando il campione supera la capacità
+    viene escluso l'evento con priorità più bassa tra quelli non garantiti.
+    """
+
+    def __init__(self, capacity: int, min_per_stratum: int = MIN_PER_STRATUM, level_weights: dict = None,
+                 seed=None):
+        """
+        Args:
+            capacity (int): Eventi nel campione (superata solo se gli strati sono più numerosi)
+            min_per_stratum (int): Eventi garantiti per ogni strato (almeno 1)
+            level_weights (dict): Peso per tipo di evento (default LEVEL_WEIGHTS)
+            seed: Seme del generatore casuale (campione riproducibile)
+        """
+        self.capacity = capacity
+        self.min_per_stratum = max(1, min_per_stratum)
+        self.level_weights = LEVEL_WEIGHTS if level_weights is None else level_weights
+        self.total = 0
+        self._rng = random.Random(seed)
+        self._strata = {}
+        # Candidati all'esclusione: (priorità, numero d'ordine, strato) del minimo di ogni
+        # strato con eventi oltre quelli garantiti; le voci superate vengono scartate in lettura
+        self._candidates = []
+        self._size = 0
+
+    def add(self, log: dict):
+        """
+        Considera un evento per il campione
+
+        Args:
+            log (dict): Evento nel formato dell'applicazione
+        """
+        seq = self.total
+        self.total += 1
+        key = stratum_key(log)
+        stratum = self._strata.get(key)
+        if stratum is None:
+            stratum = self._strata[key] = _Stratum()
+        stratum.seen += 1
+
+        weight = self.level_weights.get(log.get("type"), DEFAULT_WEIGHT)
+        priority = math.log(1.0 - self._rng.random()) / weight
+
+        # === SCARTO IMMEDIATO ===
+        # Caso più frequente a campione pieno: l'evento sarebbe il primo a essere escluso
+        if self._size >= self.capacity and len(stratum.heap) >= self.min_per_stratum:
+            threshold = self._threshold()
+            if threshold is not None and priority < threshold and priority < stratum.heap[0][0]:
+                return
+
+        heapq.heappush(stratum.heap, (priority, seq, log))
+        self._size += 1
+        if len(stratum.heap) > self.min_per_stratum:
+            heapq.heappush(self._candidates, (stratum.heap[0][0], stratum.heap[0][1], key))
+
+        # === ESCLUSIONE ===
+        while self._size > self.capacity and self._evict():
+            pass
+
+        # Le voci superate si accumulano: ricostruisce l'heap quando diventa troppo grande
+        if len(self._candidates) > 4 * (self.capacity + len(self._strata)):
+            self._rebuild_candidates()
+
+    def add_batch(self, logs: list):
+        """
+        Considera un lotto di eventi (usabile come fase della pipeline, vedi pipeline.py)
+        """
+        for log in logs:
+            self.add(log)
+
+    def _is_candidate(self, entry: tuple) -> bool:
+        """La voce corrisponde ancora al minimo escludibile del suo strato?"""
+        stratum = self._strata[entry[2]]
+        return len(stratum.heap) > self.min_per_stratum and stratum.heap[0][1] == entry[1]
+
+    def _threshold(self):
+        """Priorità del prossimo evento da escludere (None se tutti gli eventi sono garantiti)"""
+        candidates = self._candidates
+        while candidates and not self._is_candidate(candidates[0]):
+            heapq.heappop(candidates)
+        return candidates[0][0] if candidates else None
+
+    def _evict(self) -> bool:
+        """Esclude l'evento escludibile con priorità più bassa; False se non ce ne sono"""
+        if self._threshold() is None:
+            return False
+        _, _, key = heapq.heappop(self._candidates)
+        stratum = self._strata[key]
+        heapq.heappop(stratum.heap)
+        self._size -= 1
+        if len(stratum.heap) > self.min_per_stratum:
+            heapq.heappush(self._candidates, (stratum.heap[0][0], stratum.heap[0][1], key))
+        return True
+
+    def _rebuild_candidates(self):
+        """Ricostruisce l'heap dei candidati con il solo minimo di ogni strato"""
+        self._candidates = [
+            (stratum.heap[0][0], stratum.heap[0][1], key)
+            for key, stratum in self._strata.items()
+            if len(stratum.heap) > self.min_per_stratum
+        ]
+        heapq.heapify(self._candidates)
+
+    def result(self) -> tuple:
+        """
+        Returns:
+            tuple: (eventi del campione nell'ordine di lettura originale, riepilogo per il payload)
+        """
+        entries = [entry for stratum in self._strata.values() for entry in stratum.heap]
+        entries.sort(key=lambda entry: entry[1])
+        logs = [entry[2] for entry in entries]
+
+        # === RIEPILOGO ===
+        # "weight": quanti eventi estratti rappresenta ogni evento campionato dello strato
+        strata = []
+        for (level, source, event_id), stratum in self._strata.items():
+            sampled = len(stratum.heap)
+            strata.append({
+                "type": level,
+                "source": source,
+                "event_id": event_id,
+                "seen": stratum.seen,
+                "sampled": sampled,
+                "weight": round(stratum.seen / sampled, 2),
+            })
+        strata.sort(key=lambda s: s["seen"], reverse=True)
+        summary = {
+            "method": "stratified_reservoir",
+            "total_events": self.total,
+            "sampled_events": len(logs),
+            "ratio": round(len(logs) / self.total, 4) if self.total else 1.0,
+            "strata": strata,
+        }
+        return logs, summary
+
+
+def sample_logs(logs: list, capacity: int, **kwargs) -> tuple:
+    """
+    Campiona una lista di eventi
+
+    Args:
+        logs (list): Eventi nel formato dell'applicazione
+        capacity (int): Dimensione del campione
+        **kwargs: Opzioni di StratifiedSampler
+
+    Returns:
+        tuple: (eventi campionati, riepilogo) come StratifiedSampler.result
+    """
+    sampler = StratifiedSampler(capacity, **kwargs)
+    sampler.add_batch(logs)
+    return sampler.result()
+
+
+def merge_summaries(summaries: list) -> dict:
+    """
+    Unisce i riepiloghi di più payload campionati (vedi outbox.coalesce_payloads)
+
+    Args:
+        summaries (list): Riepiloghi restituiti da StratifiedSampler.result
+
+    Returns:
+        dict: Riepilogo con eventi visti e campionati sommati per strato
+    """
+    merged = {}
+    for summary in summaries:
+        for stratum in summary["strata"]:
+            key = (stratum["type"], stratum["source"], stratum["event_id"])
+            entry = merged.setdefault(key, dict(stratum, seen=0, sampled=0))
+            entry["seen"] += stratum["seen"]
+            entry["sampled"] += stratum["sampled"]
+    strata = sorted(merged.values(), key=lambda s: s["seen"], reverse=True)
+    for stratum in strata:
+        stratum["weight"] = round(stratum["seen"] / stratum["sampled"], 2)
+    total = sum(s["total_events"] for s in summaries)
+    sampled = sum(s["sampled_events"] for s in summaries)
+    return {
+        "method": "stratified_reservoir",
+        "total_events": total,
+        "sampled_events": sampled,
+        "ratio": round(sampled / total, 4) if total else 1.0,
+        "strata": strata,
+    }
+
+
+# === ANTEPRIMA DA RIGA DI COMANDO ===
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from collections import Counter
+
+    from evtx_reader import read_evtx_logs
+
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Anteprima del campionamento stratificato")
+    parser.add_argument("evtx", help="File .evtx da campionare")
+    parser.add_argument("-n", type=int, default=100000, help="Eventi da leggere (default: 100000)")
+    parser.add_argument("--size", type=int, default=500, help="Dimensione del campione (default: 500)")
+    args = parser.parse_args()
+
+    events = read_evtx_logs(args.evtx, args.n)
+    started = time.perf_counter()
+    sample, info = sample_logs(events, args.size)
+    elapsed = time.perf_counter() - started
+
+    print(f"{info['total_events']} eventi -> {info['sampled_events']} campionati "
+          f"({len(info['strata'])} strati) in {elapsed * 1000:.0f} ms")
+    recent = Counter(e["type"] for e in events[:args.size])
+    sampled = Counter(e["type"] for e in sample)
+    print(f"{'Tipo':<16}{'Estratti':>10}{'Più recenti':>14}{'Campione':>10}")
+    for level, count in Counter(e["type"] for e in events).most_common():
+        print(f"{level:<16}{count:>10}{recent[level]:>14}{sampled[level]:>10}")
+    covered = len({stratum_key(e) for e in events[:args.size]})
+    print(f"Strati coperti: più recenti {covered}/{len(info['strata'])}, campione "
+          f"{len({stratum_key(e) for e in sample})}/{len(info['strata'])}")
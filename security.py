@@ -0,0 +1,514 @@
+"""
+EvLogPyAI - Campi Strutturati degli Eventi di Sicurezza
+Estrae account, tipo di accesso, IP e motivo dell'errore dagli eventi di audit
+e ne calcola gli aggregati (accessi non riusciti per account/IP al minuto, blocchi...)
+
+Per gli Event ID registrati in SECURITY_EVENTS i dati vengono letti dalle insertion
+strings (StringInserts di pywin32, EventData dei file .evtx) per posizione, con un
+estrattore compilato una volta per Event ID (operator.itemgetter): niente
+SafeFormatMessage né espressioni regolari sul testo formattato. Il messaggio
+dell'evento diventa una riga compatta con i soli campi utili, ad esempio:
+    Accesso non riuscito | Account: CONTOSO\\mario | Tipo accesso: 3 (Rete) | IP: 10.0.0.5 | Motivo: Password errata
+
+Gli aggregati (SecurityAggregator) vengono calcolati durante la lettura e inviati
+all'AI al posto delle migliaia di righe dei singoli accessi.
+
+Uso da riga di comando (su un file .evtx del log Security):
+    python security.py Security.evtx -n 300000
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# operator: Estrattori per posizione compilati una volta per Event ID
+from operator import itemgetter
+
+# baseline: Conversione dei timestamp degli eventi (minuto di ogni accesso)
+from baseline import event_epoch
+
+
+# === EVENT ID REGISTRATI ===
+# Event ID -> (descrizione, {campo: posizione nelle insertion strings})
+# Posizioni dello schema di Windows 10/Server 2016 e successivi (compatibili con 2008 R2 per i campi usati)
+SECURITY_EVENTS = {
+    4624: ("Accesso riuscito", {
+        "subject": 1, "account": 5, "domain": 6, "logon_type": 8, "auth_package": 10,
+        "workstation": 11, "process": 17, "ip": 18, "port": 19,
+    }),
+    4625: ("Accesso non riuscito", {
+        "subject": 1, "account": 5, "domain": 6, "status": 7, "sub_status": 9, "logon_type": 10,
+        "auth_package": 12, "workstation": 13, "process": 18, "ip": 19, "port": 20,
+    }),
+    4634: ("Disconnessione", {"account": 1, "domain": 2, "logon_type": 4}),
+    4647: ("Disconnessione avviata dall'utente", {"account": 1, "domain": 2}),
+    4648: ("Accesso con credenziali esplicite", {
+        "subject": 1, "account": 5, "domain": 6, "target_server": 8, "process": 11, "ip": 12, "port": 13,
+    }),
+    4672: ("Privilegi speciali assegnati all'accesso", {"account": 1, "domain": 2, "privileges": 4}),
+    4720: ("Account utente creato", {"account": 0, "domain": 1, "subject": 4}),
+    4722: ("Account utente abilitato", {"account": 0, "domain": 1, "subject": 4}),
+    4724: ("Reimpostazione della password", {"account": 0, "domain": 1, "subject": 4}),
+    4725: ("Account utente disabilitato", {"account": 0, "domain": 1, "subject": 4}),
+    4726: ("Account utente eliminato", {"account": 0, "domain": 1, "subject": 4}),
+    4728: ("Membro aggiunto a un gruppo globale", {"member": 0, "group": 2, "domain": 3, "subject": 6}),
+    4732: ("Membro aggiunto a un gruppo locale", {"member": 0, "group": 2, "domain": 3, "subject": 6}),
+    4756: ("Membro aggiunto a un gruppo universale", {"member": 0, "group": 2, "domain": 3, "subject": 6}),
+    4740: ("Account bloccato", {"account": 0, "caller": 1, "subject": 4}),
+    4767: ("Account sbloccato", {"account": 0, "domain": 1, "subject": 4}),
+    4768: ("Richiesta ticket Kerberos (TGT)", {"account": 0, "domain": 1, "status": 6, "ip": 9, "port": 10}),
+    4771: ("Preautenticazione Kerberos non riuscita", {"account": 0, "status": 4, "ip": 6, "port": 7}),
+    4776: ("Convalida delle credenziali NTLM", {"account": 1, "workstation": 2, "status": 3}),
+}
+
+# Event ID contati come accessi non riusciti
+FAILED_LOGON_IDS = (4625, 4771)
+
+# Convalide delle credenziali (NTLM, TGT Kerberos): errori contati a parte, perché sulla
+# stessa macchina accompagnano spesso un 4625 per lo stesso tentativo
+VALIDATION_IDS = (4776, 4768)
+
+# Tipi di accesso (campo LogonType)
+LOGON_TYPES = {
+    "2": "Interattivo", "3": "Rete", "4": "Batch", "5": "Servizio", "7": "Sblocco",
+    "8": "Rete (testo in chiaro)", "9": "Nuove credenziali", "10": "Desktop remoto",
+    "11": "Interattivo (cache)",
+}
+
+# Codici NTSTATUS dei campi Status/SubStatus e codici Kerberos
+FAILURE_REASONS = {
+    "0xc000006a": "Password errata",
+    "0xc0000064": "Account inesistente",
+    "0xc000006d": "Nome utente o password errati",
+    "0xc000006e": "Restrizione dell'account",
+    "0xc000006f": "Accesso fuori dall'orario consentito",
+    "0xc0000070": "Workstation non consentita",
+    "0xc0000071": "Password scaduta",
+    "0xc0000072": "Account disabilitato",
+    "0xc0000133": "Orologio non sincronizzato con il DC",
+    "0xc000015b": "Tipo di accesso non concesso",
+    "0xc0000193": "Account scaduto",
+    "0xc0000224": "Cambio password obbligatorio",
+    "0xc0000234": "Account bloccato",
+    "0xc0000413": "Autenticazione non consentita dal firewall",
+    "0x6": "Kerberos: account inesistente",
+    "0x12": "Kerberos: account disabilitato, scaduto o bloccato",
+    "0x17": "Kerberos: password scaduta",
+    "0x18": "Kerberos: password errata",
+    "0x25": "Kerberos: orologio non sincronizzato",
+}
+
+# Etichette dei campi nel messaggio compatto (in quest'ordine)
+FIELD_LABELS = (
+    ("account", "Account"), ("member", "Membro"), ("group", "Gruppo"), ("logon_type", "Tipo accesso"),
+    ("ip", "IP"), ("workstation", "Workstation"), ("caller", "Computer chiamante"),
+    ("target_server", "Server"), ("reason", "Motivo"), ("privileges", "Privilegi"),
+    ("auth_package", "Autenticazione"), ("process", "Processo"), ("subject", "Richiesto da"),
+)
+
+# Voci per ogni classifica degli aggregati
+TOP_ENTRIES = 20
+
+# Eventi di esempio inviati all'AI per ogni Event ID aggregato
+EXAMPLES_PER_EVENT_ID = 3
+
+# Un IP con accessi non riusciti su almeno questo numero di account diversi è un possibile password spraying
+SPRAY_MIN_ACCOUNTS = 5
+
+
+# Valori delle insertion strings equivalenti a un campo assente
+_EMPTY_VALUES = frozenset((None, "", "-", " "))
+
+
+class FieldExtractor:
+    """
+    Estrattore di un Event ID: insertion strings -> campi con nome
+    """
+
+    __slots__ = ("names", "positions", "_getter", "_min_length")
+
+    def __init__(self, fields: dict):
+        self.names = tuple(fields)
+        self.positions = tuple(fields.values())
+        getter = itemgetter(*self.positions)
+        # itemgetter con una sola posizione restituisce il valore, non una tupla
+        self._getter = getter if len(self.positions) > 1 else (lambda values: (getter(values),))
+        self._min_length = max(self.positions) + 1
+
+    def __call__(self, inserts) -> dict:
+        if inserts is None:
+            return {}
+        if len(inserts) >= self._min_length:
+            values = self._getter(inserts)
+        else:
+            # Schema più vecchio o evento troncato: solo le posizioni presenti
+            values = [inserts[p] if p < len(inserts) else None for p in self.positions]
+        return {name: value for name, value in zip(self.names, values) if value not in _EMPTY_VALUES}
+
+
+# Estrattori compilati all'importazione del modulo
+EXTRACTORS = {event_id: FieldExtractor(fields) for event_id, (_, fields) in SECURITY_EVENTS.items()}
+
+
+def is_security_source(source) -> bool:
+    """Provider degli eventi di audit (nome del log live o del provider nei file .evtx)"""
+    text = str(source or "")
+    return text == "Microsoft-Windows-Security-Auditing" or text == "Security"
+
+
+def extract_fields(event_id: int, inserts) -> dict:
+    """
+    Campi strutturati di un evento di sicurezza
+
+    Args:
+        event_id (int): Event ID (16 bit bassi)
+        inserts: Insertion strings dell'evento (lista o tupla)
+
+    Returns:
+        dict: Campi normalizzati (account con dominio, tipo di accesso, motivo), o None se l'Event ID
+              non è registrato
+    """
+    extractor = EXTRACTORS.get(event_id)
+    if extractor is None:
+        return None
+    fields = extractor(inserts)
+
+    # === NORMALIZZAZIONE ===
+    domain = fields.pop("domain", None)
+    if domain and "account" in fields and "\\" not in fields["account"]:
+        fields["account"] = f"{domain}\\{fields['account']}"
+    status = fields.get("sub_status")
+    if not status or status == "0x0":
+        status = fields.get("status")
+    if status:
+        status = str(status).strip().lower()
+        if status not in ("0x0", "0x00000000"):
+            fields["reason"] = f"{FAILURE_REASONS.get(status, 'Codice')} ({status})"
+    logon_type = fields.get("logon_type")
+    if logon_type is not None:
+        logon_type = str(logon_type).strip()
+        fields["logon_type"] = f"{logon_type} ({LOGON_TYPES[logon_type]})" if logon_type in LOGON_TYPES else logon_type
+    if fields.get("ip") in ("::1", "127.0.0.1"):
+        fields["ip"] = f"{fields['ip']} (locale)"
+    if "privileges" in fields:
+        fields["privileges"] = " ".join(str(fields["privileges"]).split())
+    return fields
+
+
+def format_fields(event_id: int, fields: dict) -> str:
+    """
+    Messaggio compatto di un evento di sicurezza (sostituisce il testo formattato da Windows)
+    """
+    parts = [SECURITY_EVENTS[event_id][0]]
+    for name, label in FIELD_LABELS:
+        value = fields.get(name)
+        if value:
+            parts.append(f"{label}: {value}")
+    return " | ".join(parts)
+
+
+class SecurityAggregator:
+    """
+    Aggregati degli eventi di sicurezza calcolati durante la lettura
+    """
+
+    def __init__(self):
+        self.events = 0
+        self.by_event_id = {}
+        # Le voci terminano con gli orari (epoch) del primo e dell'ultimo evento, vedi _track_range
+        # (account, ip) -> [totale, {minuto: accessi}, primo, ultimo, {motivo: n}, {tipo accesso: n}, ...]
+        self._failed = {}
+        self._failed_minutes = {}
+        self._spray = {}          # ip -> {account}
+        self._lockouts = {}       # account -> [n, computer chiamante, primo, ultimo, ...]
+        self._successes = {}      # (account, ip) -> [n, primo, ultimo, ...]
+        self._privileged = {}     # account -> n
+        self._logon_types = {}
+        self._explicit = {}       # (account, server) -> n
+        self._validation_failures = {}  # (account, motivo) -> n
+        self._changes = []
+        self._times = {}
+
+    def add(self, log: dict, fields: dict):
+        """
+        Aggiunge un evento già estratto
+
+        Args:
+            log (dict): Evento nel formato dell'applicazione (timestamp ed Event ID)
+            fields (dict): Campi restituiti da extract_fields
+        """
+        event_id = log["event_id"]
+        self.events += 1
+        self.by_event_id[event_id] = self.by_event_id.get(event_id, 0) + 1
+        timestamp = log["timestamp"]
+        account = fields.get("account") or fields.get("member") or "?"
+        ip = fields.get("ip") or fields.get("workstation") or "-"
+
+        if event_id in FAILED_LOGON_IDS:
+            epoch = event_epoch(timestamp, self._times)
+            minute = int(epoch // 60) if epoch is not None else None
+            entry = self._failed.get((account, ip))
+            if entry is None:
+                entry = self._failed[(account, ip)] = [0, {}, timestamp, timestamp, {}, {}, None, None]
+            entry[0] += 1
+            if minute is not None:
+                entry[1][minute] = entry[1].get(minute, 0) + 1
+                self._failed_minutes[minute] = self._failed_minutes.get(minute, 0) + 1
+            self._track_range(entry, 2, timestamp, epoch)
+            reason = fields.get("reason", "Non specificato")
+            entry[4][reason] = entry[4].get(reason, 0) + 1
+            logon_type = fields.get("logon_type")
+            if logon_type:
+                entry[5][logon_type] = entry[5].get(logon_type, 0) + 1
+            self._spray.setdefault(ip, set()).add(account)
+        elif event_id in VALIDATION_IDS:
+            if "reason" in fields:
+                key = (account, fields["reason"])
+                self._validation_failures[key] = self._validation_failures.get(key, 0) + 1
+        elif event_id == 4624:
+            logon_type = fields.get("logon_type", "?")
+            self._logon_types[logon_type] = self._logon_types.get(logon_type, 0) + 1
+            entry = self._successes.get((account, ip))
+            if entry is None:
+                entry = self._successes[(account, ip)] = [0, timestamp, timestamp, None, None]
+            entry[0] += 1
+            self._track_range(entry, 1, timestamp, event_epoch(timestamp, self._times))
+        elif event_id == 4740:
+            entry = self._lockouts.get(account)
+            if entry is None:
+                entry = self._lockouts[account] = [0, fields.get("caller"), timestamp, timestamp, None, None]
+            entry[0] += 1
+            self._track_range(entry, 2, timestamp, event_epoch(timestamp, self._times))
+        elif event_id == 4672:
+            self._privileged[account] = self._privileged.get(account, 0) + 1
+        elif event_id == 4648:
+            key = (account, fields.get("target_server") or "-")
+            self._explicit[key] = self._explicit.get(key, 0) + 1
+        elif event_id in (4720, 4722, 4724, 4725, 4726, 4728, 4732, 4756, 4767) and len(self._changes) < 100:
+            self._changes.append({"timestamp": timestamp, "event_id": event_id,
+                                  "description": SECURITY_EVENTS[event_id][0], "account": account,
+                                  "group": fields.get("group"), "by": fields.get("subject")})
+
+        # La cache dei timestamp resta piccola anche su log molto lunghi
+        if len(self._times) > 100000:
+            self._times.clear()
+
+    @staticmethod
+    def _track_range(entry: list, first_index: int, timestamp: str, epoch):
+        """
+        Primo e ultimo evento di una voce: gli eventi arrivano dal più recente, quindi
+        vengono confrontati gli orari (ultimi due elementi della voce) e non l'ordine di arrivo
+        """
+        if epoch is None:
+            return
+        if entry[-2] is None or epoch < entry[-2]:
+            entry[-2] = epoch
+            entry[first_index] = timestamp
+        if entry[-1] is None or epoch > entry[-1]:
+            entry[-1] = epoch
+            entry[first_index + 1] = timestamp
+
+    def result(self) -> dict:
+        """
+        Returns:
+            dict: Aggregati compatti per il payload (classifiche limitate a TOP_ENTRIES voci)
+        """
+        failed = []
+        for (account, ip), (count, minutes, first, last, reasons, logon_types, _, _) in self._failed.items():
+            failed.append({
+                "account": account, "ip": ip, "count": count,
+                "peak_per_minute": max(minutes.values()) if minutes else None,
+                "active_minutes": len(minutes),
+                "first": first, "last": last,
+                "reasons": reasons, "logon_types": logon_types,
+            })
+        failed.sort(key=lambda f: f["count"], reverse=True)
+
+        # Accessi riusciti dopo errori dallo stesso account e IP: possibile compromissione
+        success_after_failure = [
+            {"account": account, "ip": ip, "failures": self._failed[(account, ip)][0], "successes": entry[0],
+             "last_success": entry[2]}
+            for (account, ip), entry in self._successes.items() if (account, ip) in self._failed
+        ]
+        success_after_failure.sort(key=lambda s: s["failures"], reverse=True)
+
+        spraying = [{"ip": ip, "accounts": len(accounts),
+                     "failures": sum(self._failed[(a, ip)][0] for a in accounts)}
+                    for ip, accounts in self._spray.items() if len(accounts) >= SPRAY_MIN_ACCOUNTS]
+        spraying.sort(key=lambda s: s["accounts"], reverse=True)
+
+        peak_minute = max(self._failed_minutes.items(), key=lambda item: item[1], default=None)
+        lockouts = sorted(({"account": a, "count": e[0], "caller": e[1], "first": e[2], "last": e[3]}
+                           for a, e in self._lockouts.items()), key=lambda l: l["count"], reverse=True)
+        return {
+            "events": self.events,
+            "by_event_id": {str(k): v for k, v in sorted(self.by_event_id.items())},
+            "failed_logons": {
+                "total": sum(f["count"] for f in failed),
+                "accounts": len({f["account"] for f in failed}),
+                "sources": len({f["ip"] for f in failed}),
+                "peak_per_minute": peak_minute[1] if peak_minute else 0,
+                "top": failed[:TOP_ENTRIES],
+            },
+            "password_spraying": spraying[:TOP_ENTRIES],
+            "credential_validation_failures": [
+                {"account": a, "reason": r, "count": n} for (a, r), n in
+                sorted(self._validation_failures.items(), key=lambda item: item[1], reverse=True)[:TOP_ENTRIES]
+            ],
+            "success_after_failure": success_after_failure[:TOP_ENTRIES],
+            "lockouts": lockouts[:TOP_ENTRIES],
+            "logon_types": self._logon_types,
+            "privileged_logons": [{"account": a, "count": n} for a, n in
+                                  sorted(self._privileged.items(), key=lambda item: item[1], reverse=True)
+                                  [:TOP_ENTRIES]],
+            "explicit_credentials": [{"account": a, "server": s, "count": n} for (a, s), n in
+                                     sorted(self._explicit.items(), key=lambda item: item[1], reverse=True)
+                                     [:TOP_ENTRIES]],
+            "account_changes": self._changes,
+        }
+
+
+def reduce_logs(logs: list, summary: dict, examples: int = EXAMPLES_PER_EVENT_ID) -> list:
+    """
+    Eventi da inviare all'AI insieme agli aggregati: quelli non aggregati più qualche esempio per Event ID
+
+    Args:
+        logs (list): Eventi dell'estrazione
+        summary (dict): Aggregati restituiti da SecurityAggregator.result
+        examples (int): Eventi conservati per ogni Event ID aggregato
+
+    Returns:
+        list: Eventi nell'ordine originale
+    """
+    aggregated = {int(event_id) for event_id in summary["by_event_id"]}
+    kept = {}
+    reduced = []
+    for log in logs:
+        event_id = log.get("event_id")
+        if event_id in aggregated and is_security_source(log.get("source")):
+            if kept.get(event_id, 0) >= examples:
+                continue
+            kept[event_id] = kept.get(event_id, 0) + 1
+        reduced.append(log)
+    return reduced
+
+
+def format_summary(summary: dict) -> str:
+    """
+    Testo leggibile degli aggregati (console e riga di comando)
+    """
+    failed = summary["failed_logons"]
+    lines = [f"{summary['events']} eventi di sicurezza registrati · {failed['total']} accessi non riusciti "
+             f"({failed['accounts']} account, {failed['sources']} origini, picco {failed['peak_per_minute']}/min)"]
+    for entry in failed["top"][:10]:
+        reasons = ", ".join(f"{r} x{n}" for r, n in entry["reasons"].items())
+        lines.append(f"  {entry['account']} da {entry['ip']}: {entry['count']} "
+                     f"(picco {entry['peak_per_minute']}/min, {entry['first']} → {entry['last']}) {reasons}")
+    for entry in summary["password_spraying"]:
+        lines.append(f"  ⚠️  Possibile password spraying da {entry['ip']}: {entry['accounts']} account, "
+                     f"{entry['failures']} tentativi")
+    for entry in summary["success_after_failure"]:
+        lines.append(f"  ⚠️  Accesso riuscito dopo {entry['failures']} errori: {entry['account']} da {entry['ip']} "
+                     f"({entry['last_success']})")
+    for entry in summary["lockouts"]:
+        lines.append(f"  🔒 {entry['account']} bloccato {entry['count']} volte (chiamante {entry['caller']})")
+    return "\n".join(lines)
+
+
+# === RIGA DI COMANDO ===
+
+def _synthetic_inserts(count: int, seed: int = 1) -> list:
+    """(Event ID, insertion strings) di accessi riusciti e non riusciti, per il benchmark"""
+    import random
+
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        account = f"user{rng.randrange(200)}"
+        ip = f"10.0.{rng.randrange(4)}.{rng.randrange(250)}"
+        if rng.random() < 0.3:
+            inserts = ["S-1-5-18", "DC01$", "CONTOSO", "0x3e7", "S-1-0-0", account, "CONTOSO", "0xc000006d",
+                       "%%2313", "0xc000006a", "3", "NtLmSsp", "NTLM", "WS01", "-", "-", "0", "0x0", "-", ip,
+                       str(40000 + i % 20000)]
+            events.append((4625, tuple(inserts)))
+        else:
+            inserts = ["S-1-5-18", "DC01$", "CONTOSO", "0x3e7", "S-1-5-21-1", account, "CONTOSO", "0x1f2e3",
+                       "3", "NtLmSsp", "NTLM", "WS01", "{0}", "-", "NTLM V2", "128", "0x0", "-", ip,
+                       str(40000 + i % 20000), "%%1833"]
+            events.append((4624, tuple(inserts)))
+    return events
+
+
+def benchmark(count: int = 300000):
+    """
+    Estrazione dei campi, messaggio compatto e aggregati su eventi sintetici
+
+    Returns:
+        dict: Secondi per fase ed eventi al secondo
+    """
+    import time
+    from datetime import datetime, timedelta
+
+    events = _synthetic_inserts(count)
+    base = datetime(2026, 1, 1, 8, 0, 0)
+    timestamps = [(base + timedelta(seconds=i // 5)).strftime("%c") for i in range(count)]
+
+    started = time.perf_counter()
+    extracted = [(event_id, extract_fields(event_id, inserts)) for event_id, inserts in events]
+    extract_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for event_id, fields in extracted:
+        format_fields(event_id, fields)
+    format_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    aggregator = SecurityAggregator()
+    for (event_id, fields), timestamp in zip(extracted, timestamps):
+        aggregator.add({"event_id": event_id, "timestamp": timestamp}, fields)
+    summary = aggregator.result()
+    aggregate_seconds = time.perf_counter() - started
+
+    total = extract_seconds + format_seconds + aggregate_seconds
+    print(f"📊 {count} eventi sintetici 4624/4625")
+    print(f"  estrazione campi : {extract_seconds:6.2f}s")
+    print(f"  messaggio compatto: {format_seconds:6.2f}s")
+    print(f"  aggregati        : {aggregate_seconds:6.2f}s")
+    print(f"  totale           : {total:6.2f}s ({count / total:,.0f} eventi/s)")
+    return {"extract_seconds": extract_seconds, "format_seconds": format_seconds,
+            "aggregate_seconds": aggregate_seconds, "events_per_second": count / total, "summary": summary}
+
+
+def main():
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Aggregati degli eventi di sicurezza")
+    parser.add_argument("evtx", nargs="?", help="File .evtx del log Security")
+    parser.add_argument("-n", type=int, default=300000, help="Eventi da leggere (default: 300000)")
+    parser.add_argument("--json", action="store_true", help="Stampa gli aggregati in JSON")
+    parser.add_argument("--bench", type=int, metavar="EVENTI", help="Benchmark su eventi sintetici")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench)
+        return
+    if not args.evtx:
+        parser.error("indicare un file .evtx oppure --bench")
+
+    from extractor import extract_in_thread
+
+    started = time.perf_counter()
+    logs, info = extract_in_thread(args.evtx, args.n)
+    elapsed = time.perf_counter() - started
+    summary = info.get("security")
+    if summary is None:
+        print(f"Nessun evento di sicurezza registrato tra {len(logs)} eventi letti")
+    elif args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(format_summary(summary))
+    print(f"\n{len(logs)} eventi letti in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+EvLogPyAI - Ricerca per Intervallo di Tempo
+Estrazione degli eventi tra due orari senza scorrere tutti i record più recenti
+
+I numeri di record di un log classico crescono con l'ora di scrittura (TimeWritten):
+il record di un orario si trova con una ricerca binaria, leggendo un solo record per
+passo con EVENTLOG_SEEK_READ. Per "gli eventi tra le 02:00 e le 02:15 di stanotte"
+servono quindi O(log n) letture posizionate più i record dell'intervallo, invece della
+lettura all'indietro di tutto ciò che è stato scritto dopo.
+
+Le coppie (record, ora di scrittura) scoperte vengono salvate in una cache SQLite per
+canale: le ricerche successive partono da un intervallo già ristretto. I record
+sovrascritti (log circolare) escono dalla cache; se un campione non corrisponde più al
+log (log svuotato, numerazione ripartita) la cache del canale viene scartata.
+
+I canali di "Registri applicazioni e servizi" non hanno numeri di record posizionabili:
+per loro il filtro sul tempo va direttamente nella query XPath di EvtQuery (vedi
+eventlog.iter_channel_events).
+
+Confronto su un log simulato (letture posizionate contro lettura sequenziale):
+    python timeseek.py --bench 5000000
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni del benchmark da riga di comando
+import argparse
+
+# math: Fine dell'intervallo arrotondata al secondo (risoluzione di TimeWritten)
+import math
+
+# random: Log simulato del benchmark
+import random
+
+# sqlite3: Cache dei campioni record -> ora di scrittura
+import sqlite3
+
+# threading: Cache usata dal thread o dal processo di estrazione
+import threading
+
+# time: Misura dei tempi del benchmark
+import time
+
+# paths: Cartella dati dell'applicazione
+from paths import app_data_path
+
+
+# === CONFIGURAZIONE ===
+
+# Campioni tenuti in cache per canale: oltre, i più vecchi (numeri di record più bassi) vengono eliminati
+MAX_SAMPLES = 4096
+
+# Formato degli orari nel form della GUI
+TIME_FORMAT = "%d/%m/%Y %H:%M"
+
+
+class SeekCache:
+    """
+    Campioni (record, ora di scrittura) dei log classici, in un file SQLite
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path (str): Percorso del file SQLite (default: %LOCALAPPDATA%\\EvLogPyAI\\seek.db)
+        """
+        self.path = path or app_data_path("seek.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS samples (
+                channel TEXT NOT NULL,
+                record INTEGER NOT NULL,
+                written REAL NOT NULL,
+                PRIMARY KEY (channel, record)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._conn.commit()
+
+    def bracket(self, channel: str, when: float, oldest: int, newest: int) -> tuple:
+        """
+        Campioni più vicini a un orario tra i record ancora presenti nel log
+
+        Returns:
+            tuple: ((record, ora) dell'ultimo campione scritto prima di when o None,
+                    (record, ora) del primo campione scritto da when in poi o None)
+        """
+        with self._lock:
+            before = self._conn.execute(
+                "SELECT record, written FROM samples WHERE channel = ? AND record BETWEEN ? AND ? AND written < ? "
+                "ORDER BY record DESC LIMIT 1", (channel, oldest, newest, when)
+            ).fetchone()
+            after = self._conn.execute(
+                "SELECT record, written FROM samples WHERE channel = ? AND record BETWEEN ? AND ? AND written >= ? "
+                "ORDER BY record LIMIT 1", (channel, oldest, newest, when)
+            ).fetchone()
+        return before, after
+
+    def add(self, channel: str, samples: list, oldest: int):
+        """
+        Salva i campioni scoperti e dimentica i record sovrascritti
+
+        Args:
+            channel (str): Nome del log
+            samples (list): Coppie (record, ora di scrittura)
+            oldest (int): Record più vecchio ancora presente nel log
+        """
+        if not samples:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO samples (channel, record, written) VALUES (?, ?, ?)",
+                                   ((channel, record, written) for record, written in samples))
+            self._conn.execute("DELETE FROM samples WHERE channel = ? AND record < ?", (channel, oldest))
+            self._conn.execute(
+                "DELETE FROM samples WHERE channel = ? AND record < (SELECT record FROM samples WHERE channel = ? "
+                "ORDER BY record DESC LIMIT 1 OFFSET ?)", (channel, channel, MAX_SAMPLES)
+            )
+            self._conn.commit()
+
+    def clear(self, channel: str):
+        """Scarta i campioni di un canale (log svuotato o numerazione ripartita)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM samples WHERE channel = ?", (channel,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def find_record(when: float, oldest: int, newest: int, written_at, cache: SeekCache = None,
+                channel: str = None, stats: dict = None) -> int:
+    """
+    Primo record scritto da when in poi, con una ricerca binaria sui numeri di record
+
+    Args:
+        when (float): Orario (epoch)
+        oldest (int): Record più vecchio presente nel log
+        newest (int): Record più recente presente nel log
+        written_at (callable): written_at(record) -> ora di scrittura (epoch), una lettura posizionata
+        cache (SeekCache): Campioni delle ricerche precedenti (None = nessuna cache)
+        channel (str): Nome del log nella cache
+        stats (dict): Riepilogo in cui contare le letture posizionate ("seeks")
+
+    Returns:
+        int: Numero di record (newest + 1 se tutti i record sono precedenti a when)
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("seeks", 0)
+    lo, hi = oldest, newest + 1
+    if hi <= lo:
+        return lo
+
+    # L'intervallo parte già ristretto dai campioni in cache: il primo viene verificato,
+    # se il log non corrisponde più la cache del canale viene scartata
+    if cache is not None:
+        before, after = cache.bracket(channel, when, oldest, newest)
+        probe = before or after
+        if probe is not None:
+            stats["seeks"] += 1
+            if written_at(probe[0]) != probe[1]:
+                cache.clear(channel)
+                before = after = None
+        if before is not None:
+            lo = before[0] + 1
+        if after is not None:
+            hi = after[0]
+
+    discovered = []
+    while lo < hi:
+        mid = (lo + hi) // 2
+        written = written_at(mid)
+        stats["seeks"] += 1
+        discovered.append((mid, written))
+        if written < when:
+            lo = mid + 1
+        else:
+            hi = mid
+    if cache is not None:
+        cache.add(channel, discovered, oldest)
+    return lo
+
+
+def iter_records_between(log_type: str, since: float, until: float, num_records: int, summary: dict,
+                         cache: SeekCache = None):
+    """
+    Record grezzi di un log classico scritti tra since e until, dal più recente
+
+    Una ricerca binaria trova l'ultimo record dell'intervallo, poi la lettura prosegue
+    all'indietro fino al primo record scritto prima di since.
+
+    Args:
+        log_type (str): Nome tecnico del log (es. "System")
+        since (float): Inizio dell'intervallo (epoch, None = dal record più vecchio)
+        until (float): Fine dell'intervallo, inclusa (epoch, None = fino al più recente)
+        num_records (int): Numero massimo di record
+        summary (dict): Riepilogo in cui accumulare tempi e letture posizionate
+        cache (SeekCache): Campioni delle ricerche precedenti
+
+    Yields:
+        eventlog.RawEvent: Record serializzabili, come extractor.iter_raw_windows_log
+    """
+    import win32evtlog
+    import eventlog
+
+    started = time.perf_counter()
+    hand = win32evtlog.OpenEventLog(None, log_type)
+    summary["open_seconds"] += time.perf_counter() - started
+    seek_flags = win32evtlog.EVENTLOG_SEEK_READ | win32evtlog.EVENTLOG_BACKWARDS_READ
+
+    def written_at(record: int) -> float:
+        return _epoch(win32evtlog.ReadEventLog(hand, seek_flags, record)[0].TimeWritten)
+
+    try:
+        # === RICERCA DELL'ULTIMO RECORD DELL'INTERVALLO ===
+        started = time.perf_counter()
+        oldest, newest = eventlog.get_record_range(hand)
+        last = newest
+        if until is not None:
+            # TimeWritten ha la risoluzione del secondo: l'ultimo record è quello prima del primo
+            # scritto nel secondo successivo a until
+            last = find_record(end_of_range(until), oldest, newest, written_at, cache, log_type, summary) - 1
+        summary["seek_seconds"] = summary.get("seek_seconds", 0.0) + time.perf_counter() - started
+        if last < oldest:
+            return
+
+        # === LETTURA ALL'INDIETRO FINO A SINCE ===
+        flags = seek_flags
+        events_read = 0
+        while events_read < num_records:
+            started = time.perf_counter()
+            events = win32evtlog.ReadEventLog(hand, flags, last)
+            # Dopo il primo seek prosegue in modo sequenziale
+            flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
+            records = []
+            done = not events
+            for event in events:
+                if since is not None and _epoch(event.TimeWritten) < since:
+                    done = True
+                    break
+                records.append(eventlog.raw_event(event))
+                if events_read + len(records) >= num_records:
+                    break
+            summary["read_seconds"] += time.perf_counter() - started
+            events_read += len(records)
+            yield from records
+            if done:
+                break
+    finally:
+        win32evtlog.CloseEventLog(hand)
+
+
+def end_of_range(until: float) -> float:
+    """
+    Primo secondo intero successivo alla fine (inclusa) di un intervallo
+
+    "Al 02:15" (02:15:59.999) diventa 02:16:00: i record scritti alle 02:16:00 restano fuori.
+    """
+    return math.floor(until) + 1
+
+
+def _epoch(value) -> float:
+    """Orario di pywin32 (TimeWritten) in secondi epoch"""
+    return value.timestamp() if hasattr(value, "timestamp") else float(int(value))
+
+
+# === BENCHMARK ===
+
+def benchmark(records: int = 5_000_000, window_minutes: float = 15, hours_ago: float = 20, rate: float = 20.0):
+    """
+    Letture necessarie per un intervallo vecchio su un log simulato: ricerca binaria (con e senza
+    cache) contro la lettura all'indietro di tutti i record più recenti
+
+    Args:
+        records (int): Record nel log simulato
+        window_minutes (float): Ampiezza dell'intervallo cercato
+        hours_ago (float): Quanto indietro si trova l'intervallo
+        rate (float): Record al secondo scritti in media nel log
+    """
+    import tempfile
+    import os
+
+    # Ore di scrittura non decrescenti con raffiche e pause, come un log reale
+    rng = random.Random(7)
+    now = time.time()
+    written = [0.0] * records
+    t = now
+    for i in range(records - 1, -1, -1):
+        written[i] = t
+        t -= rng.expovariate(rate)
+    oldest, newest = 1, records
+    until = now - hours_ago * 3600
+    since = until - window_minutes * 60
+
+    def written_at(record: int) -> float:
+        return written[record - oldest]
+
+    with tempfile.TemporaryDirectory() as folder:
+        cache = SeekCache(os.path.join(folder, "seek.db"))
+        print(f"📊 Log simulato di {records} record ({(now - written[0]) / 86400:.1f} giorni), "
+              f"intervallo di {window_minutes:g} minuti {hours_ago:g} ore fa")
+        for label in ("ricerca binaria", "ricerca con cache"):
+            stats = {}
+            started = time.perf_counter()
+            last = find_record(until + 1, oldest, newest, written_at, cache, "Bench", stats) - 1
+            elapsed = (time.perf_counter() - started) * 1000
+            first = find_record(since, oldest, newest, written_at)
+            print(f"  {label:<18} {stats['seeks']:>4} letture posizionate, {last - first + 1} record "
+                  f"nell'intervallo ({elapsed:.1f} ms)")
+        cache.close()
+
+    scanned = newest - last
+    print(f"  lettura all'indietro: {scanned} record più recenti da scorrere prima dell'intervallo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Benchmark della ricerca per intervallo di tempo")
+    parser.add_argument("--bench", type=int, default=5_000_000, metavar="RECORD",
+                        help="Record del log simulato (default: 5000000)")
+    parser.add_argument("--window", type=float, default=15, help="Minuti dell'intervallo (default: 15)")
+    parser.add_argument("--hours-ago", type=float, default=20, help="Ore fa dell'intervallo (default: 20)")
+    args = parser.parse_args()
+    benchmark(args.bench, args.window, args.hours_ago)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,18 +17,6 @@ import customtkinter as ctk
 # Messagebox: Modulo standard di tkinter per mostrare finestre di dialogo (alert, conferme, errori)
 from tkinter import messagebox
 
-# win32evtlog: Libreria per accedere ai log eventi di Windows (richiede pywin32)
-import win32evtlog
-
-# win32evtlogutil: Utilities per formattare i messaggi dei log eventi di Windows
-import win32evtlogutil
-
-# win32con: Costanti di Windows (come EVENTLOG_ERROR_TYPE, EVENTLOG_WARNING_TYPE, ecc.)
-import win32con
-
-# requests: Libreria per effettuare richieste HTTP (usata per inviare dati a N8N se necessario)
-import requests
-
 # json: Libreria per gestire dati in formato JSON
 import json
 
@@ -44,17 +32,84 @@ import threading
 # webbrowser: Libreria per aprire URL nel browser predefinito
 import webbrowser
 
-# tempfile: Libreria per creare file temporanei
-import tempfile
+# argparse: Per leggere le opzioni da riga di comando (es. modalità watch)
+import argparse
+
+# watch: Modalità follow/tail con analisi automatica a soglia
+from watch import LogWatcher, ErrorRateRule, NewEventIdRule
+
+# outbox: Coda durevole con retry per gli invii a N8N
+from outbox import Outbox, OutboxSender
+
+# paths: Cartella dei dati locali dell'applicazione
+from paths import app_data_path, APP_DATA_DIR
+
+# metrics: Metriche per fase (durate, byte, istogrammi) e trace JSON-lines
+from metrics import Metrics, LoopLagProbe
+
+# time: Cronometro ad alta risoluzione per le fasi di lettura e formattazione
+import time
+
+# wire: Formati di trasmissione del payload (json, compact, msgpack)
+from wire import WIRE_FORMATS, WIRE_JSON
+
+# history: Storico delle estrazioni con ricerca full-text
+from history import EventIndex, format_result
+
+# reportstore: Archivio dei report HTML servito dal server locale
+from reportstore import ReportStore, render_report
+
+# archive: Archivio compresso e deduplicato degli eventi estratti
+from archive import EventArchive, DEFAULT_MAX_MB, DEFAULT_MAX_DAYS
+
+# blobstore: Testi completi dei messaggi lunghi, letti solo quando servono
+from blobstore import MessageStore, detach_message
+
+# channels: Catalogo di tutti i canali del Visualizzatore Eventi con metadati in cache
+from channels import ChannelCatalog, format_estimate
+
+# browser: Tabella virtualizzata degli eventi estratti
+from browser import EventBrowser
+
+# extractor: Estrazione degli eventi in un processo separato dalla GUI
+from extractor import ExtractionWorker, extract_in_thread, EXTRACT_MODES, EXTRACT_PROCESS
+
+# timeseek: Ricerca per intervallo di tempo (campi "Dal" / "Al" del form)
+from timeseek import TIME_FORMAT
+
+# multiprocessing: freeze_support per il processo di estrazione nell'eseguibile PyInstaller
+import multiprocessing
 
-# http.server: Libreria per creare un server HTTP locale
-from http.server import HTTPServer, BaseHTTPRequestHandler
+# Report sul Desktop scritto a lotti e pipeline a fasi sovrapposte
+from report import ReportWriter, report_path
+from pipeline import Pipeline, Stage
 
-# socketserver: Per gestire il server in modo thread-safe
-import socketserver
+# Campionamento stratificato delle estrazioni grandi
+from sampling import StratifiedSampler, sample_logs
 
-# urllib.parse: Per parsare i dati delle richieste
-from urllib.parse import parse_qs
+# Profilo normale dei log e analisi differenziale
+from baseline import load_baseline, capture_baseline, baseline_path
+
+# Knowledge base locale dei problemi noti (risposta immediata senza AI)
+from knowledge import KnowledgeBase, format_matches, summarize_matches
+
+# socket: Nome dell'host dei profili baseline
+import socket
+
+# Correlazione degli eventi di più canali in incidenti
+from correlation import Correlator, format_incidents, GAP_SECONDS
+
+# Aggregati degli eventi di sicurezza (accessi non riusciti, blocchi, privilegi)
+from security import format_summary as format_security_summary, reduce_logs as reduce_security_logs
+
+# Stato di N8N e Ollama e preriscaldamento del modello
+from health import HealthMonitor, format_state, OLLAMA_URL, OLLAMA_MODEL
+
+# rules: Etichette delle regole di rilevazione sugli eventi
+from rules import RuleEngine, format_summary as format_rules_summary
+
+# callback: Server HTTP delle risposte di N8N e abbinamento alle richieste inviate
+from callback import CallbackServer, PendingRequests, new_request_id, MAX_BODY_BYTES
 
 
 class EvLogPyAI(ctk.CTk):
@@ -74,6 +129,12 @@ class EvLogPyAI(ctk.CTk):
         "Sistema": "System",                # Log degli eventi di sistema (hardware, driver, ecc.)
         "Eventi Inoltrati": "ForwardedEvents"  # Log degli eventi inoltrati da altri computer
     }
+    # Gli altri canali (es. Microsoft-Windows-TaskScheduler/Operational) compaiono nel menu con il
+    # loro nome tecnico, dal catalogo dei canali (vedi channels.py e _channel)
+    
+    # === CANALI CORRELATI ===
+    # Canali letti insieme a quello selezionato per la correlazione degli incidenti (--correlate)
+    CORRELATION_CHANNELS = ("System", "Application")
     
     # === URL WEBHOOK N8N ===
     # URL del webhook N8N per triggerare il workflow
@@ -99,8 +160,90 @@ class EvLogPyAI(ctk.CTk):
         # === VARIABILI PER IL SERVER CALLBACK ===
         # Server HTTP per ricevere le risposte da N8N
         self.callback_server = None
-        self.callback_thread = None
-        self.pending_request_data = None  # Memorizza i dati della richiesta in corso
+        self.pending_requests = PendingRequests()  # Richieste inviate, abbinate alle risposte per request_id
+        self.callback_max_bytes = MAX_BODY_BYTES   # Dimensione massima di una risposta (vedi --callback-max-mb)
+        
+        # === METRICHE ===
+        # Durate per fase esposte su /metrics e trace JSON-lines per ogni esecuzione
+        self.metrics = Metrics(trace_dir=os.path.join(APP_DATA_DIR, "traces"))
+        
+        # === OUTBOX INVII N8N ===
+        # Coda durevole su disco: gli invii sopravvivono a interruzioni di N8N e riavvii
+        self.outbox = Outbox(app_data_path("outbox.db"))
+        self.outbox_sender = OutboxSender(
+            self.outbox,
+            self.N8N_WEBHOOK_URL,
+            on_sent=self._on_outbox_sent,
+            on_failed=self._on_outbox_failed,
+            metrics=self.metrics
+        )
+        self.metrics.add_gauges(lambda: {f"outbox_{k}": v for k, v in self.outbox_sender.stats().items()})
+        self.metrics.add_gauges(self.pending_requests.stats)
+        
+        # === MESSAGGI COMPLETI ===
+        # Gli eventi portano un'anteprima del messaggio; il testo completo dei messaggi lunghi
+        # (stack trace, eccezioni .NET) sta in messages.db e viene letto da report, tabella e payload
+        self.message_store = MessageStore()
+        self.message_store.prune()
+        
+        # === CATALOGO DEI CANALI ===
+        # Menu delle categorie riempito subito dalla cache; aggiornamento in background dopo l'avvio
+        self.channel_catalog = ChannelCatalog()
+        
+        # === ESTRAZIONE ===
+        # Lettura e formattazione in un processo separato (modalità scelta con --extract-mode)
+        self.extraction_worker = ExtractionWorker(messages_path=self.message_store.path)
+        self.extract_mode = EXTRACT_PROCESS
+        
+        # Processi di formattazione dei messaggi nelle estrazioni grandi (None = uno per CPU, vedi --format-workers)
+        self.format_workers = None
+        
+        # === CAMPIONAMENTO ===
+        # Oltre questo numero di eventi all'AI arriva un campione stratificato (0 = mai, vedi --sample-size)
+        self.sample_size = 0
+        
+        # === BASELINE ===
+        # Con --baseline-diff a N8N vanno solo gli eventi nuovi o in aumento rispetto al profilo normale
+        self.baseline_diff = False
+        self._baselines = {}
+        
+        # === KNOWLEDGE BASE LOCALE ===
+        # Gli eventi noti ricevono subito spiegazione e soluzione; None = disattivata (--no-known-issues)
+        self.knowledge_base = KnowledgeBase(custom_path=app_data_path("known_issues.json"))
+        
+        # === CORRELAZIONE ===
+        # Con --correlate vengono letti anche i canali di CORRELATION_CHANNELS e all'AI
+        # arrivano gli incidenti (catene di eventi correlati) invece della lista piatta
+        self.correlator = None
+        
+        # === REGOLE DI RILEVAZIONE ===
+        # Ogni evento letto riceve il campo "tags" con le regole corrispondenti (vedi rules.py);
+        # None = disattivate (--no-rules)
+        self.rule_engine = RuleEngine(custom_path=app_data_path("rules.json"))
+        
+        # === STATO DEI SERVIZI ===
+        # Controlli periodici di N8N e Ollama avviati dopo la creazione della finestra
+        # (indirizzi modificabili con --n8n-url e --ollama-url, preriscaldamento disattivabile con --no-warmup)
+        self.ollama_url = OLLAMA_URL
+        self.ollama_model = OLLAMA_MODEL
+        self.warmup = True
+        self.health_monitor = None
+        
+        # === STORICO ESTRAZIONI ===
+        # Indice full-text di tutti gli eventi estratti (finestra "Storico" e --search)
+        self.history = EventIndex(app_data_path("history.db"))
+        self.search_window = None
+        
+        # === ARCHIVIO REPORT ===
+        # Risposte dell'AI salvate in %LOCALAPPDATA%\EvLogPyAI\reports e servite su /reports/
+        self.report_store = ReportStore()
+        
+        # === ARCHIVIO ESTRAZIONI ===
+        # Eventi di ogni estrazione compressi e deduplicati (vedi archive.py), con limiti di spazio
+        # e di età applicati dopo ogni estrazione; None = disattivato (--no-archive)
+        self.archive = EventArchive(messages=self.message_store)
+        self.archive_max_bytes = DEFAULT_MAX_MB * 1024 * 1024
+        self.archive_max_days = DEFAULT_MAX_DAYS
         
         # === CONFIGURAZIONE FINESTRA PRINCIPALE ===
         # Imposta il titolo della finestra che appare nella barra del titolo
@@ -146,6 +289,31 @@ class EvLogPyAI(ctk.CTk):
         # === CREAZIONE INTERFACCIA ===
         # Chiama il metodo che crea tutti i componenti grafici
         self._create_widgets()
+        
+        # === AVVIO SERVER CALLBACK ===
+        # Il server resta attivo per tutta la durata dell'app: riceve le risposte di N8N
+        # (anche per invii rimasti in coda da una sessione precedente) ed espone /metrics
+        self.after(500, self._start_callback_server)
+        
+        # === AVVIO OUTBOX ===
+        # Dopo main(), che imposta URL del webhook e formato del payload (--n8n-url, --wire-format):
+        # i job rimasti in coda da una sessione precedente non partono con i valori predefiniti.
+        # Dopo il server callback, che deve già ascoltare quando arrivano le risposte
+        self.after(600, self.outbox_sender.start)
+        
+        # === REATTIVITÀ GUI ===
+        # Ritardo del mainloop esposto su /metrics (gui_loop_lag_*): confronta --extract-mode process/thread
+        self.loop_probe = LoopLagProbe(self.after)
+        self.metrics.add_gauges(self.loop_probe.stats)
+        self.loop_probe.start()
+        
+        # === STATO DEI SERVIZI ===
+        # Avviato dopo main(), che può cambiare gli indirizzi dei servizi
+        self.after(200, self._start_health_monitor)
+        
+        # === AGGIORNAMENTO CATALOGO ===
+        # Il thread del catalogo non può modificare la GUI: il menu viene aggiornato dal mainloop
+        self.channel_catalog.start(on_update=lambda: self.after(0, self._refresh_categories))
     
     def _set_window_icon(self):
         """
@@ -280,8 +448,9 @@ class EvLogPyAI(ctk.CTk):
         # ComboBox (menu a tendina) per selezionare la categoria di log
         self.category_menu = ctk.CTkComboBox(
             self.form_frame,                               # Contenuto nel form_frame
-            values=list(self.LOG_CATEGORIES.keys()),       # Lista delle opzioni (Applicazione, Sicurezza, ecc.)
+            values=self._category_values(),                # Log classici (Applicazione, ...) e canali dal catalogo
             variable=self.category_var,                    # Variabile che memorizza la selezione
+            command=self._update_selection_hint,           # Stima della selezione (eventi, dimensione, periodo)
             height=40,                                     # Altezza del menu
             border_color=self.colors["border"],            # Colore del bordo
             fg_color=self.colors["input_bg"],              # Colore di sfondo
@@ -321,6 +490,8 @@ class EvLogPyAI(ctk.CTk):
         )
         # side="left": posiziona il widget sul lato sinistro del rows_frame
         self.rows_entry.pack(side="left")
+        # La stima della selezione segue il numero di righe digitato
+        self.rows_entry.bind("<KeyRelease>", self._update_selection_hint)
         
         # Label con testo di aiuto accanto al campo input
         self.rows_hint = ctk.CTkLabel(
@@ -333,6 +504,44 @@ class EvLogPyAI(ctk.CTk):
         # padx=10: margine sinistro di 10px per distanziare dal campo
         self.rows_hint.pack(side="left", padx=10)
         
+        # === CAMPO 3B: INTERVALLO DI TEMPO (OPZIONALE) ===
+        # Solo gli eventi tra i due orari: il log viene posizionato con una ricerca binaria
+        # invece di scorrere tutto ciò che è stato scritto dopo (vedi timeseek.py)
+        self._create_label("Intervallo di Tempo (opzionale)")
+        
+        self.range_frame = ctk.CTkFrame(self.form_frame, fg_color="transparent")
+        self.range_frame.pack(fill="x", pady=(0, 15))
+        
+        self.since_entry = ctk.CTkEntry(
+            self.range_frame,
+            placeholder_text="Dal: 19/10/2026 02:00",
+            height=40,
+            width=180,
+            border_color=self.colors["border"],
+            fg_color=self.colors["input_bg"],
+            text_color=self.colors["text"]
+        )
+        self.since_entry.pack(side="left")
+        
+        self.until_entry = ctk.CTkEntry(
+            self.range_frame,
+            placeholder_text="Al: 19/10/2026 02:15",
+            height=40,
+            width=180,
+            border_color=self.colors["border"],
+            fg_color=self.colors["input_bg"],
+            text_color=self.colors["text"]
+        )
+        self.until_entry.pack(side="left", padx=(10, 0))
+        
+        self.range_hint = ctk.CTkLabel(
+            self.range_frame,
+            text="(gg/mm/aaaa hh:mm, vuoto = nessun limite)",
+            font=ctk.CTkFont(size=12),
+            text_color=self.colors["text_secondary"]
+        )
+        self.range_hint.pack(side="left", padx=10)
+        
         # === CAMPO 4: DESCRIZIONE ISSUE ===
         # Crea l'etichetta "Descrizione Issue *"
         self._create_label("Descrizione Issue *")
@@ -378,6 +587,20 @@ class EvLogPyAI(ctk.CTk):
         # padx=(0, 10): margine destro di 10px per distanziarlo dall'altro pulsante
         self.cancel_btn.pack(side="left", padx=(0, 10))
         
+        # === PULSANTE STORICO ===
+        # Apre la finestra di ricerca negli eventi delle estrazioni precedenti
+        self.history_btn = ctk.CTkButton(
+            self.buttons_frame,                          # Contenuto nel buttons_frame
+            text="🔎 Storico",                           # Testo del pulsante con emoji
+            width=140,                                   # Larghezza di 140 pixel
+            height=45,                                   # Altezza di 45 pixel
+            fg_color=self.colors["secondary"],           # Colore di sfondo grigio
+            hover_color="#4B5563",                       # Colore più scuro quando il mouse è sopra
+            font=ctk.CTkFont(size=14, weight="bold"),   # Font grassetto dimensione 14
+            command=self._open_history_search            # Funzione da eseguire al click
+        )
+        self.history_btn.pack(side="left")
+        
         # === PULSANTE ESTRAI LOG ===
         # Pulsante verde che estrae i log e li salva sul desktop
         self.submit_btn = ctk.CTkButton(
@@ -405,6 +628,82 @@ class EvLogPyAI(ctk.CTk):
         # pady=(0, 10): margine inferiore di 10px
         self.status_label.pack(pady=(0, 10))
         
+        # === STATO DEI SERVIZI ===
+        # Disponibilità e latenza di N8N e Ollama, aggiornata dai controlli in background
+        self.health_label = ctk.CTkLabel(
+            self.main_frame,
+            text="⚪ N8N · ⚪ Ollama: controllo in corso",
+            font=ctk.CTkFont(size=10),
+            text_color=self.colors["text_secondary"]
+        )
+        self.health_label.pack(pady=(0, 6))
+        
+    def _channel(self, category: str) -> str:
+        """
+        Nome tecnico del canale di una categoria del menu
+        
+        Args:
+            category (str): Voce del menu (nome italiano di un log classico o nome del canale)
+            
+        Returns:
+            str: Nome del canale di Windows (es. "System", "Microsoft-Windows-TaskScheduler/Operational")
+        """
+        return self.LOG_CATEGORIES.get(category, category)
+    
+    def _category_values(self) -> list:
+        """
+        Voci del menu delle categorie: i log classici, poi gli altri canali attivi del catalogo
+        
+        Returns:
+            list: Nomi italiani dei log classici seguiti dai nomi dei canali con almeno un evento
+        """
+        classic = set(self.LOG_CATEGORIES.values())
+        return list(self.LOG_CATEGORIES.keys()) + [row["name"] for row in self.channel_catalog.channels()
+                                                   if row["name"] not in classic]
+    
+    def _refresh_categories(self):
+        """
+        Aggiorna il menu delle categorie dopo un aggiornamento del catalogo (nel thread della GUI)
+        """
+        self.category_menu.configure(values=self._category_values())
+        self._update_selection_hint()
+    
+    def _update_selection_hint(self, event=None):
+        """
+        Mostra accanto al numero di righe quanti eventi, quanti MB e quale periodo implica la selezione
+        """
+        category = self.category_var.get()
+        info = self.channel_catalog.get(self._channel(category)) if category else None
+        if info is None:
+            self.rows_hint.configure(text="(Numero di eventi da recuperare)")
+            return
+        rows = self.rows_entry.get().strip()
+        self.rows_hint.configure(text=f"({format_estimate(info, int(rows) if rows.isdigit() and int(rows) else None)})")
+    
+    def _time_range(self) -> tuple:
+        """
+        Intervallo di tempo scritto nei campi "Dal" / "Al"
+        
+        Returns:
+            tuple: (dal, al) in secondi epoch (None per un campo vuoto), None se entrambi vuoti
+        
+        Raises:
+            ValueError: Orario non nel formato TIME_FORMAT o "Dal" successivo ad "Al"
+        """
+        bounds = []
+        for entry in (self.since_entry, self.until_entry):
+            value = entry.get().strip()
+            bounds.append(datetime.strptime(value, TIME_FORMAT).timestamp() if value else None)
+        since, until = bounds
+        if since is None and until is None:
+            return None
+        if until is not None:
+            # "Al 02:15" comprende tutto il minuto
+            until += 59.999
+        if since is not None and until is not None and since > until:
+            raise ValueError("l'orario 'Dal' è successivo ad 'Al'")
+        return since, until
+    
     def _create_label(self, text: str):
         """
         Metodo di utilità per creare le etichette dei campi del form
@@ -457,6 +756,13 @@ class EvLogPyAI(ctk.CTk):
         # isdigit() controlla se la stringa contiene solo cifre
         elif not rows_value.isdigit() or int(rows_value) <= 0:
             errors.append("• Il numero di righe deve essere un numero positivo")
+        
+        # === VALIDAZIONE INTERVALLO DI TEMPO ===
+        # Campi facoltativi: se compilati devono essere orari validi
+        try:
+            self._time_range()
+        except ValueError as e:
+            errors.append(f"• Intervallo di tempo non valido (gg/mm/aaaa hh:mm): {e}")
             
         # === VALIDAZIONE DESCRIZIONE ===
         # Verifica che il campo descrizione non sia vuoto
@@ -477,13 +783,21 @@ class EvLogPyAI(ctk.CTk):
             
         return True  # Validazione riuscita
     
-    def _get_windows_logs(self, category: str, num_records: int) -> list:
+    def _get_windows_logs(self, category: str, num_records: int, on_batch=None, on_summary=None,
+                          time_range: tuple = None) -> list:
         """
         Recupera i log dal Visualizzatore Eventi di Windows
         
+        La lettura e la formattazione avvengono in un processo separato (vedi extractor.py),
+        così il mainloop della GUI non compete per il GIL durante le letture grandi.
+        Con --extract-mode thread vengono eseguite in questo thread come in origine.
+        
         Args:
             category (str): Nome della categoria di log in italiano (es. "Applicazione")
             num_records (int): Numero esatto di eventi da recuperare
+            on_batch (callable): Riceve ogni lotto di eventi appena letto (vedi _extract_and_save)
+            on_summary (callable): Riceve il riepilogo dell'estrazione (tempi, aggregati di sicurezza)
+            time_range (tuple): (dal, al) in secondi epoch: solo gli eventi dell'intervallo (vedi timeseek.py)
             
         Returns:
             list: Lista di dizionari, ognuno contenente i dati di un evento di log
@@ -493,90 +807,40 @@ class EvLogPyAI(ctk.CTk):
         
         # Converte il nome della categoria dall'italiano al nome tecnico Windows
         # get() con secondo parametro fornisce un valore predefinito se la chiave non esiste
-        log_type = self.LOG_CATEGORIES.get(category, "Application")
+        log_type = self._channel(category)
+        
+        # Avanzamento mostrato nella status bar (aggiornata dal thread della GUI)
+        def on_progress(count: int):
+            self.after(0, self._update_status, f"📖 Lettura log di Windows... {count} eventi")
         
         try:
-            # === APERTURA LOG EVENTI ===
-            # OpenEventLog apre l'accesso al log eventi di Windows
-            # None = computer locale, log_type = tipo di log (Application, System, ecc.)
-            hand = win32evtlog.OpenEventLog(None, log_type)
-            
-            # === FLAGS DI LETTURA ===
-            # EVENTLOG_BACKWARDS_READ: legge dal più recente al più vecchio
-            # EVENTLOG_SEQUENTIAL_READ: legge in sequenza
-            # L'operatore | combina le due flag (bitwise OR)
-            flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
-            
-            # Contatore degli eventi letti finora
-            events_read = 0
-            
-            # === CICLO DI LETTURA EVENTI ===
-            # Continua a leggere finché non raggiungiamo il numero richiesto di eventi
-            while events_read < num_records:
-                # ReadEventLog legge un batch di eventi (di solito fino a 100 alla volta)
-                # Ritorna una lista di oggetti evento
-                events = win32evtlog.ReadEventLog(hand, flags, 0)
-                
-                # Se non ci sono più eventi da leggere, esci dal ciclo
-                if not events:
-                    break
-                    
-                # === PROCESSA OGNI EVENTO ===
-                # Itera su ogni evento nel batch appena letto
-                for event in events:
-                    # Se abbiamo già raggiunto il numero richiesto, ferma la lettura
-                    if events_read >= num_records:
-                        break
-                        
-                    # === DETERMINAZIONE TIPO EVENTO ===
-                    # Converte il codice numerico del tipo evento in una stringa leggibile
-                    event_type = "Info"  # Valore predefinito
-                    
-                    # EVENTLOG_ERROR_TYPE = 1: Evento di errore critico
-                    if event.EventType == win32con.EVENTLOG_ERROR_TYPE:
-                        event_type = "Errore"
-                    # EVENTLOG_WARNING_TYPE = 2: Evento di avviso
-                    elif event.EventType == win32con.EVENTLOG_WARNING_TYPE:
-                        event_type = "Avviso"
-                    # EVENTLOG_INFORMATION_TYPE = 4: Evento informativo
-                    elif event.EventType == win32con.EVENTLOG_INFORMATION_TYPE:
-                        event_type = "Informazione"
-                    # EVENTLOG_AUDIT_SUCCESS = 8: Audit riuscito (eventi di sicurezza)
-                    elif event.EventType == win32con.EVENTLOG_AUDIT_SUCCESS:
-                        event_type = "Audit Success"
-                    # EVENTLOG_AUDIT_FAILURE = 16: Audit fallito (eventi di sicurezza)
-                    elif event.EventType == win32con.EVENTLOG_AUDIT_FAILURE:
-                        event_type = "Audit Failure"
-                    
-                    # === RECUPERO MESSAGGIO EVENTO ===
-                    # Tenta di formattare il messaggio dell'evento in modo leggibile
-                    try:
-                        # SafeFormatMessage converte il messaggio raw in testo formattato
-                        msg = win32evtlogutil.SafeFormatMessage(event, log_type)
-                    except:
-                        # Se la formattazione fallisce, usa un messaggio predefinito
-                        msg = "Messaggio non disponibile"
-                    
-                    # === CREAZIONE DIZIONARIO EVENTO ===
-                    # Crea un dizionario con tutti i dati dell'evento
-                    log_entry = {
-                        "timestamp": event.TimeGenerated.Format(),  # Data/ora dell'evento formattata
-                        "source": event.SourceName,                 # Nome dell'applicazione/servizio che ha generato l'evento
-                        "event_id": event.EventID & 0xFFFF,         # ID univoco dell'evento (& 0xFFFF estrae i 16 bit bassi)
-                        "type": event_type,                         # Tipo evento (Errore, Avviso, ecc.)
-                        "category": event.EventCategory,            # Categoria numerica dell'evento
-                        "message": msg[:500] if msg else "N/A"     # Messaggio (limitato a 500 caratteri per evitare file troppo grandi)
-                    }
-                    
-                    # Aggiunge l'evento alla lista dei log
-                    logs.append(log_entry)
-                    
-                    # Incrementa il contatore eventi letti
-                    events_read += 1
-                    
-            # === CHIUSURA LOG ===
-            # Chiude l'handle del log eventi (importante per liberare risorse)
-            win32evtlog.CloseEventLog(hand)
+            # === ESTRAZIONE ===
+            # Il processo di estrazione invia gli eventi a lotti binari sulla pipe
+            if self.extract_mode == EXTRACT_PROCESS:
+                logs, summary = self.extraction_worker.extract(log_type, num_records, on_progress=on_progress,
+                                                               on_batch=on_batch, time_range=time_range)
+            else:
+                logs, summary = extract_in_thread(log_type, num_records, on_progress=on_progress,
+                                                  on_batch=on_batch, format_workers=self.format_workers,
+                                                  messages=self.message_store, time_range=time_range)
+            
+            # Registra le metriche di apertura, lettura, formattazione e trasferimento
+            self.metrics.observe("open_handle", summary["open_seconds"])
+            if "seek_seconds" in summary:
+                self.metrics.observe("seek", summary["seek_seconds"], items=summary["seeks"])
+            self.metrics.observe("read", summary["read_seconds"], items=summary["events"])
+            self.metrics.observe("format", summary["format_seconds"], items=summary["events"],
+                                 nbytes=summary["message_bytes"])
+            if "decode_seconds" in summary:
+                self.metrics.observe("transfer", summary["decode_seconds"], items=summary["events"],
+                                     nbytes=summary["wire_bytes"])
+            if "stored_messages" in summary:
+                self.metrics.observe("store_messages", summary["store_seconds"], items=summary["stored_messages"])
+            if "security" in summary:
+                self.metrics.observe("security_aggregate", summary.get("aggregate_seconds", 0.0),
+                                     items=summary["security"]["events"])
+            if on_summary:
+                on_summary(summary)
             
         except Exception as e:
             # === GESTIONE ERRORI ===
@@ -593,6 +857,28 @@ class EvLogPyAI(ctk.CTk):
         # Ritorna la lista di eventi recuperati
         return logs
     
+    def _start_health_monitor(self):
+        """
+        Avvia i controlli di N8N e Ollama e, se attivo, il preriscaldamento del modello
+        """
+        self.health_monitor = HealthMonitor(
+            self.N8N_WEBHOOK_URL,
+            self.ollama_url,
+            self.ollama_model,
+            on_update=self._on_health_update,
+            warmup=self.warmup
+        )
+        self.metrics.add_gauges(self.health_monitor.stats)
+        self.health_monitor.start()
+    
+    def _on_health_update(self, state: dict):
+        """
+        Riceve lo stato dei servizi dal thread dei controlli
+        """
+        text = format_state(state)
+        # Il thread dei controlli non può modificare la GUI: aggiornamento nel thread principale
+        self.after(0, lambda: self.health_label.configure(text=text))
+    
     def _update_status(self, message: str):
         """
         Aggiorna il testo nella barra di stato in basso
@@ -635,22 +921,16 @@ class EvLogPyAI(ctk.CTk):
                 title = self.title_entry.get().strip()           # Titolo del problema
                 category = self.category_var.get()               # Categoria selezionata
                 num_rows = int(self.rows_entry.get().strip())    # Numero righe (convertito in intero)
+                time_range = self._time_range()                  # Intervallo di tempo (None = nessuno)
                 description = self.description_text.get("1.0", "end-1c").strip()  # Descrizione completa
                 
-                # === RECUPERO LOG DA WINDOWS ===
-                # Chiama la funzione che legge i log dal Visualizzatore Eventi
-                logs = self._get_windows_logs(category, num_rows)
+                # Nuova esecuzione: le fasi seguenti finiscono in un nuovo file di trace
+                self.metrics.start_run(category=category, rows=num_rows)
                 
-                # === CONTROLLO LOG TROVATI ===
-                # Se non sono stati trovati log, informa l'utente e termina
-                if not logs:
-                    self.submit_btn.configure(state="normal", text="📥 Estrai Log")  # Riabilita il pulsante
-                    self._update_status("⚠️ Nessun log trovato")                     # Aggiorna status
-                    return  # Esce dalla funzione
-                
-                # === SALVATAGGIO FILE ===
-                # Chiama la funzione che salva i log in un file di testo sul desktop
-                self._save_logs_to_desktop(title, category, description, logs, num_rows)
+                # === RECUPERO LOG E SALVATAGGIO FILE ===
+                # Legge i log dal Visualizzatore Eventi; report e corpo dell'invio
+                # vengono preparati mentre la lettura è ancora in corso
+                self._extract_and_save(title, category, description, num_rows, time_range)
                 
             finally:
                 # === RIABILITAZIONE PULSANTE ===
@@ -664,7 +944,195 @@ class EvLogPyAI(ctk.CTk):
         # Questo evita che l'interfaccia si blocchi durante la lettura dei log
         threading.Thread(target=process, daemon=True).start()
     
-    def _save_logs_to_desktop(self, title: str, category: str, description: str, logs: list, num_rows: int):
+    def _extract_and_save(self, title: str, category: str, description: str, num_rows: int,
+                          time_range: tuple = None):
+        """
+        Estrae i log e salva il report sul Desktop con fasi sovrapposte (vedi pipeline.py)
+        
+        Ogni lotto letto viene passato a fasi che lavorano in parallelo alla lettura:
+        scrittura del report, indicizzazione nello storico, archiviazione compressa e
+        serializzazione della lista "logs" per l'invio a N8N. Al termine della lettura il
+        file è già completo.
+        
+        Args:
+            title (str): Titolo del problema
+            category (str): Categoria di log selezionata
+            description (str): Descrizione dettagliata del problema
+            num_rows (int): Numero di righe richieste dall'utente
+            time_range (tuple): (dal, al) in secondi epoch, None = gli eventi più recenti
+        """
+        filename, filepath = report_path(category, title)
+        writer = ReportWriter(filepath, title, category, self._channel(category), description, num_rows,
+                              messages=self.message_store)
+        
+        # Lista "logs" serializzata a pezzi: unita alla fine è identica a json.dumps(logs)
+        logs_parts = []
+        
+        def serialize(batch: list):
+            logs_parts.append(json.dumps(batch, ensure_ascii=False)[1:-1])
+        
+        # === INDICIZZAZIONE NELLO STORICO ===
+        # Un errore dell'indice non deve impedire il salvataggio né l'invio a N8N
+        history_state = {"extraction_id": None, "failed": False}
+        
+        def index_history(batch: list):
+            if history_state["failed"]:
+                return
+            try:
+                if history_state["extraction_id"] is None:
+                    history_state["extraction_id"] = self.history.begin_extraction(category, title, filepath)
+                self.history.add_events(history_state["extraction_id"], batch)
+            except Exception as e:
+                history_state["failed"] = True
+                print(f"⚠️  Indicizzazione storico non riuscita: {e}")
+        
+        # === ARCHIVIAZIONE ===
+        # Come per lo storico: un errore dell'archivio non interrompe l'estrazione
+        archive_state = {"run": None, "failed": False}
+        
+        def archive_events(batch: list):
+            if archive_state["failed"]:
+                return
+            try:
+                if archive_state["run"] is None:
+                    archive_state["run"] = self.archive.begin_run(title, category, self._channel(category),
+                                                                  description, num_rows, filename)
+                archive_state["run"].add_events(batch)
+            except Exception as e:
+                archive_state["failed"] = True
+                print(f"⚠️  Archiviazione non riuscita: {e}")
+        
+        stages = [
+            Stage("write_report", writer.write_events, size=writer.tell),
+            Stage("index_history", index_history),
+        ]
+        if self.archive is not None:
+            stages.append(Stage("archive_events", archive_events))
+        
+        # === CAMPIONAMENTO ===
+        # Se gli eventi richiesti superano --sample-size all'AI va un campione: viene
+        # calcolato durante la lettura al posto della serializzazione della lista completa
+        sampler = None
+        if self.baseline_diff or self.correlator is not None:
+            # Baseline e correlazione cambiano gli eventi da inviare: niente da preparare
+            pass
+        elif self.sample_size and num_rows > self.sample_size:
+            sampler = StratifiedSampler(self.sample_size)
+            stages.append(Stage("sample_logs", sampler.add_batch))
+        else:
+            stages.append(Stage("serialize_logs", serialize, size=lambda: sum(len(part) for part in logs_parts)))
+        
+        # Aggregati di sicurezza calcolati durante la lettura (solo log Security, vedi security.py)
+        summaries = []
+        
+        started = time.perf_counter()
+        try:
+            with Pipeline(stages, metrics=self.metrics) as pipeline:
+                # Le regole etichettano ogni lotto prima delle fasi: report e lista "logs" includono i tag
+                def tag_and_put(batch: list):
+                    if self.rule_engine is not None:
+                        with self.metrics.stage("tag_rules") as stage:
+                            stage.add_items(len(batch))
+                            self.rule_engine.tag_events(batch)
+                    pipeline.put(batch)
+                
+                logs = self._get_windows_logs(category, num_rows, on_batch=tag_and_put,
+                                              on_summary=summaries.append, time_range=time_range)
+            if logs:
+                writer.close()
+        except Exception as e:
+            # === GESTIONE ERRORI ===
+            # Errore durante la scrittura del file (es. permessi insufficienti, disco pieno, ecc.)
+            writer.abort()
+            self._finish_archive(archive_state["run"], False)
+            self._update_status("Errore salvataggio")
+            messagebox.showerror(
+                "Errore",                                         # Titolo finestra
+                f"Impossibile salvare il file:\n{str(e)}"        # Messaggio di errore dettagliato
+            )
+            return
+        
+        # === CONTROLLO LOG TROVATI ===
+        # Se non sono stati trovati log (o la lettura è fallita) il report parziale viene eliminato
+        if not logs:
+            writer.abort()
+            self._finish_archive(archive_state["run"], False)
+            self._update_status("⚠️ Nessun log trovato")
+            return
+        self.metrics.observe("extract_pipeline", time.perf_counter() - started, items=len(logs))
+        self._finish_archive(archive_state["run"], not archive_state["failed"])
+        
+        # === CANALI CORRELATI ===
+        # Letti qui, nel thread di estrazione: l'invio dalla tabella eventi non deve rileggere altri canali
+        context = self._read_correlation_channels(category, num_rows) if self.correlator is not None else None
+        
+        # Pulisce i campi del form per permettere una nuova estrazione
+        self._clear_form()
+        
+        # === VISUALIZZATORE EVENTI ===
+        # Apertura non bloccante: la tabella viene creata dal thread della GUI
+        self._update_status(f"✅ File salvato: {filename} - Seleziona gli eventi da analizzare")
+        logs_json = "[" + ", ".join(logs_parts) + "]" if logs_parts else None
+        sample = sampler.result() if sampler is not None and len(logs) > self.sample_size else None
+        security = summaries[0].get("security") if summaries else None
+        self.after(0, self._open_event_browser, title, category, description, logs, filename, filepath,
+                   logs_json, sample, context, security)
+    
+    def _finish_archive(self, run, keep: bool):
+        """
+        Chiude (o annulla) l'estrazione nell'archivio e applica i limiti di spazio e di età
+        
+        Args:
+            run (ArchiveRun): Estrazione in corso di archiviazione (None = niente da fare)
+            keep (bool): False se il report non è stato salvato o l'archiviazione è fallita
+        """
+        if run is None:
+            return
+        if not keep:
+            run.abort()
+            return
+        try:
+            run.close()
+            with self.metrics.stage("archive_retention"):
+                result = self.archive.apply_retention(self.archive_max_bytes, self.archive_max_days)
+            if result:
+                print(f"🗜️  Archivio: eliminate {result['deleted_runs']} estrazioni, "
+                      f"{result['bytes_before'] / 1024 / 1024:.1f} → {result['bytes_after'] / 1024 / 1024:.1f} MB")
+        except Exception as e:
+            run.abort()
+            print(f"⚠️  Archiviazione non riuscita: {e}")
+    
+    def _read_correlation_channels(self, category: str, num_rows: int) -> dict:
+        """
+        Legge gli altri canali di CORRELATION_CHANNELS per la correlazione degli incidenti
+        
+        Args:
+            category (str): Categoria selezionata (il suo canale è già stato letto)
+            num_rows (int): Eventi da leggere per canale
+            
+        Returns:
+            dict: Nome tecnico del canale -> eventi (i canali non leggibili vengono saltati)
+        """
+        context = {}
+        for channel in self.CORRELATION_CHANNELS:
+            if channel == self._channel(category):
+                continue
+            self._update_status(f"🔗 Lettura del log {channel} per la correlazione...")
+            try:
+                with self.metrics.stage("correlation_context") as stage:
+                    if self.extract_mode == EXTRACT_PROCESS:
+                        logs, _ = self.extraction_worker.extract(channel, num_rows)
+                    else:
+                        logs, _ = extract_in_thread(channel, num_rows, format_workers=self.format_workers,
+                                                    messages=self.message_store)
+                    stage.add_items(len(logs))
+                context[channel] = logs
+            except Exception as e:
+                print(f"⚠️  Log {channel} non leggibile, escluso dalla correlazione: {e}")
+        return context
+    
+    def _save_logs_to_desktop(self, title: str, category: str, description: str, logs: list, num_rows: int,
+                              interactive: bool = True, coalesce_key: str = None):
         """
         Salva i log estratti in un file di testo formattato sul Desktop dell'utente
         
@@ -674,98 +1142,64 @@ class EvLogPyAI(ctk.CTk):
             description (str): Descrizione dettagliata del problema
             logs (list): Lista di dizionari contenenti gli eventi log
             num_rows (int): Numero di righe richieste dall'utente
+            interactive (bool): Se False non mostra finestre di dialogo e non pulisce il form
+                                (usato dalla modalità watch)
+            coalesce_key (str): Chiave di coalescenza dell'invio a N8N (vedi _send_to_n8n)
         """
         try:
-            # === DETERMINAZIONE PERCORSO DESKTOP ===
-            # os.path.expanduser("~") ottiene la cartella home dell'utente corrente
-            # es. "C:\Users\NomeUtente" su Windows
-            # os.path.join() combina il percorso con "Desktop"
-            desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-            
-            # === GENERAZIONE NOME FILE ===
-            # Crea un timestamp nel formato AAAAMMGG_HHMMSS (es. 20260202_153045)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Sanitizza il titolo rimuovendo caratteri non validi per i nomi file
-            # Mantiene solo lettere, numeri, spazi, trattini e underscore
-            # [:50] limita la lunghezza a 50 caratteri per evitare nomi troppo lunghi
-            safe_title = "".join(c if c.isalnum() or c in (' ', '-', '_') else '_' for c in title)[:50]
-            
-            # Compone il nome del file finale
-            # Formato: EvLog_[Categoria]_[Titolo]_[Timestamp].txt
-            filename = f"EvLog_{category}_{safe_title}_{timestamp}.txt"
-            
-            # Crea il percorso completo del file combinando desktop + nome file
-            filepath = os.path.join(desktop, filename)
+            # === PERCORSO E NOME FILE ===
+            # Report sul Desktop: EvLog_[Categoria]_[Titolo]_[Timestamp].txt (vedi report.py)
+            filename, filepath = report_path(category, title)
             
             # Aggiorna la status bar
             self._update_status("💾 Salvataggio file sul desktop...")
             
+            # === MESSAGGI COMPLETI ===
+            # Gli eventi della modalità watch arrivano con il testo completo: resta solo l'anteprima
+            for log in logs:
+                detach_message(log, self.message_store)
+            self.message_store.flush()
+            
+            # === REGOLE DI RILEVAZIONE ===
+            if self.rule_engine is not None:
+                with self.metrics.stage("tag_rules") as stage:
+                    stage.add_items(len(logs))
+                    self.rule_engine.tag_events(logs)
+            
             # === SCRITTURA FILE ===
-            # Apre il file in modalità scrittura con encoding UTF-8 (supporta caratteri speciali)
-            # "with" assicura che il file venga chiuso automaticamente alla fine
-            with open(filepath, "w", encoding="utf-8") as f:
-                # === INTESTAZIONE FILE ===
-                # Scrive una riga di separazione (80 caratteri "=")
-                f.write("=" * 80 + "\n")
-                # Titolo del report centrato
-                f.write("  EvLogPyAI - Report Log Eventi Windows\n")
-                f.write("=" * 80 + "\n\n")
-                
-                # === INFORMAZIONI ESTRAZIONE ===
-                # Scrive i metadati dell'estrazione con emoji per migliore leggibilità
-                f.write(f"📋 TITOLO: {title}\n")
-                # Mostra sia il nome italiano che quello tecnico Windows della categoria
-                f.write(f"📁 CATEGORIA: {category} ({self.LOG_CATEGORIES[category]})\n")
-                # Data e ora dell'estrazione nel formato GG/MM/AAAA HH:MM:SS
-                f.write(f"📅 DATA ESTRAZIONE: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
-                # Numero di righe richieste dall'utente
-                f.write(f"📊 RIGHE RICHIESTE: {num_rows}\n")
-                # Numero effettivo di righe estratte (potrebbe essere minore se non ci sono abbastanza log)
-                f.write(f"📊 RIGHE ESTRATTE: {len(logs)}\n\n")
-                
-                # === SEZIONE DESCRIZIONE ISSUE ===
-                # Riga di separazione (80 trattini)
-                f.write("-" * 80 + "\n")
-                f.write("  DESCRIZIONE ISSUE\n")
-                f.write("-" * 80 + "\n")
-                # Scrive la descrizione completa del problema
-                f.write(f"{description}\n\n")
-                
-                # === SEZIONE LOG EVENTI ===
-                f.write("=" * 80 + "\n")
-                f.write("  LOG EVENTI\n")
-                f.write("=" * 80 + "\n\n")
-                
-                # === CICLO DI SCRITTURA EVENTI ===
-                # Itera su tutti gli eventi nella lista logs
-                # enumerate(logs, 1) fornisce sia l'indice (partendo da 1) che l'evento
-                for i, log in enumerate(logs, 1):
-                    # Intestazione dell'evento con numero progressivo
-                    f.write(f"--- Evento #{i} ---\n")
-                    
-                    # Scrive tutti i dettagli dell'evento in modo strutturato
-                    f.write(f"  Timestamp: {log['timestamp']}\n")    # Data/ora evento
-                    f.write(f"  Sorgente:  {log['source']}\n")       # Applicazione/servizio che ha generato l'evento
-                    f.write(f"  Event ID:  {log['event_id']}\n")     # ID univoco dell'evento
-                    f.write(f"  Tipo:      {log['type']}\n")         # Tipo (Errore, Avviso, Info, ecc.)
-                    f.write(f"  Categoria: {log['category']}\n")     # Categoria numerica
-                    f.write(f"  Messaggio:\n")
-                    
-                    # === FORMATTAZIONE MESSAGGIO ===
-                    # Il messaggio può contenere più righe, quindi le splitta
-                    # Indenta ogni riga con 4 spazi per migliore leggibilità
-                    for line in log['message'].split('\n'):
-                        f.write(f"    {line}\n")
-                    
-                    # Riga vuota tra un evento e l'altro per separazione visiva
-                    f.write("\n")
-                
-                # === CHIUSURA FILE ===
-                # Riga finale di separazione
-                f.write("=" * 80 + "\n")
-                f.write("  Fine Report\n")
-                f.write("=" * 80 + "\n")
+            # Stesso formato della pipeline di _extract_and_save, in un unico lotto
+            writer = ReportWriter(filepath, title, category, self._channel(category), description, num_rows,
+                                  messages=self.message_store)
+            with self.metrics.stage("write_report") as stage:
+                stage.add_items(len(logs))
+                try:
+                    writer.write_events(logs)
+                    stage.add_bytes(writer.close())
+                except Exception:
+                    writer.abort()
+                    raise
+            
+            # === INDICIZZAZIONE NELLO STORICO ===
+            # Un errore dell'indice non deve impedire il salvataggio né l'invio a N8N
+            try:
+                with self.metrics.stage("index_history") as stage:
+                    stage.add_items(self.history.add_extraction(logs, category, title, filepath))
+            except Exception as e:
+                print(f"⚠️  Indicizzazione storico non riuscita: {e}")
+            
+            # === ARCHIVIAZIONE ===
+            if self.archive is not None:
+                run = self.archive.begin_run(title, category, self._channel(category), description,
+                                             num_rows, filename)
+                try:
+                    with self.metrics.stage("archive_events") as stage:
+                        stage.add_items(len(logs))
+                        run.add_events(logs)
+                except Exception as e:
+                    print(f"⚠️  Archiviazione non riuscita: {e}")
+                    self._finish_archive(run, False)
+                else:
+                    self._finish_archive(run, True)
             
             # === NOTIFICA SUCCESSO ===
             # A questo punto il file è stato scritto e chiuso con successo
@@ -773,21 +1207,20 @@ class EvLogPyAI(ctk.CTk):
             # Aggiorna la status bar con il nome del file salvato
             self._update_status(f"✅ File salvato: {filename}")
             
-            # Mostra una finestra di dialogo informativa all'utente
-            messagebox.showinfo(
-                "Estrazione Completata",                         # Titolo finestra
-                f"Log estratti con successo!\n\n"
-                f"📁 File: {filename}\n"                    # Nome del file creato
-                f"📍 Posizione: Desktop\n"                  # Dove si trova il file
-                f"📊 Eventi estratti: {len(logs)}"         # Quanti eventi sono stati salvati
-            )
-            
-            # Pulisce i campi del form per permettere una nuova estrazione
-            self._clear_form()
+            if interactive:
+                # Pulisce i campi del form per permettere una nuova estrazione
+                self._clear_form()
+                
+                # === VISUALIZZATORE EVENTI ===
+                # Gli eventi vengono mostrati nella tabella: l'utente sceglie quali inviare all'analisi
+                self._update_status(f"✅ File salvato: {filename} - Seleziona gli eventi da analizzare")
+                self.after(0, self._open_event_browser, title, category, description, logs, filename, filepath)
+                return
             
             # === INVIO TRIGGER A N8N ===
             # Dopo il salvataggio del file, invia i dati a N8N per triggerare il workflow
-            self._send_to_n8n(title, category, description, logs, filename, filepath)
+            self._send_to_n8n(title, category, description, logs, filename, filepath,
+                              coalesce_key=coalesce_key)
             
         except Exception as e:
             # === GESTIONE ERRORI ===
@@ -808,87 +1241,30 @@ class EvLogPyAI(ctk.CTk):
         Avvia un server HTTP locale per ricevere le risposte da N8N
         Il server rimane in ascolto su CALLBACK_PORT in attesa della risposta dell'AI
         """
-        # Riferimento all'istanza principale per accederla dall'handler
-        app_instance = self
-        
-        class CallbackHandler(BaseHTTPRequestHandler):
-            """
-            Handler HTTP per gestire le richieste in arrivo da N8N
-            """
-            
-            def log_message(self, format, *args):
-                """Sovrascrive il log per evitare output su console"""
-                print(f"📨 Server callback: {args[0]}")
-            
-            def do_POST(self):
-                """
-                Gestisce le richieste POST (risposta da N8N)
-                """
-                try:
-                    # Legge la lunghezza del contenuto
-                    content_length = int(self.headers['Content-Length'])
-                    # Legge il corpo della richiesta
-                    post_data = self.rfile.read(content_length)
-                    
-                    # Decodifica JSON
-                    response_data = json.loads(post_data.decode('utf-8'))
-                    
-                    print("\n" + "="*80)
-                    print("📥 RISPOSTA RICEVUTA DA N8N")
-                    print("="*80)
-                    print(f"📦 Dati ricevuti: {str(response_data)[:500]}")
-                    print("="*80 + "\n")
-                    
-                    # Invia risposta OK a N8N
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({"status": "received"}).encode())
-                    
-                    # Processa la risposta nel thread principale della GUI
-                    app_instance.after(100, lambda: app_instance._process_n8n_response(response_data))
-                    
-                except Exception as e:
-                    print(f"❌ Errore elaborazione risposta: {str(e)}")
-                    self.send_response(500)
-                    self.end_headers()
-            
-            def do_GET(self):
-                """
-                Gestisce le richieste GET (health check)
-                """
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(b"EvLogPyAI Callback Server Running")
+        # Il server è già attivo (es. altri invii in attesa di risposta)
+        if self.callback_server:
+            return True
         
         try:
-            # Crea il server HTTP
-            # Usa "" (stringa vuota) o "0.0.0.0" per ascoltare su tutte le interfacce
-            # Questo permette connessioni sia IPv4 che IPv6
-            self.callback_server = HTTPServer(
-                ("", self.CALLBACK_PORT),  # "" = tutte le interfacce
-                CallbackHandler
+            # === AVVIO SERVER ===
+            # Ascolto su tutte le interfacce (IPv4 e IPv6) in un thread separato (vedi callback.py);
+            # ogni risposta viene processata nel thread principale della GUI
+            self.callback_server = CallbackServer(
+                self.CALLBACK_PORT,
+                on_response=lambda data: self.after(100, lambda: self._process_n8n_response(data)),
+                metrics=self.metrics,
+                max_body_bytes=self.callback_max_bytes,
+                reports=self.report_store
             )
-            
-            # Disabilita il timeout del server per gestire risposte lunghe dall'AI
-            # None = nessun timeout, il server rimane in ascolto indefinitamente
-            self.callback_server.timeout = None
+            self.callback_server.start()
             
             print(f"🖥️  Server callback avviato su http://{self.CALLBACK_HOST}:{self.CALLBACK_PORT}")
             print(f"📡 Ascolto su tutte le interfacce - porta {self.CALLBACK_PORT}")
             self._update_status(f"🖥️ Server in ascolto su porta {self.CALLBACK_PORT}...")
-            
-            # Avvia il server in un thread separato
-            self.callback_thread = threading.Thread(
-                target=self.callback_server.serve_forever,
-                daemon=True
-            )
-            self.callback_thread.start()
-            
             return True
             
         except OSError as e:
+            self.callback_server = None
             print(f"❌ Errore avvio server: {str(e)}")
             if "Address already in use" in str(e) or "10048" in str(e):
                 messagebox.showerror(
@@ -898,6 +1274,7 @@ class EvLogPyAI(ctk.CTk):
                 )
             return False
         except Exception as e:
+            self.callback_server = None
             print(f"❌ Errore server: {str(e)}")
             return False
     
@@ -907,9 +1284,8 @@ class EvLogPyAI(ctk.CTk):
         """
         if self.callback_server:
             print("🛑 Arresto server callback...")
-            self.callback_server.shutdown()
+            self.callback_server.stop()
             self.callback_server = None
-            self.callback_thread = None
     
     def _process_n8n_response(self, response_data: dict):
         """
@@ -934,246 +1310,83 @@ class EvLogPyAI(ctk.CTk):
             
             print(f"📝 Output AI ricevuto ({len(ai_output)} caratteri)")
             
-            # Genera l'HTML con la risposta
-            html_content = self._generate_html_response(ai_output)
-            
-            # Apre nel browser
-            self._open_response_in_browser(html_content)
+            # === ABBINAMENTO ALLA RICHIESTA ===
+            # Con più analisi in corso il request_id indica a quale richiesta risponde l'AI
+            requests_matched = self.pending_requests.match(response_data)
+            if not requests_matched:
+                print(f"⚠️  Risposta non abbinata a una richiesta in attesa (request_id "
+                      f"{response_data.get('request_id')!r})")
+            
+            # Tempo trascorso tra la consegna a N8N e l'arrivo della risposta AI
+            for request in requests_matched:
+                if "delivered" in request:
+                    self.metrics.observe("wait_ai", time.perf_counter() - request["delivered"],
+                                         nbytes=len(ai_output.encode("utf-8")))
+            
+            with self.metrics.stage("render_html") as stage:
+                # Genera l'HTML con la risposta
+                request_data = requests_matched[0] if requests_matched else {}
+                html_content = self._generate_html_response(ai_output, request_data=request_data)
+                stage.add_bytes(len(html_content.encode("utf-8")))
+                
+                # Salva nell'archivio e apre nel browser
+                self._open_response_in_browser(html_content, request_data.get("title"), request_data.get("category"))
             
             # Aggiorna lo stato
             self._update_status("✅ Analisi completata - Browser aperto")
             
-            # Ferma il server callback (non più necessario)
-            self._stop_callback_server()
-            
         except Exception as e:
             print(f"❌ Errore elaborazione risposta: {str(e)}")
             self._update_status(f"❌ Errore: {str(e)}")
             messagebox.showerror("Errore", f"Errore durante l'elaborazione della risposta:\n{str(e)}")
     
-    def _generate_html_response(self, ai_output: str) -> str:
+    def _generate_html_response(self, ai_output: str, request_data: dict = None,
+                                heading: str = "🤖 EvLogPyAI - Analisi AI") -> str:
         """
         Genera una pagina HTML formattata con la risposta dell'AI
         
         Args:
             ai_output (str): Testo della risposta dell'AI
+            request_data (dict): Titolo e categoria della richiesta (default: ultima richiesta inviata)
+            heading (str): Intestazione della pagina (es. per la risposta della knowledge base)
             
         Returns:
-            str: Pagina HTML completa
+            str: Pagina HTML completa (foglio di stile condiviso, vedi reportstore.py)
         """
         # Recupera i dati della richiesta originale se disponibili
-        request_data = self.pending_request_data or {}
-        title = request_data.get("title", "Analisi Log")
-        category = request_data.get("category", "N/D")
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        request_data = request_data or {}
+        return render_report(ai_output, title=request_data.get("title", "Analisi Log"),
+                             category=request_data.get("category", "N/D"), heading=heading)
         
-        # Escape HTML per sicurezza
-        ai_output_escaped = ai_output.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-        
-        # Converte i newline in <br> per HTML
-        ai_output_html = ai_output_escaped.replace("\n", "<br>\n")
-        
-        html_template = f'''<!DOCTYPE html>
-<html lang="it">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>EvLogPyAI - Analisi AI</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #1F2937 0%, #111827 100%);
-            min-height: 100vh;
-            padding: 40px 20px;
-            color: #F9FAFB;
-        }}
-        
-        .container {{
-            max-width: 900px;
-            margin: 0 auto;
-        }}
-        
-        .header {{
-            background: linear-gradient(135deg, #10B981 0%, #059669 100%);
-            padding: 30px;
-            border-radius: 15px 15px 0 0;
-            text-align: center;
-            box-shadow: 0 4px 20px rgba(16, 185, 129, 0.3);
-        }}
-        
-        .header h1 {{
-            color: #1F2937;
-            font-size: 28px;
-            margin-bottom: 10px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            gap: 10px;
-        }}
-        
-        .header .subtitle {{
-            color: #1F2937;
-            opacity: 0.8;
-            font-size: 14px;
-        }}
-        
-        .meta-info {{
-            background: #374151;
-            padding: 20px 30px;
-            display: flex;
-            justify-content: space-between;
-            flex-wrap: wrap;
-            gap: 15px;
-            border-bottom: 1px solid #4B5563;
-        }}
-        
-        .meta-item {{
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }}
-        
-        .meta-item .icon {{
-            font-size: 18px;
-        }}
-        
-        .meta-item .label {{
-            color: #9CA3AF;
-            font-size: 12px;
-            text-transform: uppercase;
-        }}
-        
-        .meta-item .value {{
-            color: #F9FAFB;
-            font-weight: 600;
-        }}
-        
-        .content {{
-            background: #374151;
-            padding: 30px;
-            border-radius: 0 0 15px 15px;
-            box-shadow: 0 4px 20px rgba(0, 0, 0, 0.3);
-        }}
-        
-        .section-title {{
-            color: #10B981;
-            font-size: 18px;
-            margin-bottom: 20px;
-            padding-bottom: 10px;
-            border-bottom: 2px solid #10B981;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .ai-response {{
-            background: #1F2937;
-            padding: 25px;
-            border-radius: 10px;
-            border-left: 4px solid #10B981;
-            line-height: 1.8;
-            font-size: 15px;
-            white-space: pre-wrap;
-            word-wrap: break-word;
-        }}
-        
-        .ai-response p {{
-            margin-bottom: 15px;
-        }}
-        
-        .footer {{
-            text-align: center;
-            margin-top: 30px;
-            color: #6B7280;
-            font-size: 13px;
-        }}
-        
-        .footer a {{
-            color: #10B981;
-            text-decoration: none;
-        }}
-        
-        .footer a:hover {{
-            text-decoration: underline;
-        }}
-        
-        @media (max-width: 600px) {{
-            .header h1 {{
-                font-size: 22px;
-            }}
-            
-            .meta-info {{
-                flex-direction: column;
-            }}
-            
-            .content {{
-                padding: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🤖 EvLogPyAI - Analisi AI</h1>
-            <div class="subtitle">Report generato automaticamente dall'analisi dei log di Windows</div>
-        </div>
-        
-        <div class="meta-info">
-            <div class="meta-item">
-                <span class="icon">📋</span>
-                <div>
-                    <div class="label">Titolo</div>
-                    <div class="value">{title}</div>
-                </div>
-            </div>
-            <div class="meta-item">
-                <span class="icon">📁</span>
-                <div>
-                    <div class="label">Categoria</div>
-                    <div class="value">{category}</div>
-                </div>
-            </div>
-            <div class="meta-item">
-                <span class="icon">🕐</span>
-                <div>
-                    <div class="label">Data Analisi</div>
-                    <div class="value">{timestamp}</div>
-                </div>
-            </div>
-        </div>
-        
-        <div class="content">
-            <div class="section-title">
-                <span>🔍</span>
-                <span>Diagnosi e Analisi</span>
-            </div>
-            <div class="ai-response">
-{ai_output_html}
-            </div>
-        </div>
-        
-        <div class="footer">
-            <p>Generato da <strong>EvLogPyAI</strong> con tecnologia <a href="#">Ollama AI</a></p>
-            <p>© 2026 - Tutti i diritti riservati</p>
-        </div>
-    </div>
-</body>
-</html>'''
-        
-        return html_template
-        
-    def _send_to_n8n(self, title: str, category: str, description: str, logs: list, filename: str, filepath: str):
-        """
-        Invia i dati estratti al webhook N8N per triggerare il workflow
+    def _get_baseline(self, category: str):
+        """
+        Profilo normale della categoria su questo host (caricato una volta, ricaricato se ricatturato)
+        
+        Returns:
+            Baseline: Profilo, o None se non è mai stato catturato o non è leggibile
+        """
+        channel = self._channel(category)
+        try:
+            cached = self._baselines.get(channel)
+            path = baseline_path(socket.gethostname(), channel)
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if cached is None or cached[0] != mtime:
+                cached = self._baselines[channel] = (mtime, load_baseline(channel) if mtime else None)
+            return cached[1]
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Baseline {channel} non utilizzabile: {e}")
+            return None
+    
+    def _send_to_n8n(self, title: str, category: str, description: str, logs: list, filename: str, filepath: str,
+                     coalesce_key: str = None, logs_json: str = None, sample: tuple = None, context: dict = None,
+                     security: dict = None):
+        """
+        Accoda i dati estratti nell'outbox per l'invio al webhook N8N
         Avvia un server callback locale per ricevere la risposta dell'AI
         
+        L'invio vero e proprio avviene nel thread dell'outbox (retry con backoff),
+        quindi questo metodo ritorna subito e i dati non vanno persi se N8N non risponde.
+        
         Args:
             title (str): Titolo del problema
             category (str): Categoria di log selezionata
@@ -1181,8 +1394,81 @@ class EvLogPyAI(ctk.CTk):
             logs (list): Lista di dizionari contenenti gli eventi log
             filename (str): Nome del file salvato sul desktop
             filepath (str): Percorso completo del file salvato
+            coalesce_key (str): Invii con la stessa chiave possono essere uniti se in coda insieme
+            logs_json (str): Lista logs già serializzata durante l'estrazione (vedi _extract_and_save)
+            sample (tuple): Campione (eventi, riepilogo) già calcolato durante l'estrazione
+            context (dict): Eventi degli altri canali per la correlazione degli incidenti
+            security (dict): Aggregati degli eventi di sicurezza calcolati durante l'estrazione
         """
         try:
+            # === REGOLE DI RILEVAZIONE ===
+            # Riepilogo calcolato su tutti gli eventi, prima che baseline e knowledge base li riducano
+            rules = self.rule_engine.summarize(logs) if self.rule_engine is not None else None
+            if rules:
+                print(format_rules_summary(rules))
+            
+            # === CONFRONTO CON LA BASELINE ===
+            # Solo firme mai viste nel profilo normale o con frequenza molto superiore
+            diff = None
+            baseline = self._get_baseline(category) if self.baseline_diff else None
+            if baseline is not None:
+                with self.metrics.stage("baseline_diff") as stage:
+                    stage.add_items(len(logs))
+                    logs, diff = baseline.diff(logs)
+                logs_json = sample = None
+                print(f"📐 Baseline {diff['profile']}: {diff['forwarded_events']} eventi anomali su "
+                      f"{diff['total_events']} ({diff['new_signatures']} firme nuove, "
+                      f"{diff['increased_signatures']} in aumento)")
+                if not logs:
+                    self._update_status("✅ Nessuna anomalia rispetto alla baseline: niente da analizzare")
+                    return
+            
+            # === CORRELAZIONE DEGLI INCIDENTI ===
+            # Gli eventi di tutti i canali diventano poche decine di incidenti: all'AI vanno
+            # la struttura degli incidenti e i loro eventi rappresentativi
+            incidents = None
+            if self.correlator is not None:
+                channel = self._channel(category)
+                with self.metrics.stage("correlate") as stage:
+                    stage.add_items(len(logs) + sum(len(c) for c in (context or {}).values()))
+                    representatives, incidents = self.correlator.correlate({channel: logs, **(context or {})},
+                                                                           focus=channel)
+                print(format_incidents(incidents))
+                if incidents["incidents"]:
+                    logs, logs_json, sample = representatives, None, None
+                else:
+                    incidents = None
+            
+            # === PROBLEMI NOTI ===
+            # Risposta immediata dalla knowledge base; all'AI vanno solo eventi sconosciuti o ambigui
+            known = None
+            if self.knowledge_base is not None:
+                started = time.perf_counter()
+                matches, escalated = self.knowledge_base.split(logs)
+                if matches:
+                    report = format_matches(matches, total=len(logs), escalated=len(escalated))
+                    html_content = self._generate_html_response(
+                        report, request_data={"title": title, "category": category},
+                        heading="⚡ EvLogPyAI - Problemi Noti"
+                    )
+                    self._open_response_in_browser(html_content, title, category, "⚡ EvLogPyAI - Problemi Noti")
+                    self.metrics.observe("known_issues", time.perf_counter() - started, items=len(logs),
+                                         nbytes=len(html_content.encode("utf-8")))
+                    known = summarize_matches(matches)
+                    print(f"⚡ Knowledge base: {known['matched_events']} eventi noti, "
+                          f"{len(escalated)} da inviare all'AI")
+                    if len(escalated) != len(logs):
+                        logs, logs_json, sample = escalated, None, None
+                if not logs:
+                    self._update_status("✅ Problemi noti: risposta aperta nel browser, nessuna analisi AI necessaria")
+                    return
+            
+            # === AGGREGATI DI SICUREZZA ===
+            # Al posto delle migliaia di accessi all'AI vanno gli aggregati e pochi esempi per Event ID
+            if security:
+                logs, logs_json, sample = reduce_security_logs(logs, security), None, None
+                print(format_security_summary(security))
+            
             # === AVVIO SERVER CALLBACK ===
             # Prima di inviare a N8N, avviamo il server locale per ricevere la risposta
             if not self._start_callback_server():
@@ -1190,13 +1476,36 @@ class EvLogPyAI(ctk.CTk):
                 return
             
             # === MEMORIZZA DATI RICHIESTA ===
-            # Salva i dati per usarli quando generiamo l'HTML
-            self.pending_request_data = {
+            # Salva i dati per usarli quando generiamo l'HTML: la risposta di N8N riporta
+            # il request_id, così ogni risposta trova la sua richiesta anche con più analisi in corso
+            request_id = new_request_id()
+            self.pending_requests.add(request_id, {
                 "title": title,
                 "category": category,
                 "description": description,
                 "total_logs": len(logs)
-            }
+            })
+            
+            # === CAMPIONAMENTO ===
+            # Le estrazioni oltre --sample-size vengono ridotte a un campione stratificato;
+            # il riepilogo nel payload indica quanti eventi rappresenta ogni evento inviato
+            sampling = None
+            if self.sample_size and len(logs) > self.sample_size:
+                with self.metrics.stage("sample_logs") as stage:
+                    stage.add_items(len(logs))
+                    logs, sampling = sample if sample is not None else sample_logs(logs, self.sample_size)
+                logs_json = None
+                print(f"🎯 Campione stratificato: {sampling['sampled_events']} eventi su "
+                      f"{sampling['total_events']} ({len(sampling['strata'])} strati)")
+            
+            # === MESSAGGI COMPLETI ===
+            # Solo per gli eventi che vanno davvero all'AI, dopo tutte le riduzioni: al posto
+            # dell'anteprima il messaggio completo (entro AI_MESSAGE_MAX_CHARS caratteri)
+            with self.metrics.stage("expand_messages") as stage:
+                stage.add_items(len(logs))
+                expanded = self.message_store.expand(logs)
+            if expanded is not logs:
+                logs, logs_json = expanded, None
             
             # === URL CALLBACK ===
             # URL dove N8N invierà la risposta dell'AI
@@ -1208,116 +1517,114 @@ class EvLogPyAI(ctk.CTk):
             payload = {
                 "title": title,                                    # Titolo del problema
                 "category": category,                              # Categoria italiana
-                "category_windows": self.LOG_CATEGORIES[category], # Nome tecnico Windows
+                "category_windows": self._channel(category),       # Nome tecnico Windows
                 "description": description,                        # Descrizione issue
                 "timestamp": datetime.now().isoformat(),           # Timestamp ISO 8601
                 "filename": filename,                              # Nome file creato
                 "filepath": filepath,                              # Percorso completo
                 "total_logs": len(logs),                          # Numero eventi estratti
                 "logs": logs,                                      # Array con tutti gli eventi
-                "callback_url": callback_url                       # URL per la risposta
+                "callback_url": callback_url,                      # URL per la risposta
+                "request_id": request_id                           # Restituito da N8N nella risposta
             }
+            if sampling:
+                payload["sampling"] = sampling                     # Rapporti di campionamento per strato
+            if diff:
+                payload["baseline"] = diff                         # Confronto con il profilo normale
+            if known:
+                payload["known_issues"] = known                    # Problemi già spiegati localmente
+            if incidents:
+                payload["incidents"] = incidents                   # Incidenti correlati tra i canali
+            if security:
+                payload["security"] = security                     # Aggregati degli eventi di audit
+            if rules:
+                payload["rules"] = rules                           # Regole di rilevazione scattate
+            
+            # === ACCODAMENTO NELL'OUTBOX ===
+            # Il payload viene scritto su disco prima di qualsiasi tentativo di rete
+            job_id = self.outbox.enqueue(payload, coalesce_key=coalesce_key, logs_json=logs_json)
+            self.outbox_sender.notify()
             
             # === DEBUG: Stampa informazioni invio ===
             print("\n" + "="*80)
-            print("🚀 INVIO DATI A N8N")
+            print("🚀 INVIO DATI A N8N (outbox)")
             print("="*80)
             print(f"📍 URL Webhook: {self.N8N_WEBHOOK_URL}")
             print(f"📞 Callback URL: {callback_url}")
-            print(f"📦 Payload: {len(logs)} log da inviare")
+            print(f"📦 Payload: {len(logs)} log da inviare (job #{job_id})")
             print(f"📋 Titolo: {title}")
             print(f"📁 Categoria: {category}")
+            print(f"📬 Job in coda: {self.outbox.depth()}")
             print("="*80 + "\n")
             
-            # === INVIO RICHIESTA HTTP POST ===
             # Aggiorna la status bar
-            self._update_status("🚀 Invio a N8N... In attesa risposta AI...")
-            
-            # Invia una richiesta POST al webhook N8N
-            # timeout=300: attende max 5 minuti per l'ACK iniziale
-            # La risposta completa dell'AI arriverà al callback server (senza timeout)
-            response = requests.post(
-                self.N8N_WEBHOOK_URL,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=300
-            )
-            
-            # === DEBUG: Stampa risposta ===
-            print(f"✅ ACK ricevuto - Status Code: {response.status_code}")
-            print("="*80 + "\n")
-            
-            # === VERIFICA RISPOSTA ===
-            # Controlla se N8N ha ricevuto correttamente la richiesta
-            if response.status_code == 200:
-                self._update_status("⏳ N8N sta elaborando... In attesa risposta AI...")
-                print("✅ N8N ha ricevuto i dati. Server in ascolto per la risposta...")
-                print(f"🖥️  Callback server attivo su: {callback_url}")
-                # La risposta effettiva arriverà al callback server
-                
-            else:
-                # Se il server risponde ma con un errore
-                self._update_status(f"⚠️ N8N ha risposto con codice {response.status_code}")
-                print(f"⚠️ ATTENZIONE: N8N risposta con status {response.status_code}")
-                print(f"Corpo risposta: {response.text}")
-                self._stop_callback_server()
-                
-        except requests.exceptions.Timeout:
-            # === GESTIONE TIMEOUT ===
-            self._update_status("⚠️ Timeout connessione N8N")
-            print("\n" + "="*80)
-            print("❌ ERRORE: Timeout connessione N8N")
-            print("⏱️  N8N non risponde entro 5 minuti")
-            print(f"📍 URL tentato: {self.N8N_WEBHOOK_URL}")
-            print("="*80 + "\n")
-            self._stop_callback_server()
-            
-        except requests.exceptions.ConnectionError as e:
-            # === GESTIONE ERRORE CONNESSIONE ===
-            self._update_status("⚠️ N8N non disponibile")
-            print("\n" + "="*80)
-            print("❌ ERRORE: Impossibile connettersi a N8N")
-            print(f"📍 URL: {self.N8N_WEBHOOK_URL}")
-            print(f"💡 Dettagli errore: {str(e)}")
-            print("\n🔍 VERIFICHE DA FARE:")
-            print("  1. N8N è in esecuzione? Controlla http://localhost:5678")
-            print("  2. Il nodo Webhook è configurato nel workflow?")
-            print("  3. Il webhook path è corretto? Deve essere 'evlogpyai'")
-            print("  4. Il workflow è attivo/salvato?")
-            print("="*80 + "\n")
-            self._stop_callback_server()
-            
+            self._update_status("🚀 Invio a N8N in coda... In attesa risposta AI...")
+        
         except Exception as e:
-            # === GESTIONE ALTRI ERRORI ===
+            # === GESTIONE ERRORI ===
             self._update_status("❌ Errore invio N8N")
             print("\n" + "="*80)
             print("❌ ERRORE GENERICO durante invio a N8N")
             print(f"💥 Tipo errore: {type(e).__name__}")
             print(f"📄 Messaggio: {str(e)}")
             print("="*80 + "\n")
-            self._stop_callback_server()
     
-    def _open_response_in_browser(self, html_content: str):
+    def _on_outbox_sent(self, payload: dict):
+        """
+        Chiamata dal thread dell'outbox quando N8N ha ricevuto un invio
+        
+        Args:
+            payload (dict): Payload consegnato
+        """
+        self.pending_requests.delivered(payload.get("request_id"))
+        print("✅ N8N ha ricevuto i dati. Server in ascolto per la risposta...")
+        print(f"🖥️  Callback server attivo su: {payload.get('callback_url')}")
+        self.after(0, lambda: self._update_status("⏳ N8N sta elaborando... In attesa risposta AI..."))
+    
+    def _on_outbox_failed(self, payload: dict, error: str, dead: bool):
         """
-        Salva la risposta HTML in un file temporaneo e lo apre nel browser predefinito
+        Chiamata dal thread dell'outbox dopo un tentativo di invio fallito
+        
+        Args:
+            payload (dict): Payload non consegnato
+            error (str): Descrizione dell'errore
+            dead (bool): True se il job è stato abbandonato definitivamente
+        """
+        if dead:
+            self.after(0, lambda: self._update_status("❌ Invio a N8N abbandonato dopo troppi tentativi"))
+        else:
+            depth = self.outbox.depth()
+            self.after(0, lambda: self._update_status(
+                f"⚠️ N8N non disponibile - nuovo tentativo automatico ({depth} in coda)"
+            ))
+    
+    def _open_response_in_browser(self, html_content: str, title: str = None, category: str = None,
+                                  heading: str = "🤖 EvLogPyAI - Analisi AI"):
+        """
+        Salva la risposta HTML nell'archivio dei report e la apre nel browser predefinito
+        
+        La pagina viene servita dal server locale (gzip, cache del foglio di stile) ed è
+        raggiungibile anche dopo dallo storico /reports/; se il server non può partire
+        viene aperto direttamente il file.
         
         Args:
             html_content (str): Contenuto HTML da visualizzare
+            title (str): Titolo del problema (indice dello storico)
+            category (str): Categoria di log (indice dello storico)
+            heading (str): Tipo di report (indice dello storico)
         """
+        report_path = None
         try:
-            # Crea un file temporaneo con estensione .html
-            # delete=False: non elimina il file automaticamente quando viene chiuso
-            # suffix='.html': estensione del file
-            # mode='w': modalità scrittura
-            # encoding='utf-8': supporto caratteri speciali
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.html', encoding='utf-8') as f:
-                f.write(html_content)
-                temp_file_path = f.name
-            
-            print(f"📄 Risposta salvata in: {temp_file_path}")
-            
-            # Apre il file HTML nel browser predefinito
-            webbrowser.open('file://' + temp_file_path)
+            report_id = self.report_store.save(html_content, title, category, heading)
+            report_path = self.report_store.path(report_id)
+            print(f"📄 Risposta salvata in: {report_path}")
+            
+            if self._start_callback_server():
+                # Sempre 127.0.0.1: i report vengono serviti solo ai client locali
+                webbrowser.open(ReportStore.url(f"http://{self.CALLBACK_HOST}:{self.callback_server.port}",
+                                                report_id))
+            else:
+                webbrowser.open('file://' + report_path)
             
             print("🌐 Apertura browser con la risposta dell'AI...")
             
@@ -1326,10 +1633,151 @@ class EvLogPyAI(ctk.CTk):
             # Se fallisce l'apertura del browser, mostra almeno il path del file
             messagebox.showinfo(
                 "Risposta AI disponibile",
-                f"La risposta è stata salvata in:\n{temp_file_path}\n\n"
+                f"La risposta è stata salvata in:\n{report_path or self.report_store.directory}\n\n"
                 "Apri il file manualmente nel browser."
             )
     
+    def _open_report_history(self):
+        """
+        Apre nel browser lo storico dei report (servito dal server locale)
+        """
+        if self._start_callback_server():
+            webbrowser.open(ReportStore.url(f"http://{self.CALLBACK_HOST}:{self.callback_server.port}"))
+        else:
+            webbrowser.open('file://' + self.report_store.directory)
+    
+    def _open_event_browser(self, title: str, category: str, description: str, logs: list, filename: str,
+                            filepath: str, logs_json: str = None, sample: tuple = None, context: dict = None,
+                            security: dict = None):
+        """
+        Apre la tabella degli eventi estratti; il pulsante "Invia" manda a N8N solo quelli selezionati
+        
+        Args:
+            title (str): Titolo del problema
+            category (str): Categoria di log selezionata
+            description (str): Descrizione dettagliata del problema
+            logs (list): Eventi estratti
+            filename (str): Nome del report salvato sul desktop
+            filepath (str): Percorso completo del report
+            logs_json (str): Eventi già serializzati, riusati se vengono inviati tutti
+            sample (tuple): Campione stratificato di tutti gli eventi, riusato se vengono inviati tutti
+            context (dict): Eventi degli altri canali per la correlazione (vedi _read_correlation_channels)
+            security (dict): Aggregati di sicurezza di tutti gli eventi, inviati se vengono inviati tutti
+        """
+        def send(selected: list):
+            # Chiamata dal thread della GUI: baseline, correlazione, knowledge base, campionamento e
+            # serializzazione del payload avvengono in un thread, come l'invio dopo l'estrazione
+            if len(selected) == len(logs):
+                kwargs = {"logs_json": logs_json, "sample": sample, "context": context, "security": security}
+            else:
+                kwargs = {"context": context}
+            threading.Thread(target=self._send_to_n8n, args=(title, category, description, selected, filename,
+                                                             filepath), kwargs=kwargs, daemon=True).start()
+        
+        EventBrowser(self, logs, self.colors, title=f"📁 {filename} · {len(logs)} eventi", on_send=send,
+                     messages=self.message_store)
+    
+    def _open_history_search(self):
+        """
+        Apre (o porta in primo piano) la finestra di ricerca nello storico delle estrazioni
+        """
+        if self.search_window is not None and self.search_window.winfo_exists():
+            self.search_window.focus()
+            return
+        
+        window = ctk.CTkToplevel(self)
+        window.title("EvLogPyAI - Ricerca nello storico")
+        window.geometry("800x550")
+        window.configure(fg_color=self.colors["background"])
+        self.search_window = window
+        
+        # === BARRA DI RICERCA ===
+        bar = ctk.CTkFrame(window, fg_color="transparent")
+        bar.pack(fill="x", padx=15, pady=(15, 5))
+        
+        entry = ctk.CTkEntry(
+            bar,
+            placeholder_text='Es: source:Ntfs id:7031 level:errore "arrestato in modo imprevisto"',
+            height=40,
+            border_color=self.colors["border"],
+            fg_color=self.colors["input_bg"],
+            text_color=self.colors["text"]
+        )
+        entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        info = ctk.CTkLabel(window, text="", font=ctk.CTkFont(size=11),
+                            text_color=self.colors["text_secondary"], anchor="w")
+        
+        results = ctk.CTkTextbox(
+            window,
+            fg_color=self.colors["card"],
+            text_color=self.colors["text"],
+            wrap="word",
+            state="disabled"
+        )
+        
+        def show(lines: list, status: str):
+            """Mostra i risultati (chiamata nel thread della GUI)"""
+            if not window.winfo_exists():
+                return
+            info.configure(text=status)
+            results.configure(state="normal")
+            results.delete("1.0", "end")
+            results.insert("1.0", "\n\n".join(lines))
+            results.configure(state="disabled")
+        
+        def run_search(event=None):
+            query = entry.get().strip()
+            if not query:
+                return
+            info.configure(text="🔎 Ricerca in corso...")
+            
+            # La ricerca avviene in un thread: l'indice può essere occupato da un'estrazione
+            def worker():
+                started = time.perf_counter()
+                try:
+                    found = self.history.search(query, limit=200)
+                except ValueError as e:
+                    self.after(0, show, [], f"❌ {e}")
+                    return
+                elapsed = (time.perf_counter() - started) * 1000
+                status = f"{len(found)} risultati in {elapsed:.1f} ms (dal più recente)"
+                self.after(0, show, [format_result(r) for r in found], status)
+            
+            threading.Thread(target=worker, daemon=True).start()
+        
+        search_btn = ctk.CTkButton(
+            bar,
+            text="Cerca",
+            width=100,
+            height=40,
+            fg_color=self.colors["primary"],
+            hover_color="#059669",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            command=run_search
+        )
+        search_btn.pack(side="right")
+        
+        # Storico dei report HTML delle analisi (nel browser)
+        reports_btn = ctk.CTkButton(
+            bar,
+            text="📄 Report",
+            width=100,
+            height=40,
+            fg_color=self.colors["secondary"],
+            hover_color="#4B5563",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            command=self._open_report_history
+        )
+        reports_btn.pack(side="right", padx=(0, 10))
+        
+        info.pack(fill="x", padx=15)
+        results.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+        
+        # Invio avvia la ricerca
+        entry.bind("<Return>", run_search)
+        entry.focus()
+    
     def _on_cancel(self):
         """
         Gestisce il click sul pulsante Annulla
@@ -1349,27 +1797,311 @@ class EvLogPyAI(ctk.CTk):
         
         # Reimposta il menu categoria al valore predefinito
         self.category_menu.set("Seleziona categoria...")
+        self._update_selection_hint()
         
         # Cancella il contenuto del campo numero righe
         self.rows_entry.delete(0, "end")
         
+        # Cancella l'intervallo di tempo
+        self.since_entry.delete(0, "end")
+        self.until_entry.delete(0, "end")
+        
         # Cancella il contenuto del textbox descrizione
         # delete("1.0", "end") rimuove tutto il testo da riga 1, carattere 0 alla fine
         self.description_text.delete("1.0", "end")
 
 
+def _parse_args():
+    """
+    Legge le opzioni da riga di comando
+    
+    Returns:
+        argparse.Namespace: Opzioni scelte dall'utente
+    """
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Windows Event Log Manager")
+    parser.add_argument("--watch", metavar="CATEGORIA", choices=list(EvLogPyAI.LOG_CATEGORIES.keys()),
+                        help="Modalità watch: segue la categoria indicata (solo log classici) e avvia l'analisi "
+                             "automaticamente")
+    parser.add_argument("--error-rate", type=int, default=10,
+                        help="Errori al minuto oltre i quali avviare l'analisi (default: 10)")
+    parser.add_argument("--no-new-id", action="store_true",
+                        help="Non avviare l'analisi quando compare un Event ID mai visto")
+    parser.add_argument("--debounce", type=float, default=30.0,
+                        help="Secondi di quiete prima di inviare l'analisi (default: 30)")
+    parser.add_argument("--cooldown", type=float, default=600.0,
+                        help="Secondi minimi tra due analisi automatiche (default: 600)")
+    parser.add_argument("--profile", action="store_true",
+                        default=os.environ.get("EVLOGPYAI_PROFILE") == "1",
+                        help="Profila CPU e memoria dell'esecuzione e salva un bundle in "
+                             "%%LOCALAPPDATA%%\\EvLogPyAI\\profiles (anche con EVLOGPYAI_PROFILE=1)")
+    parser.add_argument("--wire-format", choices=WIRE_FORMATS,
+                        default=os.environ.get("EVLOGPYAI_WIRE_FORMAT", WIRE_JSON),
+                        help="Formato del payload inviato a N8N: json (originale), compact (colonnare) "
+                             "o msgpack (anche con EVLOGPYAI_WIRE_FORMAT)")
+    parser.add_argument("--extract-mode", choices=EXTRACT_MODES,
+                        default=os.environ.get("EVLOGPYAI_EXTRACT_MODE", EXTRACT_PROCESS),
+                        help="Dove leggere e formattare gli eventi: process (processo separato, default) "
+                             "o thread (nel processo della GUI)")
+    parser.add_argument("--format-workers", type=int, default=None,
+                        help="Processi di formattazione dei messaggi per le estrazioni grandi "
+                             "(default: uno per CPU, 1 = nel ciclo di lettura)")
+    parser.add_argument("--sample-size", type=int,
+                        default=int(os.environ.get("EVLOGPYAI_SAMPLE_SIZE", "0")),
+                        help="Oltre questo numero di eventi invia all'AI un campione stratificato per tipo, "
+                             "sorgente ed Event ID (0 = disattivato, anche con EVLOGPYAI_SAMPLE_SIZE)")
+    parser.add_argument("--baseline-diff", action="store_true",
+                        default=os.environ.get("EVLOGPYAI_BASELINE_DIFF") == "1",
+                        help="Invia a N8N solo gli eventi nuovi o in aumento rispetto alla baseline "
+                             "della categoria (anche con EVLOGPYAI_BASELINE_DIFF=1)")
+    parser.add_argument("--capture-baseline", metavar="CATEGORIA",
+                        help="Cattura il profilo normale della categoria o di un canale, es. "
+                             "Microsoft-Windows-TaskScheduler/Operational (da eseguire su una macchina in salute)")
+    parser.add_argument("--baseline-events", type=int, default=100000,
+                        help="Eventi letti da --capture-baseline (default: 100000)")
+    parser.add_argument("--no-known-issues", action="store_true",
+                        help="Non usare la knowledge base locale: tutti gli eventi vanno all'AI")
+    parser.add_argument("--no-rules", action="store_true",
+                        help="Non etichettare gli eventi con le regole di rilevazione")
+    parser.add_argument("--correlate", action="store_true",
+                        default=os.environ.get("EVLOGPYAI_CORRELATE") == "1",
+                        help="Legge anche i log Sistema e Applicazione e invia all'AI gli incidenti correlati "
+                             "invece della lista di eventi (anche con EVLOGPYAI_CORRELATE=1)")
+    parser.add_argument("--correlation-gap", type=float, default=GAP_SECONDS,
+                        help=f"Secondi tra eventi vicini dello stesso incidente (default: {GAP_SECONDS})")
+    parser.add_argument("--callback-max-mb", type=float,
+                        default=float(os.environ.get("EVLOGPYAI_CALLBACK_MAX_MB", MAX_BODY_BYTES / 1024 / 1024)),
+                        help="Dimensione massima in MB di una risposta ricevuta da N8N "
+                             f"(default: {MAX_BODY_BYTES // 1024 // 1024}, anche con EVLOGPYAI_CALLBACK_MAX_MB)")
+    parser.add_argument("--no-archive", action="store_true",
+                        help="Non conservare gli eventi estratti nell'archivio compresso (vedi archive.py)")
+    parser.add_argument("--archive-max-mb", type=float,
+                        default=float(os.environ.get("EVLOGPYAI_ARCHIVE_MAX_MB", DEFAULT_MAX_MB)),
+                        help="Spazio massimo in MB dell'archivio delle estrazioni "
+                             f"(default: {DEFAULT_MAX_MB}, anche con EVLOGPYAI_ARCHIVE_MAX_MB)")
+    parser.add_argument("--archive-days", type=float,
+                        default=float(os.environ.get("EVLOGPYAI_ARCHIVE_DAYS", DEFAULT_MAX_DAYS)),
+                        help="Giorni dopo i quali le estrazioni archiviate vengono eliminate "
+                             f"(default: {DEFAULT_MAX_DAYS}, anche con EVLOGPYAI_ARCHIVE_DAYS)")
+    parser.add_argument("--n8n-url", default=os.environ.get("EVLOGPYAI_N8N_URL", EvLogPyAI.N8N_WEBHOOK_URL),
+                        help="URL del webhook N8N (anche con EVLOGPYAI_N8N_URL)")
+    parser.add_argument("--ollama-url", default=os.environ.get("EVLOGPYAI_OLLAMA_URL", OLLAMA_URL),
+                        help=f"Indirizzo di Ollama per i controlli di stato (default: {OLLAMA_URL}, "
+                             "anche con EVLOGPYAI_OLLAMA_URL)")
+    parser.add_argument("--ollama-model", default=os.environ.get("EVLOGPYAI_OLLAMA_MODEL", OLLAMA_MODEL),
+                        help=f"Modello da tenere in memoria (default: {OLLAMA_MODEL}, "
+                             "anche con EVLOGPYAI_OLLAMA_MODEL)")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Solo controlli di stato: non preriscalda il webhook e il modello all'avvio")
+    parser.add_argument("--search", metavar="QUERY",
+                        help='Cerca nello storico delle estrazioni senza aprire la GUI '
+                             '(es. "source:Ntfs id:7031 level:errore")')
+    parser.add_argument("--limit", type=int, default=50,
+                        help="Numero massimo di risultati di --search (default: 50)")
+    parser.add_argument("--import-reports", metavar="CARTELLA", nargs="?",
+                        const=os.path.join(os.path.expanduser("~"), "Desktop"),
+                        help="Indicizza nello storico i report EvLog_*.txt di una cartella (default: Desktop)")
+    return parser.parse_args()
+
+
+def _run_watch(app: EvLogPyAI, args):
+    """
+    Avvia la modalità watch: finestra nascosta, log seguito in un thread dedicato
+    
+    Args:
+        app (EvLogPyAI): Istanza dell'applicazione (usata per salvataggio e invio a N8N)
+        args (argparse.Namespace): Opzioni da riga di comando
+    """
+    category = args.watch
+    
+    # === REGOLE DI ATTIVAZIONE ===
+    rules = [ErrorRateRule(args.error_rate)]
+    if not args.no_new_id:
+        rules.append(NewEventIdRule())
+    
+    def on_trigger(events: list, reasons: list):
+        """Salva il report e invia a N8N gli eventi che hanno fatto scattare l'analisi"""
+        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        title = f"Watch {category} {timestamp}"
+        description = "Analisi automatica avviata dalla modalità watch.\nMotivi:\n" + \
+            "\n".join(f"- {r}" for r in reasons)
+        # Ogni analisi automatica ha la sua trace per fase, come un'estrazione dal form
+        app.metrics.start_run(category=category, rows=len(events), trigger="watch")
+        app._save_logs_to_desktop(title, category, description, events, len(events), interactive=False,
+                                  coalesce_key=f"watch:{category}")
+    
+    # La finestra resta nascosta: il mainloop serve solo per ricevere la risposta di N8N
+    app.withdraw()
+    
+    # Solo i log classici: "Installazione" (Setup) ed "Eventi Inoltrati" (ForwardedEvents)
+    # esistono solo per le API Evt* e OpenEventLog seguirebbe il log Application al loro posto
+    try:
+        watcher = LogWatcher(
+            EvLogPyAI.LOG_CATEGORIES[category],
+            rules,
+            on_trigger,
+            debounce=args.debounce,
+            cooldown=args.cooldown,
+            # Un'analisi alla volta: le successive restano in attesa finché l'outbox non si svuota
+            is_busy=lambda: app.outbox.depth() > 0
+        )
+    except ValueError as e:
+        print(f"❌ Modalità watch non disponibile per '{category}': {e}")
+        app.after(0, app.quit)
+        return
+    
+    app.protocol("WM_DELETE_WINDOW", watcher.stop)
+    
+    def run_and_quit():
+        try:
+            watcher.run()
+        finally:
+            app.after(0, app.quit)
+    
+    threading.Thread(target=run_and_quit, daemon=True).start()
+
+
+def _run_baseline_capture(args):
+    """
+    Cattura e salva il profilo normale di una categoria
+    
+    Args:
+        args (argparse.Namespace): Opzioni da riga di comando
+    """
+    channel = EvLogPyAI.LOG_CATEGORIES.get(args.capture_baseline, args.capture_baseline)
+    started = time.perf_counter()
+    baseline = capture_baseline(channel, channel, args.baseline_events,
+                                on_progress=lambda n: print(f"📖 {n} eventi letti..."))
+    path = baseline.save()
+    print(f"📐 Baseline {baseline.host}/{channel}: {baseline.events} eventi, "
+          f"{baseline.span_seconds / 3600:.1f} ore, in {time.perf_counter() - started:.1f} s")
+    print(f"💾 Salvata in {path}")
+
+
+def _run_history_cli(args):
+    """
+    Importa report e/o esegue una ricerca nello storico e stampa i risultati
+    
+    Args:
+        args (argparse.Namespace): Opzioni da riga di comando
+    """
+    history = EventIndex(app_data_path("history.db"))
+    try:
+        if args.import_reports:
+            reports, events = history.import_reports(args.import_reports)
+            print(f"📥 Importati {reports} report ({events} eventi nuovi) da {args.import_reports}")
+        
+        if args.search:
+            started = time.perf_counter()
+            try:
+                results = history.search(args.search, limit=args.limit)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            elapsed = (time.perf_counter() - started) * 1000
+            for result in results:
+                print(format_result(result))
+            print(f"\n🔎 {len(results)} risultati in {elapsed:.1f} ms")
+    finally:
+        history.close()
+
+
 def main():
     """
     Entry point (punto di ingresso) dell'applicazione
     Questa funzione viene chiamata all'avvio del programma
     """
+    # Necessario nell'eseguibile PyInstaller: il processo di estrazione riparte da qui
+    multiprocessing.freeze_support()
+    
+    # Legge le opzioni da riga di comando
+    args = _parse_args()
+    
+    # === STORICO DA RIGA DI COMANDO ===
+    # Importazione dei report e ricerca non richiedono la GUI
+    if args.import_reports or args.search:
+        _run_history_cli(args)
+        return
+    
+    # === CATTURA BASELINE ===
+    if args.capture_baseline:
+        _run_baseline_capture(args)
+        return
+    
+    # === MODALITÀ PROFILING ===
+    # Avviata prima dell'app così vengono profilati anche i thread creati nel costruttore
+    # Il modulo viene importato solo se richiesto: senza --profile l'overhead è nullo
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler(os.path.join(APP_DATA_DIR, "profiles"))
+        profiler.start()
+    
     # Crea un'istanza della classe EvLogPyAI (inizializza l'applicazione)
     app = EvLogPyAI()
     
+    # Formato del payload: il decoder del workflow N8N accetta tutti i formati
+    app.outbox_sender.wire_format = args.wire_format
+    
+    # Estrazione nel processo separato o nel thread della GUI
+    app.extract_mode = args.extract_mode
+    
+    # Pool di formattazione dei messaggi (in entrambe le modalità)
+    app.format_workers = args.format_workers
+    app.extraction_worker.format_workers = args.format_workers
+    
+    # Campionamento stratificato delle estrazioni grandi
+    app.sample_size = args.sample_size
+    
+    # Analisi differenziale rispetto alla baseline
+    app.baseline_diff = args.baseline_diff
+    
+    # Knowledge base locale dei problemi noti
+    if args.no_known_issues:
+        app.knowledge_base = None
+    
+    # Regole di rilevazione
+    if args.no_rules:
+        app.rule_engine = None
+    
+    # Archivio compresso delle estrazioni
+    if args.no_archive:
+        app.archive.close()
+        app.archive = None
+    app.archive_max_bytes = int(args.archive_max_mb * 1024 * 1024)
+    app.archive_max_days = args.archive_days
+    
+    # Correlazione degli incidenti tra i canali
+    if args.correlate:
+        app.correlator = Correlator(custom_path=app_data_path("correlation_rules.json"), gap=args.correlation_gap)
+    
+    # Indirizzi dei servizi e preriscaldamento (letti all'avvio dei controlli di stato)
+    app.N8N_WEBHOOK_URL = args.n8n_url
+    app.outbox_sender.url = args.n8n_url
+    app.ollama_url = args.ollama_url
+    app.callback_max_bytes = int(args.callback_max_mb * 1024 * 1024)
+    app.ollama_model = args.ollama_model
+    app.warmup = not args.no_warmup
+    
+    # Snapshot della memoria a ogni confine di fase
+    if profiler:
+        profiler.attach(app.metrics)
+    
+    # === MODALITÀ WATCH ===
+    # Se richiesta, segue il log in background invece di mostrare il form
+    if args.watch:
+        _run_watch(app, args)
+    
     # mainloop() avvia il loop principale dell'interfaccia grafica
     # Mantiene la finestra aperta e risponde agli eventi (click, digitazione, ecc.)
     # Il programma rimane in esecuzione finché la finestra non viene chiusa
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        # Alla chiusura libera la porta del server callback
+        app._stop_callback_server()
+        # Scrive il bundle di profiling (pstats, allocatori, stack collapsed)
+        if profiler:
+            profiler.stop()
 
 
 # === AVVIO APPLICAZIONE ===
@@ -0,0 +1,311 @@
+"""
+EvLogPyAI - Modalità Watch (follow/tail)
+Tiene aperto un canale del Visualizzatore Eventi, legge solo i record nuovi,
+li raggruppa in micro-batch e avvia un'analisi automatica quando scatta una soglia
+
+Caratteristiche:
+- Lettura incrementale tramite numero di record (nessuna rilettura)
+- Attesa bloccante su NotifyChangeEventLog: CPU quasi nulla quando il log è fermo
+- Regole configurabili (tasso di errori al minuto, nuovo Event ID mai visto)
+- Debounce: una raffica di eventi produce una sola analisi, non centinaia
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# time: Orologio monotono per finestre temporali e debounce
+import time
+
+# collections: deque per finestre scorrevoli e buffer di contesto a dimensione fissa
+from collections import deque
+
+# win32evtlog: Apertura del log e notifica dei cambiamenti
+import win32evtlog
+
+# win32event: Eventi kernel per attendere nuovi record senza polling
+import win32event
+
+# eventlog: Lettura incrementale e conversione dei record
+import eventlog
+
+
+# === REGOLE DI ATTIVAZIONE ===
+
+class ErrorRateRule:
+    """
+    Scatta quando il numero di eventi di errore supera una soglia al minuto
+    """
+
+    def __init__(self, max_per_minute: int, levels=("Errore", "Audit Failure")):
+        """
+        Args:
+            max_per_minute (int): Numero di errori al minuto oltre il quale la regola scatta
+            levels (tuple): Tipi di evento conteggiati come errori
+        """
+        self.max_per_minute = max_per_minute
+        self.levels = set(levels)
+        # Istanti di arrivo degli errori nell'ultimo minuto
+        self._hits = deque()
+
+    def check(self, events: list, now: float):
+        """
+        Valuta un micro-batch di eventi
+
+        Args:
+            events (list): Eventi del micro-batch (dizionari)
+            now (float): Istante corrente (time.monotonic)
+
+        Returns:
+            str | None: Motivo dell'attivazione, oppure None
+        """
+        for event in events:
+            if event["type"] in self.levels:
+                self._hits.append(now)
+
+        # Scarta gli errori più vecchi di 60 secondi
+        while self._hits and now - self._hits[0] > 60:
+            self._hits.popleft()
+
+        if len(self._hits) > self.max_per_minute:
+            return f"{len(self._hits)} errori/min (soglia {self.max_per_minute})"
+        return None
+
+
+class NewEventIdRule:
+    """
+    Scatta quando compare una coppia sorgente/Event ID mai vista prima
+    """
+
+    def __init__(self):
+        # Firme (source, event_id) già osservate
+        self.seen = set()
+
+    def prime(self, events: list):
+        """
+        Registra gli eventi già presenti nel log come "noti" senza far scattare la regola
+
+        Args:
+            events (list): Eventi storici (dizionari)
+        """
+        for event in events:
+            self.seen.add((event["source"], event["event_id"]))
+
+    def check(self, events: list, now: float):
+        """
+        Valuta un micro-batch di eventi
+
+        Args:
+            events (list): Eventi del micro-batch (dizionari)
+            now (float): Istante corrente (time.monotonic)
+
+        Returns:
+            str | None: Motivo dell'attivazione, oppure None
+        """
+        new = []
+        for event in events:
+            key = (event["source"], event["event_id"])
+            if key not in self.seen:
+                self.seen.add(key)
+                new.append(f"{key[0]}/{key[1]}")
+
+        if new:
+            return "Nuovi Event ID: " + ", ".join(new[:10])
+        return None
+
+
+# === WATCHER ===
+
+class LogWatcher:
+    """
+    Segue un log di Windows e invoca on_trigger quando una regola scatta
+
+    Il ciclo principale alterna:
+    1. Attesa bloccante di nuovi record (o della scadenza del prossimo timer)
+    2. Lettura incrementale dei record nuovi e accumulo nel micro-batch
+    3. Valutazione delle regole sul micro-batch chiuso
+    4. Invio dell'analisi quando il periodo di debounce è trascorso
+    """
+
+    def __init__(self, log_type: str, rules: list, on_trigger,
+                 batch_max: int = 200, batch_interval: float = 5.0,
+                 debounce: float = 30.0, max_delay: float = 300.0,
+                 cooldown: float = 600.0, context_size: int = 200,
+                 prime_records: int = 1000, is_busy=None):
+        """
+        Args:
+            log_type (str): Nome tecnico del log di Windows (es. "System")
+            rules (list): Regole con metodo check(events, now)
+            on_trigger (callable): Funzione on_trigger(events, reasons) chiamata per ogni analisi
+            batch_max (int): Numero massimo di eventi in un micro-batch
+            batch_interval (float): Età massima (secondi) di un micro-batch prima della chiusura
+            debounce (float): Secondi di quiete (nessuna nuova attivazione) prima di inviare l'analisi
+            max_delay (float): Attesa massima dalla prima attivazione, anche se la raffica continua
+            cooldown (float): Pausa minima tra due analisi consecutive
+            context_size (int): Numero di eventi recenti inviati con ogni analisi
+            prime_records (int): Record storici usati per inizializzare le regole all'avvio
+            is_busy (callable): Se restituisce True l'analisi viene rimandata (es. analisi in corso)
+
+        Raises:
+            ValueError: Log non classico (es. "Setup", "ForwardedEvents"): OpenEventLog aprirebbe
+                        in silenzio il log Application (vedi eventlog.is_classic_log)
+        """
+        if not eventlog.is_classic_log(log_type):
+            raise ValueError(f"'{log_type}' non è un log classico: la modalità watch non può seguirlo")
+        self.log_type = log_type
+        self.rules = rules
+        self.on_trigger = on_trigger
+        self.batch_max = batch_max
+        self.batch_interval = batch_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.cooldown = cooldown
+        self.prime_records = prime_records
+        self.is_busy = is_busy or (lambda: False)
+
+        # Ultimo record già elaborato
+        self.last_record = 0
+
+        # Micro-batch corrente e istante del suo primo evento
+        self._batch = []
+        self._batch_started = None
+
+        # Eventi recenti inviati come contesto all'analisi
+        self._recent = deque(maxlen=context_size)
+
+        # Stato del debounce: ultimo motivo per ogni regola, prima e ultima attivazione
+        self._reasons = {}
+        self._first_fire = None
+        self._last_fire = None
+        self._last_analysis = None
+
+        # Evento kernel usato per interrompere l'attesa dall'esterno
+        self._stop_event = win32event.CreateEvent(None, True, False, None)
+
+    def stop(self):
+        """
+        Interrompe il ciclo di watch (può essere chiamato da un altro thread)
+        """
+        win32event.SetEvent(self._stop_event)
+
+    def run(self):
+        """
+        Ciclo principale: resta in esecuzione finché non viene chiamato stop()
+        """
+        hand = win32evtlog.OpenEventLog(None, self.log_type)
+        # Evento auto-reset segnalato da Windows a ogni nuovo record scritto nel log
+        change_event = win32event.CreateEvent(None, False, False, None)
+        try:
+            win32evtlog.NotifyChangeEventLog(hand, change_event)
+            self._prime(hand)
+
+            print(f"👀 Watch attivo su '{self.log_type}' dal record {self.last_record}")
+
+            while True:
+                timeout_ms = self._next_timeout_ms(time.monotonic())
+                rc = win32event.WaitForMultipleObjects(
+                    [self._stop_event, change_event], False, timeout_ms
+                )
+                if rc == win32event.WAIT_OBJECT_0:
+                    break
+
+                now = time.monotonic()
+                if rc == win32event.WAIT_OBJECT_0 + 1:
+                    records = eventlog.read_records_after(hand, self.last_record)
+                    if records:
+                        self.last_record = records[-1].RecordNumber
+                        self._add_events(
+                            [eventlog.event_to_dict(r, self.log_type) for r in records], now
+                        )
+                self._tick(now)
+        finally:
+            win32evtlog.CloseEventLog(hand)
+            print("🛑 Watch terminato")
+
+    def _prime(self, hand):
+        """
+        Posiziona il watcher sulla fine del log e inizializza le regole con gli eventi recenti
+        """
+        oldest, newest = eventlog.get_record_range(hand)
+        start = max(oldest, newest - self.prime_records + 1)
+        history = [
+            eventlog.event_to_dict(r, self.log_type)
+            for r in eventlog.read_records_after(hand, start - 1)
+        ] if newest >= oldest else []
+
+        for rule in self.rules:
+            if hasattr(rule, "prime"):
+                rule.prime(history)
+        self._recent.extend(history)
+        self.last_record = max(newest, 0)
+
+    def _add_events(self, events: list, now: float):
+        """
+        Aggiunge eventi al micro-batch corrente, chiudendolo se pieno
+        """
+        for event in events:
+            if self._batch_started is None:
+                self._batch_started = now
+            self._batch.append(event)
+            self._recent.append(event)
+            if len(self._batch) >= self.batch_max:
+                self._flush_batch(now)
+
+    def _flush_batch(self, now: float):
+        """
+        Chiude il micro-batch corrente e lo valuta con tutte le regole
+        """
+        batch, self._batch, self._batch_started = self._batch, [], None
+        if not batch:
+            return
+
+        for index, rule in enumerate(self.rules):
+            reason = rule.check(batch, now)
+            if reason:
+                self._reasons[index] = reason
+                self._last_fire = now
+                if self._first_fire is None:
+                    self._first_fire = now
+
+    def _tick(self, now: float):
+        """
+        Gestisce i timer: chiusura del micro-batch per età e invio dell'analisi dopo il debounce
+        """
+        if self._batch_started is not None and now - self._batch_started >= self.batch_interval:
+            self._flush_batch(now)
+
+        if self._first_fire is None:
+            return
+
+        quiet = now - self._last_fire >= self.debounce
+        overdue = now - self._first_fire >= self.max_delay
+        cooled = self._last_analysis is None or now - self._last_analysis >= self.cooldown
+        if (quiet or overdue) and cooled and not self.is_busy():
+            reasons = list(self._reasons.values())
+            events = list(self._recent)
+            self._reasons, self._first_fire, self._last_fire = {}, None, None
+            self._last_analysis = now
+
+            print(f"🚨 Analisi automatica: {'; '.join(reasons)}")
+            self.on_trigger(events, reasons)
+
+    def _next_timeout_ms(self, now: float) -> int:
+        """
+        Calcola quanto attendere prima del prossimo timer (micro-batch o debounce)
+
+        Returns:
+            int: Millisecondi di attesa; INFINITE se non ci sono timer in sospeso
+        """
+        deadlines = []
+        if self._batch_started is not None:
+            deadlines.append(self._batch_started + self.batch_interval)
+        if self._first_fire is not None:
+            deadline = min(self._last_fire + self.debounce, self._first_fire + self.max_delay)
+            if self._last_analysis is not None:
+                deadline = max(deadline, self._last_analysis + self.cooldown)
+            # Se un'analisi è in corso riprova periodicamente
+            if self.is_busy():
+                deadline = max(deadline, now + 5)
+            deadlines.append(deadline)
+
+        if not deadlines:
+            return win32event.INFINITE
+        return max(0, int((min(deadlines) - now) * 1000))
@@ -0,0 +1,378 @@
+"""
+EvLogPyAI - Formati di trasmissione del payload verso N8N
+Serializza il payload del webhook nel formato scelto dall'utente
+
+Formati disponibili:
+- json: formato originale, "logs" è una lista di oggetti (una copia delle chiavi per ogni evento)
+- compact: "logs_columnar" contiene una lista per colonna, con sorgenti e testi dei
+  messaggi codificati a dizionario, livelli numerici e timestamp in secondi; le etichette
+  delle regole ("tags", vedi rules.py) viaggiano a dizionario e solo per gli eventi che le hanno
+- msgpack: stesso schema di "compact" serializzato con MessagePack (richiede il pacchetto msgpack)
+
+Il nodo Code "Decode Payload" del workflow N8N (n8n/workflows/decode-payload.js)
+ricostruisce la lista "logs" originale, quindi il resto del workflow non cambia.
+
+Benchmark dimensione/tempo rispetto al formato originale:
+    python wire.py --bench                     # eventi sintetici
+    python wire.py --bench --evtx System.evtx  # eventi reali da un file .evtx
+"""
+
+# === IMPORTAZIONE LIBRERIE ===
+
+# argparse: Opzioni del benchmark da riga di comando
+import argparse
+
+# calendar: Orario locale dei timestamp in secondi (senza fuso orario)
+import calendar
+
+# functools: Formato di "%c" calcolato una volta sola
+import functools
+
+# json: Serializzazione dei formati json e compact
+import json
+
+# random: Generazione degli eventi sintetici per il benchmark
+import random
+
+# re: Estrazione dei parametri variabili dai messaggi
+import re
+
+# time: Misura dei tempi di serializzazione
+import time
+
+# datetime: Conversione dei timestamp testuali in secondi
+from datetime import datetime, timedelta
+
+# msgpack: Serializzazione binaria (opzionale, solo per il formato msgpack)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# === FORMATI ===
+WIRE_JSON = "json"
+WIRE_COMPACT = "compact"
+WIRE_MSGPACK = "msgpack"
+WIRE_FORMATS = (WIRE_JSON, WIRE_COMPACT, WIRE_MSGPACK)
+
+# Versione dello schema colonnare (controllata dal decoder in N8N)
+# 2: "ts" è l'orario locale in secondi, riformattato con "ts_format" come il testo originale
+COLUMNAR_VERSION = 2
+
+# === TIMESTAMP ===
+# Forme note di "%c" scritte solo con le direttive che il decoder N8N sa riprodurre
+# (%a %b %d %e %H %M %S %Y %y %m, nomi inglesi): C/glibc, C/MSVC e le impostazioni più comuni
+_TIME_FORMATS = (
+    "%a %b %e %H:%M:%S %Y",
+    "%a %b %d %H:%M:%S %Y",
+    "%m/%d/%y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%y %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%d.%m.%Y %H:%M:%S",
+)
+
+# Date di prova: giorno a una cifra e giorno oltre il 12 (distinguono %d/%e e giorno/mese)
+_SAMPLE_TIMES = (datetime(2026, 1, 5, 7, 8, 9), datetime(2026, 11, 25, 17, 48, 59))
+
+_EPOCH = datetime(1970, 1, 1)
+
+# === LIVELLI ===
+# Stessi codici numerici di EventType di Windows; 0 = tipo non riconosciuto ("Info")
+LEVEL_CODES = {
+    "Errore": 1,
+    "Avviso": 2,
+    "Informazione": 4,
+    "Audit Success": 8,
+    "Audit Failure": 16,
+    "Info": 0,
+}
+
+# Parti variabili dei messaggi (numeri, valori esadecimali, GUID): vengono estratte
+# come parametri così messaggi che differiscono solo per questi valori condividono il template
+_PARAM_PATTERN = re.compile(r"\{[0-9A-Fa-f-]{36}\}|0x[0-9A-Fa-f]+|\d+")
+
+# Segnaposto dei parametri nel template (non compare nei messaggi del Visualizzatore Eventi)
+PARAM_MARK = "\x00"
+
+
+def message_template(message) -> tuple:
+    """
+    Separa un messaggio nel template (parti fisse) e nei parametri (numeri, esadecimali, GUID)
+
+    Args:
+        message (str): Messaggio dell'evento
+
+    Returns:
+        tuple: (template con PARAM_MARK al posto dei parametri, lista dei parametri)
+    """
+    if isinstance(message, str) and PARAM_MARK not in message:
+        params = _PARAM_PATTERN.findall(message)
+        return (_PARAM_PATTERN.sub(PARAM_MARK, message) if params else message), params
+    # Messaggio già contenente il segnaposto: inviato così com'è, senza parametri
+    return message, []
+
+
+@functools.lru_cache(maxsize=None)
+def local_time_format():
+    """
+    Forma esplicita di "%c" su questo computer, riproducibile dal decoder N8N
+
+    Returns:
+        str: Formato tra _TIME_FORMATS (None se "%c" non corrisponde a nessuno, es. nomi dei giorni localizzati)
+    """
+    for candidate in _TIME_FORMATS:
+        try:
+            if all(moment.strftime(candidate) == moment.strftime("%c") for moment in _SAMPLE_TIMES) \
+                    and ("%a" not in candidate or _SAMPLE_TIMES[0].strftime("%a %b") == "Mon Jan"):
+                return candidate
+        except ValueError:
+            # %e non esiste nello strftime di Windows
+            continue
+    return None
+
+
+def to_columnar(logs: list) -> dict:
+    """
+    Converte la lista di eventi nello schema colonnare
+
+    Args:
+        logs (list): Eventi nel formato dell'applicazione (timestamp, source, event_id, type, category, message,
+                     tags facoltativo)
+
+    Returns:
+        dict: Colonne dello schema compatto (una voce per evento in ogni colonna)
+    """
+    sources, source_index = [], {}
+    templates, template_index = [], {}
+    timestamps, ts_text = [], {}
+    tag_names, tag_index, tags = [], {}, {}
+    parsed_times = {}
+    columns = {"source": [], "event_id": [], "level": [], "category": [], "template": [], "params": []}
+
+    ts_format = local_time_format()
+
+    for i, log in enumerate(logs):
+        # === TIMESTAMP ===
+        # Il backend live usa il formato "%c" locale: lo riconvertiamo nell'orario locale in secondi
+        # (senza fuso orario né ora legale), che i decoder riformattano con ts_format nello stesso
+        # testo. I timestamp che non tornerebbero identici viaggiano come testo in ts_text
+        text = log.get("timestamp")
+        seconds = parsed_times.get(text)
+        if seconds is None and text not in parsed_times:
+            try:
+                moment = datetime.strptime(text, "%c")
+                seconds = calendar.timegm(moment.timetuple()) if moment.strftime(ts_format) == text else None
+            except (TypeError, ValueError, OverflowError):
+                seconds = None
+            parsed_times[text] = seconds
+        timestamps.append(seconds)
+        if seconds is None:
+            ts_text[str(i)] = text
+
+        # === SORGENTE (dizionario) ===
+        source = log.get("source")
+        index = source_index.get(source)
+        if index is None:
+            index = source_index[source] = len(sources)
+            sources.append(source)
+        columns["source"].append(index)
+
+        columns["event_id"].append(log.get("event_id"))
+        columns["level"].append(LEVEL_CODES.get(log.get("type"), 0))
+        columns["category"].append(log.get("category"))
+
+        # === MESSAGGIO (template a dizionario + parametri) ===
+        template, params = message_template(log.get("message"))
+        index = template_index.get(template)
+        if index is None:
+            index = template_index[template] = len(templates)
+            templates.append(template)
+        columns["template"].append(index)
+        columns["params"].append(params or None)
+
+        # === ETICHETTE DELLE REGOLE (dizionario, solo gli eventi etichettati) ===
+        if log.get("tags"):
+            indexes = []
+            for tag in log["tags"]:
+                index = tag_index.get(tag)
+                if index is None:
+                    index = tag_index[tag] = len(tag_names)
+                    tag_names.append(tag)
+                indexes.append(index)
+            tags[str(i)] = indexes
+
+    return {
+        "version": COLUMNAR_VERSION,
+        "count": len(logs),
+        "levels": {str(code): label for label, code in LEVEL_CODES.items()},
+        "sources": sources,
+        "templates": templates,
+        "ts": timestamps,
+        "ts_format": ts_format,
+        "ts_text": ts_text,
+        "tag_names": tag_names,
+        "tags": tags,
+        **columns,
+    }
+
+
+def from_columnar(data: dict) -> list:
+    """
+    Ricostruisce la lista di eventi da uno schema colonnare (stessa logica del decoder N8N)
+
+    Args:
+        data (dict): Colonne prodotte da to_columnar
+
+    Returns:
+        list: Eventi nel formato dell'applicazione
+    """
+    if data.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"Versione dello schema colonnare non supportata: {data.get('version')}")
+
+    logs = []
+    tag_names, tags = data.get("tag_names") or [], data.get("tags") or {}
+    for i in range(data["count"]):
+        seconds = data["ts"][i]
+        if seconds is None:
+            timestamp = data["ts_text"].get(str(i))
+        else:
+            timestamp = (_EPOCH + timedelta(seconds=seconds)).strftime(data["ts_format"])
+
+        template = data["templates"][data["template"][i]]
+        params = data["params"][i]
+        if params:
+            parts = template.split(PARAM_MARK)
+            message = parts[0] + "".join(p + part for p, part in zip(params, parts[1:]))
+        else:
+            message = template
+
+        log = {
+            "timestamp": timestamp,
+            "source": data["sources"][data["source"][i]],
+            "event_id": data["event_id"][i],
+            "type": data["levels"].get(str(data["level"][i]), "Info"),
+            "category": data["category"][i],
+            "message": message,
+        }
+        if str(i) in tags:
+            log["tags"] = [tag_names[index] for index in tags[str(i)]]
+        logs.append(log)
+    return logs
+
+
+def encode_payload(payload: dict, wire_format: str = WIRE_JSON) -> tuple:
+    """
+    Serializza il payload del webhook nel formato richiesto
+
+    Args:
+        payload (dict): Payload nel formato originale (con la lista "logs")
+        wire_format (str): json, compact o msgpack
+
+    Returns:
+        tuple: (corpo della richiesta in bytes, Content-Type)
+    """
+    if wire_format == WIRE_MSGPACK and msgpack is None:
+        print("⚠️  Pacchetto msgpack non installato: uso il formato compact")
+        wire_format = WIRE_COMPACT
+
+    if wire_format == WIRE_JSON:
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+
+    compact = {key: value for key, value in payload.items() if key != "logs"}
+    compact["wire_format"] = wire_format
+    compact["logs_columnar"] = to_columnar(payload.get("logs") or [])
+
+    if wire_format == WIRE_MSGPACK:
+        return msgpack.packb(compact, use_bin_type=True), "application/msgpack"
+    # Separatori senza spazi: nello schema colonnare sono una parte rilevante dei byte
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "application/json"
+
+
+# === BENCHMARK ===
+
+def _synthetic_logs(count: int, seed: int = 1) -> list:
+    """
+    Genera eventi simili a quelli del log Sistema (poche sorgenti, messaggi ripetuti)
+    """
+    rnd = random.Random(seed)
+    sources = ["Service Control Manager", "Microsoft-Windows-Kernel-Power", "disk", "Ntfs",
+               "Microsoft-Windows-DistributedCOM", "Microsoft-Windows-WindowsUpdateClient"]
+    messages = [
+        "Il servizio Windows Update è stato terminato in modo imprevisto. Si è verificato {n} volta/e.",
+        "Il driver ha rilevato un errore del controller in \\Device\\Harddisk{n}\\DR{n}.",
+        "Impostazioni di autorizzazione specifiche dell'applicazione non concedono l'autorizzazione "
+        "Attivazione locale per l'applicazione server COM con CLSID {{D63B10C5-BB46-4990-A94F-E40B9D520160}} "
+        "all'utente NT AUTHORITY\\SYSTEM SID (S-1-5-18) dall'indirizzo LocalHost (tramite LRPC).",
+        "Il sistema è stato riavviato senza un arresto regolare. Codice 0x{h:08X}.",
+        "Installazione completata: l'aggiornamento KB{n} è stato installato correttamente.",
+    ]
+    labels = list(LEVEL_CODES)
+    logs = []
+    for i in range(count):
+        logs.append({
+            "timestamp": datetime.fromtimestamp(1767225600 - i * 37).strftime("%c"),
+            "source": rnd.choice(sources),
+            "event_id": rnd.choice([7031, 7034, 41, 153, 10016, 19]),
+            "type": rnd.choice(labels),
+            "category": rnd.randint(0, 5),
+            "message": rnd.choice(messages).format(n=rnd.randint(1, 5000000), h=rnd.getrandbits(32)),
+        })
+    return logs
+
+
+def benchmark(logs: list, repeat: int = 5):
+    """
+    Confronta dimensione e tempo di serializzazione dei formati disponibili
+
+    Args:
+        logs (list): Eventi da serializzare
+        repeat (int): Ripetizioni (viene riportato il tempo migliore)
+    """
+    payload = {
+        "title": "Benchmark", "category": "Sistema", "category_windows": "System",
+        "description": "Confronto formati di trasmissione", "timestamp": datetime.now().isoformat(),
+        "filename": "benchmark.txt", "filepath": "benchmark.txt", "total_logs": len(logs),
+        "logs": logs, "callback_url": "http://host.docker.internal:5050/callback",
+    }
+
+    print(f"📊 Benchmark payload ({len(logs)} eventi)")
+    baseline = None
+    for wire_format in WIRE_FORMATS:
+        if wire_format == WIRE_MSGPACK and msgpack is None:
+            print(f"   {wire_format:<8} saltato (pacchetto msgpack non installato)")
+            continue
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body, _content_type = encode_payload(payload, wire_format)
+            best = min(best, time.perf_counter() - started)
+        baseline = baseline or len(body)
+        print(f"   {wire_format:<8} {len(body) / 1024:>10.1f} KiB  {len(body) / baseline:>6.1%}  "
+              f"{best * 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EvLogPyAI - Benchmark dei formati di trasmissione")
+    parser.add_argument("--bench", action="store_true", help="Confronta dimensione e tempo di serializzazione")
+    parser.add_argument("-n", "--num-records", type=int, default=2000,
+                        help="Numero di eventi da serializzare (default: 2000)")
+    parser.add_argument("--evtx", metavar="FILE", help="Usa gli eventi di un file .evtx invece di quelli sintetici")
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_help()
+        return
+
+    if args.evtx:
+        from evtx_reader import read_evtx_logs
+        logs = read_evtx_logs(args.evtx, args.num_records)
+    else:
+        logs = _synthetic_logs(args.num_records)
+    benchmark(logs)
+
+
+if __name__ == "__main__":
+    main()